@@ -4,7 +4,10 @@ Configuration de l'interface d'administration pour les comptes
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
 from django.utils.html import format_html
-from .models import Arbitre, Commissaire, LigueArbitrage, GradeArbitrage, Admin, ExcuseArbitre
+from .models import (
+    Arbitre, Commissaire, LigueArbitrage, GradeArbitrage, Admin, ExcuseArbitre,
+    NotificationOutbox, NotificationAttempt, BroadcastJob
+)
 
 @admin.register(Admin)
 class AdminUserAdmin(UserAdmin):
@@ -245,6 +248,53 @@ class ExcuseArbitreAdmin(admin.ModelAdmin):
         """Optimise les requêtes"""
         return super().get_queryset(request).select_related('arbitre', 'arbitre__ligue', 'traite_par')
 
+class NotificationAttemptInline(admin.TabularInline):
+    """Tentatives d'envoi d'un message de l'outbox"""
+    model = NotificationAttempt
+    fields = ['number', 'success', 'duration_ms', 'error_message', 'created_at']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+@admin.register(NotificationOutbox)
+class NotificationOutboxAdmin(admin.ModelAdmin):
+    """Interface d'administration pour l'outbox des notifications"""
+    
+    list_display = ['id', 'channel', 'arbitre', 'title', 'status', 'attempts', 'next_attempt_at', 'created_at']
+    list_filter = ['status', 'channel', 'created_at']
+    search_fields = ['arbitre__first_name', 'arbitre__last_name', 'title']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'attempts', 'locked_at', 'last_error', 'created_at', 'sent_at',
+        'coalesce_key', 'coalesced_count', 'superseded_by', 'delivered_devices'
+    ]
+    inlines = [NotificationAttemptInline]
+    actions = ['relancer_messages']
+    
+    def relancer_messages(self, request, queryset):
+        """Remettre en file les messages abandonnés"""
+        from notifications import outbox
+        
+        relances = outbox.relancer(queryset)
+        self.message_user(request, f'{relances} message(s) remis en file d\'envoi.')
+    relancer_messages.short_description = "Remettre en file les messages abandonnés"
+    
+    def get_queryset(self, request):
+        """Optimise les requêtes"""
+        return super().get_queryset(request).select_related('arbitre')
+
+@admin.register(BroadcastJob)
+class BroadcastJobAdmin(admin.ModelAdmin):
+    """Interface d'administration pour les broadcasts FCM"""
+    
+    list_display = ['id', 'title', 'status', 'total_tokens', 'created_at', 'finished_at']
+    list_filter = ['status', 'created_at']
+    search_fields = ['title']
+    ordering = ['-created_at']
+    readonly_fields = [
+        'status', 'results', 'total_tokens', 'echecs', 'error', 'created_at', 'started_at', 'finished_at'
+    ]
+
 # Configuration du site d'administration
 admin.site.site_header = "Direction Nationale de l'Arbitrage"
 admin.site.site_title = "Administration DNA"
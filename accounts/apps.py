@@ -6,40 +6,7 @@ class AccountsConfig(AppConfig):
     name = 'accounts'
     verbose_name = 'Gestion des Arbitres'
 
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
-
+    
+    def ready(self):
+        """Importer les signaux quand l'app est prête"""
+        import accounts.signals
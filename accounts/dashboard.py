@@ -0,0 +1,284 @@
+"""
+Tableau de bord d'administration matérialisé
+
+Les compteurs affichés par `admin_stats` et par les statistiques FCM sont
+stockés dans la table `dashboard_counters`. Chaque enregistrement sait à
+quelles clés il contribue (ex: un arbitre actif compte dans
+`arbitres:total` et `arbitres:actifs`) ; les signaux comparent l'état
+chargé et l'état sauvegardé puis appliquent des incréments atomiques
+(`UPDATE ... SET value = value + 1`).
+
+Les opérations qui contournent les signaux (`QuerySet.update`,
+`bulk_create`) provoquent une dérive : `reconcile()` recalcule tous les
+compteurs et doit être lancé périodiquement via la commande
+`reconcile_dashboard`. Si le marqueur d'initialisation est absent (table
+vide ou instantané invalidé), la lecture déclenche une réconciliation.
+"""
+import logging
+from datetime import date
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Arbitre, Commissaire, Admin, LigueArbitrage, Device, DashboardCounter
+
+logger = logging.getLogger(__name__)
+
+MARQUEUR_INITIALISATION = 'dashboard:initialise'
+
+# Champs nécessaires au calcul des contributions, par modèle
+CHAMPS_SUIVIS = {
+    Arbitre: ('is_active',),
+    Commissaire: ('is_active',),
+    Admin: ('is_active',),
+    LigueArbitrage: ('is_active',),
+    Device: ('is_active', 'device_type', 'channel', 'user_type'),
+}
+
+PREFIXES_UTILISATEURS = {
+    Arbitre: 'arbitres',
+    Commissaire: 'commissaires',
+    Admin: 'admins',
+}
+
+
+def _cle_mois(value):
+    """Clé du compteur mensuel des matchs (`matches:mois:AAAA-MM`)"""
+    if not value:
+        return None
+    if isinstance(value, date):
+        return f'matches:mois:{value.strftime("%Y-%m")}'
+    # Date encore sous forme de chaîne (affectée avant la sauvegarde)
+    return f'matches:mois:{str(value)[:7]}'
+
+
+def contributions(instance):
+    """Ensemble des clés de compteur auxquelles contribue un enregistrement"""
+    model = type(instance)
+
+    if model in PREFIXES_UTILISATEURS:
+        prefix = PREFIXES_UTILISATEURS[model]
+        keys = {f'{prefix}:total'}
+        if instance.is_active:
+            keys.add(f'{prefix}:actifs')
+        return frozenset(keys)
+
+    if model is LigueArbitrage:
+        return frozenset({'ligues:actives'} if instance.is_active else ())
+
+    if model is Device:
+        # Seuls les appareils FCM sont comptés (statistiques FCM)
+        if instance.channel != 'fcm':
+            return frozenset()
+        keys = {'fcm:total', f'fcm:utilisateurs:{instance.user_type}s'}
+        if instance.is_active:
+            keys.add('fcm:actifs')
+            keys.add(f'fcm:plateforme:{instance.device_type}')
+        return frozenset(keys)
+
+    # Match (application matches)
+    keys = {'matches:total'}
+    cle_mois = _cle_mois(instance.match_date)
+    if cle_mois:
+        keys.add(cle_mois)
+    return frozenset(keys)
+
+
+def champs_suivis(model):
+    return CHAMPS_SUIVIS.get(model, ('match_date',))
+
+
+def capturer_etat(instance):
+    """
+    Mémoriser les contributions de l'état chargé (signal post_init)
+
+    Si un champ suivi est différé (`only()` / `defer()`), l'état d'origine est
+    inconnu : on stocke None et la sauvegarde invalidera l'instantané.
+    """
+    if any(field not in instance.__dict__ for field in champs_suivis(type(instance))):
+        instance._dashboard_keys = None
+        return
+    instance._dashboard_keys = contributions(instance)
+
+
+def _appliquer(deltas):
+    """Appliquer des incréments atomiques aux compteurs"""
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        updated = DashboardCounter.objects.filter(key=key).update(value=F('value') + delta)
+        if not updated:
+            # Nouvelle clé (ex: premier match d'un mois)
+            counter, _ = DashboardCounter.objects.get_or_create(key=key)
+            DashboardCounter.objects.filter(pk=counter.pk).update(value=F('value') + delta)
+
+
+def enregistrement_sauvegarde(instance, created):
+    """Répercuter une création ou une modification (signal post_save)"""
+    nouvelles = contributions(instance)
+    if created:
+        anciennes = frozenset()
+    else:
+        anciennes = getattr(instance, '_dashboard_keys', None)
+        if anciennes is None:
+            invalider()
+            instance._dashboard_keys = nouvelles
+            return
+
+    deltas = {key: 1 for key in nouvelles - anciennes}
+    deltas.update({key: -1 for key in anciennes - nouvelles})
+    _appliquer(deltas)
+    instance._dashboard_keys = nouvelles
+
+
+def enregistrement_supprime(instance):
+    """Répercuter une suppression (signal post_delete)"""
+    anciennes = getattr(instance, '_dashboard_keys', None)
+    if anciennes is None:
+        invalider()
+        return
+    _appliquer({key: -1 for key in anciennes})
+
+
+def invalider():
+    """Invalider l'instantané : la prochaine lecture le recalculera"""
+    DashboardCounter.objects.filter(key=MARQUEUR_INITIALISATION).delete()
+
+
+def _compter_utilisateurs(model, prefix):
+    counts = model.objects.aggregate(
+        total=Count('id'),
+        actifs=Count('id', filter=Q(is_active=True)),
+    )
+    return {
+        f'{prefix}:total': counts['total'],
+        f'{prefix}:actifs': counts['actifs'],
+    }
+
+
+def _calculer_compteurs():
+    """Recalculer tous les compteurs à partir des tables sources"""
+    values = {}
+    for model, prefix in PREFIXES_UTILISATEURS.items():
+        values.update(_compter_utilisateurs(model, prefix))
+
+    values['ligues:actives'] = LigueArbitrage.objects.filter(is_active=True).count()
+
+    try:
+        from matches.models import Match
+    except ImportError:
+        Match = None
+    if Match is not None:
+        values['matches:total'] = Match.objects.count()
+        par_mois = (
+            Match.objects.annotate(mois=TruncMonth('match_date'))
+            .values('mois')
+            .annotate(total=Count('id'))
+            .order_by()
+        )
+        for row in par_mois:
+            cle_mois = _cle_mois(row['mois'])
+            if cle_mois:
+                values[cle_mois] = row['total']
+
+    fcm = Device.objects.filter(channel='fcm').aggregate(
+        total=Count('id'),
+        actifs=Count('id', filter=Q(is_active=True)),
+        arbitres=Count('id', filter=Q(user_type='arbitre')),
+        commissaires=Count('id', filter=Q(user_type='commissaire')),
+        admins=Count('id', filter=Q(user_type='admin')),
+    )
+    values['fcm:total'] = fcm['total']
+    values['fcm:actifs'] = fcm['actifs']
+    for user_type in ('arbitres', 'commissaires', 'admins'):
+        values[f'fcm:utilisateurs:{user_type}'] = fcm[user_type]
+    par_plateforme = (
+        Device.objects.filter(channel='fcm', is_active=True)
+        .values('device_type')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+    for row in par_plateforme:
+        values[f'fcm:plateforme:{row["device_type"]}'] = row['total']
+
+    return values
+
+
+def reconcile():
+    """
+    Recalculer entièrement l'instantané (corrige toute dérive)
+
+    Returns:
+        Dict des compteurs recalculés
+    """
+    values = _calculer_compteurs()
+    values[MARQUEUR_INITIALISATION] = 1
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Les clés absentes du recalcul (mois sans match, plateforme vide) valent 0
+        DashboardCounter.objects.exclude(key__in=values.keys()).delete()
+        DashboardCounter.objects.bulk_create(
+            [DashboardCounter(key=key, value=value, updated_at=now) for key, value in values.items()],
+            update_conflicts=True,
+            unique_fields=['key'],
+            update_fields=['value', 'updated_at'],
+        )
+
+    logger.info(f'Tableau de bord réconcilié ({len(values)} compteurs)')
+    return values
+
+
+def _lire(keys=None, prefix=None):
+    """Lire les compteurs, en réconciliant si l'instantané n'est pas initialisé"""
+    queryset = DashboardCounter.objects.all()
+    if keys is not None:
+        queryset = queryset.filter(key__in=list(keys) + [MARQUEUR_INITIALISATION])
+    elif prefix is not None:
+        queryset = queryset.filter(Q(key__startswith=prefix) | Q(key=MARQUEUR_INITIALISATION))
+
+    values = dict(queryset.values_list('key', 'value'))
+    if MARQUEUR_INITIALISATION not in values:
+        values = reconcile()
+    return values
+
+
+def get_admin_stats():
+    """Statistiques de `admin_stats` lues depuis l'instantané"""
+    cle_mois = _cle_mois(timezone.localdate())
+    values = _lire(keys=[
+        'arbitres:total', 'arbitres:actifs',
+        'commissaires:total', 'commissaires:actifs',
+        'admins:total', 'admins:actifs',
+        'ligues:actives', 'matches:total', cle_mois,
+    ])
+    return {
+        'total_arbitres': values.get('arbitres:total', 0),
+        'arbitres_actifs': values.get('arbitres:actifs', 0),
+        'total_commissaires': values.get('commissaires:total', 0),
+        'commissaires_actifs': values.get('commissaires:actifs', 0),
+        'total_admins': values.get('admins:total', 0),
+        'admins_actifs': values.get('admins:actifs', 0),
+        'total_ligues': values.get('ligues:actives', 0),
+        'total_matches': values.get('matches:total', 0),
+        'matches_ce_mois': values.get(cle_mois, 0),
+    }
+
+
+def get_fcm_stats():
+    """Statistiques des tokens FCM lues depuis l'instantané"""
+    values = _lire(prefix='fcm:')
+    return {
+        'total_tokens': values.get('fcm:total', 0),
+        'active_tokens': values.get('fcm:actifs', 0),
+        'by_platform': {
+            device_type: values.get(f'fcm:plateforme:{device_type}', 0)
+            for device_type, _ in Device.DEVICE_TYPE_CHOICES
+        },
+        'by_user_type': {
+            user_type: values.get(f'fcm:utilisateurs:{user_type}', 0)
+            for user_type in ('arbitres', 'commissaires', 'admins')
+        },
+    }
@@ -0,0 +1,165 @@
+"""
+Index de disponibilité des arbitres
+
+Pour chaque arbitre et chaque saison (1er juillet - 30 juin), deux bitmaps
+d'un bit par jour sont stockés dans `disponibilites_arbitres` :
+- `jours_excuses` : jours couverts par une excuse acceptée ;
+- `jours_designations` : jours où l'arbitre a une désignation active.
+
+Les signaux recalculent les bitmaps de l'arbitre concerné pour les saisons
+touchées (deux requêtes). La recherche "qui est libre le jour J" charge les
+bitmaps des candidats en une requête et répond par des opérations bit à bit.
+Les opérations qui contournent les signaux (`QuerySet.update`) sont
+rattrapées par la commande `reconstruire_disponibilites`.
+"""
+from datetime import date, timedelta
+
+from django.utils import timezone
+
+MOIS_DEBUT_SAISON = 7
+JOURS_PAR_SAISON = 366
+TAILLE_BITMAP = (JOURS_PAR_SAISON + 7) // 8
+
+STATUT_EXCUSE_ACCEPTEE = 'acceptee'
+STATUTS_DESIGNATION_ACTIFS = ['proposed', 'accepted', 'confirmed']
+
+
+def saison_de(jour):
+    """Saison (année de début) contenant une date"""
+    if isinstance(jour, str):
+        # Date encore sous forme de chaîne (affectée avant la sauvegarde)
+        jour = date.fromisoformat(jour[:10])
+    return jour.year if jour.month >= MOIS_DEBUT_SAISON else jour.year - 1
+
+
+def debut_saison(saison):
+    return date(saison, MOIS_DEBUT_SAISON, 1)
+
+
+def fin_saison(saison):
+    return date(saison + 1, MOIS_DEBUT_SAISON, 1) - timedelta(days=1)
+
+
+def saisons_entre(debut, fin):
+    """Saisons couvertes par l'intervalle [debut, fin]"""
+    return list(range(saison_de(debut), saison_de(fin) + 1))
+
+
+def _bit(saison, jour):
+    return (jour - debut_saison(saison)).days
+
+
+def vers_octets(valeur):
+    return valeur.to_bytes(TAILLE_BITMAP, 'little')
+
+
+def depuis_octets(octets):
+    return int.from_bytes(bytes(octets or b''), 'little')
+
+
+def masque(saison, jours):
+    """Entier dont les bits correspondent aux jours donnés de la saison"""
+    valeur = 0
+    for jour in jours:
+        valeur |= 1 << _bit(saison, jour)
+    return valeur
+
+
+def masque_plage(saison, debut, fin):
+    """Entier couvrant les jours de [debut, fin] compris dans la saison"""
+    debut = max(debut, debut_saison(saison))
+    fin = min(fin, fin_saison(saison))
+    if debut > fin:
+        return 0
+    premier, dernier = _bit(saison, debut), _bit(saison, fin)
+    return ((1 << (dernier - premier + 1)) - 1) << premier
+
+
+def calculer_bitmaps(arbitre_ids, saison, Designation, ExcuseArbitre):
+    """
+    Bitmaps (excuses, désignations) des arbitres pour une saison, en deux requêtes
+
+    Les modèles sont passés en paramètre pour servir aussi dans les migrations.
+
+    Returns:
+        dict arbitre_id -> (jours_excuses, jours_designations) en entiers
+    """
+    debut, fin = debut_saison(saison), fin_saison(saison)
+    bitmaps = {arbitre_id: [0, 0] for arbitre_id in arbitre_ids}
+
+    for arbitre_id, date_debut, date_fin in ExcuseArbitre.objects.filter(
+        arbitre_id__in=arbitre_ids,
+        status=STATUT_EXCUSE_ACCEPTEE,
+        date_debut__lte=fin,
+        date_fin__gte=debut
+    ).values_list('arbitre_id', 'date_debut', 'date_fin'):
+        bitmaps[arbitre_id][0] |= masque_plage(saison, date_debut, date_fin)
+
+    for arbitre_id, match_date in Designation.objects.filter(
+        arbitre_id__in=arbitre_ids,
+        status__in=STATUTS_DESIGNATION_ACTIFS,
+        match__match_date__range=(debut, fin)
+    ).values_list('arbitre_id', 'match__match_date'):
+        bitmaps[arbitre_id][1] |= 1 << _bit(saison, match_date)
+
+    return bitmaps
+
+
+def actualiser(arbitre_ids, saisons):
+    """Recalculer et enregistrer les bitmaps des arbitres pour les saisons données"""
+    from matches.models import Designation
+    from .models import ExcuseArbitre, DisponibiliteArbitre
+
+    arbitre_ids = {arbitre_id for arbitre_id in arbitre_ids if arbitre_id}
+    if not arbitre_ids:
+        return
+    maintenant = timezone.now()
+    for saison in set(saisons):
+        bitmaps = calculer_bitmaps(arbitre_ids, saison, Designation, ExcuseArbitre)
+        DisponibiliteArbitre.objects.bulk_create(
+            [
+                DisponibiliteArbitre(
+                    arbitre_id=arbitre_id,
+                    saison=saison,
+                    jours_excuses=vers_octets(excuses),
+                    jours_designations=vers_octets(designations),
+                    updated_at=maintenant
+                )
+                for arbitre_id, (excuses, designations) in bitmaps.items()
+            ],
+            update_conflicts=True,
+            unique_fields=['saison', 'arbitre'],
+            update_fields=['jours_excuses', 'jours_designations', 'updated_at']
+        )
+
+
+def arbitres_occupes(arbitres, jours):
+    """
+    Arbitres occupés sur au moins un des jours donnés
+
+    Args:
+        arbitres: QuerySet d'Arbitre (candidats déjà filtrés par grade, ligue, ...)
+        jours: dates à vérifier
+
+    Returns:
+        dict arbitre_id -> motifs ('excuse', 'designation') ; les arbitres
+        absents du dict sont libres
+    """
+    from .models import DisponibiliteArbitre
+
+    jours_par_saison = {}
+    for jour in jours:
+        jours_par_saison.setdefault(saison_de(jour), []).append(jour)
+    masques = {saison: masque(saison, liste) for saison, liste in jours_par_saison.items()}
+
+    occupes = {}
+    for arbitre_id, saison, excuses, designations in DisponibiliteArbitre.objects.filter(
+        saison__in=masques,
+        arbitre__in=arbitres.values('id')
+    ).values_list('arbitre_id', 'saison', 'jours_excuses', 'jours_designations'):
+        masque_saison = masques[saison]
+        if depuis_octets(excuses) & masque_saison:
+            occupes.setdefault(arbitre_id, set()).add('excuse')
+        if depuis_octets(designations) & masque_saison:
+            occupes.setdefault(arbitre_id, set()).add('designation')
+    return occupes
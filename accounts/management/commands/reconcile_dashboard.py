@@ -0,0 +1,20 @@
+"""
+Commande Django pour recalculer les compteurs du tableau de bord d'administration
+
+Les compteurs sont maintenus par les signaux ; cette commande corrige la dérive
+due aux opérations en masse (QuerySet.update, bulk_create). À planifier
+périodiquement (ex: cron toutes les heures).
+"""
+from django.core.management.base import BaseCommand
+from accounts.dashboard import reconcile
+
+
+class Command(BaseCommand):
+    help = 'Recalcule les compteurs du tableau de bord d\'administration'
+
+    def handle(self, *args, **options):
+        values = reconcile()
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Tableau de bord réconcilié ({len(values)} compteurs)')
+        )
@@ -0,0 +1,60 @@
+"""
+Commande Django pour reconstruire l'index de disponibilité des arbitres
+
+Les bitmaps sont maintenus par les signaux ; cette commande les recalcule
+entièrement (après un import ou des mises à jour en masse).
+"""
+from django.core.management.base import BaseCommand
+from django.db.models import Max, Min
+
+from accounts import disponibilites
+from accounts.models import Arbitre, ExcuseArbitre, DisponibiliteArbitre
+from matches.models import Designation
+
+
+class Command(BaseCommand):
+    help = 'Reconstruit l\'index de disponibilité des arbitres (bitmaps par saison)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--saison',
+            type=int,
+            action='append',
+            help='Saison à reconstruire (année de début, ex: 2025) ; répétable. Par défaut : toutes',
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=500,
+            help='Nombre d\'arbitres recalculés par lot',
+        )
+
+    def _saisons_existantes(self):
+        bornes = [
+            Designation.objects.aggregate(debut=Min('match__match_date'), fin=Max('match__match_date')),
+            ExcuseArbitre.objects.aggregate(debut=Min('date_debut'), fin=Max('date_fin')),
+        ]
+        # Saisons déjà indexées : à recalculer même si elles n'ont plus de données
+        saisons = set(DisponibiliteArbitre.objects.values_list('saison', flat=True).distinct())
+        for borne in bornes:
+            if borne['debut'] and borne['fin']:
+                saisons.update(disponibilites.saisons_entre(borne['debut'], borne['fin']))
+        return sorted(saisons)
+
+    def handle(self, *args, **options):
+        saisons = options['saison'] or self._saisons_existantes()
+        if not saisons:
+            self.stdout.write(self.style.WARNING('❌ Aucune désignation ni excuse à indexer'))
+            return
+
+        arbitre_ids = list(Arbitre.objects.order_by('id').values_list('id', flat=True))
+        taille = max(1, options['taille_lot'])
+        for debut in range(0, len(arbitre_ids), taille):
+            disponibilites.actualiser(arbitre_ids[debut:debut + taille], saisons)
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'✅ Index reconstruit pour {len(arbitre_ids)} arbitre(s), '
+                f'saison(s): {", ".join(f"{s}/{s + 1}" for s in saisons)}'
+            )
+        )
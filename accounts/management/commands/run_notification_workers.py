@@ -0,0 +1,104 @@
+"""
+Commande Django pour envoyer les notifications de l'outbox
+
+Un pool de threads envoie les messages pris en charge par lots (SELECT ...
+FOR UPDATE SKIP LOCKED) ; plusieurs instances de la commande peuvent tourner
+en parallèle. Sans --once, la commande tourne jusqu'à son arrêt (SIGINT /
+SIGTERM) en interrogeant la file toutes les --intervalle secondes lorsqu'elle
+est vide. Voir notifications/outbox.py.
+
+À chaque passage, les abonnements aux topics FCM des tokens marqués sont
+synchronisés (notifications/topics.py) et le prochain broadcast en file
+(BroadcastJob, voir firebase_config.lancer_broadcast) est envoyé.
+"""
+import signal
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from notifications import outbox, topics
+
+
+class Command(BaseCommand):
+    help = 'Envoie les notifications en attente de l\'outbox (pool de workers)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=4,
+            help='Nombre de threads d\'envoi (défaut : 4)',
+        )
+        parser.add_argument(
+            '--taille-lot',
+            type=int,
+            default=50,
+            help='Messages pris en charge par lot (défaut : 50)',
+        )
+        parser.add_argument(
+            '--intervalle',
+            type=float,
+            default=2.0,
+            help='Attente en secondes lorsque la file est vide (défaut : 2)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Vider la file une fois puis s\'arrêter',
+        )
+
+    def handle(self, *args, **options):
+        from firebase_config import prendre_broadcasts
+
+        self.arret = False
+        signal.signal(signal.SIGTERM, self._arreter)
+
+        compteurs = {'sent': 0, 'pending': 0, 'dead': 0, 'topics': 0, 'done': 0, 'failed': 0}
+        with ThreadPoolExecutor(max_workers=max(1, options['workers']), thread_name_prefix='notifications') as pool:
+            try:
+                while not self.arret:
+                    compteurs['topics'] += topics.synchroniser()['synced']
+                    broadcasts = prendre_broadcasts()
+                    messages = outbox.prendre_lot(options['taille_lot'])
+                    if not messages and not broadcasts:
+                        if options['once']:
+                            break
+                        time.sleep(options['intervalle'])
+                        continue
+                    envois = [pool.submit(self._broadcaster, job) for job in broadcasts]
+                    for statut in pool.map(self._traiter, messages):
+                        compteurs[statut] += 1
+                    for envoi in envois:
+                        compteurs[envoi.result()] += 1
+            except KeyboardInterrupt:
+                pass
+
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Notifications: {compteurs['sent']} envoyée(s), "
+            f"{compteurs['pending']} à réessayer, {compteurs['dead']} abandonnée(s), "
+            f"{compteurs['topics']} token(s) resynchronisé(s) sur les topics, "
+            f"{compteurs['done']} broadcast(s) envoyé(s), {compteurs['failed']} broadcast(s) échoué(s)"
+        ))
+
+    def _arreter(self, *args):
+        # Terminer le lot en cours puis s'arrêter
+        self.arret = True
+
+    @staticmethod
+    def _traiter(message):
+        try:
+            return outbox.traiter(message)
+        finally:
+            # Chaque thread a sa propre connexion
+            connection.close()
+
+    @staticmethod
+    def _broadcaster(job):
+        from firebase_config import executer_broadcast
+
+        try:
+            return executer_broadcast(job)
+        finally:
+            connection.close()
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0019_gradearbitrage'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DashboardCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100, unique=True, verbose_name='Clé du compteur')),
+                ('value', models.BigIntegerField(default=0, verbose_name='Valeur')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date de mise à jour')),
+            ],
+            options={
+                'verbose_name': 'Compteur du tableau de bord',
+                'verbose_name_plural': 'Compteurs du tableau de bord',
+                'db_table': 'dashboard_counters',
+                'ordering': ['key'],
+            },
+        ),
+    ]
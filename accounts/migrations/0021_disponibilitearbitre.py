@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:01
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Max, Min
+
+
+def remplir_disponibilites(apps, schema_editor):
+    """Construire l'index pour les saisons couvertes par les désignations et excuses existantes"""
+    from accounts.disponibilites import calculer_bitmaps, saisons_entre, vers_octets
+
+    Arbitre = apps.get_model('accounts', 'Arbitre')
+    ExcuseArbitre = apps.get_model('accounts', 'ExcuseArbitre')
+    DisponibiliteArbitre = apps.get_model('accounts', 'DisponibiliteArbitre')
+    Designation = apps.get_model('matches', 'Designation')
+
+    saisons = set()
+    for bornes in [
+        Designation.objects.aggregate(debut=Min('match__match_date'), fin=Max('match__match_date')),
+        ExcuseArbitre.objects.aggregate(debut=Min('date_debut'), fin=Max('date_fin')),
+    ]:
+        if bornes['debut'] and bornes['fin']:
+            saisons.update(saisons_entre(bornes['debut'], bornes['fin']))
+
+    arbitre_ids = list(Arbitre.objects.order_by('id').values_list('id', flat=True))
+    for saison in saisons:
+        for debut in range(0, len(arbitre_ids), 500):
+            bitmaps = calculer_bitmaps(arbitre_ids[debut:debut + 500], saison, Designation, ExcuseArbitre)
+            DisponibiliteArbitre.objects.bulk_create([
+                DisponibiliteArbitre(
+                    arbitre_id=arbitre_id,
+                    saison=saison,
+                    jours_excuses=vers_octets(excuses),
+                    jours_designations=vers_octets(designations),
+                )
+                for arbitre_id, (excuses, designations) in bitmaps.items()
+                if excuses or designations
+            ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_dashboardcounter'),
+        ('matches', '0013_search_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DisponibiliteArbitre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('saison', models.PositiveSmallIntegerField(verbose_name='Saison (année de début)')),
+                ('jours_excuses', models.BinaryField(default=bytes, verbose_name='Jours excusés')),
+                ('jours_designations', models.BinaryField(default=bytes, verbose_name='Jours désignés')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date de mise à jour')),
+                ('arbitre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='disponibilites', to='accounts.arbitre', verbose_name='Arbitre')),
+            ],
+            options={
+                'verbose_name': "Disponibilité d'arbitre",
+                'verbose_name_plural': "Disponibilités d'arbitres",
+                'db_table': 'disponibilites_arbitres',
+                'constraints': [models.UniqueConstraint(fields=('saison', 'arbitre'), name='unique_disponibilite_saison')],
+            },
+        ),
+        migrations.RunPython(remplir_disponibilites, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.7 on 2026-10-19 21:00
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_disponibilitearbitre'),
+        ('matches', '0017_tarification_versions'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationOutbox',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('channel', models.CharField(choices=[('fcm', 'Firebase Cloud Messaging'), ('webpush', 'Web Push')], max_length=20, verbose_name='Canal')),
+                ('title', models.CharField(max_length=200, verbose_name='Titre')),
+                ('body', models.TextField(verbose_name='Message')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Données')),
+                ('tag', models.CharField(blank=True, default='', max_length=50, verbose_name='Tag')),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('processing', "En cours d'envoi"), ('sent', 'Envoyée'), ('dead', 'Abandonnée')], default='pending', max_length=20, verbose_name='Statut')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='Tentatives')),
+                ('max_attempts', models.PositiveSmallIntegerField(default=6, verbose_name='Tentatives maximum')),
+                ('next_attempt_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Prochaine tentative')),
+                ('locked_at', models.DateTimeField(blank=True, null=True, verbose_name='Pris en charge le')),
+                ('last_error', models.TextField(blank=True, default='', verbose_name='Dernière erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('sent_at', models.DateTimeField(blank=True, null=True, verbose_name="Date d'envoi")),
+                ('arbitre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notifications_outbox', to='accounts.arbitre', verbose_name='Arbitre')),
+                ('designation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='notifications_outbox', to='matches.designation', verbose_name='Désignation')),
+                ('notification', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='outbox', to='accounts.notificationdesignation', verbose_name='Notification de désignation')),
+            ],
+            options={
+                'verbose_name': "Notification en file d'envoi",
+                'verbose_name_plural': "Notifications en file d'envoi",
+                'db_table': 'notification_outbox',
+                'ordering': ['next_attempt_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='NotificationAttempt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('number', models.PositiveSmallIntegerField(verbose_name='Numéro de tentative')),
+                ('success', models.BooleanField(default=False, verbose_name='Réussie')),
+                ('response', models.JSONField(blank=True, null=True, verbose_name='Réponse')),
+                ('error_message', models.TextField(blank=True, default='', verbose_name="Message d'erreur")),
+                ('duration_ms', models.PositiveIntegerField(default=0, verbose_name='Durée (ms)')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de la tentative')),
+                ('notification', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='attempts', to='accounts.notificationdesignation', verbose_name='Notification de désignation')),
+                ('message', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='attempt_history', to='accounts.notificationoutbox', verbose_name='Message')),
+            ],
+            options={
+                'verbose_name': "Tentative d'envoi",
+                'verbose_name_plural': "Tentatives d'envoi",
+                'db_table': 'notification_attempts',
+                'ordering': ['message', 'number'],
+            },
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['status', 'next_attempt_at'], name='notificatio_status_7f28bd_idx'),
+        ),
+    ]
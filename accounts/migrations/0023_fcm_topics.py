@@ -0,0 +1,23 @@
+# Generated by Django 4.2.7 on 2026-10-19 21:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0022_notification_outbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='fcmtoken',
+            name='topics',
+            field=models.JSONField(blank=True, default=list, verbose_name='Topics abonnés'),
+        ),
+        migrations.AddField(
+            model_name='fcmtoken',
+            name='topics_synced',
+            field=models.BooleanField(db_index=True, default=False, verbose_name='Topics synchronisés'),
+        ),
+    ]
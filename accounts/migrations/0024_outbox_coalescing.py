@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 22:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0023_fcm_topics'),
+        ('matches', '0017_tarification_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='coalesce_key',
+            field=models.CharField(blank=True, default='', max_length=100, verbose_name='Clé de regroupement'),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='coalesced_count',
+            field=models.PositiveSmallIntegerField(default=1, verbose_name='Notifications regroupées'),
+        ),
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='superseded_by',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='superseded', to='accounts.notificationoutbox', verbose_name='Remplacée par'),
+        ),
+        migrations.AlterField(
+            model_name='notificationoutbox',
+            name='status',
+            field=models.CharField(choices=[('pending', 'En attente'), ('processing', "En cours d'envoi"), ('sent', 'Envoyée'), ('dead', 'Abandonnée'), ('superseded', 'Remplacée')], default='pending', max_length=20, verbose_name='Statut'),
+        ),
+        migrations.AddIndex(
+            model_name='notificationoutbox',
+            index=models.Index(fields=['arbitre', 'coalesce_key', 'status'], name='notificatio_arbitre_5091e1_idx'),
+        ),
+    ]
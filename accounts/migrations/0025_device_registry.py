@@ -0,0 +1,154 @@
+# Generated by Django 4.2.7 on 2026-10-19 22:30
+
+from django.db import migrations, models
+
+TYPES_UTILISATEUR = ('arbitre', 'commissaire', 'admin')
+CHAMPS_DATES = ('created_at', 'updated_at', 'last_used')
+
+
+def _garder_dates(*modeles):
+    """Conserver les dates d'origine (désactiver auto_now / auto_now_add)"""
+    for modele in modeles:
+        for champ in modele._meta.concrete_fields:
+            if champ.name in CHAMPS_DATES:
+                champ.auto_now = champ.auto_now_add = False
+
+
+def fusionner(apps, schema_editor):
+    """Copier les tokens FCM et les abonnements Web Push dans le registre Device"""
+    FCMToken = apps.get_model('accounts', 'FCMToken')
+    PushSubscription = apps.get_model('accounts', 'PushSubscription')
+    Device = apps.get_model('accounts', 'Device')
+    _garder_dates(Device)
+
+    devices = []
+    for fcm_token in FCMToken.objects.all().iterator():
+        user_type = next((nom for nom in TYPES_UTILISATEUR if getattr(fcm_token, f'{nom}_id')), None)
+        if user_type is None:
+            continue
+        devices.append(Device(
+            user_type=user_type,
+            user_id=getattr(fcm_token, f'{user_type}_id'),
+            channel='fcm',
+            token=fcm_token.token,
+            device_type=fcm_token.device_type,
+            device_id=fcm_token.device_id,
+            app_version=fcm_token.app_version,
+            is_active=fcm_token.is_active,
+            created_at=fcm_token.created_at,
+            updated_at=fcm_token.updated_at,
+            last_used=fcm_token.last_used,
+            topics=fcm_token.topics,
+            topics_synced=fcm_token.topics_synced,
+        ))
+
+    # Un endpoint enregistré par plusieurs arbitres : garder le plus récent
+    endpoints = set()
+    for subscription in PushSubscription.objects.order_by('endpoint', '-last_used').iterator():
+        if subscription.endpoint in endpoints:
+            continue
+        endpoints.add(subscription.endpoint)
+        devices.append(Device(
+            user_type='arbitre',
+            user_id=subscription.arbitre_id,
+            channel='webpush',
+            token=subscription.endpoint,
+            device_type='web',
+            p256dh=subscription.p256dh,
+            auth=subscription.auth,
+            is_active=subscription.is_active,
+            created_at=subscription.created_at,
+            updated_at=subscription.last_used,
+            last_used=subscription.last_used,
+        ))
+    Device.objects.bulk_create(devices, batch_size=1000)
+
+
+def separer(apps, schema_editor):
+    """Recréer les tokens FCM et les abonnements Web Push à partir du registre"""
+    FCMToken = apps.get_model('accounts', 'FCMToken')
+    PushSubscription = apps.get_model('accounts', 'PushSubscription')
+    Device = apps.get_model('accounts', 'Device')
+    _garder_dates(FCMToken, PushSubscription)
+
+    existants = {
+        user_type: set(apps.get_model('accounts', user_type.capitalize()).objects.values_list('pk', flat=True))
+        for user_type in TYPES_UTILISATEUR
+    }
+    fcm_tokens = []
+    subscriptions = []
+    for device in Device.objects.all().iterator():
+        if device.user_id not in existants[device.user_type]:
+            continue
+        if device.channel == 'fcm':
+            fcm_tokens.append(FCMToken(
+                token=device.token,
+                device_type=device.device_type,
+                device_id=device.device_id,
+                app_version=device.app_version,
+                is_active=device.is_active,
+                created_at=device.created_at,
+                updated_at=device.updated_at,
+                last_used=device.last_used,
+                topics=device.topics,
+                topics_synced=device.topics_synced,
+                **{f'{device.user_type}_id': device.user_id},
+            ))
+        elif device.user_type == 'arbitre':
+            subscriptions.append(PushSubscription(
+                arbitre_id=device.user_id,
+                endpoint=device.token,
+                p256dh=device.p256dh,
+                auth=device.auth,
+                is_active=device.is_active,
+                created_at=device.created_at,
+                last_used=device.last_used,
+            ))
+    FCMToken.objects.bulk_create(fcm_tokens, batch_size=1000)
+    PushSubscription.objects.bulk_create(subscriptions, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0024_outbox_coalescing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Device',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_type', models.CharField(choices=[('arbitre', 'Arbitre'), ('commissaire', 'Commissaire'), ('admin', 'Administrateur')], max_length=20, verbose_name="Type d'utilisateur")),
+                ('user_id', models.PositiveIntegerField(verbose_name="ID de l'utilisateur")),
+                ('channel', models.CharField(choices=[('fcm', 'Firebase Cloud Messaging'), ('webpush', 'Web Push')], max_length=20, verbose_name='Canal')),
+                ('token', models.CharField(max_length=500, verbose_name='Token FCM ou endpoint Web Push')),
+                ('device_type', models.CharField(choices=[('ios', 'iOS'), ('android', 'Android'), ('web', 'Web')], default='web', max_length=20, verbose_name="Type d'appareil")),
+                ('p256dh', models.TextField(blank=True, default='', verbose_name='Clé publique P-256 DH')),
+                ('auth', models.TextField(blank=True, default='', verbose_name="Clé d'authentification")),
+                ('device_id', models.CharField(blank=True, max_length=255, null=True, verbose_name="ID de l'appareil")),
+                ('app_version', models.CharField(blank=True, max_length=50, null=True, verbose_name="Version de l'app")),
+                ('is_active', models.BooleanField(default=True, verbose_name='Appareil actif')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date de mise à jour')),
+                ('last_used', models.DateTimeField(auto_now=True, verbose_name='Dernière utilisation')),
+                ('topics', models.JSONField(blank=True, default=list, verbose_name='Topics abonnés')),
+                ('topics_synced', models.BooleanField(db_index=True, default=False, verbose_name='Topics synchronisés')),
+            ],
+            options={
+                'verbose_name': 'Appareil',
+                'verbose_name_plural': 'Appareils',
+                'db_table': 'devices',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(condition=models.Q(('is_active', True)), fields=['user_type', 'user_id', 'channel'], name='device_actif_utilisateur_idx')],
+                'constraints': [models.UniqueConstraint(fields=('channel', 'token'), name='unique_device_channel_token')],
+            },
+        ),
+        migrations.RunPython(fusionner, separer),
+        migrations.DeleteModel(
+            name='FCMToken',
+        ),
+        migrations.DeleteModel(
+            name='PushSubscription',
+        ),
+    ]
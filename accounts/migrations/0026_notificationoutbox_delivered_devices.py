@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 23:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0025_device_registry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='notificationoutbox',
+            name='delivered_devices',
+            field=models.JSONField(blank=True, default=list, verbose_name='Appareils servis'),
+        ),
+    ]
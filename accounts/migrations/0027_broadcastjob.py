@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 23:25
+
+from django.db import migrations, models
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0026_notificationoutbox_delivered_devices'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BroadcastJob',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('title', models.CharField(max_length=200, verbose_name='Titre')),
+                ('body', models.TextField(verbose_name='Message')),
+                ('data', models.JSONField(blank=True, default=dict, verbose_name='Données')),
+                ('device_types', models.JSONField(blank=True, null=True, verbose_name="Types d'appareils ciblés")),
+                ('status', models.CharField(choices=[('pending', 'En attente'), ('running', 'En cours'), ('done', 'Terminé'), ('failed', 'Échoué')], default='pending', max_length=20, verbose_name='Statut')),
+                ('results', models.JSONField(blank=True, null=True, verbose_name='Résultats')),
+                ('total_tokens', models.PositiveIntegerField(default=0, verbose_name='Tokens visés')),
+                ('echecs', models.JSONField(blank=True, default=list, verbose_name='Échecs')),
+                ('error', models.TextField(blank=True, default='', verbose_name='Erreur')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Date de création')),
+                ('started_at', models.DateTimeField(blank=True, null=True, verbose_name="Début de l'envoi")),
+                ('finished_at', models.DateTimeField(blank=True, null=True, verbose_name="Fin de l'envoi")),
+            ],
+            options={
+                'verbose_name': 'Broadcast',
+                'verbose_name_plural': 'Broadcasts',
+                'db_table': 'broadcast_jobs',
+                'ordering': ['-created_at'],
+                'indexes': [models.Index(fields=['status', 'created_at'], name='broadcast_j_status_1b9a6a_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-19 23:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0027_broadcastjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationMetric',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(verbose_name='Jour')),
+                ('channel', models.CharField(choices=[('fcm', 'FCM'), ('webpush', 'Web Push')], max_length=20, verbose_name='Canal')),
+                ('sent', models.BigIntegerField(default=0, verbose_name='Envoyés')),
+                ('failed', models.BigIntegerField(default=0, verbose_name='Échecs')),
+                ('pruned', models.BigIntegerField(default=0, verbose_name='Appareils désactivés')),
+            ],
+            options={
+                'verbose_name': 'Métrique de livraison',
+                'verbose_name_plural': 'Métriques de livraison',
+                'db_table': 'notification_metrics',
+                'ordering': ['-day', 'channel'],
+                'unique_together': {('day', 'channel')},
+            },
+        ),
+    ]
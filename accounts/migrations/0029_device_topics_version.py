@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 23:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0028_notificationmetric'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='device',
+            name='topics_version',
+            field=models.PositiveIntegerField(default=0, verbose_name='Version des topics'),
+        ),
+    ]
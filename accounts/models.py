@@ -1,12 +1,16 @@
 """
 Modèles pour la gestion des utilisateurs du système d'arbitrage
 """
+import uuid
+
 from django.db import models
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.utils import timezone
 from django.core.validators import RegexValidator
 from django.contrib.auth import get_user_model
 
+from .transitions import appliquer_transition, excuse_status_changed, notification_status_changed
+
 class LigueArbitrage(models.Model):
     """Modèle pour les ligues d'arbitrage"""
     
@@ -84,6 +88,9 @@ class ArbitreManager(BaseUserManager):
 class Arbitre(AbstractBaseUser, PermissionsMixin):
     """Modèle pour les arbitres (mobile uniquement)"""
     
+    # Grades du moins élevé au plus élevé (comparaisons "grade ≥ X")
+    GRADES_ORDRE = ['candidat', '3eme_serie', '2eme_serie', '1ere_serie', 'federale']
+    
     # Validation du numéro de téléphone tunisien
     phone_regex = RegexValidator(
         regex=r'^(\+216|216)?[0-9]{8}$',
@@ -475,54 +482,48 @@ class Admin(AbstractBaseUser, PermissionsMixin):
         return f"{self.get_full_name()} ({self.phone_number}) - {self.get_user_type_display()}"
 
 # ============================================================================
-# NOTIFICATIONS PUSH
+# APPAREILS (NOTIFICATIONS PUSH ET FIREBASE CLOUD MESSAGING)
 # ============================================================================
 
-class PushSubscription(models.Model):
-    """Modèle pour les abonnements push des arbitres"""
-    
-    arbitre = models.ForeignKey(
-        Arbitre,
-        on_delete=models.CASCADE,
-        related_name='push_subscriptions',
-        verbose_name="Arbitre"
-    )
-    
-    endpoint = models.URLField(verbose_name="Endpoint de notification")
-    p256dh = models.TextField(verbose_name="Clé publique P-256 DH")
-    auth = models.TextField(verbose_name="Clé d'authentification")
+class DeviceQuerySet(models.QuerySet):
+    def actifs(self):
+        return self.filter(is_active=True)
+    
+    def pour(self, user):
+        """Appareils d'un utilisateur (Arbitre, Commissaire ou Admin)"""
+        return self.filter(user_type=Device.type_utilisateur(user), user_id=user.pk)
+    
+    def pour_utilisateurs(self, users):
+        """Appareils d'un ensemble d'utilisateurs d'un même type"""
+        users = list(users)
+        if not users:
+            return self.none()
+        return self.filter(user_type=Device.type_utilisateur(users[0]), user_id__in=[user.pk for user in users])
+
+
+class Device(models.Model):
+    """
+    Appareil enregistré pour les notifications (registre unique)
     
-    # Métadonnées
-    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
-    is_active = models.BooleanField(default=True, verbose_name="Abonnement actif")
-    last_used = models.DateTimeField(auto_now=True, verbose_name="Dernière utilisation")
+    Un appareil appartient à un utilisateur identifié par (user_type, user_id)
+    et reçoit les notifications sur un canal :
+    - fcm : token Firebase Cloud Messaging (application mobile ou web) ;
+    - webpush : abonnement Web Push d'un navigateur (endpoint et clés).
     
-    class Meta:
-        verbose_name = "Abonnement Push"
-        verbose_name_plural = "Abonnements Push"
-        unique_together = ['arbitre', 'endpoint']
-        ordering = ['-created_at']
+    Tous les canaux d'un utilisateur se résolvent en une requête servie par
+    l'index partiel des appareils actifs.
+    """
     
-    def __str__(self):
-        return f"Push pour {self.arbitre.get_full_name()}"
+    USER_TYPE_CHOICES = [
+        ('arbitre', 'Arbitre'),
+        ('commissaire', 'Commissaire'),
+        ('admin', 'Administrateur'),
+    ]
     
-    @property
-    def subscription_info(self):
-        """Retourne les informations d'abonnement au format Web Push"""
-        return {
-            'endpoint': self.endpoint,
-            'keys': {
-                'p256dh': self.p256dh,
-                'auth': self.auth
-            }
-        }
-
-# ============================================================================
-# FIREBASE CLOUD MESSAGING (FCM)
-# ============================================================================
-
-class FCMToken(models.Model):
-    """Modèle pour stocker les tokens FCM des appareils mobiles"""
+    CHANNEL_CHOICES = [
+        ('fcm', 'Firebase Cloud Messaging'),
+        ('webpush', 'Web Push'),
+    ]
     
     DEVICE_TYPE_CHOICES = [
         ('ios', 'iOS'),
@@ -530,95 +531,97 @@ class FCMToken(models.Model):
         ('web', 'Web'),
     ]
     
-    # Relations avec les utilisateurs (peut être un Arbitre, Commissaire ou Admin)
-    arbitre = models.ForeignKey(
-        Arbitre,
-        on_delete=models.CASCADE,
-        related_name='fcm_tokens',
-        null=True,
-        blank=True,
-        verbose_name="Arbitre"
-    )
-    commissaire = models.ForeignKey(
-        Commissaire,
-        on_delete=models.CASCADE,
-        related_name='fcm_tokens',
-        null=True,
-        blank=True,
-        verbose_name="Commissaire"
-    )
-    admin = models.ForeignKey(
-        Admin,
-        on_delete=models.CASCADE,
-        related_name='fcm_tokens',
-        null=True,
-        blank=True,
-        verbose_name="Administrateur"
-    )
+    # Propriétaire
+    user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES, verbose_name="Type d'utilisateur")
+    user_id = models.PositiveIntegerField(verbose_name="ID de l'utilisateur")
     
-    # Informations du token FCM
-    token = models.CharField(max_length=255, unique=True, verbose_name="Token FCM")
+    # Canal et adresse : token FCM ou endpoint Web Push
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, verbose_name="Canal")
+    token = models.CharField(max_length=500, verbose_name="Token FCM ou endpoint Web Push")
     device_type = models.CharField(
         max_length=20,
         choices=DEVICE_TYPE_CHOICES,
+        default='web',
         verbose_name="Type d'appareil"
     )
+    
+    # Clés Web Push
+    p256dh = models.TextField(blank=True, default='', verbose_name="Clé publique P-256 DH")
+    auth = models.TextField(blank=True, default='', verbose_name="Clé d'authentification")
+    
+    # Informations de l'application (FCM)
     device_id = models.CharField(max_length=255, blank=True, null=True, verbose_name="ID de l'appareil")
     app_version = models.CharField(max_length=50, blank=True, null=True, verbose_name="Version de l'app")
     
     # Statut et métadonnées
-    is_active = models.BooleanField(default=True, verbose_name="Token actif")
+    is_active = models.BooleanField(default=True, verbose_name="Appareil actif")
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Date de mise à jour")
     last_used = models.DateTimeField(auto_now=True, verbose_name="Dernière utilisation")
     
+    # Topics FCM (voir notifications/topics.py)
+    topics = models.JSONField(default=list, blank=True, verbose_name="Topics abonnés")
+    topics_synced = models.BooleanField(default=False, db_index=True, verbose_name="Topics synchronisés")
+    # Incrémenté à chaque marquage : une synchronisation n'enregistre son
+    # résultat que si l'appareil n'a pas été remarqué entre-temps
+    topics_version = models.PositiveIntegerField(default=0, verbose_name="Version des topics")
+    
+    objects = DeviceQuerySet.as_manager()
+    
     class Meta:
-        db_table = 'fcm_tokens'
-        verbose_name = "Token FCM"
-        verbose_name_plural = "Tokens FCM"
-        unique_together = ['token']
+        db_table = 'devices'
+        verbose_name = "Appareil"
+        verbose_name_plural = "Appareils"
         ordering = ['-created_at']
+        constraints = [
+            models.UniqueConstraint(fields=['channel', 'token'], name='unique_device_channel_token'),
+        ]
+        indexes = [
+            # Appareils actifs d'un utilisateur, tous canaux (index partiel)
+            models.Index(
+                fields=['user_type', 'user_id', 'channel'],
+                condition=models.Q(is_active=True),
+                name='device_actif_utilisateur_idx',
+            ),
+        ]
     
     def __str__(self):
-        user_info = self.get_user_info()
-        return f"{user_info} - {self.device_type} - {self.token[:20]}..."
+        return f"{self.get_user_type_display()} #{self.user_id} - {self.get_channel_display()} - {self.token[:20]}..."
     
-    def get_user_info(self):
-        """Retourne les informations de l'utilisateur associé"""
-        if self.arbitre:
-            return f"Arbitre: {self.arbitre.get_full_name()}"
-        elif self.commissaire:
-            return f"Commissaire: {self.commissaire.get_full_name()}"
-        elif self.admin:
-            return f"Admin: {self.admin.get_full_name()}"
-        return "Utilisateur inconnu"
+    @staticmethod
+    def type_utilisateur(user):
+        """Type d'utilisateur d'un Arbitre, Commissaire ou Admin"""
+        if isinstance(user, Arbitre):
+            return 'arbitre'
+        if isinstance(user, Commissaire):
+            return 'commissaire'
+        if isinstance(user, Admin):
+            return 'admin'
+        raise ValueError(f'Type d\'utilisateur non supporté: {type(user).__name__}')
+    
+    @staticmethod
+    def modele_utilisateur(user_type):
+        return {'arbitre': Arbitre, 'commissaire': Commissaire, 'admin': Admin}[user_type]
     
     def get_user(self):
         """Retourne l'utilisateur associé (Arbitre, Commissaire ou Admin)"""
-        if self.arbitre:
-            return self.arbitre
-        elif self.commissaire:
-            return self.commissaire
-        elif self.admin:
-            return self.admin
-        return None
+        return self.modele_utilisateur(self.user_type).objects.filter(pk=self.user_id).first()
     
-    def clean(self):
-        """Validation: un token doit être associé à exactement un utilisateur"""
-        from django.core.exceptions import ValidationError
-        
-        user_count = sum([
-            bool(self.arbitre),
-            bool(self.commissaire),
-            bool(self.admin)
-        ])
-        
-        if user_count != 1:
-            raise ValidationError("Un token FCM doit être associé à exactement un utilisateur.")
+    @property
+    def endpoint(self):
+        """Endpoint Web Push (canal webpush)"""
+        return self.token
     
-    def save(self, *args, **kwargs):
-        self.clean()
-        super().save(*args, **kwargs)
+    @property
+    def subscription_info(self):
+        """Retourne les informations d'abonnement au format Web Push"""
+        return {
+            'endpoint': self.token,
+            'keys': {
+                'p256dh': self.p256dh,
+                'auth': self.auth
+            }
+        }
 
 # ============================================================================
 # NOTIFICATIONS DE DÉSIGNATION
@@ -699,25 +702,27 @@ class NotificationDesignation(models.Model):
     def __str__(self):
         return f"{self.arbitre.get_full_name()} - {self.match_nom} - {self.get_designation_type_display()}"
     
+    # Transitions conditionnelles (voir accounts/transitions.py)
+    
     def mark_as_read(self):
-        """Marquer la notification comme lue"""
-        if not self.is_read:
-            self.is_read = True
-            self.read_at = timezone.now()
-            self.status = 'read'
-            self.save(update_fields=['is_read', 'read_at', 'status'])
+        """Marquer la notification comme lue (si elle ne l'est pas déjà)"""
+        return appliquer_transition(
+            self, 'read', ['sent', 'delivered', 'failed'], notification_status_changed,
+            is_read=True, read_at=timezone.now()
+        )
     
     def mark_as_delivered(self):
-        """Marquer la notification comme livrée"""
-        if self.status == 'sent':
-            self.status = 'delivered'
-            self.save(update_fields=['status'])
+        """Marquer la notification comme livrée (si elle est envoyée)"""
+        return appliquer_transition(
+            self, 'delivered', ['sent'], notification_status_changed
+        )
     
     def mark_as_failed(self, error_message=""):
-        """Marquer la notification comme échouée"""
-        self.status = 'failed'
-        self.error_message = error_message
-        self.save(update_fields=['status', 'error_message'])
+        """Marquer la notification comme échouée (si elle est envoyée)"""
+        return appliquer_transition(
+            self, 'failed', ['sent'], notification_status_changed,
+            error_message=error_message
+        )
     
     @property
     def time_since_created(self):
@@ -729,6 +734,202 @@ class NotificationDesignation(models.Model):
         """Vérifier si la notification est récente (moins de 24h)"""
         return self.time_since_created.total_seconds() < 86400  # 24 heures
 
+class NotificationOutbox(models.Model):
+    """
+    Notification en attente d'envoi (outbox transactionnelle)
+    
+    Écrite dans la transaction de l'opération qui la produit, puis envoyée
+    par les workers (`manage.py run_notification_workers`) avec reprise et
+    backoff exponentiel ; après `max_attempts` échecs elle passe en
+    lettre morte (voir notifications/outbox.py).
+    
+    Les notifications de même clé de regroupement (`coalesce_key`) pour un
+    arbitre et un canal, mises en file pendant la fenêtre de regroupement,
+    sont remplacées par la dernière (`superseded`, avec `superseded_by`).
+    """
+    
+    CHANNEL_CHOICES = [
+        ('fcm', 'Firebase Cloud Messaging'),
+        ('webpush', 'Web Push'),
+    ]
+    
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('processing', 'En cours d\'envoi'),
+        ('sent', 'Envoyée'),
+        ('dead', 'Abandonnée'),
+        ('superseded', 'Remplacée'),
+    ]
+    
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, verbose_name="Canal")
+    arbitre = models.ForeignKey(
+        Arbitre,
+        on_delete=models.CASCADE,
+        related_name='notifications_outbox',
+        verbose_name="Arbitre"
+    )
+    # Désignation à marquer comme notifiée après l'envoi
+    designation = models.ForeignKey(
+        'matches.Designation',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='notifications_outbox',
+        verbose_name="Désignation"
+    )
+    # Historique de notification à marquer livré / échoué
+    notification = models.ForeignKey(
+        NotificationDesignation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='outbox',
+        verbose_name="Notification de désignation"
+    )
+    
+    # Contenu
+    title = models.CharField(max_length=200, verbose_name="Titre")
+    body = models.TextField(verbose_name="Message")
+    data = models.JSONField(default=dict, blank=True, verbose_name="Données")
+    tag = models.CharField(max_length=50, blank=True, default='', verbose_name="Tag")
+    
+    # Regroupement
+    coalesce_key = models.CharField(max_length=100, blank=True, default='', verbose_name="Clé de regroupement")
+    coalesced_count = models.PositiveSmallIntegerField(default=1, verbose_name="Notifications regroupées")
+    superseded_by = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='superseded',
+        verbose_name="Remplacée par"
+    )
+    
+    # Envoi
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    attempts = models.PositiveSmallIntegerField(default=0, verbose_name="Tentatives")
+    max_attempts = models.PositiveSmallIntegerField(default=6, verbose_name="Tentatives maximum")
+    next_attempt_at = models.DateTimeField(default=timezone.now, verbose_name="Prochaine tentative")
+    locked_at = models.DateTimeField(null=True, blank=True, verbose_name="Pris en charge le")
+    last_error = models.TextField(blank=True, default='', verbose_name="Dernière erreur")
+    # Appareils déjà servis : les tentatives suivantes ne les visent plus
+    delivered_devices = models.JSONField(default=list, blank=True, verbose_name="Appareils servis")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    sent_at = models.DateTimeField(null=True, blank=True, verbose_name="Date d'envoi")
+    
+    class Meta:
+        db_table = 'notification_outbox'
+        verbose_name = "Notification en file d'envoi"
+        verbose_name_plural = "Notifications en file d'envoi"
+        ordering = ['next_attempt_at']
+        indexes = [
+            # Prochains messages à envoyer
+            models.Index(fields=['status', 'next_attempt_at']),
+            # Messages en attente à regrouper
+            models.Index(fields=['arbitre', 'coalesce_key', 'status']),
+        ]
+    
+    def __str__(self):
+        return f"{self.get_channel_display()} - {self.title} ({self.get_status_display()})"
+
+
+class NotificationAttempt(models.Model):
+    """Tentative d'envoi d'une notification de l'outbox"""
+    
+    message = models.ForeignKey(
+        NotificationOutbox,
+        on_delete=models.CASCADE,
+        related_name='attempt_history',
+        verbose_name="Message"
+    )
+    notification = models.ForeignKey(
+        NotificationDesignation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='attempts',
+        verbose_name="Notification de désignation"
+    )
+    number = models.PositiveSmallIntegerField(verbose_name="Numéro de tentative")
+    success = models.BooleanField(default=False, verbose_name="Réussie")
+    response = models.JSONField(null=True, blank=True, verbose_name="Réponse")
+    error_message = models.TextField(blank=True, default='', verbose_name="Message d'erreur")
+    duration_ms = models.PositiveIntegerField(default=0, verbose_name="Durée (ms)")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de la tentative")
+    
+    class Meta:
+        db_table = 'notification_attempts'
+        verbose_name = "Tentative d'envoi"
+        verbose_name_plural = "Tentatives d'envoi"
+        ordering = ['message', 'number']
+    
+    def __str__(self):
+        return f"{self.message_id} #{self.number} - {'réussie' if self.success else 'échouée'}"
+
+
+class BroadcastJob(models.Model):
+    """Broadcast FCM en file d'envoi (traité par run_notification_workers)"""
+    
+    STATUS_CHOICES = [
+        ('pending', 'En attente'),
+        ('running', 'En cours'),
+        ('done', 'Terminé'),
+        ('failed', 'Échoué'),
+    ]
+    
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    title = models.CharField(max_length=200, verbose_name="Titre")
+    body = models.TextField(verbose_name="Message")
+    data = models.JSONField(default=dict, blank=True, verbose_name="Données")
+    device_types = models.JSONField(null=True, blank=True, verbose_name="Types d'appareils ciblés")
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', verbose_name="Statut")
+    results = models.JSONField(null=True, blank=True, verbose_name="Résultats")
+    total_tokens = models.PositiveIntegerField(default=0, verbose_name="Tokens visés")
+    # Seuls les échecs sont conservés (un broadcast vise tous les appareils)
+    echecs = models.JSONField(default=list, blank=True, verbose_name="Échecs")
+    error = models.TextField(blank=True, default='', verbose_name="Erreur")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Date de création")
+    started_at = models.DateTimeField(null=True, blank=True, verbose_name="Début de l'envoi")
+    finished_at = models.DateTimeField(null=True, blank=True, verbose_name="Fin de l'envoi")
+    
+    class Meta:
+        db_table = 'broadcast_jobs'
+        verbose_name = "Broadcast"
+        verbose_name_plural = "Broadcasts"
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+    
+    def __str__(self):
+        return f"{self.title} ({self.get_status_display()})"
+
+
+class NotificationMetric(models.Model):
+    """Compteurs journaliers de livraison d'un canal (voir notifications/metrics.py)"""
+    
+    CHANNEL_CHOICES = [
+        ('fcm', 'FCM'),
+        ('webpush', 'Web Push'),
+    ]
+    
+    day = models.DateField(verbose_name="Jour")
+    channel = models.CharField(max_length=20, choices=CHANNEL_CHOICES, verbose_name="Canal")
+    sent = models.BigIntegerField(default=0, verbose_name="Envoyés")
+    failed = models.BigIntegerField(default=0, verbose_name="Échecs")
+    pruned = models.BigIntegerField(default=0, verbose_name="Appareils désactivés")
+    
+    class Meta:
+        db_table = 'notification_metrics'
+        verbose_name = "Métrique de livraison"
+        verbose_name_plural = "Métriques de livraison"
+        ordering = ['-day', 'channel']
+        unique_together = ['day', 'channel']
+    
+    def __str__(self):
+        return f"{self.day} {self.get_channel_display()}: {self.sent} envoyé(s), {self.pruned} désactivé(s)"
+
 # ============================================================================
 # MODÈLE EXCUSE ARBITRE
 # ============================================================================
@@ -853,33 +1054,44 @@ class ExcuseArbitre(models.Model):
         today = timezone.now().date()
         return self.date_debut > today
     
-    def accepter(self, admin_user, commentaire=None):
-        """Accepter l'excuse"""
-        self.status = 'acceptee'
-        self.traite_par = admin_user
-        self.traite_le = timezone.now()
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Statut chargé : un save() qui le modifie émet excuse_status_changed
+        instance._statut_charge = instance.__dict__.get('status')
+        return instance
+    
+    # Transitions conditionnelles (voir accounts/transitions.py)
+    
+    def _valeurs_traitement(self, admin_user, commentaire):
+        valeurs = {}
+        if admin_user:
+            valeurs['traite_par'] = admin_user
+            valeurs['traite_le'] = timezone.now()
         if commentaire:
-            self.commentaire_admin = commentaire
-        self.save()
+            valeurs['commentaire_admin'] = commentaire
+        return valeurs
+    
+    def accepter(self, admin_user, commentaire=None):
+        """Accepter l'excuse (si elle est en attente)"""
+        return appliquer_transition(
+            self, 'acceptee', ['en_attente'], excuse_status_changed,
+            **self._valeurs_traitement(admin_user, commentaire)
+        )
     
     def refuser(self, admin_user, commentaire=None):
-        """Refuser l'excuse"""
-        self.status = 'refusee'
-        self.traite_par = admin_user
-        self.traite_le = timezone.now()
-        if commentaire:
-            self.commentaire_admin = commentaire
-        self.save()
+        """Refuser l'excuse (si elle est en attente)"""
+        return appliquer_transition(
+            self, 'refusee', ['en_attente'], excuse_status_changed,
+            **self._valeurs_traitement(admin_user, commentaire)
+        )
     
     def annuler(self, admin_user=None, commentaire=None):
-        """Annuler l'excuse"""
-        self.status = 'annulee'
-        if admin_user:
-            self.traite_par = admin_user
-            self.traite_le = timezone.now()
-        if commentaire:
-            self.commentaire_admin = commentaire
-        self.save()
+        """Annuler l'excuse (en attente ou acceptée)"""
+        return appliquer_transition(
+            self, 'annulee', ['en_attente', 'acceptee'], excuse_status_changed,
+            **self._valeurs_traitement(admin_user, commentaire)
+        )
     
     @property
     def can_be_modified(self):
@@ -891,6 +1103,58 @@ class ExcuseArbitre(models.Model):
         """Vérifier si l'excuse peut être annulée"""
         return self.status in ['en_attente', 'acceptee'] and not self.is_passee()
 
+# ============================================================================
+# TABLEAU DE BORD D'ADMINISTRATION
+# ============================================================================
+
+class DashboardCounter(models.Model):
+    """Compteur matérialisé du tableau de bord (maintenu par les signaux)"""
+    
+    key = models.CharField(max_length=100, unique=True, verbose_name="Clé du compteur")
+    value = models.BigIntegerField(default=0, verbose_name="Valeur")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Date de mise à jour")
+    
+    class Meta:
+        db_table = 'dashboard_counters'
+        verbose_name = "Compteur du tableau de bord"
+        verbose_name_plural = "Compteurs du tableau de bord"
+        ordering = ['key']
+    
+    def __str__(self):
+        return f"{self.key} = {self.value}"
+
+
+class DisponibiliteArbitre(models.Model):
+    """
+    Index de disponibilité d'un arbitre pour une saison (juillet à juin)
+    
+    Un bit par jour de la saison (bit 0 = 1er juillet) : `jours_excuses` pour
+    les excuses acceptées, `jours_designations` pour les désignations actives.
+    Maintenu par les signaux (voir accounts/disponibilites.py).
+    """
+    
+    arbitre = models.ForeignKey(
+        Arbitre,
+        on_delete=models.CASCADE,
+        related_name='disponibilites',
+        verbose_name="Arbitre"
+    )
+    saison = models.PositiveSmallIntegerField(verbose_name="Saison (année de début)")
+    jours_excuses = models.BinaryField(default=bytes, verbose_name="Jours excusés")
+    jours_designations = models.BinaryField(default=bytes, verbose_name="Jours désignés")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Date de mise à jour")
+    
+    class Meta:
+        db_table = 'disponibilites_arbitres'
+        verbose_name = "Disponibilité d'arbitre"
+        verbose_name_plural = "Disponibilités d'arbitres"
+        constraints = [
+            models.UniqueConstraint(fields=['saison', 'arbitre'], name='unique_disponibilite_saison')
+        ]
+    
+    def __str__(self):
+        return f"{self.arbitre_id} - saison {self.saison}/{self.saison + 1}"
+
 # ============================================================================
 # MODÈLE POUR LA RÉINITIALISATION DE MOT DE PASSE
 # ============================================================================
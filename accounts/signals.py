@@ -0,0 +1,192 @@
+"""
+Signaux de l'application accounts
+
+- Maintien incrémental des compteurs du tableau de bord d'administration
+  (voir accounts/dashboard.py).
+- Maintien de l'index de disponibilité des arbitres (voir accounts/disponibilites.py).
+- Marquage des appareils FCM dont les topics sont à resynchroniser
+  (voir notifications/topics.py).
+- Suppression des appareils d'un utilisateur supprimé (le registre Device
+  n'a pas de clé étrangère vers les utilisateurs).
+"""
+from django.db.models import F
+from django.db.models.expressions import Combinable
+from django.db.models.signals import post_init, post_save, pre_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from .models import Arbitre, Commissaire, Admin, LigueArbitrage, Device, ExcuseArbitre
+from .transitions import excuse_status_changed, signaler_changement_sauvegarde
+from . import dashboard, disponibilites
+from notifications import topics
+
+MODELES_TABLEAU_DE_BORD = [Arbitre, Commissaire, Admin, LigueArbitrage, Device]
+
+try:
+    from matches.models import Match, Designation
+    from matches.transitions import designation_status_changed
+    MODELES_TABLEAU_DE_BORD.append(Match)
+except ImportError:
+    Match = Designation = designation_status_changed = None
+
+
+def capturer_etat_tableau_de_bord(sender, instance, **kwargs):
+    """Mémoriser les compteurs auxquels contribue l'enregistrement chargé"""
+    dashboard.capturer_etat(instance)
+
+
+def mettre_a_jour_tableau_de_bord(sender, instance, created, raw=False, **kwargs):
+    """Incrémenter / décrémenter les compteurs après une sauvegarde"""
+    if raw:
+        return
+    dashboard.enregistrement_sauvegarde(instance, created)
+
+
+def decrementer_tableau_de_bord(sender, instance, **kwargs):
+    """Décrémenter les compteurs après une suppression"""
+    dashboard.enregistrement_supprime(instance)
+
+
+# Connectés modèle par modèle : post_init est émis à chaque instanciation
+for modele in MODELES_TABLEAU_DE_BORD:
+    post_init.connect(capturer_etat_tableau_de_bord, sender=modele)
+    post_save.connect(mettre_a_jour_tableau_de_bord, sender=modele)
+    post_delete.connect(decrementer_tableau_de_bord, sender=modele)
+
+
+# ===== TOPICS FCM =====
+
+@receiver(post_init, sender=Arbitre)
+@receiver(post_init, sender=Commissaire)
+@receiver(post_init, sender=Admin)
+@receiver(post_init, sender=Device)
+def capturer_etat_topics(sender, instance, **kwargs):
+    """Mémoriser les champs qui déterminent les topics de l'enregistrement chargé"""
+    instance._etat_topics = topics.etat(instance)
+
+
+@receiver(pre_save, sender=Device)
+def marquer_topics_token(sender, instance, raw=False, **kwargs):
+    """Token créé, réactivé, désactivé ou réattribué : topics à resynchroniser"""
+    if raw or instance.channel != 'fcm':
+        return
+    nouvel_etat = topics.etat(instance)
+    if instance._state.adding or nouvel_etat is None or nouvel_etat != getattr(instance, '_etat_topics', None):
+        instance.topics_synced = False
+        if not instance._state.adding:
+            instance.topics_version = F('topics_version') + 1
+    instance._etat_topics = nouvel_etat
+
+
+@receiver(post_save, sender=Device)
+def recharger_version_topics(sender, instance, raw=False, **kwargs):
+    """Remplacer l'expression F() de topics_version par sa valeur enregistrée"""
+    if not raw and isinstance(instance.topics_version, Combinable):
+        instance.refresh_from_db(fields=['topics_version'])
+
+
+@receiver(post_save, sender=Arbitre)
+@receiver(post_save, sender=Commissaire)
+@receiver(post_save, sender=Admin)
+def marquer_topics_utilisateur(sender, instance, created, raw=False, **kwargs):
+    """Ligue, grade, rôle ou statut modifié : topics des tokens à resynchroniser"""
+    if raw or created:
+        return
+    nouvel_etat = topics.etat(instance)
+    ancien_etat = getattr(instance, '_etat_topics', None)
+    instance._etat_topics = nouvel_etat
+    if ancien_etat is None or nouvel_etat is None or nouvel_etat != ancien_etat:
+        topics.marquer_utilisateur(instance)
+
+
+@receiver(post_delete, sender=Arbitre)
+@receiver(post_delete, sender=Commissaire)
+@receiver(post_delete, sender=Admin)
+def supprimer_appareils_utilisateur(sender, instance, **kwargs):
+    """
+    Retirer les appareils d'un utilisateur supprimé
+
+    Les abonnements Web Push sont supprimés. Les appareils FCM sont désactivés
+    et marqués à resynchroniser : topics.synchroniser les désabonne de leurs
+    topics puis les supprime (supprimés ici, ils resteraient abonnés côté FCM).
+    """
+    appareils = Device.objects.pour(instance)
+    appareils.filter(channel='webpush').delete()
+    # update() ne déclenche pas les signaux : recalculer le tableau de bord
+    if appareils.filter(channel='fcm').update(
+        is_active=False, topics_synced=False, topics_version=F('topics_version') + 1
+    ):
+        dashboard.invalider()
+
+
+# ===== INDEX DE DISPONIBILITÉ DES ARBITRES =====
+
+@receiver(pre_save, sender=ExcuseArbitre)
+def memoriser_plage_excuse(sender, instance, raw=False, **kwargs):
+    """Mémoriser l'arbitre et la plage avant modification d'une excuse"""
+    if raw or not instance.pk:
+        return
+    instance._plage_precedente = ExcuseArbitre.objects.filter(pk=instance.pk).values_list(
+        'arbitre_id', 'date_debut', 'date_fin'
+    ).first()
+
+
+@receiver(post_save, sender=ExcuseArbitre)
+def signaler_statut_excuse_sauvegarde(sender, instance, created, raw=False, **kwargs):
+    """Émettre excuse_status_changed lorsqu'un save() complet change le statut"""
+    if not raw:
+        signaler_changement_sauvegarde(excuse_status_changed, instance, created)
+
+
+@receiver([post_save, post_delete, excuse_status_changed], sender=ExcuseArbitre)
+def actualiser_disponibilite_excuse(sender, instance, raw=False, **kwargs):
+    """Recalculer les jours excusés de l'arbitre sur les saisons touchées"""
+    # Changement de statut issu d'un save() : déjà traité par post_save
+    if raw or kwargs.get('sauvegarde'):
+        return
+    plages = [(instance.arbitre_id, instance.date_debut, instance.date_fin)]
+    precedente = getattr(instance, '_plage_precedente', None)
+    if precedente:
+        plages.append(precedente)
+    for arbitre_id, debut, fin in plages:
+        disponibilites.actualiser([arbitre_id], disponibilites.saisons_entre(debut, fin))
+
+
+if Designation is not None:
+
+    @receiver([post_save, post_delete, designation_status_changed], sender=Designation)
+    def actualiser_disponibilite_designation(sender, instance, raw=False, **kwargs):
+        """Recalculer les jours désignés de l'arbitre pour la saison du match"""
+        if raw or kwargs.get('sauvegarde'):
+            return
+        if Designation.match.is_cached(instance):
+            match_date = instance.match.match_date
+        else:
+            match_date = Match.objects.filter(pk=instance.match_id).values_list('match_date', flat=True).first()
+        # Match supprimé : traité par le signal du match
+        if match_date:
+            disponibilites.actualiser([instance.arbitre_id], [disponibilites.saison_de(match_date)])
+
+    @receiver(post_save, sender=Match)
+    def actualiser_disponibilite_date_match(sender, instance, created, raw=False, **kwargs):
+        """Déplacer la disponibilité des officiels lorsque la date du match change"""
+        ancienne_date = getattr(instance, '_date_chargee', None)
+        instance._date_chargee = instance.match_date
+        if raw or created or ancienne_date is None or ancienne_date == instance.match_date:
+            return
+        arbitre_ids = set(instance.designations.values_list('arbitre_id', flat=True))
+        disponibilites.actualiser(arbitre_ids, {
+            disponibilites.saison_de(ancienne_date),
+            disponibilites.saison_de(instance.match_date),
+        })
+
+    @receiver(pre_delete, sender=Match)
+    def memoriser_officiels_match(sender, instance, **kwargs):
+        """Mémoriser les officiels avant la suppression en cascade des désignations"""
+        instance._officiels = set(instance.designations.values_list('arbitre_id', flat=True))
+
+    @receiver(post_delete, sender=Match)
+    def actualiser_disponibilite_match_supprime(sender, instance, **kwargs):
+        """Libérer la journée des officiels d'un match supprimé"""
+        officiels = getattr(instance, '_officiels', None)
+        if officiels:
+            disponibilites.actualiser(officiels, [disponibilites.saison_de(instance.match_date)])
@@ -0,0 +1,76 @@
+"""
+Transitions d'état conditionnelles
+
+Chaque transition est un seul `UPDATE ... WHERE id = ... AND status IN (...)` :
+elle ne s'applique que si l'état courant en base l'autorise (pas de mise à
+jour perdue entre deux requêtes concurrentes), ne réécrit que les colonnes
+concernées et renvoie True si la ligne a effectivement changé.
+
+Les signaux de changement d'état ne sont émis que dans ce cas. Ils reçoivent
+`instance`, `ancien_statut`, `nouveau_statut` et `sauvegarde` (True lorsque le
+changement vient d'un save() complet : les receveurs post_save ont déjà
+mis à jour les données dérivées).
+"""
+from django.db import transaction
+from django.dispatch import Signal
+
+excuse_status_changed = Signal()
+notification_status_changed = Signal()
+
+
+def appliquer_transition(instance, nouveau_statut, depuis, signal, journal=None, **valeurs):
+    """
+    Passer `instance` au statut `nouveau_statut` si son statut en base est dans `depuis`
+
+    Args:
+        journal: fonction (instance, ancien_statut, nouveau_statut) exécutée dans
+            la même transaction que l'UPDATE lorsque la transition s'applique
+        valeurs: autres colonnes écrites dans le même UPDATE
+
+    Returns:
+        True si la transition a été appliquée
+    """
+    model = type(instance)
+    with transaction.atomic():
+        modifiees = model.objects.filter(pk=instance.pk, status__in=depuis).update(
+            status=nouveau_statut, **valeurs
+        )
+        if not modifiees:
+            return False
+
+        ancien_statut = instance.status
+        instance.status = nouveau_statut
+        for champ, valeur in valeurs.items():
+            setattr(instance, champ, valeur)
+        instance._statut_charge = nouveau_statut
+        if journal is not None:
+            journal(instance, ancien_statut, nouveau_statut)
+
+    signal.send(
+        sender=model,
+        instance=instance,
+        ancien_statut=ancien_statut,
+        nouveau_statut=nouveau_statut,
+        sauvegarde=False
+    )
+    return True
+
+
+def signaler_changement_sauvegarde(signal, instance, created):
+    """
+    Émettre le signal de changement d'état après un save() complet
+
+    À appeler depuis un receveur post_save ; le statut chargé est mémorisé par
+    `from_db` dans `_statut_charge`.
+    """
+    ancien_statut = getattr(instance, '_statut_charge', None)
+    instance._statut_charge = instance.status
+    if created or ancien_statut is None or ancien_statut == instance.status:
+        return
+    signal.send(
+        sender=type(instance),
+        instance=instance,
+        ancien_statut=ancien_statut,
+        nouveau_statut=instance.status,
+        sauvegarde=True
+    )
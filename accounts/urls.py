@@ -95,6 +95,8 @@ urlpatterns = [
     path('fcm/test/', views.fcm_test_notification, name='fcm_test_notification'),
     path('fcm/stats/', views.fcm_notification_stats, name='fcm_notification_stats'),
     path('fcm/broadcast/', views.fcm_send_broadcast, name='fcm_send_broadcast'),
+    path('fcm/broadcast/<str:job_id>/', views.fcm_broadcast_status, name='fcm_broadcast_status'),
+    path('fcm/segment/', views.fcm_send_segment, name='fcm_send_segment'),
     
     # ============================================================================
     # NOTIFICATIONS DE DÉSIGNATION D'ARBITRES
@@ -117,6 +119,7 @@ urlpatterns = [
     # ADMINISTRATION - SUPPRESSION ARBITRES
     # ============================================================================
     path('admin/arbitres/<int:arbitre_id>/delete/', views.arbitre_delete, name='arbitre_delete'),
+    path('arbitres/available/', views.arbitres_disponibles, name='arbitres_disponibles'),
     
     # ============================================================================
 # RÉINITIALISATION DE MOT DE PASSE AVEC OTP
@@ -7,7 +7,7 @@ from rest_framework import status, permissions
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.core.paginator import Paginator
-from django.db.models import Q
+from django.db.models import F, Q
 from .models import Arbitre, Commissaire, Admin, LigueArbitrage, ExcuseArbitre
 from .serializers import (
     ArbitreRegistrationSerializer, ArbitreProfileSerializer, ArbitreUpdateSerializer,
@@ -30,7 +30,7 @@ from .password_reset_serializers import (
 from .email_service import PasswordResetEmailService
 from rest_framework_simplejwt.tokens import RefreshToken
 from rest_framework_simplejwt.authentication import JWTAuthentication
-from .models import PushSubscription
+from .models import Device
 from django.utils import timezone
 
 # ============================================================================
@@ -490,24 +490,21 @@ def push_subscribe(request):
                 'error': 'Données d\'abonnement manquantes'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Créer ou mettre à jour l'abonnement
-        subscription, created = PushSubscription.objects.get_or_create(
-            arbitre=request.user,
-            endpoint=endpoint,
+        # Créer ou mettre à jour l'abonnement (un endpoint appartient au
+        # dernier utilisateur qui l'a enregistré)
+        Device.objects.update_or_create(
+            channel='webpush',
+            token=endpoint,
             defaults={
+                'user_type': Device.type_utilisateur(request.user),
+                'user_id': request.user.pk,
+                'device_type': 'web',
                 'p256dh': p256dh,
                 'auth': auth,
                 'is_active': True
             }
         )
         
-        if not created:
-            # Mettre à jour l'abonnement existant
-            subscription.p256dh = p256dh
-            subscription.auth = auth
-            subscription.is_active = True
-            subscription.save()
-        
         return Response({
             'success': True,
             'message': 'Abonnement aux notifications créé avec succès'
@@ -531,9 +528,9 @@ def push_unsubscribe(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Désactiver l'abonnement
-        PushSubscription.objects.filter(
-            arbitre=request.user,
-            endpoint=endpoint
+        Device.objects.pour(request.user).filter(
+            channel='webpush',
+            token=endpoint
         ).update(is_active=False)
         
         return Response({
@@ -1077,33 +1074,104 @@ def admin_stats(request):
     if not isinstance(request.user, Admin):
         return Response({'detail': 'Accès non autorisé'}, status=status.HTTP_403_FORBIDDEN)
     
-    stats = {
-        'total_arbitres': Arbitre.objects.count(),
-        'arbitres_actifs': Arbitre.objects.filter(is_active=True).count(),
-        'total_commissaires': Commissaire.objects.count(),
-        'commissaires_actifs': Commissaire.objects.filter(is_active=True).count(),
-        'total_admins': Admin.objects.count(),
-        'admins_actifs': Admin.objects.filter(is_active=True).count(),
-        'total_ligues': LigueArbitrage.objects.filter(is_active=True).count(),
-    }
+    # Compteurs matérialisés (maintenus par les signaux, voir accounts/dashboard.py)
+    from .dashboard import get_admin_stats
+    stats = get_admin_stats()
+    
+    return Response(stats)
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def arbitres_disponibles(request):
+    """
+    Arbitres actifs libres sur une ou plusieurs dates (administrateurs)
+    
+    Paramètres: date (YYYY-MM-DD, liste séparée par des virgules) ou
+    date_from / date_to (62 jours maximum), grade_min, ligue, role,
+    include_busy (true : liste aussi les arbitres occupés et le motif).
+    La disponibilité est lue dans l'index par saison (accounts/disponibilites.py).
+    """
+    from datetime import datetime, timedelta
+    from .disponibilites import arbitres_occupes
+    
+    if not isinstance(request.user, Admin):
+        return Response({'detail': 'Accès non autorisé'}, status=status.HTTP_403_FORBIDDEN)
     
-    # Ajouter les stats de matches si l'app matches est disponible
     try:
-        from matches.models import Match
-        stats['total_matches'] = Match.objects.count()
-        # Matches du mois actuel
-        from datetime import datetime
-        current_month = datetime.now().month
-        current_year = datetime.now().year
-        stats['matches_ce_mois'] = Match.objects.filter(
-            match_date__month=current_month,
-            match_date__year=current_year
-        ).count()
-    except ImportError:
-        stats['total_matches'] = 0
-        stats['matches_ce_mois'] = 0
+        jours = [
+            datetime.strptime(valeur.strip(), '%Y-%m-%d').date()
+            for valeur in request.GET.get('date', '').split(',') if valeur.strip()
+        ]
+        date_from, date_to = request.GET.get('date_from'), request.GET.get('date_to')
+        if date_from or date_to:
+            debut = datetime.strptime(date_from or date_to, '%Y-%m-%d').date()
+            fin = datetime.strptime(date_to or date_from, '%Y-%m-%d').date()
+            if fin < debut or (fin - debut).days > 61:
+                return Response({
+                    'success': False,
+                    'message': 'Période invalide (date_from ≤ date_to, 62 jours maximum)'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            jours += [debut + timedelta(days=n) for n in range((fin - debut).days + 1)]
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Format de date invalide. Utilisez YYYY-MM-DD'
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    return Response(stats)
+    if not jours:
+        return Response({
+            'success': False,
+            'message': 'Indiquez date ou date_from / date_to'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    arbitres = Arbitre.objects.filter(is_active=True)
+    
+    grade_min = request.GET.get('grade_min')
+    if grade_min:
+        if grade_min not in Arbitre.GRADES_ORDRE:
+            return Response({
+                'success': False,
+                'message': f'Grade invalide. Valeurs possibles: {", ".join(Arbitre.GRADES_ORDRE)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        arbitres = arbitres.filter(grade__in=Arbitre.GRADES_ORDRE[Arbitre.GRADES_ORDRE.index(grade_min):])
+    
+    ligue = request.GET.get('ligue')
+    if ligue:
+        if not ligue.isdigit():
+            return Response({
+                'success': False,
+                'message': 'Paramètre ligue invalide'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        arbitres = arbitres.filter(ligue_id=int(ligue))
+    
+    role = request.GET.get('role')
+    if role:
+        arbitres = arbitres.filter(role=role)
+    
+    occupes = arbitres_occupes(arbitres, jours)
+    
+    colonnes = ('id', 'first_name', 'last_name', 'grade', 'role', 'ligue_id', 'ligue__nom')
+    disponibles, indisponibles = [], []
+    for ligne in arbitres.order_by('last_name', 'first_name', 'id').values(*colonnes):
+        ligne['ligue_nom'] = ligne.pop('ligue__nom')
+        motifs = occupes.get(ligne['id'])
+        if motifs is None:
+            disponibles.append(ligne)
+        else:
+            ligne['motifs'] = sorted(motifs)
+            indisponibles.append(ligne)
+    
+    data = {
+        'success': True,
+        'message': f'{len(disponibles)} arbitre(s) disponible(s)',
+        'dates': sorted({jour.isoformat() for jour in jours}),
+        'count': len(disponibles),
+        'arbitres': disponibles
+    }
+    if str(request.GET.get('include_busy', '')).lower() in ['1', 'true', 'oui']:
+        data['indisponibles'] = indisponibles
+    return Response(data)
 
 # ============================================================================
 # NOTIFICATIONS PUSH
@@ -1130,24 +1198,21 @@ def push_subscribe(request):
                 'error': 'Données d\'abonnement manquantes'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Créer ou mettre à jour l'abonnement
-        subscription, created = PushSubscription.objects.get_or_create(
-            arbitre=request.user,
-            endpoint=endpoint,
+        # Créer ou mettre à jour l'abonnement (un endpoint appartient au
+        # dernier arbitre qui l'a enregistré)
+        Device.objects.update_or_create(
+            channel='webpush',
+            token=endpoint,
             defaults={
+                'user_type': 'arbitre',
+                'user_id': request.user.pk,
+                'device_type': 'web',
                 'p256dh': p256dh,
                 'auth': auth,
                 'is_active': True
             }
         )
         
-        if not created:
-            # Mettre à jour l'abonnement existant
-            subscription.p256dh = p256dh
-            subscription.auth = auth
-            subscription.is_active = True
-            subscription.save()
-        
         return Response({
             'success': True,
             'message': 'Abonnement aux notifications créé avec succès'
@@ -1179,9 +1244,9 @@ def push_unsubscribe(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Désactiver l'abonnement
-        PushSubscription.objects.filter(
-            arbitre=request.user,
-            endpoint=endpoint
+        Device.objects.pour(request.user).filter(
+            channel='webpush',
+            token=endpoint
         ).update(is_active=False)
         
         return Response({
@@ -1219,10 +1284,13 @@ def subscribe_push(request):
             )
         
         # Créer ou mettre à jour l'abonnement
-        subscription, created = PushSubscription.objects.update_or_create(
-            arbitre=request.user,
-            endpoint=endpoint,
+        subscription, created = Device.objects.update_or_create(
+            channel='webpush',
+            token=endpoint,
             defaults={
+                'user_type': 'arbitre',
+                'user_id': request.user.pk,
+                'device_type': 'web',
                 'p256dh': p256dh,
                 'auth': auth,
                 'is_active': True
@@ -1262,16 +1330,16 @@ def unsubscribe_push(request):
         
         # Désactiver l'abonnement
         try:
-            subscription = PushSubscription.objects.get(
-                arbitre=request.user,
-                endpoint=endpoint
+            subscription = Device.objects.pour(request.user).get(
+                channel='webpush',
+                token=endpoint
             )
             subscription.is_active = False
             subscription.save()
             
             return Response({'detail': 'Désabonnement réussi'}, status=status.HTTP_200_OK)
             
-        except PushSubscription.DoesNotExist:
+        except Device.DoesNotExist:
             return Response(
                 {'detail': 'Aucun abonnement trouvé pour cet endpoint'}, 
                 status=status.HTTP_404_NOT_FOUND
@@ -1297,10 +1365,9 @@ def push_subscriptions_status(request):
             )
         
         # Récupérer tous les abonnements de l'arbitre
-        subscriptions = PushSubscription.objects.filter(
-            arbitre=request.user,
-            is_active=True
-        ).values('id', 'endpoint', 'created_at', 'last_used')
+        subscriptions = Device.objects.pour(request.user).actifs().filter(
+            channel='webpush'
+        ).values('id', 'created_at', 'last_used', endpoint=F('token'))
         
         return Response({
             'subscriptions': list(subscriptions),
@@ -1327,9 +1394,8 @@ def test_push_notification(request):
             )
         
         # Vérifier qu'il y a au moins un abonnement actif
-        active_subscriptions = PushSubscription.objects.filter(
-            arbitre=request.user,
-            is_active=True
+        active_subscriptions = Device.objects.pour(request.user).actifs().filter(
+            channel='webpush'
         )
         
         if not active_subscriptions.exists():
@@ -1372,7 +1438,6 @@ def fcm_subscribe_mobile(request):
     """Enregistrer un token FCM pour une application mobile"""
     try:
         import json
-        from .models import FCMToken
         
         data = json.loads(request.body)
         fcm_token = data.get('fcm_token')
@@ -1407,10 +1472,12 @@ def fcm_subscribe_mobile(request):
             )
         
         # Créer ou mettre à jour le token FCM
-        fcm_token_obj, created = FCMToken.objects.get_or_create(
+        fcm_token_obj, created = Device.objects.update_or_create(
+            channel='fcm',
             token=fcm_token,
             defaults={
-                user_type: request.user,
+                'user_type': user_type,
+                'user_id': request.user.pk,
                 'device_type': device_type,
                 'device_id': device_id,
                 'app_version': app_version,
@@ -1418,15 +1485,6 @@ def fcm_subscribe_mobile(request):
             }
         )
         
-        if not created:
-            # Mettre à jour le token existant
-            setattr(fcm_token_obj, user_type, request.user)
-            fcm_token_obj.device_type = device_type
-            fcm_token_obj.device_id = device_id
-            fcm_token_obj.app_version = app_version
-            fcm_token_obj.is_active = True
-            fcm_token_obj.save()
-        
         return Response({
             'success': True,
             'message': f'Token FCM {device_type} enregistré avec succès',
@@ -1451,7 +1509,6 @@ def fcm_unsubscribe_mobile(request):
     """Désactiver un token FCM pour une application mobile"""
     try:
         import json
-        from .models import FCMToken
         
         data = json.loads(request.body)
         fcm_token = data.get('fcm_token')
@@ -1477,9 +1534,9 @@ def fcm_unsubscribe_mobile(request):
             )
         
         # Désactiver le token FCM
-        fcm_token_obj = FCMToken.objects.filter(
-            token=fcm_token,
-            **{user_type: request.user}
+        fcm_token_obj = Device.objects.pour(request.user).filter(
+            channel='fcm',
+            token=fcm_token
         ).first()
         
         if fcm_token_obj:
@@ -1512,8 +1569,6 @@ def fcm_unsubscribe_mobile(request):
 def fcm_tokens_status(request):
     """Obtenir le statut des tokens FCM de l'utilisateur"""
     try:
-        from .models import FCMToken
-        
         # Déterminer le type d'utilisateur
         user_type = None
         if isinstance(request.user, Arbitre):
@@ -1529,8 +1584,8 @@ def fcm_tokens_status(request):
             )
         
         # Récupérer tous les tokens de l'utilisateur
-        fcm_tokens = FCMToken.objects.filter(
-            **{user_type: request.user}
+        fcm_tokens = Device.objects.pour(request.user).filter(
+            channel='fcm'
         ).order_by('-created_at')
         
         tokens_data = []
@@ -1567,8 +1622,6 @@ def fcm_test_notification(request):
         from firebase_config import send_notification_to_user
         
         # Vérifier que l'utilisateur a au moins un token FCM actif
-        from .models import FCMToken
-        
         user_type = None
         if isinstance(request.user, Arbitre):
             user_type = 'arbitre'
@@ -1582,9 +1635,8 @@ def fcm_test_notification(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        active_tokens = FCMToken.objects.filter(
-            **{user_type: request.user},
-            is_active=True
+        active_tokens = Device.objects.pour(request.user).actifs().filter(
+            channel='fcm'
         )
         
         if not active_tokens.exists():
@@ -1666,10 +1718,10 @@ def fcm_send_broadcast(request):
                 status=status.HTTP_400_BAD_REQUEST
             )
         
-        from firebase_config import send_notification_to_all_platforms
+        from firebase_config import lancer_broadcast
         
-        # Envoyer la notification broadcast
-        results = send_notification_to_all_platforms(
+        # Le broadcast est mis en file (run_notification_workers) : suivre le job via fcm/broadcast/<job_id>/
+        job_id = lancer_broadcast(
             title=title,
             body=body,
             data=data_payload,
@@ -1678,8 +1730,126 @@ def fcm_send_broadcast(request):
         
         return Response({
             'success': True,
-            'message': 'Notification broadcast envoyée',
-            'results': results
+            'message': 'Notification broadcast mise en file d\'envoi',
+            'job_id': job_id
+        }, status=status.HTTP_202_ACCEPTED)
+        
+    except json.JSONDecodeError:
+        return Response(
+            {'error': 'Données JSON invalides'}, 
+            status=status.HTTP_400_BAD_REQUEST
+        )
+    except Exception as e:
+        return Response(
+            {'error': f'Erreur lors de l\'envoi: {str(e)}'}, 
+            status=status.HTTP_500_INTERNAL_SERVER_ERROR
+        )
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def fcm_broadcast_status(request, job_id):
+    """Obtenir l'état d'un broadcast (admin seulement)"""
+    # Vérifier que l'utilisateur est un admin
+    if not isinstance(request.user, Admin):
+        return Response(
+            {'error': 'Accès refusé. Seuls les administrateurs peuvent suivre les broadcasts'}, 
+            status=status.HTTP_403_FORBIDDEN
+        )
+    
+    from firebase_config import etat_broadcast
+    
+    etat = etat_broadcast(job_id)
+    if etat is None:
+        return Response(
+            {'error': 'Broadcast introuvable'}, 
+            status=status.HTTP_404_NOT_FOUND
+        )
+    
+    return Response({
+        'success': True,
+        'broadcast': etat
+    })
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def fcm_send_segment(request):
+    """Envoyer une notification à un segment (ligue, grade, rôle, type d'utilisateur) via les topics FCM (admin seulement)"""
+    try:
+        import json
+        
+        # Vérifier que l'utilisateur est un admin
+        if not isinstance(request.user, Admin):
+            return Response(
+                {'error': 'Accès refusé. Seuls les administrateurs peuvent notifier un segment'}, 
+                status=status.HTTP_403_FORBIDDEN
+            )
+        
+        data = json.loads(request.body)
+        title = data.get('title')
+        body = data.get('body')
+        ligue_id = data.get('ligue_id')
+        grade = data.get('grade')
+        role = data.get('role')
+        user_type = data.get('user_type')  # 'arbitre', 'commissaire' ou 'admin'
+        
+        if not title or not body:
+            return Response(
+                {'error': 'Titre et corps de la notification requis'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        # Validation des critères
+        if user_type and user_type not in ('arbitre', 'commissaire', 'admin'):
+            return Response(
+                {'error': 'Type d\'utilisateur invalide'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if ligue_id and not LigueArbitrage.objects.filter(id=ligue_id).exists():
+            return Response(
+                {'error': 'Ligue non trouvée'}, 
+                status=status.HTTP_404_NOT_FOUND
+            )
+        modele_grade = Commissaire if user_type == 'commissaire' else Arbitre
+        if grade and grade not in dict(modele_grade._meta.get_field('grade').choices):
+            return Response(
+                {'error': 'Grade invalide'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if role and role not in dict(Arbitre._meta.get_field('role').choices):
+            return Response(
+                {'error': 'Rôle invalide'}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        from firebase_config import send_notification_to_segment
+        
+        try:
+            results = send_notification_to_segment(
+                title=title,
+                body=body,
+                data=data.get('data', {}),
+                ligue_id=ligue_id,
+                grade=grade,
+                role=role,
+                user_type=user_type
+            )
+        except ValueError as e:
+            return Response(
+                {'error': str(e)}, 
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        
+        if not results['success']:
+            return Response(
+                {'error': f'Erreur lors de l\'envoi: {results["error"]}'}, 
+                status=status.HTTP_502_BAD_GATEWAY
+            )
+        
+        return Response({
+            'success': True,
+            'message': 'Notification envoyée au segment',
+            'message_id': results['message_id'],
+            'topics': results['topics']
         })
         
     except json.JSONDecodeError:
@@ -1703,8 +1873,9 @@ def notify_arbitre_designation(request):
     """Notifier un arbitre lors d'une désignation"""
     try:
         import json
+        from django.db import transaction
         from .models import NotificationDesignation
-        from firebase_config import send_notification_to_user
+        from notifications import outbox
         
         # Vérifier que l'utilisateur est un admin
         if not isinstance(request.user, Admin):
@@ -1735,23 +1906,23 @@ def notify_arbitre_designation(request):
                 status=status.HTTP_404_NOT_FOUND
             )
         
-        # Créer l'enregistrement de notification
-        notification = NotificationDesignation.objects.create(
-            arbitre=arbitre,
-            match_id=data['match_id'],
-            match_nom=data['match_nom'],
-            match_date=data['match_date'],
-            match_lieu=data['match_lieu'],
-            designation_type=data['designation_type'],
-            title=f"🏆 Nouvelle Désignation - {data['match_nom']}",
-            message=data['message'],
-            status='sent'
-        )
-        
-        # Envoyer la notification FCM
-        try:
-            fcm_results = send_notification_to_user(
-                user=arbitre,
+        # Historique et message d'outbox dans la même transaction ; les workers
+        # (run_notification_workers) envoient puis marquent la notification
+        with transaction.atomic():
+            notification = NotificationDesignation.objects.create(
+                arbitre=arbitre,
+                match_id=data['match_id'],
+                match_nom=data['match_nom'],
+                match_date=data['match_date'],
+                match_lieu=data['match_lieu'],
+                designation_type=data['designation_type'],
+                title=f"🏆 Nouvelle Désignation - {data['match_nom']}",
+                message=data['message'],
+                status='sent'
+            )
+            message = outbox.mettre_en_file(
+                'fcm',
+                arbitre,
                 title=notification.title,
                 body=notification.message,
                 data={
@@ -1761,35 +1932,20 @@ def notify_arbitre_designation(request):
                     'notification_id': str(notification.id),
                     'match_date': data['match_date'],
                     'match_lieu': data['match_lieu']
-                }
+                },
+                notification=notification
             )
-            
-            # Mettre à jour le statut de la notification
-            if fcm_results.get('errors', 0) == 0:
-                notification.mark_as_delivered()
-                notification.fcm_response = fcm_results
-            else:
-                notification.mark_as_failed(f"Erreur FCM: {fcm_results.get('error_details', 'Erreur inconnue')}")
-                notification.fcm_response = fcm_results
-            
-            notification.sent_at = timezone.now()
-            notification.save()
-            
-        except Exception as fcm_error:
-            notification.mark_as_failed(f"Erreur lors de l'envoi FCM: {str(fcm_error)}")
-            notification.save()
-            fcm_results = {'error': str(fcm_error)}
         
         return Response({
             'success': True,
-            'message': 'Notification de désignation envoyée',
+            'message': 'Notification de désignation mise en file d\'envoi',
             'notification_id': notification.id,
+            'outbox_id': message.id,
             'arbitre': {
                 'id': arbitre.id,
                 'nom': arbitre.get_full_name(),
                 'email': arbitre.email
-            },
-            'fcm_results': fcm_results
+            }
         })
         
     except json.JSONDecodeError:
@@ -1809,8 +1965,9 @@ def notify_multiple_arbitres(request):
     """Notifier plusieurs arbitres lors de désignations"""
     try:
         import json
+        from django.db import transaction
         from .models import NotificationDesignation
-        from firebase_config import send_notification_to_user
+        from notifications import outbox
         
         # Vérifier que l'utilisateur est un admin
         if not isinstance(request.user, Admin):
@@ -1860,23 +2017,22 @@ def notify_multiple_arbitres(request):
                     error_count += 1
                     continue
                 
-                # Créer l'enregistrement de notification
-                notification = NotificationDesignation.objects.create(
-                    arbitre=arbitre,
-                    match_id=notification_data['match_id'],
-                    match_nom=notification_data['match_nom'],
-                    match_date=notification_data['match_date'],
-                    match_lieu=notification_data['match_lieu'],
-                    designation_type=notification_data['designation_type'],
-                    title=f"🏆 Nouvelle Désignation - {notification_data['match_nom']}",
-                    message=notification_data['message'],
-                    status='sent'
-                )
-                
-                # Envoyer la notification FCM
-                try:
-                    fcm_results = send_notification_to_user(
-                        user=arbitre,
+                # Historique et message d'outbox dans la même transaction
+                with transaction.atomic():
+                    notification = NotificationDesignation.objects.create(
+                        arbitre=arbitre,
+                        match_id=notification_data['match_id'],
+                        match_nom=notification_data['match_nom'],
+                        match_date=notification_data['match_date'],
+                        match_lieu=notification_data['match_lieu'],
+                        designation_type=notification_data['designation_type'],
+                        title=f"🏆 Nouvelle Désignation - {notification_data['match_nom']}",
+                        message=notification_data['message'],
+                        status='sent'
+                    )
+                    message = outbox.mettre_en_file(
+                        'fcm',
+                        arbitre,
                         title=notification.title,
                         body=notification.message,
                         data={
@@ -1886,41 +2042,18 @@ def notify_multiple_arbitres(request):
                             'notification_id': str(notification.id),
                             'match_date': notification_data['match_date'],
                             'match_lieu': notification_data['match_lieu']
-                        }
+                        },
+                        notification=notification
                     )
-                    
-                    # Mettre à jour le statut de la notification
-                    if fcm_results.get('errors', 0) == 0:
-                        notification.mark_as_delivered()
-                        notification.fcm_response = fcm_results
-                    else:
-                        notification.mark_as_failed(f"Erreur FCM: {fcm_results.get('error_details', 'Erreur inconnue')}")
-                        notification.fcm_response = fcm_results
-                    
-                    notification.sent_at = timezone.now()
-                    notification.save()
-                    
-                    results.append({
-                        'arbitre_id': arbitre.id,
-                        'arbitre_nom': arbitre.get_full_name(),
-                        'notification_id': notification.id,
-                        'success': True,
-                        'fcm_results': fcm_results
-                    })
-                    success_count += 1
-                    
-                except Exception as fcm_error:
-                    notification.mark_as_failed(f"Erreur lors de l'envoi FCM: {str(fcm_error)}")
-                    notification.save()
-                    
-                    results.append({
-                        'arbitre_id': arbitre.id,
-                        'arbitre_nom': arbitre.get_full_name(),
-                        'notification_id': notification.id,
-                        'success': False,
-                        'error': f'Erreur FCM: {str(fcm_error)}'
-                    })
-                    error_count += 1
+                
+                results.append({
+                    'arbitre_id': arbitre.id,
+                    'arbitre_nom': arbitre.get_full_name(),
+                    'notification_id': notification.id,
+                    'outbox_id': message.id,
+                    'success': True
+                })
+                success_count += 1
                     
             except Exception as e:
                 results.append({
@@ -1932,7 +2065,7 @@ def notify_multiple_arbitres(request):
         
         return Response({
             'success': True,
-            'message': f'Notifications envoyées: {success_count} succès, {error_count} erreurs',
+            'message': f'Notifications mises en file d\'envoi: {success_count} succès, {error_count} erreurs',
             'summary': {
                 'total': len(notifications_data),
                 'success_count': success_count,
@@ -2500,8 +2633,13 @@ def cancel_excuse_arbitre(request, excuse_id):
                 'error_code': 'CANNOT_CANCEL'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Annuler l'excuse
-        excuse.annuler()
+        # Annuler l'excuse (transition gardée : échoue si elle a changé entre-temps)
+        if not excuse.annuler():
+            return Response({
+                'success': False,
+                'message': 'Cette excuse ne peut plus être annulée',
+                'error_code': 'CANNOT_CANCEL'
+            }, status=status.HTTP_409_CONFLICT)
         
         # Sérialiser les données mises à jour
         excuse_data = ExcuseArbitreDetailSerializer(excuse).data
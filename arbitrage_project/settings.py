@@ -94,6 +94,16 @@ DATABASES = {
     }
 }
 
+# Cache partagé entre les processus (serveur web, run_notification_workers,
+# commandes) : les invalidations faites par un processus sont vues par tous.
+# Table créée par `python manage.py createcachetable` (voir build.sh)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'django_cache',
+    }
+}
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -15,6 +15,10 @@ python -c "import django; print(f'Django {django.get_version()} installé')"
 echo "🗄️ Application des migrations..."
 python manage.py migrate --noinput
 
+# Créer la table du cache partagé
+echo "🗃️ Création de la table du cache..."
+python manage.py createcachetable
+
 # Collecter les fichiers statiques
 echo "📁 Collecte des fichiers statiques..."
 python manage.py collectstatic --noinput
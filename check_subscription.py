@@ -11,7 +11,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arbitrage_project.settings')
 django.setup()
 
-from accounts.models import Arbitre, PushSubscription
+from accounts.models import Arbitre, Device
 from django.utils import timezone
 
 def check_subscriptions():
@@ -32,7 +32,7 @@ def check_subscriptions():
         print(f"\n👤 {arbitre.get_full_name()} (ID: {arbitre.id})")
         
         # Vérifier les abonnements
-        subscriptions = PushSubscription.objects.filter(arbitre=arbitre)
+        subscriptions = Device.objects.pour(arbitre).filter(channel='webpush')
         total_subs = subscriptions.count()
         active_subs = subscriptions.filter(is_active=True).count()
         
@@ -51,8 +51,8 @@ def check_subscriptions():
     # 2. Statistiques globales
     print("\n📊 STATISTIQUES GLOBALES")
     
-    total_subscriptions = PushSubscription.objects.count()
-    active_subscriptions = PushSubscription.objects.filter(is_active=True).count()
+    total_subscriptions = Device.objects.filter(channel='webpush').count()
+    active_subscriptions = Device.objects.filter(channel='webpush', is_active=True).count()
     
     print(f"📱 Total abonnements: {total_subscriptions}")
     print(f"✅ Abonnements actifs: {active_subscriptions}")
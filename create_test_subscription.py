@@ -11,7 +11,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arbitrage_project.settings')
 django.setup()
 
-from accounts.models import Arbitre, PushSubscription
+from accounts.models import Arbitre, Device
 from django.utils import timezone
 
 def create_test_subscription():
@@ -29,7 +29,7 @@ def create_test_subscription():
         return False
     
     # 2. Vérifier s'il a déjà des abonnements
-    existing_subs = PushSubscription.objects.filter(arbitre=arbitre)
+    existing_subs = Device.objects.pour(arbitre).filter(channel='webpush')
     print(f"📱 Abonnements existants: {existing_subs.count()}")
     
     if existing_subs.exists():
@@ -42,9 +42,11 @@ def create_test_subscription():
         # Endpoint FCM de test (similaire à celui qui fonctionne)
         test_endpoint = "https://fcm.googleapis.com/fcm/send/TEST_SUBSCRIPTION_KEY_12345"
         
-        subscription = PushSubscription.objects.create(
-            arbitre=arbitre,
-            endpoint=test_endpoint,
+        subscription = Device.objects.create(
+            channel='webpush',
+            token=test_endpoint,
+            user_type='arbitre',
+            user_id=arbitre.pk,
             p256dh="TEST_P256DH_KEY_12345",
             auth="TEST_AUTH_KEY_12345",
             is_active=True,
@@ -62,7 +64,7 @@ def create_test_subscription():
     # 4. Vérifier l'état final
     print("\n🔍 VÉRIFICATION FINALE")
     
-    final_subs = PushSubscription.objects.filter(arbitre=arbitre, is_active=True)
+    final_subs = Device.objects.pour(arbitre).filter(channel='webpush', is_active=True)
     print(f"📱 Abonnements actifs: {final_subs.count()}")
     
     if final_subs.exists():
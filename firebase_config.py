@@ -4,8 +4,10 @@ Configuration Firebase Cloud Messaging (FCM) pour les notifications push
 import os
 import json
 import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from typing import Dict, List, Optional, Any
 from django.conf import settings
+from django.db.models import F
 from django.contrib.auth import get_user_model
 
 # Configuration du logging
@@ -56,6 +58,40 @@ def initialize_firebase():
     
     return True
 
+def _fcm_data(data: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Convertir toutes les données en chaînes de caractères pour FCM"""
+    return {str(key): str(value) for key, value in (data or {}).items()}
+
+def _config_plateforme(platform: str, title: str, body: str) -> Dict[str, Any]:
+    """Configuration spécifique selon la plateforme (construite une fois par envoi)"""
+    if platform == 'ios':
+        return {
+            'apns': messaging.APNSConfig(
+                payload=messaging.APNSPayload(
+                    aps=messaging.Aps(
+                        sound='default',
+                        badge=1,
+                        alert=messaging.ApsAlert(
+                            title=title,
+                            body=body
+                        )
+                    )
+                )
+            )
+        }
+    if platform == 'android':
+        return {
+            'android': messaging.AndroidConfig(
+                notification=messaging.AndroidNotification(
+                    sound='default',
+                    channel_id='federation_channel',
+                    priority='high',
+                    click_action='FLUTTER_NOTIFICATION_CLICK'
+                )
+            )
+        }
+    return {}
+
 def send_notification_to_platform(
     fcm_token: str, 
     title: str, 
@@ -84,48 +120,16 @@ def send_notification_to_platform(
         return False
     
     try:
-        # Configuration de base du message
-        # Convertir toutes les données en chaînes de caractères pour FCM
-        fcm_data = {}
-        if data:
-            for key, value in data.items():
-                fcm_data[str(key)] = str(value)
-        
-        message_data = {
-            'notification': messaging.Notification(
+        # Créer et envoyer le message
+        message = messaging.Message(
+            notification=messaging.Notification(
                 title=title,
                 body=body,
             ),
-            'data': fcm_data,
-            'token': fcm_token,
-        }
-        
-        # Configuration spécifique selon la plateforme
-        if platform == 'ios':
-            message_data['apns'] = messaging.APNSConfig(
-                payload=messaging.APNSPayload(
-                    aps=messaging.Aps(
-                        sound='default',
-                        badge=1,
-                        alert=messaging.ApsAlert(
-                            title=title,
-                            body=body
-                        )
-                    )
-                )
-            )
-        elif platform == 'android':
-            message_data['android'] = messaging.AndroidConfig(
-                notification=messaging.AndroidNotification(
-                    sound='default',
-                    channel_id='federation_channel',
-                    priority='high',
-                    click_action='FLUTTER_NOTIFICATION_CLICK'
-                )
-            )
-        
-        # Créer et envoyer le message
-        message = messaging.Message(**message_data)
+            data=_fcm_data(data),
+            token=fcm_token,
+            **_config_plateforme(platform, title, body)
+        )
         response = messaging.send(message)
         
         logger.info(f'Notification {platform} envoyée avec succès: {response}')
@@ -133,14 +137,197 @@ def send_notification_to_platform(
         
     except Exception as e:
         logger.error(f'Erreur lors de l\'envoi de la notification {platform}: {e}')
+        if token_invalide(e, argument_invalide=False):
+            from accounts.models import Device
+            
+            desactiver_tokens(list(
+                Device.objects.filter(channel='fcm', token=fcm_token).values_list('id', flat=True)
+            ))
         return False
 
+def token_invalide(exception: Optional[Exception], argument_invalide: bool = True) -> bool:
+    """
+    Erreur définitive liée au token : désinscrit (UNREGISTERED), enregistré
+    pour un autre projet (SENDER_ID_MISMATCH) ou mal formé (INVALID_ARGUMENT)
+    
+    INVALID_ARGUMENT peut aussi venir du message lui-même (payload mal
+    formé) : pour un envoi unitaire, où rien ne permet de trancher, passer
+    argument_invalide=False pour ne pas désactiver un token sain.
+    """
+    if exception is None or not FIREBASE_AVAILABLE:
+        return False
+    from firebase_admin import exceptions as firebase_exceptions
+    
+    erreurs = (messaging.UnregisteredError, messaging.SenderIdMismatchError)
+    if argument_invalide:
+        erreurs += (firebase_exceptions.InvalidArgumentError,)
+    return isinstance(exception, erreurs)
+
+def desactiver_tokens(token_ids: List[int]) -> int:
+    """
+    Désactiver des tokens FCM invalides en une requête
+    
+    Un token invalide n'existe plus côté FCM : ses topics sont oubliés sans
+    désabonnement.
+    """
+    from accounts.models import Device
+    
+    if not token_ids:
+        return 0
+    Device.objects.filter(id__in=token_ids).update(
+        topics=[], topics_synced=True, topics_version=F('topics_version') + 1
+    )
+    count = Device.objects.filter(id__in=token_ids, is_active=True).update(is_active=False)
+    
+    # update() ne déclenche pas les signaux : recalculer le tableau de bord
+    if count:
+        from accounts.dashboard import invalider
+        invalider()
+    return count
+
+def _envoyer_lot(platform: str, lot: List[tuple], title: str, body: str, fcm_data: Dict[str, str]) -> List[Dict[str, Any]]:
+    """
+    Envoyer un lot de tokens d'une même plateforme (un appel send_each_for_multicast)
+    
+    Returns:
+        Résultat par token, dans l'ordre du lot
+    """
+    try:
+        message = messaging.MulticastMessage(
+            tokens=[token for _, token in lot],
+            notification=messaging.Notification(
+                title=title,
+                body=body,
+            ),
+            data=fcm_data,
+            **_config_plateforme(platform, title, body)
+        )
+        reponses = messaging.send_each_for_multicast(message).responses
+    except Exception as e:
+        logger.error(f'Erreur lors de l\'envoi d\'un lot {platform} ({len(lot)} tokens): {e}')
+        return [
+            {'id': token_id, 'token': token, 'device_type': platform, 'success': False,
+             'message_id': None, 'error': str(e), 'error_code': getattr(e, 'code', None), 'invalid': False}
+            for token_id, token in lot
+        ]
+    
+    # send_each_for_multicast renvoie une réponse par token, dans l'ordre
+    resultats = [
+        {
+            'id': token_id,
+            'token': token,
+            'device_type': platform,
+            'success': reponse.success,
+            'message_id': reponse.message_id,
+            'error': str(reponse.exception) if reponse.exception else None,
+            'error_code': getattr(reponse.exception, 'code', None) if reponse.exception else None,
+            'invalid': token_invalide(reponse.exception),
+        }
+        for (token_id, token), reponse in zip(lot, reponses)
+    ]
+    
+    # INVALID_ARGUMENT sur tout le lot : le message est en cause, pas les tokens
+    if all(resultat['error_code'] == 'INVALID_ARGUMENT' for resultat in resultats):
+        for resultat in resultats:
+            resultat['invalid'] = False
+    return resultats
+
+def send_multicast(
+    fcm_tokens,
+    title: str,
+    body: str,
+    data: Optional[Dict[str, str]] = None
+) -> Dict[str, Any]:
+    """
+    Envoyer une notification à un ensemble de tokens FCM
+    
+    Les tokens sont regroupés par plateforme (une configuration APNs / Android
+    par groupe) puis envoyés par lots de FCM_MULTICAST_TAILLE (500 au plus,
+    limite de send_each_for_multicast). Les lots partent en parallèle sur un
+    pool de FCM_MULTICAST_WORKERS threads (défaut 4) ; la dernière utilisation
+    des tokens servis est écrite en une requête à la fin de l'envoi
+    (notifications/utilisation.py).
+    
+    Les tokens définitivement invalides (voir token_invalide) sont désactivés
+    en une requête à la fin de l'envoi ; le bilan alimente les métriques de
+    livraison (notifications/metrics.py).
+    
+    Args:
+        fcm_tokens: QuerySet de Device (canal 'fcm')
+        title: Titre de la notification
+        body: Corps de la notification
+        data: Données supplémentaires (optionnel)
+    
+    Returns:
+        Dict avec le nombre de notifications envoyées par plateforme, le
+        nombre d'erreurs, le nombre de tokens désactivés ('deactivated') et
+        le résultat de chaque token ('tokens')
+    """
+    from accounts.models import Device
+    from notifications import metrics
+    from notifications.utilisation import RegistreUtilisation
+    
+    results = {'ios': 0, 'android': 0, 'web': 0, 'errors': 0, 'deactivated': 0, 'tokens': []}
+    
+    # Regrouper les tokens par plateforme
+    groupes = {}
+    for token_id, token, device_type in fcm_tokens.values_list('id', 'token', 'device_type').iterator():
+        groupes.setdefault(device_type, []).append((token_id, token))
+    if not groupes:
+        return results
+    
+    if not FIREBASE_AVAILABLE or not initialize_firebase():
+        for device_type, lot in groupes.items():
+            for token_id, token in lot:
+                results['tokens'].append({
+                    'id': token_id, 'token': token, 'device_type': device_type, 'success': False,
+                    'message_id': None, 'error': 'Firebase indisponible', 'error_code': None, 'invalid': False,
+                })
+        results['errors'] = len(results['tokens'])
+        metrics.enregistrer('fcm', echecs=results['errors'])
+        return results
+    
+    taille = min(500, getattr(settings, 'FCM_MULTICAST_TAILLE', 500))
+    fcm_data = _fcm_data(data)
+    workers = max(1, getattr(settings, 'FCM_MULTICAST_WORKERS', 4))
+    invalides = []
+    servis = RegistreUtilisation(Device)
+    
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='fcm') as pool:
+        envois = [
+            pool.submit(_envoyer_lot, device_type, lot[debut:debut + taille], title, body, fcm_data)
+            for device_type, lot in groupes.items()
+            for debut in range(0, len(lot), taille)
+        ]
+        for envoi in as_completed(envois):
+            resultats_lot = envoi.result()
+            for resultat in resultats_lot:
+                if resultat['success']:
+                    results[resultat['device_type']] += 1
+                    servis.marquer([resultat['id']])
+                else:
+                    results['errors'] += 1
+                    if resultat['invalid']:
+                        invalides.append(resultat['id'])
+            results['tokens'].extend(resultats_lot)
+    
+    # Mettre à jour la dernière utilisation
+    servis.ecrire()
+    results['deactivated'] = desactiver_tokens(invalides)
+    metrics.enregistrer(
+        'fcm',
+        envoyes=len(results['tokens']) - results['errors'],
+        echecs=results['errors'],
+        invalides=results['deactivated']
+    )
+    return results
+
 def send_notification_to_user(
     user, 
     title: str, 
     body: str, 
     data: Optional[Dict[str, str]] = None
-) -> Dict[str, int]:
+) -> Dict[str, Any]:
     """
     Envoyer une notification à un utilisateur sur toutes ses plateformes
     
@@ -153,47 +340,24 @@ def send_notification_to_user(
     Returns:
         Dict avec le nombre de notifications envoyées par plateforme
     """
-    from accounts.models import FCMToken
-    
-    results = {'ios': 0, 'android': 0, 'web': 0, 'errors': 0}
+    from accounts.models import Device
     
     try:
         # Récupérer tous les tokens actifs de l'utilisateur
-        fcm_tokens = FCMToken.objects.filter(
-            is_active=True,
-            **{
-                f'{user.__class__.__name__.lower()}': user
-            }
-        )
+        fcm_tokens = Device.objects.pour(user).actifs().filter(channel='fcm')
         
-        for fcm_token in fcm_tokens:
-            success = send_notification_to_platform(
-                fcm_token.token, 
-                title, 
-                body, 
-                data, 
-                fcm_token.device_type
-            )
-            
-            if success:
-                results[fcm_token.device_type] += 1
-                # Mettre à jour la dernière utilisation
-                fcm_token.save()
-            else:
-                results['errors'] += 1
+        return send_multicast(fcm_tokens, title, body, data)
                 
     except Exception as e:
         logger.error(f'Erreur lors de l\'envoi de notification à l\'utilisateur: {e}')
-        results['errors'] += 1
-    
-    return results
+        return {'ios': 0, 'android': 0, 'web': 0, 'errors': 1, 'deactivated': 0, 'tokens': []}
 
 def send_notification_to_all_platforms(
     title: str, 
     body: str, 
     data: Optional[Dict[str, str]] = None,
     device_types: Optional[List[str]] = None
-) -> Dict[str, int]:
+) -> Dict[str, Any]:
     """
     Envoyer une notification à tous les utilisateurs sur toutes les plateformes
     
@@ -206,37 +370,101 @@ def send_notification_to_all_platforms(
     Returns:
         Dict avec le nombre de notifications envoyées par plateforme
     """
-    from accounts.models import FCMToken
-    
-    results = {'ios': 0, 'android': 0, 'web': 0, 'errors': 0}
+    from accounts.models import Device
     
     try:
         # Récupérer tous les tokens actifs
-        fcm_tokens = FCMToken.objects.filter(is_active=True)
+        fcm_tokens = Device.objects.actifs().filter(channel='fcm')
         
         if device_types:
             fcm_tokens = fcm_tokens.filter(device_type__in=device_types)
         
-        for fcm_token in fcm_tokens:
-            success = send_notification_to_platform(
-                fcm_token.token, 
-                title, 
-                body, 
-                data, 
-                fcm_token.device_type
-            )
-            
-            if success:
-                results[fcm_token.device_type] += 1
-                # Mettre à jour la dernière utilisation
-                fcm_token.save()
-            else:
-                results['errors'] += 1
+        return send_multicast(fcm_tokens, title, body, data)
                 
     except Exception as e:
         logger.error(f'Erreur lors de l\'envoi de notification globale: {e}')
-        results['errors'] += 1
+        return {'ios': 0, 'android': 0, 'web': 0, 'errors': 1, 'deactivated': 0, 'tokens': []}
+
+def send_notification_to_topic(
+    title: str,
+    body: str,
+    data: Optional[Dict[str, str]] = None,
+    topic: Optional[str] = None,
+    condition: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Envoyer une notification à un topic, ou à une condition sur des topics
     
+    Un seul message est envoyé, quelle que soit la taille de l'audience ; il
+    porte les configurations APNs et Android.
+    
+    Args:
+        title: Titre de la notification
+        body: Corps de la notification
+        data: Données supplémentaires (optionnel)
+        topic: Topic ciblé (voir notifications/topics.py)
+        condition: Condition FCM, à la place du topic
+    
+    Returns:
+        Dict avec le succès de l'envoi, l'identifiant du message ou l'erreur
+    """
+    if not FIREBASE_AVAILABLE:
+        logger.error("Firebase Admin SDK non disponible")
+        return {'success': False, 'message_id': None, 'error': 'Firebase indisponible'}
+    
+    if not initialize_firebase():
+        return {'success': False, 'message_id': None, 'error': 'Firebase indisponible'}
+    
+    try:
+        message = messaging.Message(
+            notification=messaging.Notification(
+                title=title,
+                body=body,
+            ),
+            data=_fcm_data(data),
+            topic=topic,
+            condition=condition,
+            **_config_plateforme('ios', title, body),
+            **_config_plateforme('android', title, body)
+        )
+        message_id = messaging.send(message)
+        
+        logger.info(f'Notification envoyée au segment {topic or condition}: {message_id}')
+        return {'success': True, 'message_id': message_id, 'error': None}
+        
+    except Exception as e:
+        logger.error(f'Erreur lors de l\'envoi au segment {topic or condition}: {e}')
+        return {'success': False, 'message_id': None, 'error': str(e)}
+
+def send_notification_to_segment(
+    title: str,
+    body: str,
+    data: Optional[Dict[str, str]] = None,
+    ligue_id: Optional[int] = None,
+    grade: Optional[str] = None,
+    role: Optional[str] = None,
+    user_type: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Envoyer une notification aux utilisateurs répondant à tous les critères
+    (ligue, grade, rôle, type d'utilisateur) en un message sur leurs topics
+    
+    Raises:
+        ValueError: critères vides ou incompatibles
+    
+    Returns:
+        Résultat de send_notification_to_topic, avec les topics ciblés
+    """
+    from notifications import topics
+    
+    topics_cibles = topics.topics_segment(ligue_id=ligue_id, grade=grade, role=role, user_type=user_type)
+    condition = topics.condition(topics_cibles)
+    results = send_notification_to_topic(
+        title, body, data,
+        topic=None if condition else topics_cibles[0],
+        condition=condition
+    )
+    results['topics'] = topics_cibles
     return results
 
 def send_notification_to_ligue(
@@ -244,9 +472,10 @@ def send_notification_to_ligue(
     title: str, 
     body: str, 
     data: Optional[Dict[str, str]] = None
-) -> Dict[str, int]:
+) -> Dict[str, Any]:
     """
     Envoyer une notification à tous les utilisateurs d'une ligue spécifique
+    (arbitres et commissaires, topic ligue_<id>)
     
     Args:
         ligue_id: ID de la ligue
@@ -255,62 +484,145 @@ def send_notification_to_ligue(
         data: Données supplémentaires (optionnel)
     
     Returns:
-        Dict avec le nombre de notifications envoyées par plateforme
+        Dict avec le succès de l'envoi, l'identifiant du message ou l'erreur
     """
-    from accounts.models import FCMToken, Arbitre, Commissaire
+    return send_notification_to_segment(title, body, data, ligue_id=ligue_id)
+
+def lancer_broadcast(
+    title: str,
+    body: str,
+    data: Optional[Dict[str, str]] = None,
+    device_types: Optional[List[str]] = None
+) -> str:
+    """
+    Mettre un broadcast en file d'envoi
     
-    results = {'ios': 0, 'android': 0, 'web': 0, 'errors': 0}
+    Le job est enregistré en base (BroadcastJob) et envoyé par
+    `manage.py run_notification_workers` : il survit à un redémarrage et son
+    état est visible de tous les processus (etat_broadcast).
     
-    try:
-        # Récupérer tous les tokens des utilisateurs de la ligue
-        fcm_tokens = FCMToken.objects.filter(
-            is_active=True
-        ).filter(
-            models.Q(arbitre__ligue_id=ligue_id) | 
-            models.Q(commissaire__ligue_id=ligue_id)
+    Returns:
+        Identifiant du job
+    """
+    from accounts.models import BroadcastJob
+    
+    job = BroadcastJob.objects.create(
+        title=title,
+        body=body,
+        data=data or {},
+        device_types=device_types
+    )
+    return job.id.hex
+
+def prendre_broadcasts(taille: int = 1) -> List[Any]:
+    """
+    Prendre en charge les prochains broadcasts à envoyer
+    
+    Un broadcast resté `running` plus de FCM_BROADCAST_VERROU_SECONDES
+    (défaut 3600, worker arrêté en cours d'envoi) redevient disponible.
+    
+    Returns:
+        liste de BroadcastJob passés en `running`
+    """
+    from datetime import timedelta
+    from django.db import transaction
+    from django.db.models import Q
+    from django.utils import timezone
+    from accounts.models import BroadcastJob
+    
+    maintenant = timezone.now()
+    expiration = maintenant - timedelta(seconds=getattr(settings, 'FCM_BROADCAST_VERROU_SECONDES', 3600))
+    with transaction.atomic():
+        jobs = list(
+            BroadcastJob.objects.select_for_update(skip_locked=True)
+            .filter(Q(status='pending') | Q(status='running', started_at__lt=expiration))
+            .order_by('created_at')[:taille]
         )
-        
-        for fcm_token in fcm_tokens:
-            success = send_notification_to_platform(
-                fcm_token.token, 
-                title, 
-                body, 
-                data, 
-                fcm_token.device_type
+        if jobs:
+            BroadcastJob.objects.filter(id__in=[job.id for job in jobs]).update(
+                status='running', started_at=maintenant
             )
-            
-            if success:
-                results[fcm_token.device_type] += 1
-                # Mettre à jour la dernière utilisation
-                fcm_token.save()
-            else:
-                results['errors'] += 1
-                
+    return jobs
+
+def executer_broadcast(job) -> str:
+    """
+    Envoyer un broadcast pris en charge et enregistrer son résultat
+    
+    Returns:
+        statut final du job ('done' ou 'failed')
+    """
+    from django.utils import timezone
+    from accounts.models import BroadcastJob
+    
+    valeurs = {}
+    try:
+        results = send_notification_to_all_platforms(job.title, job.body, job.data, job.device_types)
+        tokens = results.pop('tokens')
+        valeurs.update(
+            status='done',
+            results=results,
+            total_tokens=len(tokens),
+            echecs=[resultat for resultat in tokens if not resultat['success']][:1000],
+        )
     except Exception as e:
-        logger.error(f'Erreur lors de l\'envoi de notification à la ligue {ligue_id}: {e}')
-        results['errors'] += 1
+        logger.error(f'Erreur lors du broadcast {job.id.hex}: {e}')
+        valeurs.update(status='failed', error=str(e))
+    BroadcastJob.objects.filter(id=job.id).update(finished_at=timezone.now(), **valeurs)
+    return valeurs['status']
+
+def etat_broadcast(job_id: str) -> Optional[Dict[str, Any]]:
+    """État d'un job de broadcast (None si inconnu)"""
+    from django.core.exceptions import ValidationError
+    from accounts.models import BroadcastJob
     
-    return results
+    try:
+        job = BroadcastJob.objects.filter(id=job_id).first()
+    except ValidationError:
+        return None
+    if job is None:
+        return None
+    
+    etat = {
+        'job_id': job.id.hex,
+        'status': job.status,
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+    }
+    if job.status == 'done':
+        etat.update(results=job.results, total_tokens=job.total_tokens, echecs=job.echecs)
+    elif job.status == 'failed':
+        etat['error'] = job.error
+    return etat
 
 def cleanup_inactive_tokens():
     """
     Nettoyer les tokens FCM inactifs ou invalides
     """
-    from accounts.models import FCMToken
+    from accounts.models import Device
     from django.utils import timezone
     from datetime import timedelta
     
     try:
         # Marquer comme inactifs les tokens non utilisés depuis plus de 30 jours
         cutoff_date = timezone.now() - timedelta(days=30)
-        inactive_tokens = FCMToken.objects.filter(
+        inactive_tokens = Device.objects.filter(
+            channel='fcm',
             last_used__lt=cutoff_date,
             is_active=True
         )
         
-        count = inactive_tokens.update(is_active=False)
+        # Les topics seront désabonnés par la synchronisation (notifications/topics.py)
+        count = inactive_tokens.update(
+            is_active=False, topics_synced=False, topics_version=F('topics_version') + 1
+        )
         logger.info(f'{count} tokens FCM marqués comme inactifs')
         
+        # update() ne déclenche pas les signaux : recalculer le tableau de bord
+        if count:
+            from accounts.dashboard import invalider
+            invalider()
+        
         return count
         
     except Exception as e:
@@ -324,26 +636,15 @@ def get_notification_stats() -> Dict[str, Any]:
     Returns:
         Dict avec les statistiques
     """
-    from accounts.models import FCMToken
+    from accounts.dashboard import get_fcm_stats
+    from notifications import metrics
     
     try:
-        stats = {
-            'total_tokens': FCMToken.objects.count(),
-            'active_tokens': FCMToken.objects.filter(is_active=True).count(),
-            'by_platform': {},
-            'by_user_type': {
-                'arbitres': FCMToken.objects.filter(arbitre__isnull=False).count(),
-                'commissaires': FCMToken.objects.filter(commissaire__isnull=False).count(),
-                'admins': FCMToken.objects.filter(admin__isnull=False).count(),
-            }
-        }
+        # Compteurs matérialisés, maintenus par les signaux de Device
+        stats = get_fcm_stats()
         
-        # Statistiques par plateforme
-        for device_type, _ in FCMToken.DEVICE_TYPE_CHOICES:
-            stats['by_platform'][device_type] = FCMToken.objects.filter(
-                device_type=device_type,
-                is_active=True
-            ).count()
+        # Bilan de livraison et d'élagage des 7 derniers jours
+        stats['livraison'] = metrics.resume(jours=7)
         
         return stats
         
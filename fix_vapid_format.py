@@ -14,7 +14,7 @@ from cryptography.hazmat.primitives.asymmetric import ec
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arbitrage_project.settings')
 django.setup()
 
-from accounts.models import PushSubscription
+from accounts.models import Device
 
 def fix_vapid_format():
     """Corriger définitivement le format des clés VAPID"""
@@ -25,10 +25,10 @@ def fix_vapid_format():
     # 1. Supprimer tous les abonnements existants
     print("\n🗑️  SUPPRESSION DE TOUS LES ABONNEMENTS")
     
-    total_subscriptions = PushSubscription.objects.count()
+    total_subscriptions = Device.objects.filter(channel='webpush').count()
     if total_subscriptions > 0:
         print(f"  📱 Suppression de {total_subscriptions} abonnements...")
-        PushSubscription.objects.all().delete()
+        Device.objects.filter(channel='webpush').delete()
         print("  ✅ Tous les abonnements supprimés")
     else:
         print("  ✅ Aucun abonnement à supprimer")
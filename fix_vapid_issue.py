@@ -14,7 +14,7 @@ from cryptography.hazmat.primitives.asymmetric import ec
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arbitrage_project.settings')
 django.setup()
 
-from accounts.models import PushSubscription
+from accounts.models import Device
 from django.conf import settings
 
 def generate_new_vapid_keys():
@@ -203,7 +203,7 @@ def clean_old_subscriptions():
     """Nettoyer les anciens abonnements push"""
     print("\n🗑️  NETTOYAGE DES ANCIENS ABONNEMENTS")
     
-    total_subscriptions = PushSubscription.objects.count()
+    total_subscriptions = Device.objects.filter(channel='webpush').count()
     
     if total_subscriptions == 0:
         print("  ✅ Aucun abonnement à nettoyer")
@@ -219,8 +219,8 @@ def clean_old_subscriptions():
     
     # Supprimer tous les abonnements
     deleted_count = 0
-    for subscription in PushSubscription.objects.all():
-        arbitre_name = subscription.arbitre.get_full_name()
+    for subscription in Device.objects.filter(channel='webpush'):
+        arbitre_name = subscription.get_user().get_full_name()
         endpoint = subscription.endpoint[:30] + "..." if len(subscription.endpoint) > 30 else subscription.endpoint
         print(f"    Suppression: {arbitre_name} - {endpoint}")
         subscription.delete()
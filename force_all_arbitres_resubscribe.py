@@ -11,7 +11,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arbitrage_project.settings')
 django.setup()
 
-from accounts.models import Arbitre, PushSubscription
+from accounts.models import Arbitre, Device
 from django.utils import timezone
 
 def force_all_arbitres_resubscribe():
@@ -23,9 +23,9 @@ def force_all_arbitres_resubscribe():
     # 1. Supprimer TOUS les abonnements existants
     print("\n🗑️ SUPPRESSION DE TOUS LES ABONNEMENTS EXISTANTS")
     
-    total_existing = PushSubscription.objects.count()
+    total_existing = Device.objects.filter(channel='webpush').count()
     if total_existing > 0:
-        PushSubscription.objects.all().delete()
+        Device.objects.filter(channel='webpush').delete()
         print(f"✅ {total_existing} abonnements supprimés")
     else:
         print("ℹ️  Aucun abonnement existant à supprimer")
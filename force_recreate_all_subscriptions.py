@@ -11,7 +11,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arbitrage_project.settings')
 django.setup()
 
-from accounts.models import PushSubscription, Arbitre
+from accounts.models import Device, Arbitre
 from django.utils import timezone
 
 def force_recreate_all_subscriptions():
@@ -39,12 +39,12 @@ def force_recreate_all_subscriptions():
     # 2. Supprimer TOUS les abonnements existants
     print("\n🗑️  SUPPRESSION FORCÉE DE TOUS LES ABONNEMENTS")
     
-    total_subscriptions = PushSubscription.objects.count()
+    total_subscriptions = Device.objects.filter(channel='webpush').count()
     if total_subscriptions > 0:
         print(f"  📱 Suppression de {total_subscriptions} abonnements...")
         
         # Supprimer tous les abonnements sans demander
-        PushSubscription.objects.all().delete()
+        Device.objects.filter(channel='webpush').delete()
         print("  ✅ Tous les abonnements supprimés")
     else:
         print("  ✅ Aucun abonnement à supprimer")
@@ -103,7 +103,7 @@ def verify_clean_state():
     print("=" * 50)
     
     # Vérifier les abonnements
-    total_subscriptions = PushSubscription.objects.count()
+    total_subscriptions = Device.objects.filter(channel='webpush').count()
     print(f"  📱 Total abonnements: {total_subscriptions}")
     
     if total_subscriptions == 0:
@@ -11,7 +11,7 @@ import django
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arbitrage_project.settings')
 django.setup()
 
-from accounts.models import PushSubscription
+from accounts.models import Device
 
 def force_recreate_subscriptions():
     """Forcer la recréation de tous les abonnements push"""
@@ -21,8 +21,8 @@ def force_recreate_subscriptions():
     
     # 1. Afficher l'état actuel
     print("\n📱 ÉTAT ACTUEL:")
-    total_subscriptions = PushSubscription.objects.count()
-    active_subscriptions = PushSubscription.objects.filter(is_active=True).count()
+    total_subscriptions = Device.objects.filter(channel='webpush').count()
+    active_subscriptions = Device.objects.filter(channel='webpush', is_active=True).count()
     
     print(f"  Total abonnements: {total_subscriptions}")
     print(f"  Abonnements actifs: {active_subscriptions}")
@@ -44,8 +44,8 @@ def force_recreate_subscriptions():
     print("\n🗑️  SUPPRESSION DES ABONNEMENTS...")
     deleted_count = 0
     
-    for subscription in PushSubscription.objects.all():
-        arbitre_name = subscription.arbitre.get_full_name()
+    for subscription in Device.objects.filter(channel='webpush'):
+        arbitre_name = subscription.get_user().get_full_name()
         endpoint = subscription.endpoint[:30] + "..." if len(subscription.endpoint) > 30 else subscription.endpoint
         print(f"  Suppression: {arbitre_name} - {endpoint}")
         subscription.delete()
@@ -61,7 +61,7 @@ def force_recreate_subscriptions():
     print("  4. Les notifications fonctionneront avec les nouvelles clés VAPID")
     
     # 5. Vérification finale
-    final_count = PushSubscription.objects.count()
+    final_count = Device.objects.filter(channel='webpush').count()
     print(f"\n🔍 VÉRIFICATION FINALE:")
     print(f"  Abonnements restants: {final_count}")
     
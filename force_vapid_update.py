@@ -14,7 +14,7 @@ from cryptography.hazmat.primitives.asymmetric import ec
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arbitrage_project.settings')
 django.setup()
 
-from accounts.models import PushSubscription
+from accounts.models import Device
 
 def force_vapid_update():
     """Forcer la mise à jour complète des clés VAPID"""
@@ -25,12 +25,12 @@ def force_vapid_update():
     # 1. Supprimer TOUS les abonnements existants
     print("\n🗑️  SUPPRESSION FORCÉE DE TOUS LES ABONNEMENTS")
     
-    total_subscriptions = PushSubscription.objects.count()
+    total_subscriptions = Device.objects.filter(channel='webpush').count()
     if total_subscriptions > 0:
         print(f"  📱 Suppression de {total_subscriptions} abonnements...")
         
         # Supprimer tous les abonnements sans demander
-        PushSubscription.objects.all().delete()
+        Device.objects.filter(channel='webpush').delete()
         print("  ✅ Tous les abonnements supprimés")
     else:
         print("  ✅ Aucun abonnement à supprimer")
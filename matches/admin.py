@@ -3,7 +3,55 @@ Configuration de l'interface d'administration pour les matchs
 """
 from django.contrib import admin
 from django.contrib import messages
-from .models import Match, MatchEvent, Designation, TypeMatch, Categorie, ExcuseArbitre, TarificationMatch
+from .models import Match, MatchEvent, Designation, TypeMatch, Categorie, ExcuseArbitre, TarificationMatch, Team, Stadium
+
+class ReferentielAdmin(admin.ModelAdmin):
+    """Revue des doublons possibles du référentiel (équipes, stades)"""
+    
+    search_fields = ['nom', 'nom_normalise', 'ville']
+    ordering = ['nom']
+    readonly_fields = ['nom_normalise', 'created_at']
+    raw_id_fields = ['doublon_possible']
+    actions = ['fusionner_doublons', 'ecarter_doublons']
+    
+    def fusionner_doublons(self, request, queryset):
+        """Fusionner chaque entité dans son doublon possible"""
+        from .referentiel import fusionner
+        
+        fusionnes = 0
+        for doublon in queryset.filter(doublon_possible__isnull=False).select_related('doublon_possible'):
+            fusionner(doublon.doublon_possible, doublon)
+            fusionnes += 1
+        self.message_user(request, f'{fusionnes} doublon(s) fusionné(s)', messages.SUCCESS)
+    fusionner_doublons.short_description = "Fusionner dans le doublon possible"
+    
+    def ecarter_doublons(self, request, queryset):
+        """Entités distinctes : retirer le signalement"""
+        ecartes = queryset.filter(doublon_possible__isnull=False).update(doublon_possible=None)
+        self.message_user(request, f'{ecartes} signalement(s) écarté(s)', messages.SUCCESS)
+    ecarter_doublons.short_description = "Écarter le doublon (entités distinctes)"
+
+@admin.register(Team)
+class TeamAdmin(ReferentielAdmin):
+    """Interface d'administration pour les équipes"""
+    
+    list_display = ['nom', 'ville', 'doublon_possible', 'is_active', 'created_at']
+    list_filter = ['is_active', ('doublon_possible', admin.EmptyFieldListFilter), 'ville']
+
+@admin.register(Stadium)
+class StadiumAdmin(ReferentielAdmin):
+    """Interface d'administration pour les stades"""
+    
+    list_display = ['nom', 'ville', 'doublon_possible', 'latitude', 'longitude', 'is_active']
+    list_filter = ['is_active', ('doublon_possible', admin.EmptyFieldListFilter), 'ville']
+
+class DesignationInline(admin.TabularInline):
+    """Officiels du match (désignations)"""
+    model = Designation
+    extra = 0
+    fields = ['arbitre', 'type_designation', 'status', 'date_reponse']
+    readonly_fields = ['date_reponse']
+    raw_id_fields = ['arbitre']
 
 @admin.register(Match)
 class MatchAdmin(admin.ModelAdmin):
@@ -11,31 +59,34 @@ class MatchAdmin(admin.ModelAdmin):
     
     list_display = [
         'match_date', 'match_time', 'home_team', 'away_team',
-        'stadium', 'referee', 'status', 'score_display'
+        'stadium', 'officiels', 'status', 'score_display'
     ]
     list_filter = [
         'type_match', 'categorie', 'status', 'match_date'
     ]
     search_fields = [
-        'home_team', 'away_team', 'stadium', 'referee__first_name', 
-        'referee__last_name', 'referee__phone_number'
+        'home_team', 'away_team', 'stadium', 'designations__arbitre__first_name', 
+        'designations__arbitre__last_name', 'designations__arbitre__phone_number'
     ]
     ordering = ['-match_date', '-match_time']
     date_hierarchy = 'match_date'
+    inlines = [DesignationInline]
+    raw_id_fields = ['home_team_ref', 'away_team_ref', 'stadium_ref']
     
     fieldsets = (
         ('Informations du match', {
             'fields': ('type_match', 'categorie', 'stadium', 'match_date', 'match_time')
         }),
         ('Équipes', {
-            'fields': ('home_team', 'away_team')
+            'fields': ('home_team', 'away_team', 'home_team_ref', 'away_team_ref', 'stadium_ref')
         }),
         ('Score', {
             'fields': ('home_score', 'away_score', 'status'),
             'classes': ['collapse']
         }),
-        ('Arbitrage', {
-            'fields': ('referee',)
+        ('Arbitrage (hérité)', {
+            'fields': ('referee', 'role'),
+            'classes': ['collapse']
         }),
         ('Documents et rapports', {
             'fields': ('description', 'match_sheet', 'match_report', 'incidents'),
@@ -45,8 +96,16 @@ class MatchAdmin(admin.ModelAdmin):
     
     readonly_fields = ['created_at', 'updated_at']
     
+    def officiels(self, obj):
+        """Officiels désignés sur le match"""
+        return ', '.join(
+            f"{designation.arbitre.get_full_name()} ({designation.get_type_designation_display()})"
+            for designation in obj.get_officials()
+        ) or '-'
+    officiels.short_description = 'Officiels'
+    
     def get_queryset(self, request):
-        return super().get_queryset(request).select_related('referee')
+        return super().get_queryset(request).prefetch_related('designations__arbitre')
 
 @admin.register(MatchEvent)
 class MatchEventAdmin(admin.ModelAdmin):
@@ -118,72 +177,57 @@ class DesignationAdmin(admin.ModelAdmin):
         return super().get_queryset(request).select_related('arbitre', 'match')
     
     def envoyer_notifications_push(self, request, queryset):
-        """Envoyer les notifications push pour les désignations sélectionnées"""
-        from notifications.services import push_service
+        """Mettre en file les notifications push des désignations sélectionnées"""
+        from accounts.models import NotificationOutbox
+        from .bulk_designations import messages_designation
         
-        count = 0
-        for designation in queryset:
-            if not designation.notification_envoyee:
-                try:
-                    # Préparer les informations du match
-                    match_info = {
-                        'id': designation.match.id,
-                        'home_team': designation.match.home_team,
-                        'away_team': designation.match.away_team,
-                        'date': designation.match.match_date.isoformat(),
-                        'stade': designation.match.stadium,
-                        'type_designation': designation.get_type_designation_display()
-                    }
-                    
-                    # Envoyer la notification
-                    result = push_service.send_designation_notification(
-                        [designation.arbitre], 
-                        match_info
-                    )
-                    
-                    if result['success'] > 0:
-                        # Marquer comme envoyée
-                        designation.marquer_notification_envoyee()
-                        count += 1
-                    else:
-                        messages.warning(
-                            request, 
-                            f"Échec de l'envoi pour {designation.arbitre.get_full_name()}"
-                        )
-                        
-                except Exception as e:
-                    messages.error(
-                        request, 
-                        f"Erreur pour {designation.arbitre.get_full_name()}: {str(e)}"
-                    )
+        a_notifier = list(queryset.filter(notification_envoyee=False).select_related('match', 'arbitre'))
+        NotificationOutbox.objects.bulk_create([
+            message for designation in a_notifier
+            for message in messages_designation(designation, canaux=('webpush',))
+        ])
         
-        if count > 0:
+        if a_notifier:
             messages.success(
                 request, 
-                f"{count} notification(s) push envoyée(s) avec succès !"
+                f"{len(a_notifier)} notification(s) push mise(s) en file d'envoi !"
             )
         else:
             messages.warning(request, "Aucune notification envoyée")
     
     envoyer_notifications_push.short_description = "Envoyer les notifications push"
     
+    def _appliquer(self, request, queryset, transition, libelle):
+        """
+        Appliquer une transition gardée à chaque désignation sélectionnée
+        
+        Historique, indemnité figée, index de disponibilité, statistiques et
+        notifications suivent comme pour une transition faite depuis l'API ;
+        les désignations dont le statut ne le permet pas sont ignorées.
+        """
+        appliquees = ignorees = 0
+        for designation in queryset.select_related('match', 'arbitre'):
+            if getattr(designation, transition)():
+                appliquees += 1
+            else:
+                ignorees += 1
+        
+        messages.success(request, f"{appliquees} désignation(s) {libelle}(s) avec succès !")
+        if ignorees:
+            messages.warning(
+                request,
+                f"{ignorees} désignation(s) ignorée(s) : statut incompatible"
+            )
+    
     def confirmer_designations(self, request, queryset):
-        """Confirmer les désignations sélectionnées"""
-        count = queryset.update(status='confirmed')
-        messages.success(
-            request, 
-            f"{count} désignation(s) confirmée(s) avec succès !"
-        )
+        """Confirmer les désignations sélectionnées (proposées ou acceptées)"""
+        self._appliquer(request, queryset, 'confirmer', 'confirmée')
     
     confirmer_designations.short_description = "Confirmer les désignations"
     
     def annuler_designations(self, request, queryset):
-        """Annuler les désignations sélectionnées"""
-        count = queryset.update(status='cancelled')
-        messages.success(
-            request, 
-            f"{count} désignation(s) annulée(s) avec succès !"
-        )
+        """Annuler les désignations sélectionnées (actives)"""
+        self._appliquer(request, queryset, 'annuler', 'annulée')
     
     annuler_designations.short_description = "Annuler les désignations"
     
@@ -192,45 +236,17 @@ class DesignationAdmin(admin.ModelAdmin):
         is_new = not change
         super().save_model(request, obj, form, change)
         
-        # Si c'est une nouvelle désignation, envoyer automatiquement la notification
+        # Si c'est une nouvelle désignation, mettre en file la notification Web Push
+        # (la notification FCM est mise en file par le signal post_save)
         if is_new and not obj.notification_envoyee:
-            try:
-                from notifications.services import push_service
-                
-                # Préparer les informations du match
-                match_info = {
-                    'id': obj.match.id,
-                    'home_team': obj.match.home_team,
-                    'away_team': obj.match.away_team,
-                    'date': obj.match.match_date.isoformat(),
-                    'stade': obj.match.stadium,
-                    'type_designation': obj.get_type_designation_display()
-                }
-                
-                # Envoyer la notification
-                result = push_service.send_designation_notification(
-                    [obj.arbitre], 
-                    match_info
-                )
-                
-                if result['success'] > 0:
-                    # Marquer comme envoyée
-                    obj.marquer_notification_envoyee()
-                    messages.success(
-                        request, 
-                        f"Notification push envoyée à {obj.arbitre.get_full_name()}"
-                    )
-                else:
-                    messages.warning(
-                        request, 
-                        f"Échec de l'envoi de la notification push"
-                    )
-                    
-            except Exception as e:
-                messages.error(
-                    request, 
-                    f"Erreur lors de l'envoi de la notification: {str(e)}"
-                )
+            from .bulk_designations import messages_designation
+            
+            for message in messages_designation(obj, canaux=('webpush',)):
+                message.save()
+            messages.success(
+                request, 
+                f"Notification push mise en file d'envoi pour {obj.arbitre.get_full_name()}"
+            )
 
 
 # Ancien modèle ExcuseArbitre désactivé - maintenant dans accounts.models
@@ -283,7 +299,7 @@ class TarificationMatchAdmin(admin.ModelAdmin):
     
     list_display = [
         'competition', 'division', 'type_match', 'role', 
-        'tarif_formatted', 'is_active', 'created_at'
+        'tarif_formatted', 'valid_from', 'valid_to', 'is_active', 'created_at'
     ]
     
     list_filter = [
@@ -295,7 +311,7 @@ class TarificationMatchAdmin(admin.ModelAdmin):
         'competition', 'division', 'type_match', 'role'
     ]
     
-    ordering = ['competition', 'division', 'type_match', 'role']
+    ordering = ['competition', 'division', 'type_match', 'role', 'valid_from']
     
     list_editable = ['is_active']
     
@@ -309,6 +325,10 @@ class TarificationMatchAdmin(admin.ModelAdmin):
         ('Tarification', {
             'fields': ('tarif', 'devise', 'is_active')
         }),
+        ('Période d\'application', {
+            'fields': ('valid_from', 'valid_to'),
+            'description': "Pour changer un tarif sans modifier le passé, fermer cette version et en créer une nouvelle"
+        }),
     )
     
     readonly_fields = ['created_at', 'updated_at']
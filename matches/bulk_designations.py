@@ -0,0 +1,183 @@
+"""
+Désignations en masse (publication d'une journée complète)
+
+Le lot est validé en mémoire à partir d'un seul chargement des matchs,
+arbitres et désignations existantes, puis inséré par `bulk_create` dans une
+transaction. Les notifications sont écrites dans l'outbox par la même
+transaction et envoyées hors de la requête HTTP.
+"""
+from django.db import transaction
+
+from accounts import disponibilites
+from accounts.models import Arbitre, NotificationOutbox
+from .conflicts import detecter_conflits
+from .models import Match, Designation, HistoriqueDesignation
+from .statistics import invalidate_match_statistics, invalidate_designation_statistics
+
+TYPES_DESIGNATION = {code for code, _ in Designation.TYPE_CHOICES}
+
+
+def _identifiant(valeur):
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        return None
+
+
+def valider_lot(lignes, force=False):
+    """
+    Valider un lot de désignations en mémoire
+
+    Args:
+        lignes: liste de dicts {match, arbitre, type_designation, commentaires, force}
+        force: ignorer les conflits de planning pour tout le lot
+
+    Returns:
+        (valides, resultats) : les désignations à créer (non sauvegardées) et
+        un résultat par ligne {'index', 'success', 'errors', 'conflicts'}
+    """
+    match_ids = {_identifiant(ligne.get('match')) for ligne in lignes} - {None}
+    arbitre_ids = {_identifiant(ligne.get('arbitre')) for ligne in lignes} - {None}
+
+    # Un seul chargement par table pour tout le lot
+    matches = Match.objects.in_bulk(match_ids)
+    arbitres = Arbitre.objects.in_bulk(arbitre_ids)
+    existantes = set(
+        Designation.objects.filter(match_id__in=match_ids)
+        .values_list('match_id', 'arbitre_id', 'type_designation')
+    )
+
+    valides = []
+    resultats = []
+    deja_vues = set()
+    for index, ligne in enumerate(lignes):
+        errors = []
+        match_id = _identifiant(ligne.get('match'))
+        arbitre_id = _identifiant(ligne.get('arbitre'))
+        type_designation = ligne.get('type_designation')
+
+        match = matches.get(match_id)
+        arbitre = arbitres.get(arbitre_id)
+        if match is None:
+            errors.append('Match non trouvé')
+        if arbitre is None:
+            errors.append('Arbitre non trouvé')
+        elif not arbitre.is_active:
+            errors.append('Compte arbitre inactif')
+        if type_designation not in TYPES_DESIGNATION:
+            errors.append('Type de désignation invalide')
+
+        cle = (match_id, arbitre_id, type_designation)
+        if not errors:
+            if cle in existantes:
+                errors.append('Une désignation existe déjà pour cet arbitre et ce type sur ce match')
+            elif cle in deja_vues:
+                errors.append('Désignation en double dans le lot')
+
+        if errors:
+            resultats.append({'index': index, 'success': False, 'errors': errors})
+            continue
+
+        deja_vues.add(cle)
+        designation = Designation(
+            match=match,
+            arbitre=arbitre,
+            type_designation=type_designation,
+            commentaires=ligne.get('commentaires') or None
+        )
+        valides.append((index, designation))
+        resultats.append({'index': index, 'success': True})
+
+    # Conflits de planning (double désignation, excuse) en une passe sur le lot
+    a_controler = [
+        (index, designation) for index, designation in valides
+        if not (force or lignes[index].get('force'))
+    ]
+    conflits = detecter_conflits([
+        {'cle': index, 'arbitre_id': designation.arbitre_id, 'match_id': designation.match_id,
+         'match_date': designation.match.match_date, 'match_time': designation.match.match_time}
+        for index, designation in a_controler
+    ])
+    if conflits:
+        for index, conflits_ligne in conflits.items():
+            resultats[index] = {
+                'index': index,
+                'success': False,
+                'errors': ["Conflit de planning pour l'arbitre"],
+                'conflicts': conflits_ligne
+            }
+        valides = [(index, designation) for index, designation in valides if index not in conflits]
+
+    return valides, resultats
+
+
+def creer_lot(valides):
+    """
+    Insérer les désignations validées en une transaction
+
+    bulk_create ne déclenche pas post_save : l'historique est écrit dans la
+    même transaction, ainsi que les notifications (outbox, envoyées par
+    run_notification_workers) ; le cache des statistiques et l'index de
+    disponibilité sont mis à jour ici.
+    """
+    designations = [designation for _, designation in valides]
+    with transaction.atomic():
+        Designation.objects.bulk_create(designations)
+        HistoriqueDesignation.objects.bulk_create([
+            HistoriqueDesignation.construire(designation, None, designation.status, moment=designation.date_designation)
+            for designation in designations
+        ])
+        NotificationOutbox.objects.bulk_create(messages_lot(designations))
+
+    arbitre_ids = {designation.arbitre_id for designation in designations}
+    for arbitre_id in arbitre_ids:
+        invalidate_match_statistics(arbitre_id)
+    invalidate_designation_statistics(*arbitre_ids)
+    disponibilites.actualiser(arbitre_ids, {
+        disponibilites.saison_de(designation.match.match_date) for designation in designations
+    })
+    return designations
+
+
+def messages_designation(designation, canaux=('webpush', 'fcm')):
+    """
+    Messages d'outbox (non sauvegardés) annonçant une désignation ; le
+    message FCM marque la désignation notifiée une fois envoyé
+    """
+    from notifications import outbox
+
+    match = designation.match
+    titre = "🏆 Nouvelle Désignation d'Arbitrage"
+    corps = f"Vous avez été désigné pour le match {match.home_team} vs {match.away_team}"
+    messages = []
+    if 'webpush' in canaux:
+        messages.append(outbox.message(
+            'webpush', designation.arbitre, titre, corps,
+            data={
+                'type': 'designation',
+                'match_id': match.id,
+                'date_match': match.match_date.isoformat(),
+                'stade': match.stadium,
+                'action_url': f'/matches/{match.id}/designation'
+            },
+            tag='designation',
+            designation=designation if 'fcm' not in canaux else None
+        ))
+    if 'fcm' in canaux:
+        messages.append(outbox.message(
+            'fcm', designation.arbitre, titre, corps,
+            data={
+                'type': 'designation',
+                'match_id': str(match.id),
+                'date_match': match.match_date.isoformat(),
+                'stade': match.stadium,
+                'type_designation': designation.get_type_designation_display()
+            },
+            designation=designation
+        ))
+    return messages
+
+
+def messages_lot(designations):
+    """Messages d'outbox d'un lot : Web Push et FCM pour chaque désignation"""
+    return [message for designation in designations for message in messages_designation(designation)]
@@ -0,0 +1,167 @@
+"""
+Détection des conflits de désignation
+
+Deux sortes de conflits pour un arbitre :
+- double désignation : un autre match actif dont le coup d'envoi est à moins
+  de DESIGNATION_FENETRE_CONFLIT_MINUTES (défaut 180) minutes ;
+- excuse acceptée (accounts.ExcuseArbitre) couvrant la date du match.
+
+Toutes les désignations à vérifier sont traitées en une passe : une requête
+sur les désignations actives des arbitres concernés (index arbitre/statut,
+restreinte à l'intervalle de dates du lot) et une sur leurs excuses acceptées
+chevauchant cet intervalle, puis une recherche par bisection en mémoire.
+"""
+import bisect
+from datetime import datetime, timedelta
+
+from django.conf import settings
+
+from .models import Designation
+
+STATUT_EXCUSE_ACCEPTEE = 'acceptee'
+
+
+def _fenetre():
+    return timedelta(minutes=getattr(settings, 'DESIGNATION_FENETRE_CONFLIT_MINUTES', 180))
+
+
+def detecter_conflits(candidats):
+    """
+    Conflits d'un ensemble de désignations (proposées ou existantes)
+
+    Args:
+        candidats: liste de dicts {cle, arbitre_id, match_id, match_date,
+            match_time, designation_id (optionnel, pour une désignation existante)}
+
+    Returns:
+        dict cle -> liste de conflits ; seules les clés en conflit sont présentes.
+        Un conflit est un dict {'type': 'double_designation' | 'excuse', ...}
+    """
+    from accounts.models import ExcuseArbitre
+
+    if not candidats:
+        return {}
+
+    fenetre = _fenetre()
+    arbitre_ids = {candidat['arbitre_id'] for candidat in candidats}
+    dates = [candidat['match_date'] for candidat in candidats]
+    # Un jour de marge de chaque côté pour les matchs proches de minuit
+    debut = min(dates) - timedelta(days=1)
+    fin = max(dates) + timedelta(days=1)
+    designations_lot = {candidat.get('designation_id') for candidat in candidats} - {None}
+
+    # Créneaux occupés par arbitre : (coup d'envoi, description), triés
+    creneaux = {}
+    existantes = Designation.objects.filter(
+        arbitre_id__in=arbitre_ids,
+        status__in=Designation.ACTIVE_STATUSES,
+        match__match_date__range=(debut, fin)
+    ).exclude(id__in=designations_lot).values_list(
+        'id', 'arbitre_id', 'match_id', 'match__match_date', 'match__match_time',
+        'match__home_team', 'match__away_team', 'type_designation'
+    )
+    for designation_id, arbitre_id, match_id, match_date, match_time, home, away, type_designation in existantes:
+        creneaux.setdefault(arbitre_id, []).append((
+            datetime.combine(match_date, match_time),
+            {'designation_id': designation_id, 'match_id': match_id,
+             'match': f'{home} vs {away}', 'type_designation': type_designation}
+        ))
+    # Les désignations du lot se contrôlent aussi entre elles
+    for candidat in candidats:
+        creneaux.setdefault(candidat['arbitre_id'], []).append((
+            datetime.combine(candidat['match_date'], candidat['match_time']),
+            {'cle': candidat['cle'], 'designation_id': candidat.get('designation_id'),
+             'match_id': candidat['match_id']}
+        ))
+    instants = {}
+    for arbitre_id, liste in creneaux.items():
+        liste.sort(key=lambda creneau: creneau[0])
+        instants[arbitre_id] = [creneau[0] for creneau in liste]
+
+    excuses = {}
+    for excuse_id, arbitre_id, date_debut, date_fin, cause in ExcuseArbitre.objects.filter(
+        arbitre_id__in=arbitre_ids,
+        status=STATUT_EXCUSE_ACCEPTEE,
+        date_debut__lte=fin,
+        date_fin__gte=debut
+    ).values_list('id', 'arbitre_id', 'date_debut', 'date_fin', 'cause'):
+        excuses.setdefault(arbitre_id, []).append((date_debut, date_fin, excuse_id, cause))
+
+    conflits = {}
+    for candidat in candidats:
+        trouves = []
+        coup_envoi = datetime.combine(candidat['match_date'], candidat['match_time'])
+        liste = creneaux[candidat['arbitre_id']]
+        cles = instants[candidat['arbitre_id']]
+        gauche = bisect.bisect_left(cles, coup_envoi - fenetre + timedelta(microseconds=1))
+        droite = bisect.bisect_right(cles, coup_envoi + fenetre - timedelta(microseconds=1))
+        for autre_envoi, autre in liste[gauche:droite]:
+            if autre.get('cle') == candidat['cle']:
+                continue
+            conflit = {
+                'type': 'double_designation',
+                'match_id': autre['match_id'],
+                'date': autre_envoi.date().isoformat(),
+                'heure': autre_envoi.time().strftime('%H:%M'),
+                'ecart_minutes': int(abs((autre_envoi - coup_envoi).total_seconds()) // 60),
+            }
+            if autre.get('designation_id'):
+                conflit['designation_id'] = autre['designation_id']
+            elif 'cle' in autre:
+                # Autre ligne du même lot
+                conflit['index'] = autre['cle']
+            if 'match' in autre:
+                conflit['match'] = autre['match']
+                conflit['type_designation'] = autre['type_designation']
+            trouves.append(conflit)
+
+        for date_debut, date_fin, excuse_id, cause in excuses.get(candidat['arbitre_id'], []):
+            if date_debut <= candidat['match_date'] <= date_fin:
+                trouves.append({
+                    'type': 'excuse',
+                    'excuse_id': excuse_id,
+                    'date_debut': date_debut.isoformat(),
+                    'date_fin': date_fin.isoformat(),
+                    'cause': cause,
+                })
+
+        if trouves:
+            conflits[candidat['cle']] = trouves
+    return conflits
+
+
+def conflits_designation(match, arbitre_id, designation_id=None):
+    """Conflits d'une seule désignation (création ou contrôle unitaire)"""
+    conflits = detecter_conflits([{
+        'cle': 0,
+        'arbitre_id': arbitre_id,
+        'match_id': match.id,
+        'match_date': match.match_date,
+        'match_time': match.match_time,
+        'designation_id': designation_id,
+    }])
+    return conflits.get(0, [])
+
+
+def conflits_journee(date_match):
+    """
+    Contrôler toutes les désignations actives d'une journée en une passe
+
+    Returns:
+        liste de {'designation_id', 'arbitre_id', 'match_id', 'conflicts'}
+    """
+    designations = list(Designation.objects.filter(
+        match__match_date=date_match,
+        status__in=Designation.ACTIVE_STATUSES
+    ).values_list('id', 'arbitre_id', 'match_id', 'match__match_date', 'match__match_time'))
+    conflits = detecter_conflits([
+        {'cle': designation_id, 'designation_id': designation_id, 'arbitre_id': arbitre_id,
+         'match_id': match_id, 'match_date': match_date, 'match_time': match_time}
+        for designation_id, arbitre_id, match_id, match_date, match_time in designations
+    ])
+    return [
+        {'designation_id': designation_id, 'arbitre_id': arbitre_id,
+         'match_id': match_id, 'conflicts': conflits[designation_id]}
+        for designation_id, arbitre_id, match_id, _, _ in designations
+        if designation_id in conflits
+    ]
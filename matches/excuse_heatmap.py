@@ -0,0 +1,134 @@
+"""
+Carte de disponibilité des arbitres (heatmap des excuses)
+
+Pour un mois donné, compte jour par jour le nombre d'arbitres excusés, au
+total, par ligue et par grade. Les excuses sont chargées en une seule requête
+de chevauchement sur (date_debut, date_fin) ; les périodes d'un même arbitre
+sont fusionnées (un arbitre n'est compté qu'une fois par jour) puis cumulées
+par tableau de différences. Le résultat est mis en cache par mois ; toute
+modification d'une excuse incrémente la version du cache.
+"""
+import calendar
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+from accounts.models import Arbitre, ExcuseArbitre
+
+STATUTS_INDISPONIBLES = ['acceptee']
+CLE_VERSION = 'excuses:heatmap:version'
+
+
+def _cache_timeout():
+    return getattr(settings, 'STATISTICS_CACHE_TIMEOUT', 300)
+
+
+def _version():
+    return cache.get_or_set(CLE_VERSION, 1, None)
+
+
+def invalidate_excuse_heatmap():
+    """Invalider toutes les heatmaps en cache (changement de version)"""
+    try:
+        cache.incr(CLE_VERSION)
+    except ValueError:
+        cache.set(CLE_VERSION, 1, None)
+
+
+def bornes_du_mois(annee, mois):
+    """Premier et dernier jour du mois"""
+    return date(annee, mois, 1), date(annee, mois, calendar.monthrange(annee, mois)[1])
+
+
+def _fusionner(periodes):
+    """Fusionner des périodes [début, fin] qui se chevauchent ou se touchent"""
+    fusion = []
+    for debut, fin in sorted(periodes):
+        if fusion and debut <= fusion[-1][1] + 1:
+            fusion[-1][1] = max(fusion[-1][1], fin)
+        else:
+            fusion.append([debut, fin])
+    return fusion
+
+
+def get_excuse_heatmap(annee, mois, inclure_en_attente=False):
+    """
+    Nombre d'arbitres indisponibles par jour du mois
+
+    Args:
+        annee, mois: Mois concerné
+        inclure_en_attente: Compter aussi les excuses en attente de traitement
+    """
+    cache_key = f'excuses:heatmap:{_version()}:{annee}-{mois:02d}:{int(bool(inclure_en_attente))}'
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    debut_mois, fin_mois = bornes_du_mois(annee, mois)
+    nb_jours = (fin_mois - debut_mois).days + 1
+
+    statuts = list(STATUTS_INDISPONIBLES)
+    if inclure_en_attente:
+        statuts.append('en_attente')
+
+    # Une seule requête : toutes les excuses qui chevauchent le mois
+    rows = ExcuseArbitre.objects.filter(
+        status__in=statuts,
+        date_debut__lte=fin_mois,
+        date_fin__gte=debut_mois,
+    ).values_list('arbitre_id', 'date_debut', 'date_fin', 'arbitre__ligue__nom', 'arbitre__grade')
+
+    periodes_par_arbitre = {}
+    profils = {}
+    for arbitre_id, date_debut, date_fin, ligue, grade in rows:
+        # Indices de jours relatifs au mois, bornés au mois
+        debut = max((date_debut - debut_mois).days, 0)
+        fin = min((date_fin - debut_mois).days, nb_jours - 1)
+        periodes_par_arbitre.setdefault(arbitre_id, []).append((debut, fin))
+        profils[arbitre_id] = (ligue or 'Sans ligue', grade)
+
+    grades = dict(Arbitre._meta.get_field('grade').choices)
+    total = [0] * (nb_jours + 1)
+    par_ligue = {}
+    par_grade = {}
+    for arbitre_id, periodes in periodes_par_arbitre.items():
+        ligue, grade = profils[arbitre_id]
+        diff_ligue = par_ligue.setdefault(ligue, [0] * (nb_jours + 1))
+        diff_grade = par_grade.setdefault(grades.get(grade, grade), [0] * (nb_jours + 1))
+        for debut, fin in _fusionner(periodes):
+            for diff in (total, diff_ligue, diff_grade):
+                diff[debut] += 1
+                diff[fin + 1] -= 1
+
+    def cumuler(diff):
+        valeurs, courant = [], 0
+        for delta in diff[:nb_jours]:
+            courant += delta
+            valeurs.append(courant)
+        return valeurs
+
+    total = cumuler(total)
+    par_ligue = {ligue: cumuler(diff) for ligue, diff in sorted(par_ligue.items())}
+    par_grade = {grade: cumuler(diff) for grade, diff in sorted(par_grade.items())}
+
+    jours = []
+    for index in range(nb_jours):
+        jours.append({
+            'date': (debut_mois + timedelta(days=index)).isoformat(),
+            'total': total[index],
+            'par_ligue': {ligue: valeurs[index] for ligue, valeurs in par_ligue.items() if valeurs[index]},
+            'par_grade': {grade: valeurs[index] for grade, valeurs in par_grade.items() if valeurs[index]},
+        })
+
+    pic = max(total) if total else 0
+    result = {
+        'mois': f'{annee}-{mois:02d}',
+        'statuts': statuts,
+        'arbitres_concernes': len(periodes_par_arbitre),
+        'pic': pic,
+        'jours_pic': [jour['date'] for jour in jours if pic and jour['total'] == pic],
+        'jours': jours,
+    }
+    cache.set(cache_key, result, _cache_timeout())
+    return result
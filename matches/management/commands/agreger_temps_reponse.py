@@ -0,0 +1,40 @@
+"""
+Commande Django pour pré-agréger les temps de réponse des arbitres
+
+Recalcule les percentiles mensuels (par ligue et grade, ligue, grade et
+global) à partir de l'historique des désignations. Par défaut le mois courant
+et le précédent ; à planifier quotidiennement.
+"""
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from matches.temps_reponse import agreger_mois, debut_mois
+
+
+class Command(BaseCommand):
+    help = 'Pré-agrège les temps de réponse des arbitres par mois'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mois',
+            action='append',
+            help='Mois à recalculer (YYYY-MM) ; répétable. Par défaut : mois courant et précédent',
+        )
+
+    def handle(self, *args, **options):
+        if options['mois']:
+            try:
+                periodes = [datetime.strptime(mois, '%Y-%m').date() for mois in options['mois']]
+            except ValueError:
+                raise CommandError('Format de mois invalide. Utilisez YYYY-MM')
+        else:
+            courant = debut_mois(date.today())
+            precedent = debut_mois(courant - timedelta(days=1))
+            periodes = [precedent, courant]
+
+        for periode in periodes:
+            lignes = agreger_mois(periode)
+            self.stdout.write(f'   {periode:%Y-%m}: {lignes} agrégat(s)')
+
+        self.stdout.write(self.style.SUCCESS(f'✅ {len(periodes)} mois agrégé(s)'))
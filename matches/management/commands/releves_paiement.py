@@ -0,0 +1,69 @@
+"""
+Commande Django pour générer le relevé mensuel de paiement des arbitres
+
+Écrit le relevé (totaux par arbitre, par ligue et total général, détail des
+désignations en option) dans un fichier CSV ou XLSX, au fil du parcours des
+désignations. Par défaut le mois précédent ; à planifier en début de mois.
+"""
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from matches import paiements
+from matches.temps_reponse import debut_mois, mois_suivant
+
+
+class Command(BaseCommand):
+    help = 'Génère le relevé mensuel de paiement des arbitres (CSV ou XLSX)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--mois',
+            help='Mois du relevé (YYYY-MM). Par défaut : mois précédent',
+        )
+        parser.add_argument(
+            '--ligue',
+            type=int,
+            help='Limiter le relevé aux arbitres d\'une ligue (id)',
+        )
+        parser.add_argument(
+            '--detail',
+            action='store_true',
+            help='Ajouter une ligne par désignation',
+        )
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'xlsx'],
+            default='csv',
+            help='Format du fichier (défaut : csv)',
+        )
+        parser.add_argument(
+            '--sortie',
+            help='Chemin du fichier. Par défaut : releve_paiements_YYYY-MM.<format>',
+        )
+
+    def handle(self, *args, **options):
+        if options['mois']:
+            try:
+                debut = datetime.strptime(options['mois'], '%Y-%m').date()
+            except ValueError:
+                raise CommandError('Format de mois invalide. Utilisez YYYY-MM')
+        else:
+            debut = debut_mois(debut_mois(date.today()) - timedelta(days=1))
+
+        format_fichier = options['format']
+        if format_fichier == 'xlsx' and not paiements.OPENPYXL_AVAILABLE:
+            raise CommandError("openpyxl est requis pour l'export XLSX")
+        chemin = options['sortie'] or f'releve_paiements_{debut:%Y-%m}.{format_fichier}'
+
+        lignes = paiements.releve(debut, mois_suivant(debut), ligue_id=options['ligue'], detail=options['detail'])
+        if format_fichier == 'csv':
+            with open(chemin, 'w', encoding='utf-8', newline='') as fichier:
+                for morceau in paiements.flux_csv(lignes):
+                    fichier.write(morceau)
+        else:
+            with open(chemin, 'wb') as fichier:
+                for bloc in paiements.flux_xlsx(lignes):
+                    fichier.write(bloc)
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Relevé {debut:%Y-%m} écrit dans {chemin}'))
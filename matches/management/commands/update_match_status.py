@@ -1,10 +1,24 @@
 """
 Commande Django pour mettre à jour automatiquement les statuts des matchs
+
+Les transitions sont appliquées par trois UPDATE ensemblistes
+(match_date < / = / > aujourd'hui) qui ne touchent que les matchs dont le
+statut change réellement. La commande est idempotente et peut être lancée
+toutes les quelques minutes par un planificateur.
 """
-from django.core.management.base import BaseCommand
+from datetime import date, datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import Count, Q
 from django.utils import timezone
-from datetime import date
-from matches.models import Match
+
+from matches.models import Match, Designation
+from matches.statistics import invalidate_match_statistics
+
+# Statuts fixés manuellement, jamais recalculés à partir de la date
+STATUTS_MANUELS = ['cancelled', 'postponed']
+
 
 class Command(BaseCommand):
     help = 'Met à jour automatiquement les statuts des matchs selon leur date'
@@ -15,82 +29,102 @@ class Command(BaseCommand):
             action='store_true',
             help='Affiche les changements sans les appliquer',
         )
+        parser.add_argument(
+            '--date-from',
+            help='Ne traiter que les matchs à partir de cette date (YYYY-MM-DD)',
+        )
+        parser.add_argument(
+            '--date-to',
+            help='Ne traiter que les matchs jusqu\'à cette date incluse (YYYY-MM-DD)',
+        )
+
+    def _parse_date(self, value, option):
+        if not value:
+            return None
+        try:
+            return datetime.strptime(value, '%Y-%m-%d').date()
+        except ValueError:
+            raise CommandError(f'Format de date invalide pour {option}. Utilisez YYYY-MM-DD')
+
+    def _histogram(self, queryset):
+        """Répartition des statuts en une seule requête GROUP BY"""
+        rows = queryset.values('status').annotate(total=Count('id')).order_by('status')
+        return {row['status']: row['total'] for row in rows}
+
+    def _write_histogram(self, title, histogram):
+        self.stdout.write(title)
+        for status, count in histogram.items():
+            self.stdout.write(f'   {status}: {count} match(s)')
 
     def handle(self, *args, **options):
         dry_run = options['dry_run']
+        date_from = self._parse_date(options['date_from'], '--date-from')
+        date_to = self._parse_date(options['date_to'], '--date-to')
         today = date.today()
-        
+
         self.stdout.write(
             self.style.SUCCESS(f'🔄 Mise à jour des statuts des matchs (Date: {today})')
         )
-        
-        # Récupérer tous les matchs
-        all_matches = Match.objects.all()
-        total_matches = all_matches.count()
-        
-        if total_matches == 0:
+
+        matches = Match.objects.all()
+        if date_from:
+            matches = matches.filter(match_date__gte=date_from)
+        if date_to:
+            matches = matches.filter(match_date__lte=date_to)
+
+        status_before = self._histogram(matches)
+        if not status_before:
             self.stdout.write(
                 self.style.WARNING('❌ Aucun match trouvé')
             )
             return
-        
-        self.stdout.write(f'📊 Total des matchs: {total_matches}')
-        
-        # Statistiques avant
-        status_before = {}
-        for match in all_matches:
-            status = match.status
-            status_before[status] = status_before.get(status, 0) + 1
-        
-        self.stdout.write('\n📋 Statuts actuels:')
-        for status, count in status_before.items():
-            self.stdout.write(f'   {status}: {count} match(s)')
-        
-        # Mettre à jour les statuts
+
+        self.stdout.write(f'📊 Total des matchs: {sum(status_before.values())}')
+        self._write_histogram('\n📋 Statuts actuels:', status_before)
+
+        # Une transition par position de la date par rapport à aujourd'hui ;
+        # seuls les matchs dont le statut change sont concernés
+        transitions = [
+            ('completed', Q(match_date__lt=today)),
+            ('in_progress', Q(match_date=today)),
+            ('scheduled', Q(match_date__gt=today)),
+        ]
+        candidates = matches.exclude(status__in=STATUTS_MANUELS)
+
         updated_count = 0
-        for match in all_matches:
-            old_status = match.status
-            new_status = None
-            
-            if match.match_date < today:
-                new_status = 'completed'
-            elif match.match_date == today:
-                new_status = 'in_progress'
-            else:
-                new_status = 'scheduled'
-            
-            if old_status != new_status:
-                if not dry_run:
-                    match.status = new_status
-                    match.save()
-                
-                updated_count += 1
-                self.stdout.write(
-                    f'   {"✅" if not dry_run else "🔍"} {match.home_team} vs {match.away_team} '
-                    f'({match.match_date}): {old_status} → {new_status}'
-                )
-        
+        arbitre_ids = set()
+        with transaction.atomic():
+            for new_status, condition in transitions:
+                to_update = candidates.filter(condition).exclude(status=new_status)
+
+                if dry_run:
+                    count = to_update.count()
+                else:
+                    # Arbitres concernés, pour invalider leurs statistiques en cache
+                    arbitre_ids.update(
+                        Designation.objects.filter(match__in=to_update).values_list('arbitre_id', flat=True).distinct()
+                    )
+                    count = to_update.update(status=new_status, updated_at=timezone.now())
+
+                if count:
+                    self.stdout.write(
+                        f'   {"✅" if not dry_run else "🔍"} → {new_status}: {count} match(s)'
+                    )
+                updated_count += count
+
         if dry_run:
             self.stdout.write(
                 self.style.WARNING(f'\n🔍 Mode test: {updated_count} match(s) seraient mis à jour')
             )
-        else:
-            self.stdout.write(
-                self.style.SUCCESS(f'\n✅ {updated_count} match(s) mis à jour')
-            )
-        
-        # Statistiques après (si pas en mode test)
-        if not dry_run and updated_count > 0:
-            self.stdout.write('\n📋 Nouveaux statuts:')
-            status_after = {}
-            for match in Match.objects.all():
-                status = match.status
-                status_after[status] = status_after.get(status, 0) + 1
-            
-            for status, count in status_after.items():
-                self.stdout.write(f'   {status}: {count} match(s)')
-
-
+            return
 
+        self.stdout.write(
+            self.style.SUCCESS(f'\n✅ {updated_count} match(s) mis à jour')
+        )
 
+        if updated_count > 0:
+            # update() ne déclenche pas les signaux post_save
+            for arbitre_id in arbitre_ids:
+                invalidate_match_statistics(arbitre_id)
 
+            self._write_histogram('\n📋 Nouveaux statuts:', self._histogram(matches))
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-19 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0007_tarificationmatch'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='excusearbitre',
+            index=models.Index(fields=['date_debut', 'date_fin'], name='matches_exc_date_de_dfc940_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='excusearbitre',
+            index=models.Index(fields=['date_fin'], name='matches_exc_date_fi_f83635_idx'),
+        ),
+    ]
@@ -0,0 +1,115 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:00
+
+import itertools
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+# Du plus avancé au moins avancé : le match fusionné garde le statut le plus avancé
+STATUS_PRIORITE = ['completed', 'in_progress', 'postponed', 'scheduled', 'cancelled']
+
+# Champs complétés depuis les doublons lorsqu'ils sont vides sur le match conservé
+CHAMPS_COMPLETABLES = [
+    'type_match_id', 'categorie_id', 'home_score', 'away_score',
+    'description', 'match_sheet', 'match_report', 'incidents',
+]
+
+
+def _cle_rencontre(match):
+    return (match.match_date, match.match_time, match.home_team, match.away_team)
+
+
+def fusionner_matchs_dupliques(apps, schema_editor):
+    """
+    Fusionner les lignes Match d'une même rencontre (une par officiel) en une seule
+
+    Pour chaque rencontre (date, heure, équipes), la ligne la plus ancienne est
+    conservée. Les désignations et événements des doublons y sont rattachés,
+    chaque ancien couple referee/role devient une Désignation confirmée, puis les
+    doublons sont supprimés.
+    """
+    Match = apps.get_model('matches', 'Match')
+    Designation = apps.get_model('matches', 'Designation')
+    MatchEvent = apps.get_model('matches', 'MatchEvent')
+
+    matches = Match.objects.order_by('match_date', 'match_time', 'home_team', 'away_team', 'id')
+    for _, groupe in itertools.groupby(list(matches), key=_cle_rencontre):
+        groupe = list(groupe)
+        canonique, doublons = groupe[0], groupe[1:]
+        doublon_ids = [match.id for match in doublons]
+
+        # Désignations existantes : rattachées au match conservé, sans doublon
+        existantes = set(
+            Designation.objects.filter(match=canonique).values_list('arbitre_id', 'type_designation')
+        )
+        for designation in Designation.objects.filter(match_id__in=doublon_ids).order_by('id'):
+            cle = (designation.arbitre_id, designation.type_designation)
+            if cle in existantes:
+                designation.delete()
+            else:
+                Designation.objects.filter(pk=designation.pk).update(match=canonique)
+                existantes.add(cle)
+
+        # Officiels hérités (referee / role) : une désignation confirmée chacun
+        nouvelles = []
+        for match in groupe:
+            cle = (match.referee_id, match.role)
+            if match.referee_id and cle not in existantes:
+                nouvelles.append(Designation(
+                    match=canonique,
+                    arbitre_id=match.referee_id,
+                    type_designation=match.role,
+                    status='confirmed',
+                    notification_envoyee=True,
+                ))
+                existantes.add(cle)
+        Designation.objects.bulk_create(nouvelles)
+
+        if not doublons:
+            continue
+
+        # Événements : rattachés au match conservé, sans les saisies en double
+        evenements = set(
+            MatchEvent.objects.filter(match=canonique).values_list('event_type', 'team', 'player_name', 'minute')
+        )
+        for event in MatchEvent.objects.filter(match_id__in=doublon_ids).order_by('id'):
+            cle = (event.event_type, event.team, event.player_name, event.minute)
+            if cle in evenements:
+                event.delete()
+            else:
+                MatchEvent.objects.filter(pk=event.pk).update(match=canonique)
+                evenements.add(cle)
+
+        # Compléter le match conservé avec les informations des doublons
+        for champ in CHAMPS_COMPLETABLES:
+            if getattr(canonique, champ) in (None, ''):
+                for match in doublons:
+                    valeur = getattr(match, champ)
+                    if valeur not in (None, ''):
+                        setattr(canonique, champ, valeur)
+                        break
+        statuts = [match.status for match in groupe if match.status in STATUS_PRIORITE]
+        if statuts:
+            canonique.status = min(statuts, key=STATUS_PRIORITE.index)
+        canonique.save()
+
+        Match.objects.filter(id__in=doublon_ids).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_dashboardcounter'),
+        ('matches', '0008_excusearbitre_date_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='match',
+            name='referee',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='matches', to='accounts.arbitre', verbose_name='Arbitre (hérité)'),
+        ),
+        # La fusion n'est pas réversible : le retour arrière conserve les rencontres fusionnées
+        migrations.RunPython(fusionner_matchs_dupliques, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-19 10:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0009_match_single_fixture'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='match',
+            constraint=models.UniqueConstraint(fields=('match_date', 'match_time', 'home_team', 'away_team'), name='unique_match_fixture'),
+        ),
+    ]
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:00
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0010_match_unique_fixture'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Stadium',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=100, verbose_name='Nom du stade')),
+                ('nom_normalise', models.CharField(help_text='Nom sans accents, casse ni ponctuation (clé de rapprochement)', max_length=100, unique=True, verbose_name='Nom normalisé')),
+                ('aliases', models.JSONField(blank=True, default=list, verbose_name='Variantes du nom')),
+                ('ville', models.CharField(blank=True, max_length=100, verbose_name='Ville')),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='Latitude')),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='Longitude')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Actif')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créé le')),
+            ],
+            options={
+                'verbose_name': 'Stade',
+                'verbose_name_plural': 'Stades',
+                'ordering': ['nom'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Team',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nom', models.CharField(max_length=100, verbose_name="Nom de l'équipe")),
+                ('nom_normalise', models.CharField(help_text='Nom sans accents, casse ni ponctuation (clé de rapprochement)', max_length=100, unique=True, verbose_name='Nom normalisé')),
+                ('aliases', models.JSONField(blank=True, default=list, verbose_name='Variantes du nom')),
+                ('ville', models.CharField(blank=True, max_length=100, verbose_name='Ville')),
+                ('latitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='Latitude')),
+                ('longitude', models.DecimalField(blank=True, decimal_places=6, max_digits=9, null=True, verbose_name='Longitude')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Active')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Créée le')),
+            ],
+            options={
+                'verbose_name': 'Équipe',
+                'verbose_name_plural': 'Équipes',
+                'ordering': ['nom'],
+            },
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='stadium_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='matches', to='matches.stadium', verbose_name='Stade (référentiel)'),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='away_team_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='away_matches', to='matches.team', verbose_name='Équipe visiteur (référentiel)'),
+        ),
+        migrations.AddField(
+            model_name='match',
+            name='home_team_ref',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='home_matches', to='matches.team', verbose_name='Équipe domicile (référentiel)'),
+        ),
+    ]
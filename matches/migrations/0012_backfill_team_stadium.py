@@ -0,0 +1,105 @@
+# Generated by Django 4.2.7 on 2026-10-19 11:00
+
+import re
+import unicodedata
+
+from django.db import migrations
+from django.db.models import Count
+
+
+def normaliser_nom(nom):
+    """
+    Forme normalisée d'un nom : minuscules, sans accents ni ponctuation
+
+    Copie figée de matches.referentiel.normaliser_nom : la migration ne doit
+    pas changer de comportement si le référentiel évolue.
+    """
+    if not nom:
+        return ''
+    nom = unicodedata.normalize('NFKD', str(nom))
+    nom = ''.join(c for c in nom if not unicodedata.combining(c))
+    nom = re.sub(r'[^a-z0-9]+', ' ', nom.lower())
+    return ' '.join(nom.split())
+
+
+def _regrouper(noms_avec_frequence):
+    """
+    Regrouper les variantes d'un même nom
+
+    Seules les variantes de même nom normalisé (accents, casse, ponctuation)
+    sont regroupées ; le nom le plus fréquent devient le nom canonique du
+    groupe. Les noms seulement proches restent des entités distinctes.
+
+    Returns:
+        liste de groupes {'nom', 'nom_normalise', 'variantes'}
+    """
+    groupes = {}
+    for nom, _ in sorted(noms_avec_frequence.items(), key=lambda item: (-item[1], item[0])):
+        nom_normalise = normaliser_nom(nom)
+        if not nom_normalise:
+            continue
+        if nom_normalise in groupes:
+            groupes[nom_normalise]['variantes'].append(nom)
+        else:
+            groupes[nom_normalise] = {'nom': nom.strip(), 'nom_normalise': nom_normalise, 'variantes': [nom]}
+    return list(groupes.values())
+
+
+def _frequences(Match, *champs):
+    frequences = {}
+    for champ in champs:
+        rows = Match.objects.exclude(**{champ: ''}).values(champ).annotate(total=Count('id')).order_by()
+        for row in rows:
+            frequences[row[champ]] = frequences.get(row[champ], 0) + row['total']
+    return frequences
+
+
+def _creer_referentiel(model, groupes):
+    """Créer les entités et retourner la correspondance nom saisi -> id"""
+    correspondance = {}
+    for groupe in groupes:
+        entite = model.objects.create(
+            nom=groupe['nom'],
+            nom_normalise=groupe['nom_normalise'],
+            aliases=[variante for variante in groupe['variantes'] if variante != groupe['nom']],
+        )
+        for variante in groupe['variantes']:
+            correspondance[variante] = entite.id
+    return correspondance
+
+
+def rattacher_equipes_et_stades(apps, schema_editor):
+    """Créer les équipes et stades à partir des noms saisis et rattacher les matchs"""
+    Match = apps.get_model('matches', 'Match')
+    Team = apps.get_model('matches', 'Team')
+    Stadium = apps.get_model('matches', 'Stadium')
+
+    equipes = _creer_referentiel(Team, _regrouper(_frequences(Match, 'home_team', 'away_team')))
+    for nom, team_id in equipes.items():
+        Match.objects.filter(home_team=nom).update(home_team_ref_id=team_id)
+        Match.objects.filter(away_team=nom).update(away_team_ref_id=team_id)
+
+    stades = _creer_referentiel(Stadium, _regrouper(_frequences(Match, 'stadium')))
+    for nom, stadium_id in stades.items():
+        Match.objects.filter(stadium=nom).update(stadium_ref_id=stadium_id)
+
+
+def detacher_equipes_et_stades(apps, schema_editor):
+    Match = apps.get_model('matches', 'Match')
+    Team = apps.get_model('matches', 'Team')
+    Stadium = apps.get_model('matches', 'Stadium')
+
+    Match.objects.update(home_team_ref=None, away_team_ref=None, stadium_ref=None)
+    Team.objects.all().delete()
+    Stadium.objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0011_team_stadium'),
+    ]
+
+    operations = [
+        migrations.RunPython(rattacher_equipes_et_stades, detacher_equipes_et_stades),
+    ]
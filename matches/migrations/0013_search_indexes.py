@@ -0,0 +1,42 @@
+# Generated by Django 4.2.7 on 2026-10-19 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0020_dashboardcounter'),
+        ('matches', '0012_backfill_team_stadium'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='designation',
+            index=models.Index(fields=['arbitre', 'status'], name='matches_des_arbitre_c03d61_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['type_match', 'match_date'], name='matches_mat_type_ma_ce1acc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['categorie', 'match_date'], name='matches_mat_categor_e11f93_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['status', 'match_date'], name='matches_mat_status_77310f_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['stadium_ref', 'match_date'], name='matches_mat_stadium_4017d7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['home_team_ref', 'match_date'], name='matches_mat_home_te_9c2e72_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['away_team_ref', 'match_date'], name='matches_mat_away_te_dde50b_idx'),
+        ),
+    ]
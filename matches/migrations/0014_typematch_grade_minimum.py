@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0013_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='typematch',
+            name='grade_minimum',
+            field=models.CharField(blank=True, choices=[('candidat', 'Candidat'), ('3eme_serie', '3ème Série'), ('2eme_serie', '2ème Série'), ('1ere_serie', '1ère Série'), ('federale', 'Fédérale')], default='', max_length=20, verbose_name='Grade minimum des officiels'),
+        ),
+    ]
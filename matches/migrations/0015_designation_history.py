@@ -0,0 +1,104 @@
+# Generated by Django 4.2.7 on 2026-10-19 19:10
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def initialiser_historique(apps, schema_editor):
+    """
+    Amorcer l'historique à partir des désignations existantes
+
+    Une entrée de création par désignation et, si l'arbitre a répondu, une
+    entrée proposed → statut à la date de réponse avec le délai correspondant.
+    """
+    Designation = apps.get_model('matches', 'Designation')
+    HistoriqueDesignation = apps.get_model('matches', 'HistoriqueDesignation')
+
+    entrees = []
+    for designation in Designation.objects.select_related('arbitre').order_by('id').iterator(chunk_size=2000):
+        commun = {
+            'designation_id': designation.id,
+            'match_id': designation.match_id,
+            'arbitre_id': designation.arbitre_id,
+            'type_designation': designation.type_designation,
+            'ligue_id': designation.arbitre.ligue_id,
+            'grade': designation.arbitre.grade or '',
+        }
+        repondu = designation.status in ('accepted', 'declined') and designation.date_reponse
+        entrees.append(HistoriqueDesignation(
+            ancien_statut='',
+            nouveau_statut='proposed' if repondu else designation.status,
+            created_at=designation.date_designation,
+            **commun
+        ))
+        if repondu:
+            entrees.append(HistoriqueDesignation(
+                ancien_statut='proposed',
+                nouveau_statut=designation.status,
+                delai_reponse_secondes=max(0, int((designation.date_reponse - designation.date_designation).total_seconds())),
+                created_at=designation.date_reponse,
+                **commun
+            ))
+        if len(entrees) >= 2000:
+            HistoriqueDesignation.objects.bulk_create(entrees)
+            entrees = []
+    HistoriqueDesignation.objects.bulk_create(entrees)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0021_disponibilitearbitre'),
+        ('matches', '0014_typematch_grade_minimum'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoriqueDesignation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('type_designation', models.CharField(max_length=30, verbose_name='Type de désignation')),
+                ('ancien_statut', models.CharField(blank=True, default='', max_length=20, verbose_name='Ancien statut')),
+                ('nouveau_statut', models.CharField(max_length=20, verbose_name='Nouveau statut')),
+                ('grade', models.CharField(blank=True, default='', max_length=20, verbose_name="Grade de l'arbitre")),
+                ('delai_reponse_secondes', models.PositiveIntegerField(blank=True, null=True, verbose_name='Délai de réponse (s)')),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now, verbose_name='Date de la transition')),
+                ('arbitre', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historique_designations', to='accounts.arbitre', verbose_name='Arbitre')),
+                ('designation', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='historique', to='matches.designation', verbose_name='Désignation')),
+                ('ligue', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='accounts.liguearbitrage', verbose_name="Ligue de l'arbitre")),
+                ('match', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historique_designations', to='matches.match', verbose_name='Match')),
+            ],
+            options={
+                'verbose_name': 'Historique de désignation',
+                'verbose_name_plural': 'Historique des désignations',
+                'ordering': ['created_at', 'id'],
+                'indexes': [models.Index(fields=['match', 'created_at'], name='matches_his_match_i_00386d_idx'), models.Index(fields=['arbitre', 'created_at'], name='matches_his_arbitre_3cc4fe_idx'), models.Index(fields=['created_at', 'nouveau_statut'], name='matches_his_created_20397c_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='StatistiqueTempsReponse',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periode', models.DateField(verbose_name='Mois (premier jour)')),
+                ('niveau', models.CharField(choices=[('ligue_grade', 'Ligue et grade'), ('ligue', 'Ligue'), ('grade', 'Grade'), ('global', 'Global')], max_length=20, verbose_name="Niveau d'agrégation")),
+                ('grade', models.CharField(blank=True, default='', max_length=20, verbose_name='Grade')),
+                ('nb_reponses', models.PositiveIntegerField(default=0, verbose_name='Nombre de réponses')),
+                ('nb_acceptees', models.PositiveIntegerField(default=0, verbose_name='Acceptées')),
+                ('nb_refusees', models.PositiveIntegerField(default=0, verbose_name='Refusées')),
+                ('moyenne_secondes', models.PositiveIntegerField(default=0, verbose_name='Moyenne (s)')),
+                ('p50_secondes', models.PositiveIntegerField(default=0, verbose_name='Médiane (s)')),
+                ('p90_secondes', models.PositiveIntegerField(default=0, verbose_name='90e percentile (s)')),
+                ('p95_secondes', models.PositiveIntegerField(default=0, verbose_name='95e percentile (s)')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Date de calcul')),
+                ('ligue', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='accounts.liguearbitrage', verbose_name='Ligue')),
+            ],
+            options={
+                'verbose_name': 'Statistique de temps de réponse',
+                'verbose_name_plural': 'Statistiques de temps de réponse',
+                'ordering': ['-periode', 'niveau', 'ligue_id', 'grade'],
+                'indexes': [models.Index(fields=['periode', 'niveau'], name='matches_sta_periode_663fb1_idx')],
+            },
+        ),
+        migrations.RunPython(initialiser_historique, migrations.RunPython.noop),
+    ]
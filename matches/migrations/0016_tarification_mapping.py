@@ -0,0 +1,38 @@
+# Generated by Django 4.2.7 on 2026-10-19 20:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0015_designation_history'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='categorie',
+            name='tarif_division',
+            field=models.CharField(blank=True, default='', max_length=20, verbose_name='Division (tarification)'),
+        ),
+        migrations.AddField(
+            model_name='designation',
+            name='devise_indemnite',
+            field=models.CharField(blank=True, default='', max_length=3, verbose_name="Devise de l'indemnité"),
+        ),
+        migrations.AddField(
+            model_name='designation',
+            name='indemnite',
+            field=models.DecimalField(blank=True, decimal_places=3, max_digits=10, null=True, verbose_name='Indemnité'),
+        ),
+        migrations.AddField(
+            model_name='typematch',
+            name='tarif_competition',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='Compétition (tarification)'),
+        ),
+        migrations.AddField(
+            model_name='typematch',
+            name='tarif_type_match',
+            field=models.CharField(blank=True, default='', max_length=50, verbose_name='Type de match (tarification)'),
+        ),
+    ]
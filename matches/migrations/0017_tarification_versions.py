@@ -0,0 +1,57 @@
+# Generated by Django 4.2.7 on 2026-10-19 20:40
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Min
+
+
+def dater_tarifs_existants(apps, schema_editor):
+    """Les tarifs existants s'appliquent à tous les matchs déjà enregistrés"""
+    Match = apps.get_model('matches', 'Match')
+    TarificationMatch = apps.get_model('matches', 'TarificationMatch')
+
+    bornes = [django.utils.timezone.localdate()]
+    premier_match = Match.objects.aggregate(debut=Min('match_date'))['debut']
+    if premier_match:
+        bornes.append(premier_match)
+    premier_tarif = TarificationMatch.objects.aggregate(debut=Min('created_at'))['debut']
+    if premier_tarif:
+        bornes.append(premier_tarif.date())
+    TarificationMatch.objects.update(valid_from=min(bornes))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0016_tarification_mapping'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='tarificationmatch',
+            options={'ordering': ['competition', 'division', 'type_match', 'role', 'valid_from'], 'verbose_name': 'Tarification de match', 'verbose_name_plural': 'Tarifications de matchs'},
+        ),
+        migrations.AlterUniqueTogether(
+            name='tarificationmatch',
+            unique_together=set(),
+        ),
+        migrations.AddField(
+            model_name='tarificationmatch',
+            name='valid_from',
+            field=models.DateField(default=django.utils.timezone.localdate, verbose_name='Applicable à partir du'),
+        ),
+        migrations.AddField(
+            model_name='tarificationmatch',
+            name='valid_to',
+            field=models.DateField(blank=True, null=True, verbose_name="Applicable jusqu'au"),
+        ),
+        migrations.RunPython(dater_tarifs_existants, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='tarificationmatch',
+            index=models.Index(fields=['competition', 'type_match', 'role', 'valid_from'], name='matches_tar_competi_a3e2c7_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='tarificationmatch',
+            constraint=models.UniqueConstraint(fields=('competition', 'division', 'type_match', 'role', 'valid_from'), name='unique_tarification_version'),
+        ),
+    ]
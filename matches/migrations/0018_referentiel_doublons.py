@@ -0,0 +1,142 @@
+# Generated by Django 4.2.7 on 2026-10-19 22:45
+
+import difflib
+import re
+import unicodedata
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+LIENS = {'Team': ('home_team', 'away_team'), 'Stadium': ('stadium',)}
+# Seuil de similarité au moment de la migration (REFERENTIEL_SEUIL_SIMILARITE)
+SEUIL_SIMILARITE = 0.88
+
+
+def normaliser_nom(nom):
+    """
+    Forme normalisée d'un nom : minuscules, sans accents ni ponctuation
+
+    Copie figée de matches.referentiel.normaliser_nom : la migration ne doit
+    pas changer de comportement si le référentiel évolue.
+    """
+    if not nom:
+        return ''
+    nom = unicodedata.normalize('NFKD', str(nom))
+    nom = ''.join(c for c in nom if not unicodedata.combining(c))
+    nom = re.sub(r'[^a-z0-9]+', ' ', nom.lower())
+    return ' '.join(nom.split())
+
+
+def similaire(nom_normalise, candidats):
+    """
+    Candidat le plus proche d'un nom normalisé, au-dessus du seuil
+
+    Copie figée de matches.referentiel.similaire.
+
+    Args:
+        candidats: liste de (identifiant, [noms normalisés connus])
+    """
+    if not nom_normalise:
+        return None
+    meilleur, meilleur_score = None, SEUIL_SIMILARITE
+    matcher = difflib.SequenceMatcher(b=nom_normalise)
+    for identifiant, noms in candidats:
+        for nom in noms:
+            matcher.set_seq1(nom)
+            if matcher.real_quick_ratio() < meilleur_score or matcher.quick_ratio() < meilleur_score:
+                continue
+            score = matcher.ratio()
+            if score >= meilleur_score:
+                meilleur, meilleur_score = identifiant, score
+    return meilleur
+
+
+def separer_rapprochements_approximatifs(apps, schema_editor):
+    """
+    Défaire les rattachements par similarité
+
+    Chaque alias ou nom saisi dont la forme normalisée diffère de celle de son
+    entité devient une entité distincte, signalée comme doublon possible de
+    celle-ci ; les matchs correspondants y sont rattachés. Les doublons
+    légitimes sont refusionnés depuis l'administration.
+    """
+    Match = apps.get_model('matches', 'Match')
+    for nom_modele, champs in LIENS.items():
+        model = apps.get_model('matches', nom_modele)
+        entites = {entite.pk: entite for entite in model.objects.all()}
+        par_normalise = {entite.nom_normalise: entite for entite in entites.values()}
+
+        def entite_pour(nom, nom_normalise, origine):
+            entite = par_normalise.get(nom_normalise)
+            if entite is None:
+                entite = model.objects.create(
+                    nom=nom.strip(), nom_normalise=nom_normalise, doublon_possible_id=origine.pk
+                )
+                par_normalise[nom_normalise] = entite
+            return entite
+
+        for entite in list(entites.values()):
+            aliases = [alias for alias in entite.aliases or [] if normaliser_nom(alias) == entite.nom_normalise]
+            for alias in entite.aliases or []:
+                nom_normalise = normaliser_nom(alias)
+                if nom_normalise and nom_normalise != entite.nom_normalise:
+                    entite_pour(alias, nom_normalise, entite)
+            if aliases != (entite.aliases or []):
+                entite.aliases = aliases
+                entite.save(update_fields=['aliases'])
+
+        for champ in champs:
+            rattachements = {}
+            lignes = Match.objects.filter(**{f'{champ}_ref__isnull': False}).values_list(
+                'pk', champ, f'{champ}_ref_id'
+            )
+            for pk, nom, ref_id in lignes:
+                nom_normalise = normaliser_nom(nom)
+                if not nom_normalise or nom_normalise == entites[ref_id].nom_normalise:
+                    continue
+                rattachements.setdefault(entite_pour(nom, nom_normalise, entites[ref_id]).pk, []).append(pk)
+            for ref_id, match_ids in rattachements.items():
+                Match.objects.filter(pk__in=match_ids).update(**{f'{champ}_ref_id': ref_id})
+
+
+def signaler_doublons_possibles(apps, schema_editor):
+    """
+    Signaler les entités existantes au nom proche d'une autre
+
+    Comme pour un nouveau nom, rien n'est fusionné : chaque entité non encore
+    signalée est liée (`doublon_possible`) à l'entité antérieure la plus
+    proche (la plus fréquente lors de la reprise), pour revue dans
+    l'administration.
+    """
+    for nom_modele in LIENS:
+        model = apps.get_model('matches', nom_modele)
+        candidats = []
+        for entite in model.objects.order_by('pk'):
+            noms = [entite.nom_normalise] + [normaliser_nom(alias) for alias in entite.aliases or []]
+            if entite.doublon_possible_id is None:
+                doublon_id = similaire(entite.nom_normalise, candidats)
+                if doublon_id is not None:
+                    model.objects.filter(pk=entite.pk).update(doublon_possible_id=doublon_id)
+            candidats.append((entite.pk, noms))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('matches', '0017_tarification_versions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='stadium',
+            name='doublon_possible',
+            field=models.ForeignKey(blank=True, help_text='Entité au nom proche, à fusionner ou à écarter par un administrateur', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='doublons_signales', to='matches.stadium', verbose_name='Doublon possible'),
+        ),
+        migrations.AddField(
+            model_name='team',
+            name='doublon_possible',
+            field=models.ForeignKey(blank=True, help_text='Entité au nom proche, à fusionner ou à écarter par un administrateur', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='doublons_signales', to='matches.team', verbose_name='Doublon possible'),
+        ),
+        migrations.RunPython(separer_rapprochements_approximatifs, migrations.RunPython.noop),
+        migrations.RunPython(signaler_doublons_possibles, migrations.RunPython.noop),
+    ]
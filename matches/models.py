@@ -1,10 +1,13 @@
 """
 Modèles pour la gestion des matchs
 """
-from django.db import models
+from django.db import models, transaction
 from django.conf import settings
 from django.utils import timezone
 
+from accounts.transitions import appliquer_transition
+from .transitions import designation_status_changed
+
 class TypeMatch(models.Model):
     """Modèle pour les types de match"""
     
@@ -13,6 +16,33 @@ class TypeMatch(models.Model):
     description = models.TextField(blank=True, verbose_name="Description")
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     ordre = models.IntegerField(default=0, verbose_name="Ordre d'affichage")
+    # Grade minimum des officiels désignés (voir Arbitre.GRADES_ORDRE)
+    grade_minimum = models.CharField(
+        max_length=20,
+        choices=[
+            ('candidat', 'Candidat'),
+            ('3eme_serie', '3ème Série'),
+            ('2eme_serie', '2ème Série'),
+            ('1ere_serie', '1ère Série'),
+            ('federale', 'Fédérale'),
+        ],
+        blank=True,
+        default='',
+        verbose_name="Grade minimum des officiels"
+    )
+    # Correspondance avec TarificationMatch (voir matches/tarification.py)
+    tarif_competition = models.CharField(
+        max_length=50,
+        blank=True,
+        default='',
+        verbose_name="Compétition (tarification)"
+    )
+    tarif_type_match = models.CharField(
+        max_length=50,
+        blank=True,
+        default='',
+        verbose_name="Type de match (tarification)"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     
     class Meta:
@@ -33,6 +63,13 @@ class Categorie(models.Model):
     description = models.TextField(blank=True, verbose_name="Description")
     is_active = models.BooleanField(default=True, verbose_name="Actif")
     ordre = models.IntegerField(default=0, verbose_name="Ordre d'affichage")
+    # Division de TarificationMatch (vide : tarif sans division)
+    tarif_division = models.CharField(
+        max_length=20,
+        blank=True,
+        default='',
+        verbose_name="Division (tarification)"
+    )
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     
     class Meta:
@@ -43,6 +80,107 @@ class Categorie(models.Model):
     def __str__(self):
         return self.nom
 
+class Team(models.Model):
+    """Équipe (référentiel canonique des noms saisis dans les matchs)"""
+    
+    nom = models.CharField(max_length=100, verbose_name="Nom de l'équipe")
+    nom_normalise = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Nom normalisé",
+        help_text="Nom sans accents, casse ni ponctuation (clé de rapprochement)"
+    )
+    aliases = models.JSONField(default=list, blank=True, verbose_name="Variantes du nom")
+    doublon_possible = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='doublons_signales',
+        verbose_name="Doublon possible",
+        help_text="Entité au nom proche, à fusionner ou à écarter par un administrateur"
+    )
+    ville = models.CharField(max_length=100, blank=True, verbose_name="Ville")
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, verbose_name="Latitude")
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, verbose_name="Longitude")
+    is_active = models.BooleanField(default=True, verbose_name="Active")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créée le")
+    
+    class Meta:
+        verbose_name = "Équipe"
+        verbose_name_plural = "Équipes"
+        ordering = ['nom']
+    
+    def __str__(self):
+        return self.nom
+    
+    def save(self, *args, **kwargs):
+        from .referentiel import normaliser_nom
+        self.nom_normalise = normaliser_nom(self.nom)
+        super().save(*args, **kwargs)
+
+class Stadium(models.Model):
+    """Stade (référentiel canonique des noms saisis dans les matchs)"""
+    
+    nom = models.CharField(max_length=100, verbose_name="Nom du stade")
+    nom_normalise = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name="Nom normalisé",
+        help_text="Nom sans accents, casse ni ponctuation (clé de rapprochement)"
+    )
+    aliases = models.JSONField(default=list, blank=True, verbose_name="Variantes du nom")
+    doublon_possible = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='doublons_signales',
+        verbose_name="Doublon possible",
+        help_text="Entité au nom proche, à fusionner ou à écarter par un administrateur"
+    )
+    ville = models.CharField(max_length=100, blank=True, verbose_name="Ville")
+    latitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, verbose_name="Latitude")
+    longitude = models.DecimalField(max_digits=9, decimal_places=6, null=True, blank=True, verbose_name="Longitude")
+    is_active = models.BooleanField(default=True, verbose_name="Actif")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
+    
+    class Meta:
+        verbose_name = "Stade"
+        verbose_name_plural = "Stades"
+        ordering = ['nom']
+    
+    def __str__(self):
+        return self.nom
+    
+    def save(self, *args, **kwargs):
+        from .referentiel import normaliser_nom
+        self.nom_normalise = normaliser_nom(self.nom)
+        super().save(*args, **kwargs)
+
+class MatchQuerySet(models.QuerySet):
+    """Requêtes sur les matchs"""
+    
+    def for_team(self, team):
+        """Matchs d'une équipe, à domicile ou à l'extérieur (index des clés étrangères)"""
+        return self.filter(models.Q(home_team_ref=team) | models.Q(away_team_ref=team))
+    
+    def officiated_by(self, arbitre):
+        """Matchs auxquels l'arbitre est désigné (désignation active)"""
+        return self.filter(
+            designations__arbitre=arbitre,
+            designations__status__in=Designation.ACTIVE_STATUSES
+        ).distinct()
+    
+    def refereed_by(self, arbitre):
+        """Matchs dont l'arbitre est l'arbitre principal (désignation active)"""
+        return self.filter(
+            designations__arbitre=arbitre,
+            designations__type_designation='arbitre_principal',
+            designations__status__in=Designation.ACTIVE_STATUSES
+        ).distinct()
+
+
 class Match(models.Model):
     """Modèle pour représenter un match"""
     
@@ -73,12 +211,36 @@ class Match(models.Model):
     
     # Lieu et date
     stadium = models.CharField(max_length=100, verbose_name="Stade")
+    stadium_ref = models.ForeignKey(
+        Stadium,
+        on_delete=models.SET_NULL,
+        related_name='matches',
+        null=True,
+        blank=True,
+        verbose_name="Stade (référentiel)"
+    )
     match_date = models.DateField(verbose_name="Date du match")
     match_time = models.TimeField(verbose_name="Heure du match")
     
     # Équipes
     home_team = models.CharField(max_length=50, verbose_name="Équipe domicile")
     away_team = models.CharField(max_length=50, verbose_name="Équipe visiteur")
+    home_team_ref = models.ForeignKey(
+        Team,
+        on_delete=models.SET_NULL,
+        related_name='home_matches',
+        null=True,
+        blank=True,
+        verbose_name="Équipe domicile (référentiel)"
+    )
+    away_team_ref = models.ForeignKey(
+        Team,
+        on_delete=models.SET_NULL,
+        related_name='away_matches',
+        null=True,
+        blank=True,
+        verbose_name="Équipe visiteur (référentiel)"
+    )
     
     # Score (optionnel, rempli après le match)
     home_score = models.PositiveIntegerField(
@@ -124,12 +286,15 @@ class Match(models.Model):
         verbose_name="Feuille de match"
     )
     
-    # Arbitre assigné
+    # Arbitre assigné (champ hérité : les officiels du match sont rattachés
+    # via Designation, une rencontre = une seule ligne Match)
     referee = models.ForeignKey(
         'accounts.Arbitre',
-        on_delete=models.CASCADE,
+        on_delete=models.SET_NULL,
         related_name='matches',
-        verbose_name="Arbitre"
+        null=True,
+        blank=True,
+        verbose_name="Arbitre (hérité)"
     )
     
     # Statut et métadonnées
@@ -155,16 +320,66 @@ class Match(models.Model):
         verbose_name="Incidents"
     )
     
+    objects = MatchQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Match"
         verbose_name_plural = "Matchs"
         ordering = ['-match_date', '-match_time']
+        constraints = [
+            # Une rencontre n'est enregistrée qu'une seule fois
+            models.UniqueConstraint(
+                fields=['match_date', 'match_time', 'home_team', 'away_team'],
+                name='unique_match_fixture'
+            ),
+        ]
+        # Recherche (matches/search.py) : chaque filtre est couvert par un index
+        # (colonne, match_date) ; le tri par date utilise le préfixe
+        # (match_date, match_time) de la contrainte unique_match_fixture
+        indexes = [
+            models.Index(fields=['type_match', 'match_date']),
+            models.Index(fields=['categorie', 'match_date']),
+            models.Index(fields=['status', 'match_date']),
+            models.Index(fields=['stadium_ref', 'match_date']),
+            models.Index(fields=['home_team_ref', 'match_date']),
+            models.Index(fields=['away_team_ref', 'match_date']),
+        ]
         
     def __str__(self):
         type_name = self.type_match.nom if self.type_match else "Type non défini"
         categorie_name = self.categorie.nom if self.categorie else "Catégorie non définie"
         return f"{self.home_team} vs {self.away_team} - {self.match_date} ({type_name} - {categorie_name})"
     
+    def save(self, *args, **kwargs):
+        """Rattacher les équipes et le stade saisis au référentiel"""
+        if kwargs.get('update_fields') is None:
+            from .referentiel import resoudre_equipe, resoudre_stade
+            if self.home_team and (self.home_team_ref_id is None or self._texte_modifie('home_team')):
+                self.home_team_ref = resoudre_equipe(self.home_team)
+            if self.away_team and (self.away_team_ref_id is None or self._texte_modifie('away_team')):
+                self.away_team_ref = resoudre_equipe(self.away_team)
+            if self.stadium and (self.stadium_ref_id is None or self._texte_modifie('stadium')):
+                self.stadium_ref = resoudre_stade(self.stadium)
+        super().save(*args, **kwargs)
+    
+    def _texte_modifie(self, champ):
+        """Le texte saisi diffère-t-il de celui chargé depuis la base ?"""
+        textes_charges = getattr(self, '_textes_charges', None)
+        if textes_charges is None:
+            return False
+        return textes_charges.get(champ) != getattr(self, champ)
+    
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._textes_charges = {
+            champ: instance.__dict__.get(champ)
+            for champ in ('home_team', 'away_team', 'stadium')
+        }
+        # Date chargée : un changement de date déplace la disponibilité des officiels
+        instance._date_chargee = instance.__dict__.get('match_date')
+        return instance
+    
     @property
     def is_completed(self):
         """Vérifie si le match est terminé"""
@@ -181,6 +396,13 @@ class Match(models.Model):
         if self.has_score:
             return f"{self.home_score} - {self.away_score}"
         return "Score non disponible"
+    
+    def get_officials(self):
+        """Désignations actives du match (arbitre principal, assistants, ...)"""
+        return [
+            designation for designation in self.designations.all()
+            if designation.status in Designation.ACTIVE_STATUSES
+        ]
 
 class MatchEvent(models.Model):
     """Modèle pour les événements du match (cartons, buts, etc.)"""
@@ -260,6 +482,9 @@ class Designation(models.Model):
         ('cancelled', 'Annulée'),
     ]
     
+    # Statuts pour lesquels l'arbitre est considéré comme officiel du match
+    ACTIVE_STATUSES = ['proposed', 'accepted', 'confirmed']
+    
     # Match concerné
     match = models.ForeignKey(
         Match,
@@ -331,11 +556,30 @@ class Designation(models.Model):
         verbose_name="Date d'envoi de la notification"
     )
     
+    # Indemnité figée à la confirmation (voir matches/tarification.py)
+    indemnite = models.DecimalField(
+        max_digits=10,
+        decimal_places=3,
+        null=True,
+        blank=True,
+        verbose_name="Indemnité"
+    )
+    devise_indemnite = models.CharField(
+        max_length=3,
+        blank=True,
+        default='',
+        verbose_name="Devise de l'indemnité"
+    )
+    
     class Meta:
         verbose_name = "Désignation d'arbitrage"
         verbose_name_plural = "Désignations d'arbitrage"
         unique_together = ['match', 'arbitre', 'type_designation']
         ordering = ['-date_designation']
+        indexes = [
+            # Matchs d'un arbitre (désignations actives)
+            models.Index(fields=['arbitre', 'status']),
+        ]
     
     def __str__(self):
         return f"{self.arbitre.get_full_name()} - {self.get_type_designation_display()} - {self.match}"
@@ -355,39 +599,252 @@ class Designation(models.Model):
         """Vérifie si la désignation est en attente de réponse"""
         return self.status == 'proposed'
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Statut chargé : un save() qui le modifie émet designation_status_changed
+        instance._statut_charge = instance.__dict__.get('status')
+        # Arbitre chargé : une réaffectation invalide aussi ses statistiques
+        instance._arbitre_charge = instance.__dict__.get('arbitre_id')
+        return instance
+    
+    def save(self, *args, **kwargs):
+        """
+        Enregistrer la désignation ; la création ou le changement de statut est
+        journalisé (HistoriqueDesignation) dans la même transaction
+        """
+        creation = self._state.adding
+        ancien_statut = getattr(self, '_statut_charge', None)
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if creation:
+                HistoriqueDesignation.journaliser(self, None, self.status)
+            elif (
+                ancien_statut is not None and ancien_statut != self.status
+                and (update_fields is None or 'status' in update_fields)
+            ):
+                HistoriqueDesignation.journaliser(self, ancien_statut, self.status)
+    
+    # Transitions conditionnelles : un seul UPDATE gardé par le statut courant,
+    # True si la transition a été appliquée (voir accounts/transitions.py)
+    
     def accepter(self):
-        """Accepter la désignation"""
-        self.status = 'accepted'
-        self.date_reponse = timezone.now()
-        self.save()
+        """Accepter la désignation (si elle est proposée)"""
+        return appliquer_transition(
+            self, 'accepted', ['proposed'], designation_status_changed,
+            journal=HistoriqueDesignation.journaliser, date_reponse=timezone.now()
+        )
     
     def refuser(self, raison=None):
-        """Refuser la désignation"""
-        self.status = 'declined'
-        self.date_reponse = timezone.now()
+        """Refuser la désignation (si elle est proposée)"""
+        valeurs = {'date_reponse': timezone.now()}
         if raison:
-            self.raison_refus = raison
-        self.save()
+            valeurs['raison_refus'] = raison
+        return appliquer_transition(
+            self, 'declined', ['proposed'], designation_status_changed,
+            journal=HistoriqueDesignation.journaliser, **valeurs
+        )
     
     def confirmer(self):
-        """Confirmer la désignation"""
-        self.status = 'confirmed'
-        self.save()
+        """Confirmer la désignation (proposée ou acceptée) en figeant son indemnité"""
+        from .tarification import valeurs_confirmation
+        return appliquer_transition(
+            self, 'confirmed', ['proposed', 'accepted'], designation_status_changed,
+            journal=HistoriqueDesignation.journaliser, **valeurs_confirmation(self)
+        )
     
     def annuler(self):
-        """Annuler la désignation"""
-        self.status = 'cancelled'
-        self.save()
+        """Annuler la désignation (tant qu'elle est active)"""
+        return appliquer_transition(
+            self, 'cancelled', self.ACTIVE_STATUSES, designation_status_changed,
+            journal=HistoriqueDesignation.journaliser
+        )
     
     def marquer_notification_envoyee(self):
         """Marquer que la notification a été envoyée"""
         self.notification_envoyee = True
         self.date_notification = timezone.now()
-        self.save()
+        Designation.objects.filter(pk=self.pk).update(
+            notification_envoyee=True,
+            date_notification=self.date_notification
+        )
+
+
+class HistoriqueDesignation(models.Model):
+    """
+    Journal append-only des changements de statut des désignations
+    
+    Une ligne par transition, écrite dans la même transaction que le
+    changement de statut. Le grade et la ligue de l'arbitre sont figés au
+    moment de la transition pour les agrégats de temps de réponse.
+    """
+    
+    designation = models.ForeignKey(
+        Designation,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='historique',
+        verbose_name="Désignation"
+    )
+    match = models.ForeignKey(
+        Match,
+        on_delete=models.CASCADE,
+        related_name='historique_designations',
+        verbose_name="Match"
+    )
+    arbitre = models.ForeignKey(
+        'accounts.Arbitre',
+        on_delete=models.CASCADE,
+        related_name='historique_designations',
+        verbose_name="Arbitre"
+    )
+    type_designation = models.CharField(max_length=30, verbose_name="Type de désignation")
+    ancien_statut = models.CharField(max_length=20, blank=True, default='', verbose_name="Ancien statut")
+    nouveau_statut = models.CharField(max_length=20, verbose_name="Nouveau statut")
+    ligue = models.ForeignKey(
+        'accounts.LigueArbitrage',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Ligue de l'arbitre"
+    )
+    grade = models.CharField(max_length=20, blank=True, default='', verbose_name="Grade de l'arbitre")
+    # Délai entre la désignation et la réponse de l'arbitre (acceptation / refus)
+    delai_reponse_secondes = models.PositiveIntegerField(null=True, blank=True, verbose_name="Délai de réponse (s)")
+    created_at = models.DateTimeField(default=timezone.now, verbose_name="Date de la transition")
+    
+    class Meta:
+        verbose_name = "Historique de désignation"
+        verbose_name_plural = "Historique des désignations"
+        ordering = ['created_at', 'id']
+        indexes = [
+            models.Index(fields=['match', 'created_at']),
+            models.Index(fields=['arbitre', 'created_at']),
+            # Agrégats par période
+            models.Index(fields=['created_at', 'nouveau_statut']),
+        ]
+    
+    def __str__(self):
+        return f"{self.designation_id}: {self.ancien_statut or '∅'} → {self.nouveau_statut}"
+    
+    @classmethod
+    def construire(cls, designation, ancien_statut, nouveau_statut, moment=None):
+        """Entrée de journal (non sauvegardée) pour une transition"""
+        if moment is None:
+            moment = designation.date_reponse if nouveau_statut in ['accepted', 'declined'] else None
+            moment = moment or timezone.now()
+        
+        if Designation.arbitre.is_cached(designation):
+            ligue_id, grade = designation.arbitre.ligue_id, designation.arbitre.grade
+        else:
+            from accounts.models import Arbitre
+            ligue_id, grade = Arbitre.objects.filter(pk=designation.arbitre_id).values_list(
+                'ligue_id', 'grade'
+            ).first() or (None, '')
+        
+        delai = None
+        if ancien_statut == 'proposed' and nouveau_statut in ['accepted', 'declined'] and designation.date_designation:
+            delai = max(0, int((moment - designation.date_designation).total_seconds()))
+        
+        return cls(
+            designation_id=designation.pk,
+            match_id=designation.match_id,
+            arbitre_id=designation.arbitre_id,
+            type_designation=designation.type_designation,
+            ancien_statut=ancien_statut or '',
+            nouveau_statut=nouveau_statut,
+            ligue_id=ligue_id,
+            grade=grade or '',
+            delai_reponse_secondes=delai,
+            created_at=moment
+        )
+    
+    @classmethod
+    def journaliser(cls, designation, ancien_statut, nouveau_statut):
+        """Enregistrer une transition"""
+        entree = cls.construire(designation, ancien_statut, nouveau_statut)
+        entree.save(force_insert=True)
+        return entree
+
+
+class StatistiqueTempsReponse(models.Model):
+    """
+    Temps de réponse des arbitres pré-agrégés par mois
+    
+    Recalculés par la commande `agreger_temps_reponse` à partir du seul mois
+    concerné de l'historique. Les percentiles ne se combinent pas : chaque
+    niveau d'agrégation (ligue et grade, ligue, grade, global) a ses lignes.
+    """
+    
+    NIVEAU_CHOICES = [
+        ('ligue_grade', 'Ligue et grade'),
+        ('ligue', 'Ligue'),
+        ('grade', 'Grade'),
+        ('global', 'Global'),
+    ]
+    
+    periode = models.DateField(verbose_name="Mois (premier jour)")
+    niveau = models.CharField(max_length=20, choices=NIVEAU_CHOICES, verbose_name="Niveau d'agrégation")
+    ligue = models.ForeignKey(
+        'accounts.LigueArbitrage',
+        on_delete=models.CASCADE,
+        null=True,
+        blank=True,
+        related_name='+',
+        verbose_name="Ligue"
+    )
+    grade = models.CharField(max_length=20, blank=True, default='', verbose_name="Grade")
+    nb_reponses = models.PositiveIntegerField(default=0, verbose_name="Nombre de réponses")
+    nb_acceptees = models.PositiveIntegerField(default=0, verbose_name="Acceptées")
+    nb_refusees = models.PositiveIntegerField(default=0, verbose_name="Refusées")
+    moyenne_secondes = models.PositiveIntegerField(default=0, verbose_name="Moyenne (s)")
+    p50_secondes = models.PositiveIntegerField(default=0, verbose_name="Médiane (s)")
+    p90_secondes = models.PositiveIntegerField(default=0, verbose_name="90e percentile (s)")
+    p95_secondes = models.PositiveIntegerField(default=0, verbose_name="95e percentile (s)")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Date de calcul")
+    
+    class Meta:
+        verbose_name = "Statistique de temps de réponse"
+        verbose_name_plural = "Statistiques de temps de réponse"
+        ordering = ['-periode', 'niveau', 'ligue_id', 'grade']
+        indexes = [
+            models.Index(fields=['periode', 'niveau']),
+        ]
+    
+    def __str__(self):
+        return f"{self.periode:%Y-%m} {self.niveau} {self.ligue_id or ''} {self.grade}: p50={self.p50_secondes}s"
+
+
+class TarificationMatchQuerySet(models.QuerySet):
+    """Requêtes sur les versions de tarifs"""
+    
+    def en_vigueur(self, jour):
+        """Versions applicables à une date (index clé / valid_from)"""
+        return self.filter(valid_from__lte=jour).filter(
+            models.Q(valid_to__isnull=True) | models.Q(valid_to__gte=jour)
+        )
+    
+    def applicable(self, competition, division, type_match, role, jour):
+        """Version applicable d'une clé à une date ; à défaut, celle sans division"""
+        versions = self.filter(
+            competition=competition, type_match=type_match, role=role, is_active=True
+        ).en_vigueur(jour).order_by('-valid_from')
+        version = versions.filter(division=division).first() if division else None
+        return version or versions.filter(division__isnull=True).first()
 
 
 class TarificationMatch(models.Model):
-    """Modèle pour les tarifs des matchs selon le type et le rôle"""
+    """
+    Modèle pour les tarifs des matchs selon le type et le rôle
+    
+    Chaque ligne est une version datée du tarif d'une clé (compétition,
+    division, type de match, rôle), applicable de valid_from à valid_to
+    inclus (sans fin si vide). Un changement de tarif crée une nouvelle
+    version (nouvelle_version) : les matchs passés gardent leur tarif.
+    """
     
     # Types de compétition
     COMPETITION_CHOICES = [
@@ -490,15 +947,37 @@ class TarificationMatch(models.Model):
         verbose_name="Actif"
     )
     
+    # Période d'application de cette version
+    valid_from = models.DateField(
+        default=timezone.localdate,
+        verbose_name="Applicable à partir du"
+    )
+    valid_to = models.DateField(
+        null=True,
+        blank=True,
+        verbose_name="Applicable jusqu'au"
+    )
+    
     # Métadonnées
     created_at = models.DateTimeField(auto_now_add=True, verbose_name="Créé le")
     updated_at = models.DateTimeField(auto_now=True, verbose_name="Modifié le")
     
+    objects = TarificationMatchQuerySet.as_manager()
+    
     class Meta:
         verbose_name = "Tarification de match"
         verbose_name_plural = "Tarifications de matchs"
-        unique_together = ['competition', 'division', 'type_match', 'role']
-        ordering = ['competition', 'division', 'type_match', 'role']
+        ordering = ['competition', 'division', 'type_match', 'role', 'valid_from']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['competition', 'division', 'type_match', 'role', 'valid_from'],
+                name='unique_tarification_version'
+            ),
+        ]
+        indexes = [
+            # Version applicable à une date (repli SQL de la table en mémoire)
+            models.Index(fields=['competition', 'type_match', 'role', 'valid_from']),
+        ]
     
     def __str__(self):
         division_str = f" - {self.get_division_display()}" if self.division else ""
@@ -508,6 +987,51 @@ class TarificationMatch(models.Model):
     def tarif_formatted(self):
         """Retourne le tarif formaté avec la devise"""
         return f"{self.tarif} {self.devise}"
+    
+    def versions(self):
+        """Versions de la même clé, de la plus ancienne à la plus récente"""
+        return TarificationMatch.objects.filter(
+            competition=self.competition, division=self.division,
+            type_match=self.type_match, role=self.role
+        ).order_by('valid_from')
+    
+    def nouvelle_version(self, valid_from=None, **valeurs):
+        """
+        Appliquer un nouveau tarif à partir de valid_from (défaut aujourd'hui,
+        ou le début de cette version si elle est future)
+        
+        La version courante est close la veille et une nouvelle version reprend
+        sa fin de validité ; à la même date de début, la version est corrigée
+        sur place.
+        
+        Returns:
+            la version portant le nouveau tarif
+        """
+        from datetime import timedelta
+        from django.db import transaction
+        
+        valid_from = valid_from or max(timezone.localdate(), self.valid_from)
+        with transaction.atomic():
+            if valid_from == self.valid_from:
+                for champ, valeur in valeurs.items():
+                    setattr(self, champ, valeur)
+                self.save()
+                return self
+            if valid_from < self.valid_from or (self.valid_to and valid_from > self.valid_to):
+                raise ValueError("La nouvelle version doit commencer pendant la période de la version modifiée")
+            
+            version = TarificationMatch(
+                competition=self.competition, division=self.division,
+                type_match=self.type_match, role=self.role,
+                tarif=self.tarif, devise=self.devise, is_active=self.is_active,
+                valid_from=valid_from, valid_to=self.valid_to
+            )
+            for champ, valeur in valeurs.items():
+                setattr(version, champ, valeur)
+            self.valid_to = valid_from - timedelta(days=1)
+            self.save(update_fields=['valid_to', 'updated_at'])
+            version.save()
+        return version
 
 
 class ExcuseArbitre(models.Model):
@@ -531,6 +1055,11 @@ class ExcuseArbitre(models.Model):
         verbose_name = "Excuse d'arbitre"
         verbose_name_plural = "Excuses d'arbitres"
         ordering = ['-created_at']
+        indexes = [
+            # Requêtes par date (passées / en cours / à venir)
+            models.Index(fields=['date_debut', 'date_fin']),
+            models.Index(fields=['date_fin']),
+        ]
     
     def __str__(self):
         return f"{self.prenom_arbitre} {self.nom_arbitre} - {self.date_debut} au {self.date_fin}"
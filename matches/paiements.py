@@ -0,0 +1,186 @@
+"""
+Relevés mensuels de paiement des arbitres
+
+Une désignation est payable lorsqu'elle est confirmée, ou acceptée sur un
+match terminé, et que son match n'est ni annulé ni reporté. Le montant est
+l'indemnité figée à la confirmation, à défaut le tarif en vigueur à la date
+du match, résolu en mémoire (voir tarification.py).
+
+Les désignations du mois sont lues par une seule requête jointe (match, type
+de match, catégorie, arbitre, ligue), triée par ligue puis arbitre et
+parcourue par `iterator(chunk_size=...)` : les totaux par arbitre et par
+ligue sont cumulés au fil du parcours, la mémoire reste constante quelle que
+soit la période. Les lignes produites alimentent un export CSV ou XLSX
+diffusé en flux.
+"""
+import csv
+import tempfile
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Q
+
+from . import tarification
+from .models import Designation
+
+try:
+    from openpyxl import Workbook
+    OPENPYXL_AVAILABLE = True
+except ImportError:
+    Workbook = None
+    OPENPYXL_AVAILABLE = False
+
+COLONNES = [
+    'ligne', 'ligue', 'arbitre_id', 'arbitre', 'cin', 'grade', 'date', 'match',
+    'type_designation', 'nb_designations', 'non_tarifees', 'montant', 'devise',
+]
+
+CHAMPS = (
+    'id', 'type_designation', 'status', 'indemnite', 'devise_indemnite',
+    'arbitre_id', 'arbitre__first_name', 'arbitre__last_name', 'arbitre__cin', 'arbitre__grade',
+    'arbitre__ligue_id', 'arbitre__ligue__nom',
+    'match__match_date', 'match__home_team', 'match__away_team',
+    'match__type_match__tarif_competition', 'match__type_match__tarif_type_match',
+    'match__categorie__tarif_division',
+)
+
+
+def _taille_lot():
+    return getattr(settings, 'PAIEMENTS_TAILLE_LOT', 2000)
+
+
+def designations_payables(debut, fin, ligue_id=None):
+    """Désignations payables dont le match a lieu dans [debut, fin[ (une requête jointe)"""
+    designations = Designation.objects.filter(
+        Q(status='confirmed') | Q(status='accepted', match__status='completed'),
+        match__match_date__gte=debut,
+        match__match_date__lt=fin,
+    ).exclude(match__status__in=['cancelled', 'postponed'])
+    if ligue_id:
+        designations = designations.filter(arbitre__ligue_id=ligue_id)
+    return designations.order_by(
+        'arbitre__ligue__nom', 'arbitre__ligue_id', 'arbitre__last_name', 'arbitre__first_name',
+        'arbitre_id', 'match__match_date', 'match__match_time', 'id'
+    ).values_list(*CHAMPS)
+
+
+class _Cumul:
+    """Nombre de désignations et montants par devise"""
+
+    def __init__(self):
+        self.nb_designations = 0
+        self.non_tarifees = 0
+        self.montants = {}
+
+    def ajouter(self, montant, devise):
+        self.nb_designations += 1
+        if montant is None:
+            self.non_tarifees += 1
+            return
+        self.montants[devise] = self.montants.get(devise, Decimal('0')) + montant
+
+    def lignes(self, base):
+        """Une ligne de total par devise (au moins une)"""
+        montants = self.montants or {'': Decimal('0')}
+        for devise, montant in sorted(montants.items()):
+            yield dict(base, nb_designations=self.nb_designations, non_tarifees=self.non_tarifees,
+                       montant=montant, devise=devise)
+
+
+def releve(debut, fin, ligue_id=None, detail=False):
+    """
+    Lignes du relevé : détail des désignations (optionnel), total par
+    arbitre, total par ligue, total général
+
+    Yields:
+        dicts dont les clés sont COLONNES
+    """
+    table_tarifs = tarification.table()
+    vide = dict.fromkeys(COLONNES, '')
+    arbitre_courant, cumul_arbitre, base_arbitre = None, None, None
+    ligue_courante, cumul_ligue, base_ligue = None, None, None
+    cumul_general = _Cumul()
+
+    for (designation_id, type_designation, statut, indemnite, devise_indemnite,
+         arbitre_id, prenom, nom, cin, grade, ligue_id_arbitre, ligue_nom,
+         match_date, domicile, exterieur, competition, type_match, division) in designations_payables(
+            debut, fin, ligue_id).iterator(chunk_size=_taille_lot()):
+
+        if arbitre_id != arbitre_courant:
+            if cumul_arbitre is not None:
+                yield from cumul_arbitre.lignes(base_arbitre)
+            arbitre_courant, cumul_arbitre = arbitre_id, _Cumul()
+            base_arbitre = dict(vide, ligne='total_arbitre', ligue=ligue_nom or '', arbitre_id=arbitre_id,
+                                arbitre=f'{prenom} {nom}', cin=cin or '', grade=grade or '')
+            if ligue_id_arbitre != ligue_courante or cumul_ligue is None:
+                if cumul_ligue is not None:
+                    yield from cumul_ligue.lignes(base_ligue)
+                ligue_courante, cumul_ligue = ligue_id_arbitre, _Cumul()
+                base_ligue = dict(vide, ligne='total_ligue', ligue=ligue_nom or '')
+
+        if statut == 'confirmed' and indemnite is not None:
+            montant, devise = indemnite, devise_indemnite
+        else:
+            montant, devise = None, ''
+            cle = tarification.cle_tarif_valeurs(competition, division, type_match, type_designation)
+            tarif = table_tarifs.tarification(*cle, jour=match_date) if cle else None
+            if tarif is not None:
+                montant, devise = tarif.tarif, tarif.devise
+
+        for cumul in (cumul_arbitre, cumul_ligue, cumul_general):
+            cumul.ajouter(montant, devise)
+        if detail:
+            yield dict(base_arbitre, ligne='designation', date=match_date.isoformat(),
+                       match=f'{domicile} vs {exterieur}', type_designation=type_designation,
+                       nb_designations=1, non_tarifees=0 if montant is not None else 1,
+                       montant=montant if montant is not None else '', devise=devise)
+
+    if cumul_arbitre is not None:
+        yield from cumul_arbitre.lignes(base_arbitre)
+        yield from cumul_ligue.lignes(base_ligue)
+    yield from cumul_general.lignes(dict(vide, ligne='total_general'))
+
+
+class _Tampon:
+    """Pseudo-fichier : csv.writer renvoie la ligne écrite au lieu de la stocker"""
+
+    def write(self, valeur):
+        return valeur
+
+
+def flux_csv(lignes):
+    """Relevé en CSV (séparateur ';', BOM pour Excel), ligne par ligne"""
+    writer = csv.writer(_Tampon(), delimiter=';')
+    yield '\ufeff' + writer.writerow(COLONNES)
+    for ligne in lignes:
+        yield writer.writerow([ligne[colonne] for colonne in COLONNES])
+
+
+def flux_xlsx(lignes, taille_bloc=64 * 1024):
+    """
+    Relevé en XLSX : classeur en mode write_only (lignes écrites au fil de
+    l'eau), puis fichier temporaire relu par blocs
+    """
+    if not OPENPYXL_AVAILABLE:
+        raise RuntimeError("openpyxl est requis pour l'export XLSX")
+
+    classeur = Workbook(write_only=True)
+    feuille = classeur.create_sheet('Relevé')
+    feuille.append(COLONNES)
+    for ligne in lignes:
+        feuille.append([
+            float(ligne[colonne]) if isinstance(ligne[colonne], Decimal) else ligne[colonne]
+            for colonne in COLONNES
+        ])
+
+    fichier = tempfile.TemporaryFile()
+    classeur.save(fichier)
+    fichier.seek(0)
+    try:
+        while True:
+            bloc = fichier.read(taille_bloc)
+            if not bloc:
+                break
+            yield bloc
+    finally:
+        fichier.close()
@@ -0,0 +1,265 @@
+"""
+Proposition automatique des désignations d'une journée
+
+Chaque poste à pourvoir (match, type de désignation) est affecté à un arbitre
+disponible en minimisant un coût total (affectation de coût minimal,
+algorithme hongrois par plus courts chemins augmentants, vectorisé NumPy).
+
+Contraintes (coût interdit) :
+- grade de l'arbitre ≥ TypeMatch.grade_minimum ;
+- arbitre libre ce jour-là (excuse acceptée ou désignation active, voir
+  accounts/disponibilites.py) ; un arbitre reçoit au plus un poste par jour ;
+- postes d'arbitre principal / 4ème arbitre / VAR réservés au rôle "arbitre".
+
+Coûts (pondérations réglables dans les settings) :
+- charge de la saison (désignations actives + postes déjà proposés) ;
+- déplacement : ville du stade absente du nom de la ligue de l'arbitre ;
+- surclassement : grade très supérieur au minimum requis ;
+- assistant confié à un arbitre de rôle "arbitre".
+
+Le résultat reprend le format de designations/bulk/ : les planificateurs le
+relisent puis le publient par ce chemin.
+"""
+import logging
+import time as chrono
+
+from django.conf import settings
+from django.db.models import Count, Q
+
+from accounts import disponibilites
+from accounts.models import Arbitre
+from .models import Designation
+from .referentiel import normaliser_nom
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+ROLES_PAR_DEFAUT = ['arbitre_principal', 'arbitre_assistant1', 'arbitre_assistant2', 'quatrieme_arbitre']
+ROLES_ASSISTANT = {'arbitre_assistant1', 'arbitre_assistant2', 'arbitre_assistant_video'}
+
+# Coût d'un poste laissé vacant, et d'une affectation interdite (toujours pire)
+COUT_NON_POURVU = 1e6
+COUT_INTERDIT = 1e9
+
+
+def _poids(nom, defaut):
+    return float(getattr(settings, 'PLANIFICATION_POIDS', {}).get(nom, defaut))
+
+
+def affectation_cout_minimal(couts):
+    """
+    Affectation de coût minimal d'une matrice rectangulaire (lignes ≤ colonnes)
+
+    Plus courts chemins augmentants avec potentiels (Jonker-Volgenant) ; la
+    relaxation de chaque étape est vectorisée sur toutes les colonnes.
+
+    Returns:
+        tableau : colonne affectée à chaque ligne
+    """
+    n, m = couts.shape
+    if n > m:
+        raise ValueError('La matrice doit avoir au moins autant de colonnes que de lignes')
+
+    u = np.zeros(n)
+    v = np.zeros(m)
+    ligne_de_colonne = np.full(m, -1, dtype=np.int64)
+    colonne_de_ligne = np.full(n, -1, dtype=np.int64)
+
+    for ligne_courante in range(n):
+        chemins = np.full(m, np.inf)
+        predecesseurs = np.full(m, -1, dtype=np.int64)
+        libres = np.ones(m, dtype=bool)
+        lignes_visitees = []
+        ligne = ligne_courante
+        minimum = 0.0
+        puits = -1
+
+        while puits == -1:
+            lignes_visitees.append(ligne)
+            reduits = minimum + couts[ligne] - u[ligne] - v
+            meilleurs = libres & (reduits < chemins)
+            chemins[meilleurs] = reduits[meilleurs]
+            predecesseurs[meilleurs] = ligne
+
+            candidats = np.where(libres, chemins, np.inf)
+            colonne = int(np.argmin(candidats))
+            minimum = candidats[colonne]
+            if ligne_de_colonne[colonne] != -1:
+                # À coût égal, préférer une colonne libre : le chemin s'arrête là
+                egales = np.flatnonzero((candidats == minimum) & (ligne_de_colonne == -1))
+                if egales.size:
+                    colonne = int(egales[0])
+            libres[colonne] = False
+            if ligne_de_colonne[colonne] == -1:
+                puits = colonne
+            else:
+                ligne = ligne_de_colonne[colonne]
+
+        # Mise à jour des potentiels
+        u[ligne_courante] += minimum
+        for ligne in lignes_visitees[1:]:
+            u[ligne] += minimum - chemins[colonne_de_ligne[ligne]]
+        visitees = ~libres
+        v[visitees] -= minimum - chemins[visitees]
+
+        # Augmentation le long du chemin trouvé
+        colonne = puits
+        while True:
+            ligne = predecesseurs[colonne]
+            ligne_de_colonne[colonne] = ligne
+            colonne_de_ligne[ligne], colonne = colonne, colonne_de_ligne[ligne]
+            if ligne == ligne_courante:
+                break
+
+    return colonne_de_ligne
+
+
+def _matrice_couts(postes, pool, charges):
+    """
+    Matrice postes x (arbitres + postes vacants)
+
+    Args:
+        postes: liste de dicts {grade_min, assistant, ville}
+        pool: dict de tableaux NumPy par attribut d'arbitre
+        charges: tableau des charges courantes des arbitres du pool
+    """
+    nb_postes = len(postes)
+    grade_min = np.array([poste['grade_min'] for poste in postes])[:, None]
+    assistant = np.array([poste['assistant'] for poste in postes])[:, None]
+
+    couts = np.repeat((_poids('charge', 1.0) * charges)[None, :], nb_postes, axis=0)
+    couts += _poids('surclassement', 0.5) * np.clip(pool['grade'][None, :] - grade_min - 1, 0, None)
+    couts += np.where(assistant & ~pool['assistant'][None, :], _poids('role', 2.0), 0.0)
+
+    # Déplacement : une comparaison par ville distincte
+    poids_deplacement = _poids('deplacement', 3.0)
+    villes = {poste['ville'] for poste in postes if poste['ville']}
+    for ville in villes:
+        hors_region = np.array([ville not in ligue for ligue in pool['ligue']])
+        lignes = np.array([poste['ville'] == ville for poste in postes])
+        couts[lignes] += poids_deplacement * hors_region[None, :]
+
+    interdit = (pool['grade'][None, :] < grade_min) | (~assistant & pool['assistant'][None, :])
+    couts[interdit] = COUT_INTERDIT
+
+    vacants = np.full((nb_postes, nb_postes), COUT_NON_POURVU)
+    return np.hstack([couts, vacants]), interdit
+
+
+def proposer_designations(matches, roles=None, arbitres=None):
+    """
+    Proposer les désignations des postes non pourvus d'un ensemble de matchs
+
+    Args:
+        matches: QuerySet de Match
+        roles: types de désignation à pourvoir (défaut : trio arbitral + 4ème arbitre)
+        arbitres: QuerySet d'Arbitre candidats (défaut : tous les arbitres actifs)
+
+    Returns:
+        dict {designations, non_pourvus, cout_total, duree_ms}
+    """
+    if not NUMPY_AVAILABLE:
+        raise RuntimeError('NumPy est requis pour la planification automatique')
+
+    debut_chrono = chrono.monotonic()
+    roles = roles or ROLES_PAR_DEFAUT
+    arbitres = arbitres if arbitres is not None else Arbitre.objects.all()
+    arbitres = arbitres.filter(is_active=True)
+
+    matches = list(matches.select_related('type_match', 'stadium_ref').order_by('match_date', 'match_time', 'id'))
+    if not matches:
+        return {'designations': [], 'non_pourvus': [], 'cout_total': 0, 'duree_ms': 0}
+
+    # Postes déjà pourvus par une désignation active
+    pourvus = set(Designation.objects.filter(
+        match__in=matches, status__in=Designation.ACTIVE_STATUSES
+    ).values_list('match_id', 'type_designation'))
+
+    # Pool d'arbitres et charge de la saison, en deux requêtes
+    saisons = {disponibilites.saison_de(match.match_date) for match in matches}
+    filtre_saison = Q()
+    for saison in saisons:
+        filtre_saison |= Q(designations__match__match_date__range=(
+            disponibilites.debut_saison(saison), disponibilites.fin_saison(saison)
+        ))
+    lignes = list(arbitres.annotate(charge=Count(
+        'designations',
+        filter=filtre_saison & Q(designations__status__in=Designation.ACTIVE_STATUSES)
+    )).order_by('id').values_list('id', 'grade', 'role', 'ligue__nom', 'charge'))
+
+    ordre_grades = {grade: index for index, grade in enumerate(Arbitre.GRADES_ORDRE)}
+    pool = {
+        'id': np.array([ligne[0] for ligne in lignes], dtype=np.int64),
+        'grade': np.array([ordre_grades.get(ligne[1], 0) for ligne in lignes]),
+        'assistant': np.array([ligne[2] == 'assistant' for ligne in lignes], dtype=bool),
+        'ligue': [normaliser_nom(ligne[3]) for ligne in lignes],
+    }
+    charges = np.array([ligne[4] for ligne in lignes], dtype=float)
+    position = {arbitre_id: index for index, arbitre_id in enumerate(pool['id'].tolist())}
+
+    propositions, non_pourvus, cout_total = [], [], 0.0
+    par_jour = {}
+    for match in matches:
+        par_jour.setdefault(match.match_date, []).append(match)
+
+    for jour, matches_jour in par_jour.items():
+        postes = []
+        for match in matches_jour:
+            grade_min = ordre_grades.get(match.type_match.grade_minimum, 0) if match.type_match else 0
+            ville = normaliser_nom(match.stadium_ref.ville) if match.stadium_ref else ''
+            for role in roles:
+                if (match.id, role) not in pourvus:
+                    postes.append({
+                        'match': match, 'role': role, 'grade_min': grade_min,
+                        'assistant': role in ROLES_ASSISTANT, 'ville': ville,
+                    })
+        if not postes:
+            continue
+
+        # Arbitres déjà occupés ce jour-là (excuse ou désignation) : exclus
+        occupes = disponibilites.arbitres_occupes(arbitres, [jour])
+        disponibles = np.array([arbitre_id not in occupes for arbitre_id in pool['id'].tolist()], dtype=bool)
+        indices = np.flatnonzero(disponibles)
+        pool_jour = {
+            'id': pool['id'][indices],
+            'grade': pool['grade'][indices],
+            'assistant': pool['assistant'][indices],
+            'ligue': [pool['ligue'][index] for index in indices],
+        }
+
+        couts, interdit = _matrice_couts(postes, pool_jour, charges[indices])
+        affectation = affectation_cout_minimal(couts)
+
+        for index_poste, colonne in enumerate(affectation.tolist()):
+            poste = postes[index_poste]
+            if colonne >= len(indices) or interdit[index_poste, colonne]:
+                non_pourvus.append({
+                    'match': poste['match'].id,
+                    'type_designation': poste['role'],
+                    'raison': 'Aucun arbitre disponible satisfaisant les contraintes'
+                })
+                continue
+            arbitre_id = int(pool_jour['id'][colonne])
+            cout_total += float(couts[index_poste, colonne])
+            # Équilibrage : la charge compte pour les jours suivants
+            charges[position[arbitre_id]] += 1
+            propositions.append({
+                'match': poste['match'].id,
+                'arbitre': arbitre_id,
+                'type_designation': poste['role'],
+            })
+
+    duree_ms = int((chrono.monotonic() - debut_chrono) * 1000)
+    logger.info(f'Planification: {len(propositions)} proposition(s), {len(non_pourvus)} poste(s) vacant(s) en {duree_ms} ms')
+    return {
+        'designations': propositions,
+        'non_pourvus': non_pourvus,
+        'cout_total': round(cout_total, 2),
+        'duree_ms': duree_ms,
+    }
@@ -0,0 +1,148 @@
+"""
+Référentiel des équipes et des stades
+
+Les noms saisis librement ("Espérance", "EST", "esperance sportive de tunis")
+sont rattachés à une entité canonique (Team / Stadium) :
+1. nom normalisé identique (sans accents, casse ni ponctuation) ;
+2. alias enregistré de l'entité ;
+3. sinon, création d'une nouvelle entité.
+
+Un nom seulement proche d'une entité existante (difflib, au-dessus de
+REFERENTIEL_SEUIL_SIMILARITE) n'est jamais rattaché automatiquement :
+"CA Bizertin" / "CS Bizertin" ou "… U17" / "… U19" sont des clubs différents.
+La nouvelle entité est signalée comme doublon possible de la plus proche
+(`doublon_possible`) et un administrateur confirme la fusion ou l'écarte.
+Le nom saisi dans le match n'est jamais réécrit.
+"""
+import difflib
+import re
+import unicodedata
+
+from django.conf import settings
+
+
+def normaliser_nom(nom):
+    """Forme normalisée d'un nom : minuscules, sans accents ni ponctuation"""
+    if not nom:
+        return ''
+    nom = unicodedata.normalize('NFKD', str(nom))
+    nom = ''.join(c for c in nom if not unicodedata.combining(c))
+    nom = re.sub(r'[^a-z0-9]+', ' ', nom.lower())
+    return ' '.join(nom.split())
+
+
+def _seuil():
+    return getattr(settings, 'REFERENTIEL_SEUIL_SIMILARITE', 0.88)
+
+
+def rapprocher(nom_normalise, candidats):
+    """
+    Candidat dont le nom normalisé ou un alias correspond exactement
+
+    Args:
+        candidats: liste de (identifiant, [noms normalisés connus])
+
+    Returns:
+        identifiant du candidat retenu, ou None
+    """
+    if not nom_normalise:
+        return None
+    for identifiant, noms in candidats:
+        if nom_normalise in noms:
+            return identifiant
+    return None
+
+
+def similaire(nom_normalise, candidats, seuil=None):
+    """
+    Candidat le plus proche d'un nom normalisé (à soumettre à la revue)
+
+    Args:
+        candidats: liste de (identifiant, [noms normalisés connus])
+
+    Returns:
+        identifiant du candidat le plus proche au-dessus du seuil, ou None
+    """
+    if not nom_normalise:
+        return None
+    seuil = _seuil() if seuil is None else seuil
+    meilleur, meilleur_score = None, seuil
+    matcher = difflib.SequenceMatcher(b=nom_normalise)
+    for identifiant, noms in candidats:
+        for nom in noms:
+            matcher.set_seq1(nom)
+            # quick_ratio est une borne supérieure peu coûteuse
+            if matcher.real_quick_ratio() < meilleur_score or matcher.quick_ratio() < meilleur_score:
+                continue
+            score = matcher.ratio()
+            if score >= meilleur_score:
+                meilleur, meilleur_score = identifiant, score
+    return meilleur
+
+
+def _resoudre(model, nom):
+    nom = (nom or '').strip()
+    nom_normalise = normaliser_nom(nom)
+    if not nom_normalise:
+        return None
+
+    # Correspondance exacte indexée
+    entite = model.objects.filter(nom_normalise=nom_normalise).first()
+    if entite is not None:
+        return entite
+
+    candidats = [
+        (pk, [normalise] + [normaliser_nom(alias) for alias in (aliases or [])])
+        for pk, normalise, aliases in model.objects.values_list('pk', 'nom_normalise', 'aliases')
+    ]
+    pk = rapprocher(nom_normalise, candidats)
+    if pk is not None:
+        return model.objects.get(pk=pk)
+
+    entite, _ = model.objects.get_or_create(
+        nom_normalise=nom_normalise,
+        defaults={'nom': nom, 'doublon_possible_id': similaire(nom_normalise, candidats)}
+    )
+    return entite
+
+
+def fusionner(entite, doublon):
+    """
+    Confirmer un doublon : rattacher ses matchs à `entite` et le supprimer
+
+    Les noms du doublon deviennent des alias de `entite` ; le texte saisi dans
+    les matchs est conservé.
+    """
+    from django.db import transaction
+    from .models import Match, Team
+
+    if entite.pk == doublon.pk:
+        return entite
+    with transaction.atomic():
+        if isinstance(entite, Team):
+            Match.objects.filter(home_team_ref=doublon).update(home_team_ref=entite)
+            Match.objects.filter(away_team_ref=doublon).update(away_team_ref=entite)
+        else:
+            Match.objects.filter(stadium_ref=doublon).update(stadium_ref=entite)
+        aliases = list(entite.aliases)
+        for variante in [doublon.nom] + list(doublon.aliases):
+            if variante != entite.nom and variante not in aliases:
+                aliases.append(variante)
+        entite.aliases = aliases
+        if entite.doublon_possible_id == doublon.pk:
+            entite.doublon_possible = None
+        entite.save(update_fields=['aliases', 'doublon_possible'])
+        doublon.delete()
+    return entite
+
+
+def resoudre_equipe(nom):
+    """Équipe canonique correspondant à un nom saisi (créée si inconnue)"""
+    from .models import Team
+    return _resoudre(Team, nom)
+
+
+def resoudre_stade(nom):
+    """Stade canonique correspondant à un nom saisi (créé si inconnu)"""
+    from .models import Stadium
+    return _resoudre(Stadium, nom)
@@ -0,0 +1,250 @@
+"""
+Recherche unifiée des matchs
+
+Filtres composables (type, catégorie, statut, équipe, stade, période, arbitre,
+ligue), clés de tri en liste blanche et pagination par curseur. Chaque filtre
+porte sur une colonne couverte par un index composite (colonne, match_date)
+déclaré sur Match ; le tri par date s'appuie sur (match_date, match_time).
+"""
+import json
+from datetime import datetime
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import CursorPagination
+
+from .models import Match, Designation
+
+# Clés de tri autorisées -> ordre SQL (toujours complété par l'id pour être total)
+TRIS = {
+    'date': ('match_date', 'match_time', 'id'),
+    '-date': ('-match_date', '-match_time', '-id'),
+    'created': ('created_at', 'id'),
+    '-created': ('-created_at', '-id'),
+}
+TRI_PAR_DEFAUT = '-date'
+
+STATUTS = {code for code, _ in Match.STATUS_CHOICES}
+
+
+class RechercheInvalide(ValueError):
+    """Paramètre de recherche invalide (message destiné au client)"""
+
+
+class MatchCursorPagination(CursorPagination):
+    """
+    Pagination par curseur sur un tri total : coût constant quelle que soit la page
+
+    CursorPagination ne place le curseur que sur la première colonne du tri
+    et complète par un décalage lorsque plusieurs lignes la partagent (une
+    journée chargée). Ici la position encode toutes les colonnes du tri
+    (date, heure, id) et la page suivante est obtenue par comparaison de clés :
+    (a, b, id) > (x, y, z) s'écrit a > x OU (a = x ET (b > y OU (b = y ET id > z))).
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    ordering = TRIS[TRI_PAR_DEFAUT]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(request, queryset, view)
+
+        self.cursor = self.decode_cursor(request)
+        if self.cursor is None:
+            (offset, reverse, current_position) = (0, False, None)
+        else:
+            (offset, reverse, current_position) = self.cursor
+
+        if reverse:
+            queryset = queryset.order_by(*_inverser(self.ordering))
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if current_position is not None:
+            queryset = queryset.filter(self._apres(current_position, reverse))
+
+        # Les positions sont uniques (id) : le décalage reste nul
+        results = list(queryset[offset:offset + self.page_size + 1])
+        self.page = list(results[:self.page_size])
+
+        if len(results) > len(self.page):
+            has_following_position = True
+            following_position = self._get_position_from_instance(results[-1], self.ordering)
+        else:
+            has_following_position = False
+            following_position = None
+
+        if reverse:
+            self.page = list(reversed(self.page))
+            self.has_next = (current_position is not None) or (offset > 0)
+            self.has_previous = has_following_position
+            if self.has_next:
+                self.next_position = current_position
+            if self.has_previous:
+                self.previous_position = following_position
+        else:
+            self.has_next = has_following_position
+            self.has_previous = (current_position is not None) or (offset > 0)
+            if self.has_next:
+                self.next_position = following_position
+            if self.has_previous:
+                self.previous_position = current_position
+
+        if (self.has_previous or self.has_next) and self.template is not None:
+            self.display_page_controls = True
+
+        return self.page
+
+    def _apres(self, position, reverse):
+        """Lignes situées après la position dans l'ordre de parcours"""
+        try:
+            valeurs = json.loads(position)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(valeurs, list) or len(valeurs) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+
+        condition = None
+        egalites = {}
+        for champ, valeur in zip(self.ordering, valeurs):
+            nom = champ.lstrip('-')
+            operateur = 'lt' if champ.startswith('-') != reverse else 'gt'
+            suivante = Q(**egalites, **{f'{nom}__{operateur}': valeur})
+            condition = suivante if condition is None else condition | suivante
+            egalites[nom] = valeur
+        return condition
+
+    def _get_position_from_instance(self, instance, ordering):
+        valeurs = []
+        for champ in ordering:
+            valeur = getattr(instance, champ.lstrip('-'))
+            valeurs.append(valeur if isinstance(valeur, int) else str(valeur))
+        return json.dumps(valeurs, separators=(',', ':'))
+
+
+def _inverser(ordering):
+    return tuple(champ[1:] if champ.startswith('-') else f'-{champ}' for champ in ordering)
+
+
+def _date(valeur, nom):
+    try:
+        return datetime.strptime(valeur, '%Y-%m-%d').date()
+    except ValueError:
+        raise RechercheInvalide(f'Format de date invalide pour {nom}. Utilisez YYYY-MM-DD')
+
+
+def _entier(valeur, nom):
+    try:
+        return int(valeur)
+    except (TypeError, ValueError):
+        raise RechercheInvalide(f'Paramètre {nom} invalide')
+
+
+def _liste(valeur):
+    return [item.strip() for item in str(valeur).split(',') if item.strip()]
+
+
+def rechercher_matchs(params, user=None):
+    """
+    Construire la requête de recherche à partir des paramètres
+
+    Args:
+        params: dict-like (request.GET) - type, categorie, status, team, stadium,
+            date_from, date_to, referee, ligue, mine, ordering
+        user: utilisateur connecté (pour mine=true)
+
+    Returns:
+        (queryset, ordering)
+
+    Raises:
+        RechercheInvalide si un paramètre est invalide
+    """
+    matches = Match.objects.all()
+
+    type_match = params.get('type')
+    if type_match:
+        # Code (L1, C1, ...) ou identifiant
+        if type_match.isdigit():
+            matches = matches.filter(type_match_id=int(type_match))
+        else:
+            matches = matches.filter(type_match__code=type_match)
+
+    categorie = params.get('categorie')
+    if categorie:
+        if categorie.isdigit():
+            matches = matches.filter(categorie_id=int(categorie))
+        else:
+            matches = matches.filter(categorie__code=categorie)
+
+    statuts = _liste(params.get('status') or '')
+    if statuts:
+        inconnus = set(statuts) - STATUTS
+        if inconnus:
+            raise RechercheInvalide(f'Statut(s) inconnu(s): {", ".join(sorted(inconnus))}')
+        matches = matches.filter(status__in=statuts)
+
+    team = params.get('team')
+    if team:
+        team_id = _entier(team, 'team')
+        matches = matches.filter(Q(home_team_ref_id=team_id) | Q(away_team_ref_id=team_id))
+
+    stadium = params.get('stadium')
+    if stadium:
+        matches = matches.filter(stadium_ref_id=_entier(stadium, 'stadium'))
+
+    date_from = params.get('date_from')
+    if date_from:
+        matches = matches.filter(match_date__gte=_date(date_from, 'date_from'))
+
+    date_to = params.get('date_to')
+    if date_to:
+        matches = matches.filter(match_date__lte=_date(date_to, 'date_to'))
+
+    # Filtres sur les officiels : sous-requête sur les désignations actives
+    # (index arbitre/statut), sans jointure multipliant les lignes
+    officiels = Q()
+    referee = params.get('referee') or params.get('referee_id')
+    if referee:
+        officiels &= Q(arbitre_id=_entier(referee, 'referee'))
+    if str(params.get('mine', '')).lower() in ['1', 'true', 'oui'] and user is not None:
+        officiels &= Q(arbitre_id=user.pk)
+    ligue = params.get('ligue')
+    if ligue:
+        officiels &= Q(arbitre__ligue_id=_entier(ligue, 'ligue'))
+    if officiels:
+        matches = matches.filter(id__in=Designation.objects.filter(
+            officiels, status__in=Designation.ACTIVE_STATUSES
+        ).values('match_id'))
+
+    ordering = params.get('ordering') or TRI_PAR_DEFAUT
+    if ordering not in TRIS:
+        raise RechercheInvalide(f'Tri invalide. Valeurs possibles: {", ".join(TRIS)}')
+
+    matches = matches.select_related('type_match', 'categorie', 'referee').prefetch_related(
+        'designations__arbitre'
+    )
+    return matches, TRIS[ordering]
+
+
+def paginer_matchs(request, matches, ordering):
+    """
+    Paginer par curseur
+
+    Returns:
+        (page, pagination) où pagination contient les liens next / previous
+    """
+    paginator = MatchCursorPagination()
+    paginator.ordering = ordering
+    page = paginator.paginate_queryset(matches, request)
+    return page, {
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+        'page_size': paginator.get_page_size(request),
+        'ordering': request.GET.get('ordering') or TRI_PAR_DEFAUT,
+    }
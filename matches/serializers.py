@@ -2,22 +2,51 @@
 Serializers pour l'API des matchs
 """
 from rest_framework import serializers
-from .models import Match, MatchEvent, TypeMatch, Categorie
+from .models import Match, MatchEvent, TypeMatch, Categorie, Team, Stadium
 from .models import Designation, ExcuseArbitre, TarificationMatch
 
 class TypeMatchSerializer(serializers.ModelSerializer):
     """Serializer pour les types de match"""
+    tarif_competition = serializers.ChoiceField(
+        choices=TarificationMatch.COMPETITION_CHOICES, required=False, allow_blank=True
+    )
+    tarif_type_match = serializers.ChoiceField(
+        choices=TarificationMatch.TYPE_MATCH_CHOICES, required=False, allow_blank=True
+    )
     
     class Meta:
         model = TypeMatch
-        fields = ['id', 'nom', 'code', 'description', 'is_active', 'ordre']
+        fields = [
+            'id', 'nom', 'code', 'description', 'is_active', 'ordre', 'grade_minimum',
+            'tarif_competition', 'tarif_type_match'
+        ]
 
 class CategorieSerializer(serializers.ModelSerializer):
     """Serializer pour les catégories"""
+    tarif_division = serializers.ChoiceField(
+        choices=TarificationMatch.DIVISION_CHOICES, required=False, allow_blank=True
+    )
     
     class Meta:
         model = Categorie
-        fields = ['id', 'nom', 'code', 'age_min', 'age_max', 'description', 'is_active', 'ordre']
+        fields = [
+            'id', 'nom', 'code', 'age_min', 'age_max', 'description', 'is_active', 'ordre',
+            'tarif_division'
+        ]
+
+class TeamSerializer(serializers.ModelSerializer):
+    """Serializer pour les équipes"""
+    
+    class Meta:
+        model = Team
+        fields = ['id', 'nom', 'aliases', 'ville', 'latitude', 'longitude', 'is_active']
+
+class StadiumSerializer(serializers.ModelSerializer):
+    """Serializer pour les stades"""
+    
+    class Meta:
+        model = Stadium
+        fields = ['id', 'nom', 'aliases', 'ville', 'latitude', 'longitude', 'is_active']
 
 class MatchEventSerializer(serializers.ModelSerializer):
     """Serializer pour les événements de match"""
@@ -29,10 +58,104 @@ class MatchEventSerializer(serializers.ModelSerializer):
             'minute', 'description', 'created_at'
         ]
 
-class MatchSerializer(serializers.ModelSerializer):
+def enregistrer_rencontre(validated_data, arbitre):
+    """
+    Enregistrer un match saisi par un arbitre
+    
+    La rencontre (date, heure, équipes) n'existe qu'une fois : si elle est déjà
+    enregistrée, l'arbitre y est simplement rattaché par une désignation
+    confirmée, avec le rôle indiqué.
+    """
+    from .referentiel import resoudre_equipe
+    
+    role = validated_data.pop('role', None) or 'arbitre_principal'
+    
+    # Équipes du référentiel (nom normalisé ou alias enregistré) : une
+    # variante d'orthographe connue désigne la même rencontre. Le nom saisi
+    # est conservé tel quel.
+    home_team = resoudre_equipe(validated_data['home_team'])
+    away_team = resoudre_equipe(validated_data['away_team'])
+    validated_data['home_team_ref'] = home_team
+    validated_data['away_team_ref'] = away_team
+    
+    match = None
+    if home_team is not None and away_team is not None:
+        match = Match.objects.filter(
+            match_date=validated_data['match_date'],
+            match_time=validated_data['match_time'],
+            home_team_ref=home_team,
+            away_team_ref=away_team
+        ).order_by('pk').first()
+    if match is None:
+        match, _ = Match.objects.get_or_create(
+            match_date=validated_data.pop('match_date'),
+            match_time=validated_data.pop('match_time'),
+            home_team=validated_data.pop('home_team'),
+            away_team=validated_data.pop('away_team'),
+            defaults=dict(validated_data, role=role)
+        )
+    
+    designation = Designation.objects.filter(
+        match=match, arbitre=arbitre, type_designation=role
+    ).first()
+    if designation is None:
+        designation = Designation(
+            match=match,
+            arbitre=arbitre,
+            type_designation=role,
+            status='confirmed',
+            notification_envoyee=True
+        )
+        # L'arbitre a saisi lui-même le match : pas de notification de désignation
+        designation._skip_notification = True
+        designation.save()
+    
+    match.designation = designation
+    return match
+
+class OfficialsMixin:
+    """
+    Officiels du match servis depuis les désignations
+    
+    Lorsque le match est lu à travers la désignation d'un arbitre (attribut
+    `designation` posé par la vue), `referee`, `referee_name` et `role`
+    reprennent cette désignation, comme l'ancien modèle une ligne par officiel.
+    """
+    
+    def get_referee_name(self, obj):
+        for designation in obj.get_officials():
+            if designation.type_designation == 'arbitre_principal':
+                return designation.arbitre.get_full_name()
+        return obj.referee.get_full_name() if obj.referee else None
+    
+    def get_officials(self, obj):
+        return [
+            {
+                'designation_id': designation.id,
+                'arbitre': designation.arbitre_id,
+                'arbitre_name': designation.arbitre.get_full_name(),
+                'type_designation': designation.type_designation,
+                'type_designation_display': designation.get_type_designation_display(),
+                'status': designation.status
+            }
+            for designation in obj.get_officials()
+        ]
+    
+    def to_representation(self, obj):
+        data = super().to_representation(obj)
+        designation = getattr(obj, 'designation', None)
+        if designation is not None:
+            if 'referee' in data:
+                data['referee'] = designation.arbitre_id
+            data['referee_name'] = designation.arbitre.get_full_name()
+            data['role'] = designation.type_designation
+        return data
+
+class MatchSerializer(OfficialsMixin, serializers.ModelSerializer):
     """Serializer pour les matchs"""
     events = MatchEventSerializer(many=True, read_only=True)
-    referee_name = serializers.CharField(source='referee.get_full_name', read_only=True)
+    referee_name = serializers.SerializerMethodField()
+    officials = serializers.SerializerMethodField()
     type_match_info = TypeMatchSerializer(source='type_match', read_only=True)
     categorie_info = CategorieSerializer(source='categorie', read_only=True)
     score_display = serializers.ReadOnlyField()
@@ -43,18 +166,23 @@ class MatchSerializer(serializers.ModelSerializer):
         model = Match
         fields = [
             'id', 'type_match', 'categorie', 'type_match_info', 'categorie_info',
-            'stadium', 'match_date', 'match_time', 'home_team', 'away_team', 
+            'stadium', 'stadium_ref', 'match_date', 'match_time', 'home_team', 'away_team',
+            'home_team_ref', 'away_team_ref',
             'home_score', 'away_score', 'role', 'description', 'match_sheet', 'referee',
-            'referee_name', 'status', 'created_at', 'updated_at',
+            'referee_name', 'officials', 'status', 'created_at', 'updated_at',
             'match_report', 'incidents', 'events', 'score_display',
             'has_score', 'is_completed'
         ]
-        read_only_fields = ['id', 'created_at', 'updated_at', 'referee']
+        read_only_fields = [
+            'id', 'created_at', 'updated_at', 'referee',
+            'stadium_ref', 'home_team_ref', 'away_team_ref'
+        ]
+        # La rencontre existante est réutilisée (voir enregistrer_rencontre)
+        validators = []
     
     def create(self, validated_data):
         """Créer un nouveau match avec l'arbitre connecté"""
-        validated_data['referee'] = self.context['request'].user
-        return super().create(validated_data)
+        return enregistrer_rencontre(validated_data, self.context['request'].user)
 
 class MatchCreateSerializer(serializers.ModelSerializer):
     """Serializer pour la création de matchs"""
@@ -66,11 +194,12 @@ class MatchCreateSerializer(serializers.ModelSerializer):
             'match_time', 'home_team', 'away_team', 'home_score', 'away_score',
             'role', 'description', 'match_sheet'
         ]
+        # La rencontre existante est réutilisée (voir enregistrer_rencontre)
+        validators = []
     
     def create(self, validated_data):
         """Créer un nouveau match"""
-        validated_data['referee'] = self.context['request'].user
-        return super().create(validated_data)
+        return enregistrer_rencontre(validated_data, self.context['request'].user)
 
 class MatchUpdateSerializer(serializers.ModelSerializer):
     """Serializer pour la mise à jour des matchs"""
@@ -83,10 +212,24 @@ class MatchUpdateSerializer(serializers.ModelSerializer):
             'away_score', 'role', 'description', 'match_sheet', 'status',
             'match_report', 'incidents'
         ]
+    
+    def update(self, instance, validated_data):
+        """Le rôle est celui de l'arbitre connecté : il est porté par sa désignation"""
+        role = validated_data.pop('role', None)
+        request = self.context.get('request')
+        if role and request is not None:
+            designations = Designation.objects.filter(match=instance, arbitre=request.user)
+            if not designations.filter(type_designation=role).exists():
+                designation = designations.filter(status__in=Designation.ACTIVE_STATUSES).first()
+                if designation is not None:
+                    designation.type_designation = role
+                    designation._skip_notification = True
+                    designation.save(update_fields=['type_designation'])
+        return super().update(instance, validated_data)
 
-class MatchListSerializer(serializers.ModelSerializer):
+class MatchListSerializer(OfficialsMixin, serializers.ModelSerializer):
     """Serializer simplifié pour la liste des matchs"""
-    referee_name = serializers.CharField(source='referee.get_full_name', read_only=True)
+    referee_name = serializers.SerializerMethodField()
     type_match_nom = serializers.SerializerMethodField()
     categorie_nom = serializers.SerializerMethodField()
     score_display = serializers.ReadOnlyField()
@@ -119,9 +262,12 @@ class DesignationSerializer(serializers.ModelSerializer):
             'type_designation_display', 'status', 'status_display',
             'date_designation', 'date_reponse', 'commentaires',
             'raison_refus', 'notification_envoyee', 'date_notification',
-            'match_info'
+            'indemnite', 'devise_indemnite', 'match_info'
+        ]
+        read_only_fields = [
+            'id', 'date_designation', 'date_reponse', 'date_notification',
+            'indemnite', 'devise_indemnite'
         ]
-        read_only_fields = ['id', 'date_designation', 'date_reponse', 'date_notification']
     
     def get_match_info(self, obj):
         """Informations du match associé"""
@@ -138,11 +284,13 @@ class DesignationSerializer(serializers.ModelSerializer):
 
 class DesignationCreateSerializer(serializers.ModelSerializer):
     """Serializer pour la création de désignations"""
+    # Passer outre les conflits (double désignation, excuse acceptée)
+    force = serializers.BooleanField(write_only=True, required=False, default=False)
     
     class Meta:
         model = Designation
         fields = [
-            'match', 'arbitre', 'type_designation', 'commentaires'
+            'match', 'arbitre', 'type_designation', 'commentaires', 'force'
         ]
     
     def validate(self, data):
@@ -157,6 +305,16 @@ class DesignationCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError(
                 "Une désignation existe déjà pour cet arbitre et ce type sur ce match"
             )
+        
+        # Conflits de planning de l'arbitre (détail structuré dans self.conflicts)
+        self.conflicts = []
+        if not data.pop('force', False):
+            from .conflicts import conflits_designation
+            self.conflicts = conflits_designation(data['match'], data['arbitre'].pk)
+            if self.conflicts:
+                raise serializers.ValidationError(
+                    "L'arbitre a un conflit de planning pour ce match (force=true pour passer outre)"
+                )
         return data
 
 class DesignationUpdateSerializer(serializers.ModelSerializer):
@@ -252,7 +410,7 @@ class TarificationMatchSerializer(serializers.ModelSerializer):
             'id', 'competition', 'competition_display', 'division', 'division_display',
             'type_match', 'type_match_display', 'role', 'role_display',
             'tarif', 'tarif_formatted', 'devise', 'is_active',
-            'created_at', 'updated_at'
+            'valid_from', 'valid_to', 'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
 
@@ -270,7 +428,7 @@ class TarificationMatchListSerializer(serializers.ModelSerializer):
         model = TarificationMatch
         fields = [
             'id', 'competition_display', 'division_display', 'type_match_display',
-            'role_display', 'tarif_formatted', 'is_active'
+            'role_display', 'tarif_formatted', 'is_active', 'valid_from', 'valid_to'
         ]
 
 
@@ -281,30 +439,69 @@ class TarificationMatchCreateSerializer(serializers.ModelSerializer):
         model = TarificationMatch
         fields = [
             'competition', 'division', 'type_match', 'role',
-            'tarif', 'devise', 'is_active'
+            'tarif', 'devise', 'is_active', 'valid_from', 'valid_to'
         ]
     
     def validate(self, data):
         """Validation personnalisée"""
-        # Vérifier l'unicité de la combinaison
-        if TarificationMatch.objects.filter(
+        from django.db.models import Q
+        from django.utils import timezone
+        
+        valid_from = data.get('valid_from') or timezone.localdate()
+        valid_to = data.get('valid_to')
+        if valid_to and valid_to < valid_from:
+            raise serializers.ValidationError("La date de fin doit être postérieure à la date de début.")
+        
+        # Pas de chevauchement avec une autre version de la même combinaison
+        chevauchement = TarificationMatch.objects.filter(
             competition=data['competition'],
             division=data.get('division'),
             type_match=data['type_match'],
             role=data['role']
-        ).exists():
+        ).filter(Q(valid_to__isnull=True) | Q(valid_to__gte=valid_from))
+        if valid_to:
+            chevauchement = chevauchement.filter(valid_from__lte=valid_to)
+        if chevauchement.exists():
             raise serializers.ValidationError(
-                "Une tarification existe déjà pour cette combinaison de compétition, division, type de match et rôle."
+                "Une tarification existe déjà sur cette période pour cette combinaison de compétition, division, type de match et rôle."
             )
         return data
 
 
 class TarificationMatchUpdateSerializer(serializers.ModelSerializer):
-    """Serializer pour la mise à jour de tarifications de matchs"""
+    """
+    Serializer pour la mise à jour de tarifications de matchs
+    
+    Un changement de tarif ou de devise crée une nouvelle version applicable
+    à partir de valid_from (défaut aujourd'hui) ; les autres champs sont
+    modifiés sur place.
+    """
+    valid_from = serializers.DateField(write_only=True, required=False)
     
     class Meta:
         model = TarificationMatch
         fields = [
-            'tarif', 'devise', 'is_active'
+            'tarif', 'devise', 'is_active', 'valid_from'
         ]
+    
+    def validate_valid_from(self, value):
+        """La nouvelle version doit commencer pendant la période de la version modifiée"""
+        if value < self.instance.valid_from or (self.instance.valid_to and value > self.instance.valid_to):
+            raise serializers.ValidationError(
+                "La nouvelle version doit commencer pendant la période de la version modifiée."
+            )
+        return value
+    
+    def update(self, instance, validated_data):
+        valid_from = validated_data.pop('valid_from', None)
+        nouvelles_valeurs = {
+            champ: validated_data.pop(champ) for champ in ['tarif', 'devise']
+            if champ in validated_data and validated_data[champ] != getattr(instance, champ)
+        }
+        if nouvelles_valeurs:
+            try:
+                instance = instance.nouvelle_version(valid_from=valid_from, **nouvelles_valeurs)
+            except ValueError as e:
+                raise serializers.ValidationError(str(e))
+        return super().update(instance, validated_data)
 
@@ -1,146 +1,170 @@
 """
 Signaux Django pour la gestion automatique des notifications
 """
-from django.db.models.signals import post_save, post_delete
+from django.db.models.signals import pre_save, post_save, post_delete
 from django.dispatch import receiver
-from django.utils import timezone
-from .models import Designation, Match
-from notifications.services import push_service
+from .models import Designation, Match, TarificationMatch
+from . import tarification
+from .statistics import invalidate_match_statistics, invalidate_designation_statistics
+from .excuse_heatmap import invalidate_excuse_heatmap
+from .transitions import designation_status_changed
+from accounts.models import Arbitre, ExcuseArbitre
+from accounts.transitions import excuse_status_changed, signaler_changement_sauvegarde
+from notifications import outbox
 
 @receiver(post_save, sender=Designation)
 def send_designation_notification(sender, instance, created, **kwargs):
     """
-    Envoyer une notification push automatiquement lors de la création d'une désignation
+    Mettre en file la notification FCM d'une désignation créée
+
+    Le message est écrit dans l'outbox dans la même transaction que la
+    désignation ; les workers l'envoient puis marquent la désignation notifiée.
     """
+    if getattr(instance, '_skip_notification', False):
+        return
+    
     if created and instance.status in ['proposed', 'accepted', 'confirmed']:
-        try:
-            print(f"🔔 Désignation créée pour {instance.arbitre.get_full_name()}")
-            
-            # Préparer les informations du match
-            match_info = {
-                'id': instance.match.id,
-                'home_team': instance.match.home_team,
-                'away_team': instance.match.away_team,
-                'date': instance.match.match_date.strftime('%d/%m/%Y'),
-                'time': instance.match.match_time.strftime('%H:%M'),
-                'stade': instance.match.stadium,
-                'type_match': instance.match.type_match.nom if instance.match.type_match else "Non défini",
-                'categorie': instance.match.categorie.nom if instance.match.categorie else "Non définie",
+        match = instance.match
+        outbox.mettre_en_file(
+            'fcm',
+            instance.arbitre,
+            title="🏆 Nouvelle Désignation d'Arbitrage",
+            body=f"Vous avez été désigné pour le match {match.home_team} vs {match.away_team}",
+            data={
+                'type': 'designation',
+                'match_id': str(match.id),
+                'date_match': match.match_date.strftime('%d/%m/%Y'),
+                'stade': match.stadium,
                 'type_designation': instance.get_type_designation_display()
-            }
-            
-            # Envoyer la notification via le nouveau système FCM
-            from firebase_config import send_notification_to_user
-            
-            result = send_notification_to_user(
-                user=instance.arbitre,
-                title="🏆 Nouvelle Désignation d'Arbitrage",
-                body=f"Vous avez été désigné pour le match {match_info['home_team']} vs {match_info['away_team']}",
-                data={
-                    'type': 'designation',
-                    'match_id': str(match_info['id']),
-                    'date_match': match_info['date'],
-                    'stade': match_info['stade'],
-                    'type_designation': match_info['type_designation']
-                }
-            )
-            
-            print(f"📤 Notification envoyée: {result}")
-            
-            # Marquer la notification comme envoyée
-            if result.get('errors', 0) == 0:
-                instance.notification_envoyee = True
-                instance.date_notification = timezone.now()
-                instance.save(update_fields=['notification_envoyee', 'date_notification'])
-                print(f"✅ Notification marquée comme envoyée pour {instance.arbitre.get_full_name()}")
-            else:
-                print(f"❌ Échec de l'envoi de notification: {result}")
-                
-        except Exception as e:
-            print(f"❌ Erreur lors de l'envoi de notification: {e}")
+            },
+            designation=instance
+        )
+
+@receiver(pre_save, sender=Designation)
+def figer_indemnite_confirmation(sender, instance, raw=False, **kwargs):
+    """
+    Figer l'indemnité d'une désignation confirmée par un save() complet
+    (les confirmations par Designation.confirmer() la figent dans l'UPDATE)
+    """
+    if raw or instance.status != 'confirmed':
+        return
+    if getattr(instance, '_statut_charge', None) == 'confirmed':
+        return
+    for champ, valeur in tarification.valeurs_confirmation(instance).items():
+        setattr(instance, champ, valeur)
 
 @receiver(post_save, sender=Designation)
-def send_designation_update_notification(sender, instance, created, **kwargs):
-    """
-    Envoyer une notification lors de la mise à jour du statut d'une désignation
-    """
-    if not created and instance.status in ['confirmed', 'cancelled']:
-        try:
-            print(f"🔄 Statut de désignation mis à jour: {instance.arbitre.get_full_name()} - {instance.get_status_display()}")
-            
-            # Préparer les informations
-            match_info = {
-                'id': instance.match.id,
-                'home_team': instance.match.home_team,
-                'away_team': instance.match.away_team,
-                'date': instance.match.match_date.strftime('%d/%m/%Y'),
-                'time': instance.match.match_time.strftime('%H:%M'),
-                'stade': instance.match.stadium,
-                'type_designation': instance.get_type_designation_display()
-            }
-            
-            # Titre et message selon le statut
-            if instance.status == 'confirmed':
-                title = "✅ Désignation Confirmée"
-                body = f"Votre désignation pour {match_info['home_team']} vs {match_info['away_team']} a été confirmée"
-                tag = 'designation_confirmed'
-            else:  # cancelled
-                title = "❌ Désignation Annulée"
-                body = f"Votre désignation pour {match_info['home_team']} vs {match_info['away_team']} a été annulée"
-                tag = 'designation_cancelled'
-            
-            # Envoyer la notification
-            result = push_service.send_notification_to_arbitres(
-                arbitres=[instance.arbitre],
-                title=title,
-                body=body,
-                data={
-                    'type': 'designation_update',
-                    'match_id': match_info['id'],
-                    'status': instance.status,
-                    'action_url': f'/matches/{match_info["id"]}/designation'
-                },
-                tag=tag
-            )
-            
-            print(f"📤 Notification de mise à jour envoyée: {result}")
-            
-        except Exception as e:
-            print(f"❌ Erreur lors de l'envoi de notification de mise à jour: {e}")
+def signal_designation_status_saved(sender, instance, created, raw=False, **kwargs):
+    """
+    Émettre designation_status_changed après un save() complet
+    (l'historique est écrit par Designation.save, dans sa transaction)
+    """
+    if raw:
+        return
+    signaler_changement_sauvegarde(designation_status_changed, instance, created)
 
-@receiver(post_delete, sender=Designation)
-def send_designation_cancellation_notification(sender, instance, **kwargs):
+@receiver(designation_status_changed, sender=Designation)
+def send_designation_update_notification(sender, instance, nouveau_statut, **kwargs):
     """
-    Envoyer une notification lors de la suppression d'une désignation
+    Mettre en file une notification Web Push lorsque le statut d'une
+    désignation change réellement (confirmation ou annulation) ; les
+    changements rapprochés d'un même match sont regroupés
     """
-    try:
-        print(f"🗑️ Désignation supprimée pour {instance.arbitre.get_full_name()}")
-        
-        # Préparer les informations
-        match_info = {
-            'id': instance.match.id,
-            'home_team': instance.match.home_team,
-            'away_team': instance.match.away_team,
-            'date': instance.match.match_date.strftime('%d/%m/%Y'),
-            'time': instance.match.match_time.strftime('%H:%M'),
-            'stade': instance.match.stadium,
-            'type_designation': instance.get_type_designation_display()
-        }
+    if getattr(instance, '_skip_notification', False):
+        return
+    
+    if nouveau_statut in ['confirmed', 'cancelled']:
+        match = instance.match
+        if nouveau_statut == 'confirmed':
+            title = "✅ Désignation Confirmée"
+            body = f"Votre désignation pour {match.home_team} vs {match.away_team} a été confirmée"
+            tag = 'designation_confirmed'
+        else:  # cancelled
+            title = "❌ Désignation Annulée"
+            body = f"Votre désignation pour {match.home_team} vs {match.away_team} a été annulée"
+            tag = 'designation_cancelled'
         
-        # Envoyer la notification
-        result = push_service.send_notification_to_arbitres(
-            arbitres=[instance.arbitre],
-            title="🗑️ Désignation Supprimée",
-            body=f"Votre désignation pour {match_info['home_team']} vs {match_info['away_team']} a été supprimée",
+        outbox.mettre_en_file(
+            'webpush',
+            instance.arbitre,
+            title=title,
+            body=body,
             data={
-                'type': 'designation_deleted',
-                'match_id': match_info['id'],
-                'action_url': f'/matches/{match_info["id"]}/designation'
+                'type': 'designation_update',
+                'match_id': match.id,
+                'status': nouveau_statut,
+                'action_url': f'/matches/{match.id}/designation'
             },
-            tag='designation_deleted'
+            tag=tag,
+            coalesce_key=f'match:{match.id}'
         )
-        
-        print(f"📤 Notification de suppression envoyée: {result}")
-        
-    except Exception as e:
-        print(f"❌ Erreur lors de l'envoi de notification de suppression: {e}")
+
+@receiver(post_delete, sender=Designation)
+def send_designation_cancellation_notification(sender, instance, origin=None, **kwargs):
+    """
+    Mettre en file une notification Web Push lors de la suppression d'une désignation
+    (remplace les changements en attente pour le même match)
+    """
+    # Suppression de l'arbitre lui-même : personne à notifier
+    if isinstance(origin, Arbitre) or getattr(origin, 'model', None) is Arbitre:
+        return
+    
+    match = instance.match
+    outbox.mettre_en_file(
+        'webpush',
+        instance.arbitre,
+        title="🗑️ Désignation Supprimée",
+        body=f"Votre désignation pour {match.home_team} vs {match.away_team} a été supprimée",
+        data={
+            'type': 'designation_deleted',
+            'match_id': match.id,
+            'action_url': f'/matches/{match.id}/designation'
+        },
+        tag='designation_deleted',
+        coalesce_key=f'match:{match.id}'
+    )
+
+# ===== INVALIDATION DU CACHE DES STATISTIQUES =====
+
+@receiver([post_save, post_delete], sender=Match)
+def invalidate_statistics_on_match_change(sender, instance, **kwargs):
+    """
+    Invalider les statistiques en cache lors de la modification d'un match
+    """
+    # Les officiels du match sont ceux de ses désignations
+    if kwargs.get('signal') is post_save:
+        arbitre_ids = list(instance.designations.values_list('arbitre_id', flat=True))
+        for arbitre_id in arbitre_ids:
+            invalidate_match_statistics(arbitre_id)
+        invalidate_designation_statistics(*arbitre_ids)
+
+@receiver([post_save, post_delete, designation_status_changed], sender=Designation)
+def invalidate_statistics_on_designation_change(sender, instance, **kwargs):
+    """
+    Invalider les statistiques en cache lors de la modification d'une désignation
+    """
+    # Changement déjà traité par post_save
+    if kwargs.get('sauvegarde'):
+        return
+    # Désignation réaffectée : l'arbitre précédent est aussi concerné
+    arbitre_ids = {instance.arbitre_id, getattr(instance, '_arbitre_charge', None)}
+    for arbitre_id in arbitre_ids:
+        invalidate_match_statistics(arbitre_id)
+    invalidate_designation_statistics(*arbitre_ids)
+    instance._arbitre_charge = instance.arbitre_id
+
+@receiver([post_save, post_delete, excuse_status_changed], sender=ExcuseArbitre)
+def invalidate_heatmap_on_excuse_change(sender, instance, **kwargs):
+    """
+    Invalider la heatmap de disponibilité lors de la modification d'une excuse
+    """
+    if kwargs.get('sauvegarde'):
+        return
+    invalidate_excuse_heatmap()
+
+@receiver([post_save, post_delete], sender=TarificationMatch)
+def invalidate_tarification_table(sender, instance, **kwargs):
+    """
+    Recharger la table des tarifs compilée après une modification
+    """
+    tarification.invalider()
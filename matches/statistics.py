@@ -0,0 +1,185 @@
+"""
+Statistiques personnelles des arbitres (matchs et désignations)
+
+Chaque statistique est calculée en une seule requête d'agrégation
+conditionnelle (GROUP BY statut / rôle / type de match / mois), puis mise
+en cache par arbitre. Les signaux des matchs et des désignations
+invalident le cache concerné.
+
+Le cache doit être partagé entre les processus (web, workers, commandes) :
+une invalidation faite dans un processus doit être vue par tous. Les
+réglages utilisent le cache en base (CACHES, table créée par
+`manage.py createcachetable`) ; un cache local au processus (LocMemCache)
+laisserait les autres processus servir des statistiques périmées jusqu'à
+STATISTICS_CACHE_TIMEOUT secondes.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Q
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import Match, Designation
+
+
+def _cache_timeout():
+    return getattr(settings, 'STATISTICS_CACHE_TIMEOUT', 300)
+
+
+def _match_cache_key(arbitre_id, today):
+    # La date du jour fait partie de la clé car les compteurs "à venir" en dépendent
+    return f'statistiques:matchs:{arbitre_id}:{today.isoformat()}'
+
+
+def _designation_cache_key(arbitre_id):
+    return f'statistiques:designations:{arbitre_id if arbitre_id is not None else "all"}'
+
+
+def _month_label(value):
+    return value.strftime('%Y-%m') if value else 'inconnu'
+
+
+def _increment(bucket, key, count):
+    bucket[key] = bucket.get(key, 0) + count
+
+
+def get_match_statistics(arbitre):
+    """Statistiques des matchs d'un arbitre (une requête, résultat en cache)"""
+    from .serializers import MatchListSerializer
+
+    today = timezone.now().date()
+    cache_key = _match_cache_key(arbitre.id, today)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    next_week = today + timedelta(days=7)
+    # Les matchs de l'arbitre sont ceux de ses désignations actives ;
+    # le rôle est celui de la désignation
+    rows = (
+        Designation.objects.filter(arbitre=arbitre, status__in=Designation.ACTIVE_STATUSES)
+        .annotate(mois=TruncMonth('match__match_date'))
+        .values('match__status', 'type_designation', 'match__type_match__nom', 'mois')
+        .annotate(
+            total=Count('match', distinct=True),
+            a_venir=Count('match', distinct=True, filter=Q(
+                match__match_date__gte=today, match__status='scheduled'
+            )),
+            semaine=Count('match', distinct=True, filter=Q(
+                match__match_date__range=[today, next_week], match__status='scheduled'
+            )),
+        )
+        .order_by()
+    )
+
+    total = upcoming = upcoming_week = 0
+    by_status, by_role, by_type, by_month = {}, {}, {}, {}
+    for row in rows:
+        count = row['total']
+        total += count
+        upcoming += row['a_venir']
+        upcoming_week += row['semaine']
+        _increment(by_status, row['match__status'], count)
+        _increment(by_role, row['type_designation'], count)
+        _increment(by_type, row['match__type_match__nom'] or 'Type non défini', count)
+        _increment(by_month, _month_label(row['mois']), count)
+
+    completed = by_status.get('completed', 0)
+
+    # La liste détaillée n'est chargée que s'il y a des matchs dans la semaine
+    upcoming_week_matches = []
+    if upcoming_week:
+        upcoming_week_matches = list(MatchListSerializer(
+            Match.objects.officiated_by(arbitre).filter(
+                match_date__range=[today, next_week],
+                status='scheduled'
+            ).select_related('type_match', 'categorie', 'referee').prefetch_related(
+                'designations__arbitre'
+            ).order_by('match_date', 'match_time'),
+            many=True
+        ).data)
+
+    result = {
+        'statistics': {
+            'total_matches': total,
+            'completed_matches': completed,
+            'upcoming_matches': upcoming,
+            'match_types': by_type,
+            'by_status': by_status,
+            'by_role': by_role,
+            'by_month': dict(sorted(by_month.items())),
+            'completion_rate': round((completed / total * 100) if total > 0 else 0, 2)
+        },
+        'upcoming_matches': upcoming_week_matches
+    }
+    cache.set(cache_key, result, _cache_timeout())
+    return result
+
+
+def get_designation_statistics(arbitre=None):
+    """
+    Statistiques des désignations (une requête, résultat en cache)
+
+    Args:
+        arbitre: Arbitre concerné, ou None pour toutes les désignations (administrateurs)
+    """
+    arbitre_id = arbitre.id if arbitre is not None else None
+    cache_key = _designation_cache_key(arbitre_id)
+    cached = cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    designations = Designation.objects.all()
+    if arbitre is not None:
+        designations = designations.filter(arbitre=arbitre)
+
+    rows = (
+        designations
+        .annotate(mois=TruncMonth('match__match_date'))
+        .values('status', 'type_designation', 'match__type_match__nom', 'mois')
+        .annotate(total=Count('id'))
+        .order_by()
+    )
+
+    type_labels = dict(Designation.TYPE_CHOICES)
+    total = 0
+    by_status, by_type, by_type_match, by_month = {}, {}, {}, {}
+    for row in rows:
+        count = row['total']
+        total += count
+        _increment(by_status, row['status'], count)
+        _increment(by_type, type_labels.get(row['type_designation'], row['type_designation']), count)
+        _increment(by_type_match, row['match__type_match__nom'] or 'Type non défini', count)
+        _increment(by_month, _month_label(row['mois']), count)
+
+    accepted = by_status.get('accepted', 0)
+    result = {
+        'total': total,
+        'accepted': accepted,
+        'declined': by_status.get('declined', 0),
+        'pending': by_status.get('proposed', 0),
+        'confirmed': by_status.get('confirmed', 0),
+        'types': by_type,
+        'by_status': by_status,
+        'by_type_match': by_type_match,
+        'by_month': dict(sorted(by_month.items())),
+        'acceptance_rate': round((accepted / total * 100) if total > 0 else 0, 2)
+    }
+    cache.set(cache_key, result, _cache_timeout())
+    return result
+
+
+def invalidate_match_statistics(arbitre_id):
+    """Invalider les statistiques de matchs d'un arbitre"""
+    if arbitre_id is None:
+        return
+    cache.delete(_match_cache_key(arbitre_id, timezone.now().date()))
+
+
+def invalidate_designation_statistics(*arbitre_ids):
+    """Invalider les statistiques de désignations des arbitres donnés (et la vue globale)"""
+    keys = [_designation_cache_key(arbitre_id) for arbitre_id in set(arbitre_ids) if arbitre_id is not None]
+    keys.append(_designation_cache_key(None))
+    cache.delete_many(keys)
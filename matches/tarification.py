@@ -0,0 +1,221 @@
+"""
+Table des tarifs compilée en mémoire
+
+Les tarifications actives sont chargées en une requête et indexées par
+(compétition, division, type de match, rôle). Chaque clé porte ses versions
+datées triées par valid_from : la version applicable à une date est trouvée
+par bisection (repli SQL équivalent : TarificationMatch.objects.applicable,
+index clé / valid_from).
+
+La table est gardée dans le processus et rechargée lorsque sa version
+change : toute sauvegarde ou suppression d'une TarificationMatch change la
+version en cache (voir signals.py). Avec un cache local à chaque processus,
+la table est en plus rechargée au plus tard après TARIFICATION_TABLE_TTL
+secondes (défaut 300).
+
+La table ne sert qu'aux lectures en masse. L'indemnité figée à la
+confirmation (valeurs_confirmation) est lue en base : une table en retard
+d'une modification faite par un autre processus ne doit pas écrire un
+montant périmé dans l'historique.
+
+Correspondance d'une désignation vers une clé de tarif :
+- compétition et type de match : TypeMatch.tarif_competition / tarif_type_match ;
+- division : Categorie.tarif_division (à défaut, tarif sans division) ;
+- rôle : ROLES_TARIF[Designation.type_designation].
+
+Le calcul ne fait aucune requête dès lors que match__type_match et
+match__categorie sont chargés (select_related).
+"""
+import bisect
+import threading
+import time as chrono
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+CLE_VERSION = 'tarification:version'
+
+# Type de désignation -> rôle de TarificationMatch
+ROLES_TARIF = {
+    'arbitre_principal': 'arbitre',
+    'arbitre_assistant1': 'assistant',
+    'arbitre_assistant2': 'assistant',
+    'quatrieme_arbitre': '4eme_arbitre',
+    'arbitre_video': 'arbitre',
+    'arbitre_assistant_video': 'assistant',
+}
+
+_verrou = threading.Lock()
+_etat = {'table': None, 'version': None, 'charge_a': 0.0}
+
+
+def _ttl():
+    return getattr(settings, 'TARIFICATION_TABLE_TTL', 300)
+
+
+class TableTarifs:
+    """Versions de tarifs actives indexées par clé, triées comme en base"""
+
+    def __init__(self, tarifications):
+        self.lignes = sorted(tarifications, key=lambda tarification: (
+            tarification.competition, tarification.division or '',
+            tarification.type_match, tarification.role, tarification.valid_from
+        ))
+        # clé -> (dates de début triées, versions dans le même ordre)
+        self.par_cle = {}
+        for tarification in self.lignes:
+            debuts, versions = self.par_cle.setdefault(
+                (tarification.competition, tarification.division, tarification.type_match, tarification.role),
+                ([], [])
+            )
+            debuts.append(tarification.valid_from)
+            versions.append(tarification)
+
+    def __len__(self):
+        return len(self.lignes)
+
+    def _version(self, cle, jour):
+        entree = self.par_cle.get(cle)
+        if entree is None:
+            return None
+        debuts, versions = entree
+        position = bisect.bisect_right(debuts, jour) - 1
+        if position < 0:
+            return None
+        version = versions[position]
+        if version.valid_to is not None and version.valid_to < jour:
+            return None
+        return version
+
+    def tarification(self, competition, division, type_match, role, jour=None):
+        """Version applicable à une date (défaut aujourd'hui) ; à défaut, celle sans division"""
+        jour = jour or timezone.localdate()
+        ligne = self._version((competition, division or None, type_match, role), jour)
+        if ligne is None and division:
+            ligne = self._version((competition, None, type_match, role), jour)
+        return ligne
+
+    def filtrer(self, competition, type_match=None, role=None, jour=None):
+        """Versions applicables à une date d'une compétition (et d'un type de match / rôle)"""
+        jour = jour or timezone.localdate()
+        return [
+            ligne for ligne in self.lignes
+            if ligne.competition == competition
+            and (type_match is None or ligne.type_match == type_match)
+            and (role is None or ligne.role == role)
+            and ligne.valid_from <= jour
+            and (ligne.valid_to is None or ligne.valid_to >= jour)
+        ]
+
+
+def _version_courante():
+    version = cache.get(CLE_VERSION)
+    if version is None:
+        cache.add(CLE_VERSION, uuid.uuid4().hex, None)
+        version = cache.get(CLE_VERSION)
+    return version
+
+
+def table():
+    """Table compilée courante (rechargée si la version a changé)"""
+    version = _version_courante()
+    if (_etat['table'] is not None and _etat['version'] == version
+            and chrono.monotonic() - _etat['charge_a'] < _ttl()):
+        return _etat['table']
+
+    from .models import TarificationMatch
+
+    with _verrou:
+        if (_etat['table'] is None or _etat['version'] != version
+                or chrono.monotonic() - _etat['charge_a'] >= _ttl()):
+            _etat['table'] = TableTarifs(TarificationMatch.objects.filter(is_active=True))
+            _etat['version'] = version
+            _etat['charge_a'] = chrono.monotonic()
+        return _etat['table']
+
+
+def invalider():
+    """Changer la version : chaque processus recharge sa table au prochain appel"""
+    cache.set(CLE_VERSION, uuid.uuid4().hex, None)
+
+
+def cle_tarif(match, type_designation):
+    """
+    Clé de tarif (compétition, division, type de match, rôle) d'un poste
+
+    Returns:
+        tuple, ou None si le type de match n'est pas rattaché à un tarif
+    """
+    type_match = match.type_match
+    if type_match is None:
+        return None
+    return cle_tarif_valeurs(
+        type_match.tarif_competition,
+        match.categorie.tarif_division if match.categorie else '',
+        type_match.tarif_type_match,
+        type_designation
+    )
+
+
+def cle_tarif_valeurs(competition, division, type_match, type_designation):
+    """Clé de tarif à partir des colonnes de correspondance (lignes values_list)"""
+    role = ROLES_TARIF.get(type_designation)
+    if not role or not competition or not type_match:
+        return None
+    return (competition, division or None, type_match, role)
+
+
+def indemnite(match, type_designation, table_tarifs=None):
+    """
+    Indemnité d'un poste, au tarif en vigueur à la date du match
+
+    Returns:
+        (tarif, devise), ou None si aucun tarif ne s'applique
+    """
+    cle = cle_tarif(match, type_designation)
+    if cle is None:
+        return None
+    if table_tarifs is None:
+        table_tarifs = table()
+    tarification = table_tarifs.tarification(*cle, jour=match.match_date)
+    if tarification is None:
+        return None
+    return tarification.tarif, tarification.devise
+
+
+def indemnites(designations):
+    """
+    Indemnités d'un ensemble de désignations avec une seule table
+
+    Une désignation confirmée garde l'indemnité figée lors de sa confirmation.
+
+    Returns:
+        dict designation_id -> (tarif, devise) ou None
+    """
+    table_tarifs = table()
+    resultats = {}
+    for designation in designations:
+        if designation.status == 'confirmed' and designation.indemnite is not None:
+            resultats[designation.id] = (designation.indemnite, designation.devise_indemnite)
+        else:
+            resultats[designation.id] = indemnite(designation.match, designation.type_designation, table_tarifs)
+    return resultats
+
+
+def valeurs_confirmation(designation):
+    """
+    Colonnes à figer lors de la confirmation d'une désignation
+
+    Le tarif est lu en base (TarificationMatch.objects.applicable, une requête
+    indexée) et non dans la table compilée.
+    """
+    from .models import TarificationMatch
+
+    match = designation.match
+    cle = cle_tarif(match, designation.type_designation)
+    tarification = TarificationMatch.objects.applicable(*cle, jour=match.match_date) if cle else None
+    if tarification is None:
+        return {'indemnite': None, 'devise_indemnite': ''}
+    return {'indemnite': tarification.tarif, 'devise_indemnite': tarification.devise}
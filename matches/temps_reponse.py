@@ -0,0 +1,78 @@
+"""
+Agrégats des temps de réponse des arbitres
+
+Les délais de réponse (désignation → acceptation / refus) sont lus dans
+l'historique des désignations pour un seul mois (index created_at) et
+enregistrés dans `StatistiqueTempsReponse` : les rapports lisent ces lignes
+pré-calculées au lieu de parcourir tout l'historique.
+"""
+import math
+from datetime import date, datetime, time
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import HistoriqueDesignation, StatistiqueTempsReponse
+
+
+def debut_mois(jour):
+    return jour.replace(day=1)
+
+
+def mois_suivant(jour):
+    return date(jour.year + jour.month // 12, jour.month % 12 + 1, 1)
+
+
+def percentile(valeurs_triees, rang):
+    """Percentile (rang le plus proche) d'une liste triée"""
+    if not valeurs_triees:
+        return 0
+    index = max(0, math.ceil(rang / 100 * len(valeurs_triees)) - 1)
+    return valeurs_triees[index]
+
+
+def agreger_mois(periode):
+    """
+    Recalculer les agrégats d'un mois
+
+    Returns:
+        nombre de lignes d'agrégat enregistrées
+    """
+    periode = debut_mois(periode)
+    debut = timezone.make_aware(datetime.combine(periode, time.min))
+    fin = timezone.make_aware(datetime.combine(mois_suivant(periode), time.min))
+
+    groupes = {}
+    for ligue_id, grade, statut, delai in HistoriqueDesignation.objects.filter(
+        created_at__gte=debut,
+        created_at__lt=fin,
+        delai_reponse_secondes__isnull=False
+    ).values_list('ligue_id', 'grade', 'nouveau_statut', 'delai_reponse_secondes').iterator(chunk_size=2000):
+        for cle in [('ligue_grade', ligue_id, grade), ('ligue', ligue_id, ''),
+                    ('grade', None, grade), ('global', None, '')]:
+            groupe = groupes.setdefault(cle, {'delais': [], 'accepted': 0, 'declined': 0})
+            groupe['delais'].append(delai)
+            if statut in ('accepted', 'declined'):
+                groupe[statut] += 1
+
+    lignes = []
+    for (niveau, ligue_id, grade), groupe in groupes.items():
+        delais = sorted(groupe['delais'])
+        lignes.append(StatistiqueTempsReponse(
+            periode=periode,
+            niveau=niveau,
+            ligue_id=ligue_id,
+            grade=grade,
+            nb_reponses=len(delais),
+            nb_acceptees=groupe['accepted'],
+            nb_refusees=groupe['declined'],
+            moyenne_secondes=round(sum(delais) / len(delais)),
+            p50_secondes=percentile(delais, 50),
+            p90_secondes=percentile(delais, 90),
+            p95_secondes=percentile(delais, 95),
+        ))
+
+    with transaction.atomic():
+        StatistiqueTempsReponse.objects.filter(periode=periode).delete()
+        StatistiqueTempsReponse.objects.bulk_create(lignes)
+    return len(lignes)
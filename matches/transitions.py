@@ -0,0 +1,8 @@
+"""
+Signal de changement de statut des désignations
+
+Voir accounts/transitions.py pour le principe des transitions conditionnelles.
+"""
+from django.dispatch import Signal
+
+designation_status_changed = Signal()
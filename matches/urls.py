@@ -11,12 +11,16 @@ urlpatterns = [
     
     # Actions spécifiques
     path('<int:match_id>/complete/', views.complete_match, name='complete_match'),
+    path('<int:match_id>/timeline/', views.match_timeline, name='match_timeline'),
     
     # Vues de consultation
     path('statistics/', views.match_statistics, name='match_statistics'),
     path('recent/', views.recent_matches, name='recent_matches'),
     path('upcoming/', views.upcoming_matches, name='upcoming_matches'),
     
+    # Compatibilité anciens clients (une ligne par officiel)
+    path('legacy/', views.legacy_matches, name='legacy_matches'),
+    
     # ===== DÉSIGNATIONS =====
     path('designations/', views.DesignationListCreateView.as_view(), name='designation_list_create'),
     path('designations/<int:pk>/', views.DesignationDetailView.as_view(), name='designation_detail'),
@@ -24,13 +28,23 @@ urlpatterns = [
     path('designations/<int:designation_id>/decline/', views.decline_designation, name='decline_designation'),
     path('designations/statistics/', views.designation_statistics, name='designation_statistics'),
     path('designations/my/', views.my_designations, name='my_designations'),
+    path('designations/board/', views.designation_board, name='designation_board'),
+    path('designations/bulk/', views.bulk_designations, name='bulk_designations'),
+    path('designations/validate/', views.validate_designations, name='validate_designations'),
+    path('designations/propose/', views.propose_designations, name='propose_designations'),
+    path('designations/arbitres/<int:arbitre_id>/timeline/', views.arbitre_timeline, name='arbitre_timeline'),
+    path('designations/response-times/', views.response_time_statistics, name='response_time_statistics'),
+    path('designations/payment-statements/', views.payment_statements, name='payment_statements'),
     
     # ===== TYPES DE MATCH ET CATÉGORIES =====
     path('types/', views.match_types, name='match_types'),
     path('categories/', views.categories, name='categories'),
     path('roles/', views.match_roles, name='match_roles'),
     
-    # ===== MATCHS PAR TYPE =====
+    # ===== RECHERCHE UNIFIÉE =====
+    path('search/', views.search_matches, name='search_matches'),
+    
+    # ===== MATCHS PAR TYPE (alias de la recherche) =====
     path('ligue1/', views.Ligue1MatchesView.as_view(), name='ligue1_matches'),
     path('ligue2/', views.Ligue2MatchesView.as_view(), name='ligue2_matches'),
     path('c1/', views.C1MatchesView.as_view(), name='c1_matches'),
@@ -41,6 +55,12 @@ urlpatterns = [
     # ===== API GÉNÉRIQUE PAR TYPE =====
     path('type/<str:type_code>/', views.matches_by_type, name='matches_by_type'),
     
+    # ===== RÉFÉRENTIEL ÉQUIPES / STADES =====
+    path('teams/', views.teams, name='teams'),
+    path('teams/<int:team_id>/matches/', views.team_matches, name='team_matches'),
+    path('stadiums/', views.stadiums, name='stadiums'),
+    path('stadiums/<int:stadium_id>/matches/', views.stadium_matches, name='stadium_matches'),
+    
     # ===== EXCUSES D'ARBITRES =====
     path('excuses/', views.ExcuseArbitreListCreateView.as_view(), name='excuse_list_create'),
     path('excuses/<int:pk>/', views.ExcuseArbitreDetailView.as_view(), name='excuse_detail'),
@@ -50,6 +70,7 @@ urlpatterns = [
     path('excuses/passees/', views.excuses_passees_par_date, name='excuses_passees_par_date'),
     path('excuses/en-cours/', views.excuses_en_cours_par_date, name='excuses_en_cours_par_date'),
     path('excuses/a-venir/', views.excuses_a_venir_par_date, name='excuses_a_venir_par_date'),
+    path('excuses/heatmap/', views.excuses_heatmap, name='excuses_heatmap'),
     
     # ===== TARIFICATION DES MATCHS =====
     path('tarification/', views.TarificationMatchListView.as_view(), name='tarification_list'),
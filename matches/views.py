@@ -4,10 +4,15 @@ Vues API pour la gestion des matchs
 from rest_framework import generics, permissions, status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
+from django.conf import settings
+from django.db import IntegrityError, transaction
 from django.utils import timezone
 from datetime import datetime, timedelta
 
-from .models import Match, MatchEvent, Designation, TypeMatch, Categorie, ExcuseArbitre, TarificationMatch
+from .models import (
+    Match, MatchEvent, Designation, TypeMatch, Categorie, ExcuseArbitre, TarificationMatch, Team, Stadium,
+    HistoriqueDesignation, StatistiqueTempsReponse
+)
 from .serializers import (
     MatchSerializer,
     MatchCreateSerializer,
@@ -20,6 +25,8 @@ from .serializers import (
     DesignationListSerializer,
     TypeMatchSerializer,
     CategorieSerializer,
+    TeamSerializer,
+    StadiumSerializer,
     ExcuseArbitreSerializer,
     ExcuseArbitreCreateSerializer,
     ExcuseArbitreListSerializer,
@@ -28,6 +35,36 @@ from .serializers import (
     TarificationMatchCreateSerializer,
     TarificationMatchUpdateSerializer
 )
+from .statistics import get_match_statistics, get_designation_statistics
+from . import tarification
+
+
+def _matchs_arbitre(arbitre, ordering=('-match__match_date', '-match__match_time'), limit=None, **filtres):
+    """
+    Matchs d'un arbitre, servis depuis ses désignations actives
+    
+    Chaque match porte la désignation de l'arbitre (`match.designation`) afin
+    que le serializer expose son rôle sur la rencontre.
+    """
+    designations = Designation.objects.filter(
+        arbitre=arbitre,
+        status__in=Designation.ACTIVE_STATUSES,
+        **{f'match__{champ}': valeur for champ, valeur in filtres.items()}
+    ).select_related(
+        'arbitre', 'match__type_match', 'match__categorie', 'match__referee'
+    ).prefetch_related(
+        'match__events', 'match__designations__arbitre'
+    ).order_by(*ordering)
+    
+    if limit is not None:
+        designations = designations[:limit]
+    
+    matches = []
+    for designation in designations:
+        match = designation.match
+        match.designation = designation
+        matches.append(match)
+    return matches
 
 class MatchListCreateView(generics.ListCreateAPIView):
     """Vue pour lister et créer des matchs"""
@@ -40,16 +77,16 @@ class MatchListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Retourne les matchs de l'arbitre connecté"""
-        return Match.objects.filter(referee=self.request.user).select_related('type_match', 'categorie', 'referee')
+        return Match.objects.officiated_by(self.request.user).select_related('type_match', 'categorie')
     
     def list(self, request, *args, **kwargs):
         """Lister les matchs de l'arbitre connecté avec toutes les données"""
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
+        matches = _matchs_arbitre(request.user)
+        serializer = self.get_serializer(matches, many=True)
         
         return Response({
             'success': True,
-            'message': f'{queryset.count()} match(s) trouvé(s)',
+            'message': f'{len(matches)} match(s) trouvé(s)',
             'matches': serializer.data
         })
     
@@ -70,13 +107,31 @@ class MatchListCreateView(generics.ListCreateAPIView):
         }, status=status.HTTP_400_BAD_REQUEST)
 
 class MatchDetailView(generics.RetrieveUpdateDestroyAPIView):
-    """Vue pour consulter, modifier et supprimer un match"""
+    """
+    Vue pour consulter, modifier et supprimer un match
+    
+    La rencontre est partagée par tous ses officiels : seuls les
+    administrateurs modifient l'affiche ou suppriment le match. L'arbitre
+    principal (désignation active) saisit le résultat ; un officiel modifie
+    son rôle, porté par sa propre désignation.
+    """
     serializer_class = MatchSerializer
     permission_classes = [permissions.IsAuthenticated]
     
+    # Champs qu'un officiel peut modifier (sa désignation)
+    CHAMPS_OFFICIEL = {'role'}
+    # Champs du résultat, saisis par l'arbitre principal
+    CHAMPS_RESULTAT = {'home_score', 'away_score', 'match_report', 'incidents', 'match_sheet', 'status'}
+    
     def get_queryset(self):
-        """Seuls les matchs de l'arbitre connecté"""
-        return Match.objects.filter(referee=self.request.user).select_related('type_match', 'categorie', 'referee')
+        """Les administrateurs voient tous les matchs, les arbitres les leurs"""
+        if self.request.user.is_staff:
+            queryset = Match.objects.all()
+        else:
+            queryset = Match.objects.officiated_by(self.request.user)
+        return queryset.select_related(
+            'type_match', 'categorie', 'referee'
+        ).prefetch_related('events', 'designations__arbitre')
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -93,57 +148,78 @@ class MatchDetailView(generics.RetrieveUpdateDestroyAPIView):
             'message': 'Match récupéré avec succès',
             'match': serializer.data
         })
+    
+    def update(self, request, *args, **kwargs):
+        partial = kwargs.pop('partial', False)
+        instance = self.get_object()
+        serializer = self.get_serializer(instance, data=request.data, partial=partial)
+        serializer.is_valid(raise_exception=True)
+        
+        if not request.user.is_staff:
+            champs_autorises = set(self.CHAMPS_OFFICIEL)
+            if Match.objects.refereed_by(request.user).filter(pk=instance.pk).exists():
+                champs_autorises |= self.CHAMPS_RESULTAT
+            # Les valeurs renvoyées à l'identique (PUT complet) sont acceptées
+            champs_modifies = sorted(
+                champ for champ, valeur in serializer.validated_data.items()
+                if champ not in champs_autorises and valeur != getattr(instance, champ)
+            )
+            if champs_modifies:
+                return Response({
+                    'success': False,
+                    'message': 'Seuls les administrateurs peuvent modifier la rencontre ; '
+                               'l\'arbitre principal saisit le résultat et un officiel ne peut modifier que son rôle',
+                    'fields': champs_modifies
+                }, status=status.HTTP_403_FORBIDDEN)
+        
+        try:
+            with transaction.atomic():
+                self.perform_update(serializer)
+        except IntegrityError:
+            return Response({
+                'success': False,
+                'message': 'Une rencontre existe déjà entre ces équipes à cette date et cette heure'
+            }, status=status.HTTP_409_CONFLICT)
+        
+        return Response(serializer.data)
+    
+    def destroy(self, request, *args, **kwargs):
+        if not request.user.is_staff:
+            return Response({
+                'success': False,
+                'message': 'Seuls les administrateurs peuvent supprimer un match'
+            }, status=status.HTTP_403_FORBIDDEN)
+        return super().destroy(request, *args, **kwargs)
 
 @api_view(['GET'])
 def match_statistics(request):
     """Statistiques des matchs de l'arbitre"""
-    user_matches = Match.objects.filter(referee=request.user)
-    
-    # Calculs des statistiques
-    total_matches = user_matches.count()
-    completed_matches = user_matches.filter(status='completed').count()
-    upcoming_matches = user_matches.filter(
-        match_date__gte=timezone.now().date(),
-        status='scheduled'
-    ).count()
-    
-    # Matchs par type
-    match_types = {}
-    for choice in Match.MATCH_TYPE_CHOICES:
-        count = user_matches.filter(match_type=choice[0]).count()
-        if count > 0:
-            match_types[choice[1]] = count
-    
-    # Prochains matchs (7 prochains jours)
-    next_week = timezone.now().date() + timedelta(days=7)
-    upcoming_week = user_matches.filter(
-        match_date__range=[timezone.now().date(), next_week],
-        status='scheduled'
-    ).order_by('match_date', 'match_time')
+    result = get_match_statistics(request.user)
     
     return Response({
         'success': True,
-        'statistics': {
-            'total_matches': total_matches,
-            'completed_matches': completed_matches,
-            'upcoming_matches': upcoming_matches,
-            'match_types': match_types,
-            'completion_rate': round((completed_matches / total_matches * 100) if total_matches > 0 else 0, 2)
-        },
-        'upcoming_matches': MatchListSerializer(upcoming_week, many=True).data
+        'statistics': result['statistics'],
+        'upcoming_matches': result['upcoming_matches']
     })
 
 @api_view(['POST'])
 def complete_match(request, match_id):
-    """Marquer un match comme terminé avec le score"""
+    """Marquer un match comme terminé avec le score (arbitre principal ou administrateur)"""
+    matches = Match.objects.all() if request.user.is_staff else Match.objects.officiated_by(request.user)
     try:
-        match = Match.objects.get(id=match_id, referee=request.user)
+        match = matches.get(id=match_id)
     except Match.DoesNotExist:
         return Response({
             'success': False,
             'message': 'Match non trouvé'
         }, status=status.HTTP_404_NOT_FOUND)
     
+    if not request.user.is_staff and not Match.objects.refereed_by(request.user).filter(pk=match.pk).exists():
+        return Response({
+            'success': False,
+            'message': 'Seul l\'arbitre principal peut saisir le résultat du match'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
     home_score = request.data.get('home_score')
     away_score = request.data.get('away_score')
     match_report = request.data.get('match_report', '')
@@ -178,9 +254,7 @@ def complete_match(request, match_id):
 def recent_matches(request):
     """Récupérer les matchs récents de l'arbitre"""
     limit = int(request.GET.get('limit', 10))
-    matches = Match.objects.filter(
-        referee=request.user
-    ).order_by('-match_date', '-match_time')[:limit]
+    matches = _matchs_arbitre(request.user, limit=limit)
     
     return Response({
         'success': True,
@@ -190,17 +264,48 @@ def recent_matches(request):
 @api_view(['GET'])
 def upcoming_matches(request):
     """Récupérer les prochains matchs de l'arbitre"""
-    matches = Match.objects.filter(
-        referee=request.user,
+    matches = _matchs_arbitre(
+        request.user,
+        ordering=('match__match_date', 'match__match_time'),
         match_date__gte=timezone.now().date(),
         status__in=['scheduled', 'in_progress']
-    ).order_by('match_date', 'match_time')
+    )
     
     return Response({
         'success': True,
         'matches': MatchListSerializer(matches, many=True).data
     })
 
+@api_view(['GET'])
+def legacy_matches(request):
+    """
+    Compatibilité : une ligne par officiel, comme l'ancien modèle Match
+    
+    Les anciens clients recevaient une ligne Match par arbitre (referee + role).
+    Chaque ligne est ici reconstruite depuis une désignation active. Les
+    administrateurs peuvent passer referee_id pour consulter un autre arbitre.
+    """
+    arbitre = request.user
+    referee_id = request.GET.get('referee_id')
+    if referee_id and request.user.is_staff:
+        from accounts.models import Arbitre
+        try:
+            arbitre = Arbitre.objects.get(id=referee_id)
+        except (Arbitre.DoesNotExist, ValueError):
+            return Response({
+                'success': False,
+                'message': 'Arbitre non trouvé'
+            }, status=status.HTTP_404_NOT_FOUND)
+    
+    matches = _matchs_arbitre(arbitre)
+    
+    return Response({
+        'success': True,
+        'deprecated': True,
+        'message': f'{len(matches)} match(s) trouvé(s)',
+        'matches': MatchSerializer(matches, many=True).data
+    })
+
 # ===== VUES POUR LES DÉSIGNATIONS =====
 
 class DesignationListCreateView(generics.ListCreateAPIView):
@@ -214,39 +319,24 @@ class DesignationListCreateView(generics.ListCreateAPIView):
     
     def get_queryset(self):
         """Retourne toutes les désignations (pour les administrateurs)"""
+        designations = Designation.objects.select_related('arbitre', 'match')
         if self.request.user.is_staff:
-            return Designation.objects.all()
+            return designations
         # Pour les arbitres, retourner leurs propres désignations
-        return Designation.objects.filter(arbitre=self.request.user)
+        return designations.filter(arbitre=self.request.user)
     
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            designation = serializer.save()
+            from django.db import transaction
+            from .bulk_designations import messages_designation
             
-            # Envoyer automatiquement la notification push
-            try:
-                from notifications.services import push_service
-                
-                match_info = {
-                    'id': designation.match.id,
-                    'home_team': designation.match.home_team,
-                    'away_team': designation.match.away_team,
-                    'date': designation.match.match_date.isoformat(),
-                    'stade': designation.match.stadium,
-                    'type_designation': designation.get_type_designation_display()
-                }
-                
-                result = push_service.send_designation_notification(
-                    [designation.arbitre], 
-                    match_info
-                )
-                
-                if result['success'] > 0:
-                    designation.marquer_notification_envoyee()
-                
-            except Exception as e:
-                print(f"Erreur notification push: {e}")
+            # Désignation et notification Web Push dans la même transaction
+            # (la notification FCM est mise en file par le signal post_save)
+            with transaction.atomic():
+                designation = serializer.save()
+                for message in messages_designation(designation, canaux=('webpush',)):
+                    message.save()
             
             return Response({
                 'success': True,
@@ -254,6 +344,15 @@ class DesignationListCreateView(generics.ListCreateAPIView):
                 'designation': DesignationSerializer(designation).data
             }, status=status.HTTP_201_CREATED)
         
+        conflicts = getattr(serializer, 'conflicts', None)
+        if conflicts:
+            return Response({
+                'success': False,
+                'message': "Conflit de planning pour l'arbitre",
+                'errors': serializer.errors,
+                'conflicts': conflicts
+            }, status=status.HTTP_409_CONFLICT)
+        
         return Response({
             'success': False,
             'message': 'Erreur lors de la création de la désignation',
@@ -267,10 +366,11 @@ class DesignationDetailView(generics.RetrieveUpdateDestroyAPIView):
     
     def get_queryset(self):
         """Seuls les administrateurs peuvent voir toutes les désignations"""
+        designations = Designation.objects.select_related('arbitre', 'match')
         if self.request.user.is_staff:
-            return Designation.objects.all()
+            return designations
         # Les arbitres voient leurs propres désignations
-        return Designation.objects.filter(arbitre=self.request.user)
+        return designations.filter(arbitre=self.request.user)
     
     def get_serializer_class(self):
         if self.request.method in ['PUT', 'PATCH']:
@@ -281,7 +381,7 @@ class DesignationDetailView(generics.RetrieveUpdateDestroyAPIView):
 def accept_designation(request, designation_id):
     """Accepter une désignation"""
     try:
-        designation = Designation.objects.get(
+        designation = Designation.objects.select_related('match', 'arbitre').get(
             id=designation_id, 
             arbitre=request.user
         )
@@ -291,14 +391,13 @@ def accept_designation(request, designation_id):
             'message': 'Désignation non trouvée'
         }, status=status.HTTP_404_NOT_FOUND)
     
-    if designation.status != 'proposed':
+    # Transition gardée : échoue si la désignation n'est plus proposée
+    if not designation.accepter():
         return Response({
             'success': False,
             'message': 'Cette désignation ne peut plus être acceptée'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    designation.accepter()
-    
     return Response({
         'success': True,
         'message': 'Désignation acceptée avec succès',
@@ -309,7 +408,7 @@ def accept_designation(request, designation_id):
 def decline_designation(request, designation_id):
     """Refuser une désignation"""
     try:
-        designation = Designation.objects.get(
+        designation = Designation.objects.select_related('match', 'arbitre').get(
             id=designation_id, 
             arbitre=request.user
         )
@@ -319,15 +418,14 @@ def decline_designation(request, designation_id):
             'message': 'Désignation non trouvée'
         }, status=status.HTTP_404_NOT_FOUND)
     
-    if designation.status != 'proposed':
+    raison = request.data.get('raison', '')
+    # Transition gardée : échoue si la désignation n'est plus proposée
+    if not designation.refuser(raison):
         return Response({
             'success': False,
             'message': 'Cette désignation ne peut plus être refusée'
         }, status=status.HTTP_400_BAD_REQUEST)
     
-    raison = request.data.get('raison', '')
-    designation.refuser(raison)
-    
     return Response({
         'success': True,
         'message': 'Désignation refusée',
@@ -339,35 +437,14 @@ def designation_statistics(request):
     """Statistiques des désignations"""
     if request.user.is_staff:
         # Pour les administrateurs, toutes les désignations
-        designations = Designation.objects.all()
+        statistics = get_designation_statistics()
     else:
         # Pour les arbitres, leurs propres désignations
-        designations = Designation.objects.filter(arbitre=request.user)
-    
-    total = designations.count()
-    accepted = designations.filter(status='accepted').count()
-    declined = designations.filter(status='declined').count()
-    pending = designations.filter(status='proposed').count()
-    confirmed = designations.filter(status='confirmed').count()
-    
-    # Désignations par type
-    types_stats = {}
-    for choice in Designation.TYPE_CHOICES:
-        count = designations.filter(type_designation=choice[0]).count()
-        if count > 0:
-            types_stats[choice[1]] = count
+        statistics = get_designation_statistics(request.user)
     
     return Response({
         'success': True,
-        'statistics': {
-            'total': total,
-            'accepted': accepted,
-            'declined': declined,
-            'pending': pending,
-            'confirmed': confirmed,
-            'types': types_stats,
-            'acceptance_rate': round((accepted / total * 100) if total > 0 else 0, 2)
-        }
+        'statistics': statistics
     })
 
 @api_view(['GET'])
@@ -375,13 +452,526 @@ def my_designations(request):
     """Récupérer les désignations de l'arbitre connecté"""
     designations = Designation.objects.filter(
         arbitre=request.user
-    ).order_by('-date_designation')
+    ).select_related('arbitre', 'match').order_by('-date_designation')
     
     return Response({
         'success': True,
         'designations': DesignationListSerializer(designations, many=True).data
     })
 
+# Colonnes du tableau de planification (une ligne = une désignation)
+COLONNES_TABLEAU_DESIGNATIONS = [
+    ('id', 'id'),
+    ('status', 'status'),
+    ('type_designation', 'type_designation'),
+    ('date_designation', 'date_designation'),
+    ('date_reponse', 'date_reponse'),
+    ('notification_envoyee', 'notification_envoyee'),
+    ('match_id', 'match_id'),
+    ('match_date', 'match__match_date'),
+    ('match_time', 'match__match_time'),
+    ('home_team', 'match__home_team'),
+    ('away_team', 'match__away_team'),
+    ('stadium', 'match__stadium'),
+    ('match_status', 'match__status'),
+    ('type_match', 'match__type_match__code'),
+    ('categorie', 'match__categorie__code'),
+    ('arbitre_id', 'arbitre_id'),
+    ('arbitre_prenom', 'arbitre__first_name'),
+    ('arbitre_nom', 'arbitre__last_name'),
+    ('arbitre_grade', 'arbitre__grade'),
+    ('ligue', 'arbitre__ligue__nom'),
+]
+
+@api_view(['GET'])
+def designation_board(request):
+    """
+    Tableau de planification des désignations (administrateurs)
+    
+    Une seule requête (match, type, catégorie, arbitre et ligue joints) et des
+    lignes compactes : `columns` donne l'ordre des valeurs de chaque ligne.
+    
+    Filtres: date (journée, YYYY-MM-DD), date_from, date_to, ligue, status
+    (liste séparée par des virgules), type_match (code), acknowledged (true/false :
+    l'arbitre a répondu ou non), limit (défaut 2000, max 10000)
+    """
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Accès réservé aux administrateurs'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    designations = Designation.objects.all()
+    
+    try:
+        for param, lookup in [('date', 'match__match_date'),
+                              ('date_from', 'match__match_date__gte'),
+                              ('date_to', 'match__match_date__lte')]:
+            value = request.GET.get(param)
+            if value:
+                designations = designations.filter(**{lookup: datetime.strptime(value, '%Y-%m-%d').date()})
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Format de date invalide. Utilisez YYYY-MM-DD'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    ligue = request.GET.get('ligue')
+    if ligue:
+        if not ligue.isdigit():
+            return Response({
+                'success': False,
+                'message': 'Paramètre ligue invalide'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        designations = designations.filter(arbitre__ligue_id=int(ligue))
+    
+    statuses = [value for value in request.GET.get('status', '').split(',') if value]
+    if statuses:
+        designations = designations.filter(status__in=statuses)
+    
+    type_match = request.GET.get('type_match')
+    if type_match:
+        designations = designations.filter(match__type_match__code=type_match)
+    
+    acknowledged = request.GET.get('acknowledged')
+    if acknowledged is not None and acknowledged != '':
+        designations = designations.filter(
+            date_reponse__isnull=acknowledged.lower() not in ['1', 'true', 'oui']
+        )
+    
+    try:
+        limit = max(1, min(int(request.GET.get('limit', 2000)), 10000))
+    except ValueError:
+        limit = 2000
+    
+    # Une ligne de plus que la limite pour savoir si le résultat est tronqué
+    rows = list(
+        designations.order_by('match__match_date', 'match__match_time', 'match_id', 'type_designation')
+        .values_list(*[lookup for _, lookup in COLONNES_TABLEAU_DESIGNATIONS])[:limit + 1]
+    )
+    truncated = len(rows) > limit
+    rows = rows[:limit]
+    
+    return Response({
+        'success': True,
+        'message': f'{len(rows)} désignation(s) trouvée(s)',
+        'columns': [name for name, _ in COLONNES_TABLEAU_DESIGNATIONS],
+        'rows': rows,
+        'truncated': truncated
+    })
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def bulk_designations(request):
+    """
+    Publier les désignations d'une journée en une seule requête (administrateurs)
+    
+    Corps: {"designations": [{match, arbitre, type_designation, commentaires, force}, ...],
+    "atomic": true, "force": false}. Le lot est validé en mémoire (y compris les
+    conflits de planning, sauf force) puis inséré en une transaction ; avec
+    atomic=true (défaut), une seule ligne invalide rejette tout le lot.
+    Les notifications sont écrites dans l'outbox par la même transaction.
+    """
+    from .bulk_designations import valider_lot, creer_lot
+    
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Accès réservé aux administrateurs'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    lignes = request.data.get('designations')
+    if not isinstance(lignes, list) or not lignes or not all(isinstance(ligne, dict) for ligne in lignes):
+        return Response({
+            'success': False,
+            'message': 'Le champ designations doit être une liste non vide'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    max_lignes = getattr(settings, 'DESIGNATIONS_LOT_MAX', 1000)
+    if len(lignes) > max_lignes:
+        return Response({
+            'success': False,
+            'message': f'Lot trop volumineux (maximum {max_lignes} désignations)'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    atomic = str(request.data.get('atomic', True)).lower() not in ['0', 'false', 'non']
+    force = str(request.data.get('force', False)).lower() in ['1', 'true', 'oui']
+    valides, resultats = valider_lot(lignes, force=force)
+    invalides = len(lignes) - len(valides)
+    
+    if invalides and (atomic or not valides):
+        return Response({
+            'success': False,
+            'message': f'{invalides} désignation(s) invalide(s), aucune désignation créée',
+            'results': resultats
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        creer_lot(valides)
+    except IntegrityError:
+        # Désignation créée entre la validation et l'insertion
+        return Response({
+            'success': False,
+            'message': 'Le lot est en conflit avec des désignations créées entre-temps, veuillez réessayer'
+        }, status=status.HTTP_409_CONFLICT)
+    
+    for index, designation in valides:
+        resultats[index]['designation_id'] = designation.pk
+    
+    return Response({
+        'success': True,
+        'message': f'{len(valides)} désignation(s) créée(s)' + (f', {invalides} ignorée(s)' if invalides else ''),
+        'created': len(valides),
+        'failed': invalides,
+        'results': resultats
+    }, status=status.HTTP_201_CREATED)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def validate_designations(request):
+    """
+    Contrôler une journée de désignations sans rien créer (administrateurs)
+    
+    Corps: {"designations": [...]} (même format que designations/bulk/) pour
+    contrôler un lot proposé, et/ou {"date": "YYYY-MM-DD"} pour contrôler les
+    désignations actives déjà publiées pour cette journée. Le contrôle est fait
+    en une passe : une requête pour les désignations, une pour les excuses.
+    """
+    from .bulk_designations import valider_lot
+    from .conflicts import conflits_journee
+    
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Accès réservé aux administrateurs'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    lignes = request.data.get('designations')
+    date_journee = request.data.get('date')
+    if lignes is None and not date_journee:
+        return Response({
+            'success': False,
+            'message': 'Indiquez designations et/ou date'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    reponse = {'success': True}
+    
+    if lignes is not None:
+        if not isinstance(lignes, list) or not all(isinstance(ligne, dict) for ligne in lignes):
+            return Response({
+                'success': False,
+                'message': 'Le champ designations doit être une liste'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        valides, resultats = valider_lot(lignes)
+        reponse['valid'] = len(valides) == len(lignes)
+        reponse['results'] = resultats
+    
+    if date_journee:
+        try:
+            date_journee = datetime.strptime(date_journee, '%Y-%m-%d').date()
+        except (TypeError, ValueError):
+            return Response({
+                'success': False,
+                'message': 'Format de date invalide. Utilisez YYYY-MM-DD'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        reponse['existing_conflicts'] = conflits_journee(date_journee)
+    
+    problemes = len(reponse.get('existing_conflicts', [])) + sum(
+        1 for resultat in reponse.get('results', []) if not resultat['success']
+    )
+    reponse['message'] = f'{problemes} problème(s) détecté(s)' if problemes else 'Aucun conflit détecté'
+    return Response(reponse)
+
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated])
+def propose_designations(request):
+    """
+    Proposer automatiquement les désignations d'une journée (administrateurs)
+    
+    Corps: {"matches": [ids]} ou {"date_from", "date_to", "type_match"},
+    "roles" (types de désignation à pourvoir), "ligue" (restreindre le pool
+    d'arbitres). Rien n'est créé : la réponse `designations` se publie telle
+    quelle via designations/bulk/ après relecture.
+    """
+    from accounts.models import Arbitre
+    from .planification import proposer_designations, NUMPY_AVAILABLE
+    
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Accès réservé aux administrateurs'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    if not NUMPY_AVAILABLE:
+        return Response({
+            'success': False,
+            'message': 'Planification automatique indisponible (NumPy non installé)'
+        }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+    
+    matches = Match.objects.exclude(status__in=['cancelled', 'postponed', 'completed'])
+    match_ids = request.data.get('matches')
+    if match_ids:
+        if not isinstance(match_ids, list) or not all(
+            isinstance(match_id, int) and not isinstance(match_id, bool) for match_id in match_ids
+        ):
+            return Response({
+                'success': False,
+                'message': 'Le champ matches doit être une liste d\'identifiants'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        matches = matches.filter(id__in=match_ids)
+    else:
+        try:
+            date_from = datetime.strptime(request.data['date_from'], '%Y-%m-%d').date()
+            date_to = datetime.strptime(request.data.get('date_to') or request.data['date_from'], '%Y-%m-%d').date()
+        except (KeyError, TypeError, ValueError):
+            return Response({
+                'success': False,
+                'message': 'Indiquez matches ou date_from / date_to (YYYY-MM-DD)'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        matches = matches.filter(match_date__range=(date_from, date_to))
+        if request.data.get('type_match'):
+            matches = matches.filter(type_match__code=request.data['type_match'])
+    
+    roles = request.data.get('roles') or None
+    types_valides = {code for code, _ in Designation.TYPE_CHOICES}
+    if roles is not None and (
+        not isinstance(roles, list) or not all(isinstance(role, str) and role in types_valides for role in roles)
+    ):
+        return Response({
+            'success': False,
+            'message': f'Rôles invalides. Valeurs possibles: {", ".join(sorted(types_valides))}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    arbitres = Arbitre.objects.all()
+    ligue = request.data.get('ligue')
+    if ligue:
+        if not str(ligue).isdigit():
+            return Response({
+                'success': False,
+                'message': 'Paramètre ligue invalide'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        arbitres = arbitres.filter(ligue_id=int(ligue))
+    
+    resultat = proposer_designations(matches, roles=roles, arbitres=arbitres)
+    return Response({
+        'success': True,
+        'message': f"{len(resultat['designations'])} désignation(s) proposée(s), "
+                   f"{len(resultat['non_pourvus'])} poste(s) non pourvu(s)",
+        **resultat
+    })
+
+# ===== HISTORIQUE DES DÉSIGNATIONS =====
+
+COLONNES_HISTORIQUE = (
+    'id', 'designation_id', 'match_id', 'arbitre_id', 'type_designation',
+    'ancien_statut', 'nouveau_statut', 'delai_reponse_secondes', 'created_at'
+)
+
+
+def _historique(request, entrees):
+    """Lignes de l'historique, filtrées par période et limitées"""
+    try:
+        for param, lookup in [('date_from', 'created_at__date__gte'), ('date_to', 'created_at__date__lte')]:
+            value = request.GET.get(param)
+            if value:
+                entrees = entrees.filter(**{lookup: datetime.strptime(value, '%Y-%m-%d').date()})
+        limit = max(1, min(int(request.GET.get('limit', 500)), 5000))
+    except ValueError:
+        return None
+    return list(entrees.order_by('created_at', 'id').values(*COLONNES_HISTORIQUE)[:limit])
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def match_timeline(request, match_id):
+    """
+    Chronologie des désignations d'un match (administrateurs et officiels du match)
+    
+    Filtres: date_from, date_to (YYYY-MM-DD), limit (défaut 500, max 5000)
+    """
+    entrees = HistoriqueDesignation.objects.filter(match_id=match_id)
+    if not request.user.is_staff and not entrees.filter(arbitre_id=request.user.pk).exists():
+        return Response({
+            'success': False,
+            'message': 'Accès non autorisé'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    timeline = _historique(request, entrees)
+    if timeline is None:
+        return Response({
+            'success': False,
+            'message': 'Paramètres invalides (dates YYYY-MM-DD, limit entier)'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'success': True,
+        'message': f'{len(timeline)} transition(s)',
+        'match_id': match_id,
+        'timeline': timeline
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def arbitre_timeline(request, arbitre_id):
+    """
+    Chronologie des désignations d'un arbitre (administrateurs ou l'arbitre lui-même)
+    
+    Filtres: date_from, date_to (YYYY-MM-DD), limit (défaut 500, max 5000)
+    """
+    if not request.user.is_staff and request.user.pk != arbitre_id:
+        return Response({
+            'success': False,
+            'message': 'Accès non autorisé'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    timeline = _historique(request, HistoriqueDesignation.objects.filter(arbitre_id=arbitre_id))
+    if timeline is None:
+        return Response({
+            'success': False,
+            'message': 'Paramètres invalides (dates YYYY-MM-DD, limit entier)'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    return Response({
+        'success': True,
+        'message': f'{len(timeline)} transition(s)',
+        'arbitre_id': arbitre_id,
+        'timeline': timeline
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def response_time_statistics(request):
+    """
+    Temps de réponse des arbitres pré-agrégés par mois (administrateurs)
+    
+    Paramètres: periode (YYYY-MM, défaut mois courant), niveau (ligue_grade,
+    ligue, grade, global ; défaut global), ligue, grade. Les agrégats sont
+    calculés par la commande agreger_temps_reponse.
+    """
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Accès réservé aux administrateurs'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        periode = datetime.strptime(request.GET.get('periode') or timezone.now().strftime('%Y-%m'), '%Y-%m').date()
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Format de période invalide. Utilisez YYYY-MM'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    niveau = request.GET.get('niveau', 'global')
+    if niveau not in dict(StatistiqueTempsReponse.NIVEAU_CHOICES):
+        return Response({
+            'success': False,
+            'message': f'Niveau invalide. Valeurs possibles: {", ".join(dict(StatistiqueTempsReponse.NIVEAU_CHOICES))}'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    statistiques = StatistiqueTempsReponse.objects.filter(periode=periode, niveau=niveau)
+    ligue = request.GET.get('ligue')
+    if ligue:
+        if not ligue.isdigit():
+            return Response({
+                'success': False,
+                'message': 'Paramètre ligue invalide'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        statistiques = statistiques.filter(ligue_id=int(ligue))
+    grade = request.GET.get('grade')
+    if grade:
+        statistiques = statistiques.filter(grade=grade)
+    
+    lignes = list(statistiques.values(
+        'ligue_id', 'ligue__nom', 'grade', 'nb_reponses', 'nb_acceptees', 'nb_refusees',
+        'moyenne_secondes', 'p50_secondes', 'p90_secondes', 'p95_secondes', 'updated_at'
+    ))
+    return Response({
+        'success': True,
+        'message': f'{len(lignes)} agrégat(s)',
+        'periode': periode.strftime('%Y-%m'),
+        'niveau': niveau,
+        'statistics': lignes
+    })
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def payment_statements(request):
+    """
+    Relevé mensuel de paiement des arbitres (administrateurs)
+    
+    Paramètres: mois (YYYY-MM, défaut mois courant), ligue, detail (true :
+    une ligne par désignation), output (json par défaut, csv ou xlsx : fichier
+    diffusé en flux). Voir paiements.py.
+    """
+    from django.http import StreamingHttpResponse
+    from . import paiements
+    from .temps_reponse import mois_suivant
+    
+    if not request.user.is_staff:
+        return Response({
+            'success': False,
+            'message': 'Accès réservé aux administrateurs'
+        }, status=status.HTTP_403_FORBIDDEN)
+    
+    try:
+        debut = datetime.strptime(request.GET.get('mois') or timezone.now().strftime('%Y-%m'), '%Y-%m').date()
+    except ValueError:
+        return Response({
+            'success': False,
+            'message': 'Format de mois invalide. Utilisez YYYY-MM'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    ligue = request.GET.get('ligue')
+    if ligue and not ligue.isdigit():
+        return Response({
+            'success': False,
+            'message': 'Paramètre ligue invalide'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    sortie = request.GET.get('output', 'json')
+    detail = request.GET.get('detail', '').lower() == 'true'
+    lignes = paiements.releve(debut, mois_suivant(debut), ligue_id=int(ligue) if ligue else None, detail=detail)
+    nom_fichier = f'releve_paiements_{debut:%Y-%m}'
+    
+    if sortie == 'csv':
+        reponse = StreamingHttpResponse(paiements.flux_csv(lignes), content_type='text/csv; charset=utf-8')
+        reponse['Content-Disposition'] = f'attachment; filename="{nom_fichier}.csv"'
+        return reponse
+    
+    if sortie == 'xlsx':
+        if not paiements.OPENPYXL_AVAILABLE:
+            return Response({
+                'success': False,
+                'message': 'Export XLSX indisponible (openpyxl non installé)'
+            }, status=status.HTTP_503_SERVICE_UNAVAILABLE)
+        reponse = StreamingHttpResponse(
+            paiements.flux_xlsx(lignes),
+            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+        )
+        reponse['Content-Disposition'] = f'attachment; filename="{nom_fichier}.xlsx"'
+        return reponse
+    
+    if sortie != 'json':
+        return Response({
+            'success': False,
+            'message': 'Format de sortie invalide. Valeurs possibles: json, csv, xlsx'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    releve = {'designations': [], 'arbitres': [], 'ligues': [], 'total': []}
+    cles = {'designation': 'designations', 'total_arbitre': 'arbitres',
+            'total_ligue': 'ligues', 'total_general': 'total'}
+    for ligne in lignes:
+        releve[cles[ligne['ligne']]].append(ligne)
+    return Response({
+        'success': True,
+        'message': f'{len(releve["arbitres"])} arbitre(s) à payer',
+        'mois': debut.strftime('%Y-%m'),
+        'releve': releve
+    })
+
 # ===== VUES POUR LES TYPES DE MATCH ET CATÉGORIES =====
 
 @api_view(['GET'])
@@ -421,55 +1011,90 @@ def match_roles(request):
         'roles': roles
     })
 
+# ===== RECHERCHE DES MATCHS =====
+
+def _reponse_recherche(request):
+    """Exécuter une recherche de matchs et construire la réponse paginée"""
+    from .search import rechercher_matchs, paginer_matchs, RechercheInvalide
+    
+    try:
+        matches, ordering = rechercher_matchs(request.GET.dict(), request.user)
+    except RechercheInvalide as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    
+    page, pagination = paginer_matchs(request, matches, ordering)
+    
+    return Response({
+        'success': True,
+        'message': f'{len(page)} match(s) trouvé(s)',
+        'pagination': pagination,
+        'matches': MatchListSerializer(page, many=True).data
+    })
+
 @api_view(['GET'])
-def matches_by_type(request, type_code):
-    """Récupérer les matchs sifflés par type de compétition"""
-    # Cette vue est accessible sans authentification
+def search_matches(request):
+    """
+    Recherche unifiée des matchs (administrateurs et arbitres)
+    
+    Filtres: type, categorie, status (liste séparée par des virgules), team,
+    stadium, date_from, date_to, referee, ligue, mine=true
+    Tri: ordering = date | -date | created | -created
+    Pagination par curseur: cursor, page_size
+    """
+    return _reponse_recherche(request)
+
+def _competition_info(type_code):
+    """Type de compétition actif, ou None"""
     try:
-        # Récupérer le type de match par code
-        match_type = TypeMatch.objects.get(code=type_code, is_active=True)
+        return TypeMatch.objects.get(code=type_code, is_active=True)
     except TypeMatch.DoesNotExist:
+        return None
+
+def _matchs_siffles(request, match_type):
+    """
+    Matchs sifflés d'une compétition pour les anciennes routes
+    
+    Les filtres passent par la recherche ; seuls les paramètres historiques
+    (referee_id, date_from, date_to) sont pris en compte.
+    
+    Raises:
+        RechercheInvalide si un paramètre est invalide
+    """
+    from .search import rechercher_matchs
+    
+    params = {
+        champ: request.GET[champ]
+        for champ in ('referee_id', 'date_from', 'date_to')
+        if request.GET.get(champ)
+    }
+    params.update(type=match_type.code, status='completed', ordering='-date')
+    matches, ordering = rechercher_matchs(params, request.user)
+    return matches.order_by(*ordering)
+
+@api_view(['GET'])
+def matches_by_type(request, type_code):
+    """Récupérer les matchs sifflés par type de compétition (filtres de la recherche)"""
+    match_type = _competition_info(type_code)
+    if match_type is None:
         return Response({
             'success': False,
             'message': f'Type de match {type_code} non trouvé'
         }, status=status.HTTP_404_NOT_FOUND)
     
-    # Récupérer les matchs sifflés (terminés) de ce type
-    matches = Match.objects.filter(
-        type_match=match_type,
-        status='completed'
-    ).select_related('type_match', 'categorie', 'referee').order_by('-match_date', '-match_time')
+    from .search import RechercheInvalide
     
-    # Appliquer des filtres optionnels
-    referee_id = request.GET.get('referee_id')
-    if referee_id:
-        matches = matches.filter(referee_id=referee_id)
-    
-    date_from = request.GET.get('date_from')
-    if date_from:
-        try:
-            from datetime import datetime
-            date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-            matches = matches.filter(match_date__gte=date_from_obj)
-        except ValueError:
-            return Response({
-                'success': False,
-                'message': 'Format de date invalide. Utilisez YYYY-MM-DD'
-            }, status=status.HTTP_400_BAD_REQUEST)
-    
-    date_to = request.GET.get('date_to')
-    if date_to:
-        try:
-            from datetime import datetime
-            date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-            matches = matches.filter(match_date__lte=date_to_obj)
-        except ValueError:
-            return Response({
-                'success': False,
-                'message': 'Format de date invalide. Utilisez YYYY-MM-DD'
-            }, status=status.HTTP_400_BAD_REQUEST)
+    try:
+        matches = _matchs_siffles(request, match_type)
+    except RechercheInvalide as e:
+        return Response({
+            'success': False,
+            'message': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
     
-    # Pagination
+    # Pagination par numéro de page (format historique de la route)
     page_size = int(request.GET.get('page_size', 20))
     page = int(request.GET.get('page', 1))
     
@@ -503,176 +1128,163 @@ def matches_by_type(request, type_code):
     })
 
 # Vues spécifiques pour chaque type de compétition
-class CompetitionMatchesView(generics.ListAPIView):
-    """Vue générique pour les matchs de compétition"""
+class CompetitionMatchesView(generics.GenericAPIView):
+    """Vue générique pour les matchs sifflés d'une compétition (filtres de la recherche)"""
     permission_classes = [permissions.AllowAny]
-    serializer_class = MatchListSerializer
+    type_code = None
     
-    def get_queryset(self):
-        type_code = self.kwargs['type_code']
-        try:
-            match_type = TypeMatch.objects.get(code=type_code, is_active=True)
-            return Match.objects.filter(
-                type_match=match_type,
-                status='completed'
-            ).select_related('type_match', 'categorie', 'referee').order_by('-match_date', '-match_time')
-        except TypeMatch.DoesNotExist:
-            return Match.objects.none()
-    
-    def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        
-        # Si aucun match trouvé, vérifier si le type existe
-        if not queryset.exists():
-            # Récupérer le type de match pour vérifier s'il existe
-            type_code = getattr(self, 'type_code', 'unknown')
-            try:
-                match_type = TypeMatch.objects.get(code=type_code, is_active=True)
-                return Response({
-                    'success': True,
-                    'message': f'Aucun match trouvé pour {match_type.nom}',
-                    'competition': {
-                        'code': match_type.code,
-                        'name': match_type.nom,
-                        'description': match_type.description
-                    },
-                    'matches': []
-                })
-            except TypeMatch.DoesNotExist:
-                return Response({
-                    'success': False,
-                    'message': f'Type de match {type_code} non trouvé'
-                }, status=status.HTTP_404_NOT_FOUND)
-        
-        # Récupérer le type de match depuis le premier match
-        match_type = queryset.first().type_match
-        
-        # Appliquer des filtres optionnels
-        referee_id = request.GET.get('referee_id')
-        if referee_id:
-            queryset = queryset.filter(referee_id=referee_id)
-        
-        date_from = request.GET.get('date_from')
-        if date_from:
-            try:
-                from datetime import datetime
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-                queryset = queryset.filter(match_date__gte=date_from_obj)
-            except ValueError:
-                return Response({
-                    'success': False,
-                    'message': 'Format de date invalide (YYYY-MM-DD)'
-                }, status=status.HTTP_400_BAD_REQUEST)
+    def get(self, request, *args, **kwargs):
+        type_code = self.kwargs.get('type_code', self.type_code)
+        match_type = _competition_info(type_code)
+        if match_type is None:
+            return Response({
+                'success': False,
+                'message': f'Type de match {type_code} non trouvé'
+            }, status=status.HTTP_404_NOT_FOUND)
         
-        date_to = request.GET.get('date_to')
-        if date_to:
-            try:
-                from datetime import datetime
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-                queryset = queryset.filter(match_date__lte=date_to_obj)
-            except ValueError:
-                return Response({
-                    'success': False,
-                    'message': 'Format de date invalide (YYYY-MM-DD)'
-                }, status=status.HTTP_400_BAD_REQUEST)
+        from .search import RechercheInvalide
         
-        serializer = self.get_serializer(queryset, many=True)
+        try:
+            matches = list(_matchs_siffles(request, match_type))
+        except RechercheInvalide as e:
+            return Response({
+                'success': False,
+                'message': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
+        # Format historique de la route : tous les matchs, sans pagination
+        if matches:
+            message = f'{len(matches)} match(s) de {match_type.nom} trouvé(s)'
+        else:
+            message = f'Aucun match trouvé pour {match_type.nom}'
         return Response({
             'success': True,
-            'message': f'{queryset.count()} match(s) de {match_type.nom} trouvé(s)',
+            'message': message,
             'competition': {
                 'code': match_type.code,
                 'name': match_type.nom,
                 'description': match_type.description
             },
-            'matches': serializer.data
+            'matches': MatchListSerializer(matches, many=True).data
         })
 
-# Vues spécifiques pour chaque type de compétition
 class Ligue1MatchesView(CompetitionMatchesView):
     """Récupérer les matchs sifflés de Ligue 1"""
     type_code = 'L1'
-    
-    def get_queryset(self):
-        try:
-            match_type = TypeMatch.objects.get(code='L1', is_active=True)
-            return Match.objects.filter(
-                type_match=match_type,
-                status='completed'
-            ).select_related('type_match', 'categorie', 'referee').order_by('-match_date', '-match_time')
-        except TypeMatch.DoesNotExist:
-            return Match.objects.none()
 
 class Ligue2MatchesView(CompetitionMatchesView):
     """Récupérer les matchs sifflés de Ligue 2"""
     type_code = 'L2'
-    
-    def get_queryset(self):
-        try:
-            match_type = TypeMatch.objects.get(code='L2', is_active=True)
-            return Match.objects.filter(
-                type_match=match_type,
-                status='completed'
-            ).select_related('type_match', 'categorie', 'referee').order_by('-match_date', '-match_time')
-        except TypeMatch.DoesNotExist:
-            return Match.objects.none()
 
 class C1MatchesView(CompetitionMatchesView):
     """Récupérer les matchs sifflés de C1"""
     type_code = 'C1'
-    
-    def get_queryset(self):
-        try:
-            match_type = TypeMatch.objects.get(code='C1', is_active=True)
-            return Match.objects.filter(
-                type_match=match_type,
-                status='completed'
-            ).select_related('type_match', 'categorie', 'referee').order_by('-match_date', '-match_time')
-        except TypeMatch.DoesNotExist:
-            return Match.objects.none()
 
 class C2MatchesView(CompetitionMatchesView):
     """Récupérer les matchs sifflés de C2"""
     type_code = 'C2'
-    
-    def get_queryset(self):
-        try:
-            match_type = TypeMatch.objects.get(code='C2', is_active=True)
-            return Match.objects.filter(
-                type_match=match_type,
-                status='completed'
-            ).select_related('type_match', 'categorie', 'referee').order_by('-match_date', '-match_time')
-        except TypeMatch.DoesNotExist:
-            return Match.objects.none()
 
 class JeunesMatchesView(CompetitionMatchesView):
     """Récupérer les matchs sifflés de Jeunes"""
     type_code = 'JUN'
-    
-    def get_queryset(self):
-        try:
-            match_type = TypeMatch.objects.get(code='JUN', is_active=True)
-            return Match.objects.filter(
-                type_match=match_type,
-                status='completed'
-            ).select_related('type_match', 'categorie', 'referee').order_by('-match_date', '-match_time')
-        except TypeMatch.DoesNotExist:
-            return Match.objects.none()
 
 class CoupeTunisieMatchesView(CompetitionMatchesView):
     """Récupérer les matchs sifflés de Coupe de Tunisie"""
     type_code = 'CT'
+
+
+# ===== RÉFÉRENTIEL DES ÉQUIPES ET DES STADES =====
+
+def _rechercher_referentiel(model, request):
+    """Recherche par nom canonique ou nom normalisé (préfixe indexé)"""
+    from .referentiel import normaliser_nom
+    
+    queryset = model.objects.filter(is_active=True)
+    search = request.GET.get('search')
+    if search:
+        queryset = queryset.filter(nom_normalise__startswith=normaliser_nom(search))
+    return queryset.order_by('nom')
+
+def _matchs_du_referentiel(request, matches, entite, cle):
+    """Liste paginée des matchs d'une équipe ou d'un stade"""
+    status_filter = request.GET.get('status')
+    if status_filter:
+        matches = matches.filter(status=status_filter)
     
-    def get_queryset(self):
-        try:
-            match_type = TypeMatch.objects.get(code='CT', is_active=True)
-            return Match.objects.filter(
-                type_match=match_type,
-                status='completed'
-            ).select_related('type_match', 'categorie', 'referee').order_by('-match_date', '-match_time')
-        except TypeMatch.DoesNotExist:
-            return Match.objects.none()
+    matches = matches.select_related('type_match', 'categorie', 'referee').prefetch_related(
+        'designations__arbitre'
+    ).order_by('-match_date', '-match_time')
+    
+    from django.core.paginator import Paginator
+    try:
+        page_size = max(1, min(int(request.GET.get('page_size', 20)), 100))
+    except ValueError:
+        page_size = 20
+    paginator = Paginator(matches, page_size)
+    page_obj = paginator.get_page(request.GET.get('page', 1))
+    
+    return Response({
+        'success': True,
+        'message': f'{paginator.count} match(s) trouvé(s)',
+        cle: entite,
+        'statistics': {
+            'total_matches': paginator.count,
+            'page': page_obj.number,
+            'page_size': page_size,
+            'total_pages': paginator.num_pages,
+            'has_next': page_obj.has_next(),
+            'has_previous': page_obj.has_previous()
+        },
+        'matches': MatchListSerializer(page_obj.object_list, many=True).data
+    })
+
+@api_view(['GET'])
+def teams(request):
+    """Récupérer les équipes (paramètre search optionnel)"""
+    teams = _rechercher_referentiel(Team, request)
+    
+    return Response({
+        'success': True,
+        'teams': TeamSerializer(teams, many=True).data
+    })
+
+@api_view(['GET'])
+def team_matches(request, team_id):
+    """Matchs d'une équipe, à domicile ou à l'extérieur"""
+    try:
+        team = Team.objects.get(id=team_id)
+    except Team.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Équipe non trouvée'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return _matchs_du_referentiel(request, Match.objects.for_team(team), TeamSerializer(team).data, 'team')
+
+@api_view(['GET'])
+def stadiums(request):
+    """Récupérer les stades (paramètre search optionnel)"""
+    stadiums = _rechercher_referentiel(Stadium, request)
+    
+    return Response({
+        'success': True,
+        'stadiums': StadiumSerializer(stadiums, many=True).data
+    })
+
+@api_view(['GET'])
+def stadium_matches(request, stadium_id):
+    """Matchs joués dans un stade"""
+    try:
+        stadium = Stadium.objects.get(id=stadium_id)
+    except Stadium.DoesNotExist:
+        return Response({
+            'success': False,
+            'message': 'Stade non trouvé'
+        }, status=status.HTTP_404_NOT_FOUND)
+    
+    return _matchs_du_referentiel(
+        request, Match.objects.filter(stadium_ref=stadium), StadiumSerializer(stadium).data, 'stadium'
+    )
 
 
 # ===== EXCUSES D'ARBITRES =====
@@ -797,6 +1409,34 @@ def excuses_arbitre_statistics(request):
     })
 
 
+def _paginer_excuses(request, queryset):
+    """
+    Paginer une liste d'excuses (paramètres page / page_size)
+    
+    Returns:
+        (page, pagination) où pagination décrit la page servie
+    """
+    from django.core.paginator import Paginator
+    
+    try:
+        page_size = int(request.GET.get('page_size', 20))
+    except ValueError:
+        page_size = 20
+    page_size = max(1, min(page_size, 100))
+    
+    paginator = Paginator(queryset, page_size)
+    page_obj = paginator.get_page(request.GET.get('page', 1))
+    
+    return page_obj, {
+        'count': paginator.count,
+        'page': page_obj.number,
+        'page_size': page_size,
+        'total_pages': paginator.num_pages,
+        'has_next': page_obj.has_next(),
+        'has_previous': page_obj.has_previous()
+    }
+
+
 def excuses_passees_par_date(request):
     """API pour voir les excuses passées par date"""
     from datetime import date
@@ -823,15 +1463,17 @@ def excuses_passees_par_date(request):
     # Récupérer les excuses passées (date_fin < date cible)
     excuses_passees = ExcuseArbitre.objects.filter(
         date_fin__lt=target_date
-    ).order_by('-date_fin')
+    ).order_by('-date_fin', '-id')
     
-    serializer = ExcuseArbitreSerializer(excuses_passees, many=True)
+    page_obj, pagination = _paginer_excuses(request, excuses_passees)
+    serializer = ExcuseArbitreSerializer(page_obj.object_list, many=True)
     
     return JsonResponse({
         'success': True,
-        'message': f'{excuses_passees.count()} excuse(s) passée(s) trouvée(s) pour le {target_date}',
+        'message': f'{pagination["count"]} excuse(s) passée(s) trouvée(s) pour le {target_date}',
         'date_cible': target_date.strftime('%Y-%m-%d'),
-        'excuses_passees': serializer.data
+        'excuses_passees': serializer.data,
+        'pagination': pagination
     })
 
 
@@ -862,15 +1504,17 @@ def excuses_en_cours_par_date(request):
     excuses_en_cours = ExcuseArbitre.objects.filter(
         date_debut__lte=target_date,
         date_fin__gte=target_date
-    ).order_by('-created_at')
+    ).order_by('-created_at', '-id')
     
-    serializer = ExcuseArbitreSerializer(excuses_en_cours, many=True)
+    page_obj, pagination = _paginer_excuses(request, excuses_en_cours)
+    serializer = ExcuseArbitreSerializer(page_obj.object_list, many=True)
     
     return JsonResponse({
         'success': True,
-        'message': f'{excuses_en_cours.count()} excuse(s) en cours trouvée(s) pour le {target_date}',
+        'message': f'{pagination["count"]} excuse(s) en cours trouvée(s) pour le {target_date}',
         'date_cible': target_date.strftime('%Y-%m-%d'),
-        'excuses_en_cours': serializer.data
+        'excuses_en_cours': serializer.data,
+        'pagination': pagination
     })
 
 
@@ -900,15 +1544,49 @@ def excuses_a_venir_par_date(request):
     # Récupérer les excuses à venir (date_debut > date cible)
     excuses_a_venir = ExcuseArbitre.objects.filter(
         date_debut__gt=target_date
-    ).order_by('date_debut')
+    ).order_by('date_debut', 'id')
     
-    serializer = ExcuseArbitreSerializer(excuses_a_venir, many=True)
+    page_obj, pagination = _paginer_excuses(request, excuses_a_venir)
+    serializer = ExcuseArbitreSerializer(page_obj.object_list, many=True)
     
     return JsonResponse({
         'success': True,
-        'message': f'{excuses_a_venir.count()} excuse(s) à venir trouvée(s) pour le {target_date}',
+        'message': f'{pagination["count"]} excuse(s) à venir trouvée(s) pour le {target_date}',
         'date_cible': target_date.strftime('%Y-%m-%d'),
-        'excuses_a_venir': serializer.data
+        'excuses_a_venir': serializer.data,
+        'pagination': pagination
+    })
+
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAuthenticated])
+def excuses_heatmap(request):
+    """
+    Heatmap de disponibilité : nombre d'arbitres excusés par jour du mois
+    
+    Paramètres: mois (YYYY-MM, défaut: mois courant), inclure_en_attente (true/false)
+    """
+    from .excuse_heatmap import get_excuse_heatmap
+    
+    mois_param = request.GET.get('mois')
+    if mois_param:
+        try:
+            mois_date = datetime.strptime(mois_param, '%Y-%m').date()
+        except ValueError:
+            return Response({
+                'success': False,
+                'message': 'Format de mois invalide. Utilisez YYYY-MM'
+            }, status=status.HTTP_400_BAD_REQUEST)
+    else:
+        mois_date = timezone.now().date()
+    
+    inclure_en_attente = request.GET.get('inclure_en_attente', 'false').lower() in ['1', 'true', 'oui']
+    heatmap = get_excuse_heatmap(mois_date.year, mois_date.month, inclure_en_attente)
+    
+    return Response({
+        'success': True,
+        'message': f'Disponibilités des arbitres pour {heatmap["mois"]}',
+        'heatmap': heatmap
     })
 
 
@@ -930,7 +1608,13 @@ class TarificationMatchListView(generics.ListAPIView):
         type_match = self.request.query_params.get('type_match')
         role = self.request.query_params.get('role')
         is_active = self.request.query_params.get('is_active')
+        jour = self.request.query_params.get('date')
         
+        if jour:
+            try:
+                queryset = queryset.en_vigueur(datetime.strptime(jour, '%Y-%m-%d').date())
+            except ValueError:
+                queryset = queryset.none()
         if competition:
             queryset = queryset.filter(competition=competition)
         if division:
@@ -942,7 +1626,7 @@ class TarificationMatchListView(generics.ListAPIView):
         if is_active is not None:
             queryset = queryset.filter(is_active=is_active.lower() == 'true')
         
-        return queryset.order_by('competition', 'division', 'type_match', 'role')
+        return queryset.order_by('competition', 'division', 'type_match', 'role', 'valid_from')
 
 
 class TarificationMatchDetailView(generics.RetrieveAPIView):
@@ -976,15 +1660,27 @@ class TarificationMatchUpdateView(generics.RetrieveUpdateDestroyAPIView):
         return TarificationMatchSerializer
 
 
+def _date_tarif(request):
+    """Date d'application demandée (?date=YYYY-MM-DD), None pour aujourd'hui"""
+    valeur = request.GET.get('date')
+    return datetime.strptime(valeur, '%Y-%m-%d').date() if valeur else None
+
+
+_DATE_TARIF_INVALIDE = 'Format de date invalide. Utilisez YYYY-MM-DD'
+
+
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def tarification_by_competition(request, competition):
-    """Récupérer toutes les tarifications d'une compétition"""
+    """Récupérer les tarifications d'une compétition en vigueur à une date (défaut aujourd'hui)"""
     try:
-        tarifications = TarificationMatch.objects.filter(
-            competition=competition,
-            is_active=True
-        ).order_by('division', 'type_match', 'role')
+        jour = _date_tarif(request)
+    except ValueError:
+        return Response({'success': False, 'message': _DATE_TARIF_INVALIDE}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        # Table compilée en mémoire (voir tarification.py)
+        tarifications = tarification.table().filtrer(competition, jour=jour)
         
         serializer = TarificationMatchListSerializer(tarifications, many=True)
         
@@ -992,7 +1688,7 @@ def tarification_by_competition(request, competition):
             'success': True,
             'message': f'Tarifications trouvées pour {competition}',
             'competition': competition,
-            'count': tarifications.count(),
+            'count': len(tarifications),
             'tarifications': serializer.data
         })
         
@@ -1006,13 +1702,17 @@ def tarification_by_competition(request, competition):
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def tarification_by_type_match(request, competition, type_match):
-    """Récupérer les tarifications d'un type de match spécifique"""
+    """Récupérer les tarifications d'un type de match en vigueur à une date (défaut aujourd'hui)"""
+    try:
+        jour = _date_tarif(request)
+    except ValueError:
+        return Response({'success': False, 'message': _DATE_TARIF_INVALIDE}, status=status.HTTP_400_BAD_REQUEST)
+    
     try:
-        tarifications = TarificationMatch.objects.filter(
-            competition=competition,
-            type_match=type_match,
-            is_active=True
-        ).order_by('division', 'role')
+        tarifications = sorted(
+            tarification.table().filtrer(competition, type_match=type_match, jour=jour),
+            key=lambda ligne: (ligne.division or '', ligne.role)
+        )
         
         serializer = TarificationMatchListSerializer(tarifications, many=True)
         
@@ -1021,7 +1721,7 @@ def tarification_by_type_match(request, competition, type_match):
             'message': f'Tarifications trouvées pour {competition} - {type_match}',
             'competition': competition,
             'type_match': type_match,
-            'count': tarifications.count(),
+            'count': len(tarifications),
             'tarifications': serializer.data
         })
         
@@ -1035,16 +1735,28 @@ def tarification_by_type_match(request, competition, type_match):
 @api_view(['GET'])
 @permission_classes([permissions.AllowAny])
 def tarification_by_role(request, competition, type_match, role):
-    """Récupérer la tarification d'un rôle spécifique"""
+    """Récupérer la tarification d'un rôle spécifique en vigueur à une date (défaut aujourd'hui)"""
     try:
-        tarification = TarificationMatch.objects.get(
-            competition=competition,
-            type_match=type_match,
-            role=role,
-            is_active=True
-        )
+        jour = _date_tarif(request)
+    except ValueError:
+        return Response({'success': False, 'message': _DATE_TARIF_INVALIDE}, status=status.HTTP_400_BAD_REQUEST)
+    
+    try:
+        division = request.query_params.get('division')
+        if division:
+            tarif = tarification.table().tarification(competition, division, type_match, role, jour=jour)
+        else:
+            # Sans division : la première tarification du rôle (tarif sans division en tête)
+            tarifs = tarification.table().filtrer(competition, type_match=type_match, role=role, jour=jour)
+            tarif = tarifs[0] if tarifs else None
         
-        serializer = TarificationMatchSerializer(tarification)
+        if tarif is None:
+            return Response({
+                'success': False,
+                'message': 'Tarification non trouvée'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        serializer = TarificationMatchSerializer(tarif)
         
         return Response({
             'success': True,
@@ -1052,12 +1764,6 @@ def tarification_by_role(request, competition, type_match, role):
             'tarification': serializer.data
         })
         
-    except TarificationMatch.DoesNotExist:
-        return Response({
-            'success': False,
-            'message': 'Tarification non trouvée'
-        }, status=status.HTTP_404_NOT_FOUND)
-        
     except Exception as e:
         return Response({
             'success': False,
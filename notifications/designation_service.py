@@ -5,7 +5,7 @@ Service de notifications automatiques pour les désignations d'arbitrage
 
 from typing import List, Dict, Any
 from django.utils import timezone
-from accounts.models import Arbitre, PushSubscription
+from accounts.models import Arbitre
 from .services import push_service
 
 class DesignationNotificationService:
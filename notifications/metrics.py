@@ -0,0 +1,85 @@
+"""
+Métriques de livraison des notifications
+
+Compteurs journaliers par canal ('fcm', 'webpush') gardés en base
+(NotificationMetric, une ligne par jour et par canal) :
+- envoyes : messages acceptés par le service push ;
+- echecs : messages refusés ou en erreur ;
+- invalides : appareils désactivés car définitivement invalides (token
+  désinscrit, abonnement 404/410).
+
+Les envois partent surtout des workers (run_notification_workers) et les
+statistiques sont lues par le serveur web : les compteurs sont incrémentés
+par des UPDATE atomiques (F()), visibles de tous les processus. Les lignes
+de plus de NOTIFICATIONS_METRIQUES_JOURS jours (défaut 30) sont supprimées à
+la création de la ligne d'un nouveau jour.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Sum
+from django.utils import timezone
+
+CANAUX = ('fcm', 'webpush')
+EVENEMENTS = ('envoyes', 'echecs', 'invalides')
+
+# Événement -> colonne de NotificationMetric
+COLONNES = {'envoyes': 'sent', 'echecs': 'failed', 'invalides': 'pruned'}
+
+
+def _purger(aujourd_hui):
+    from accounts.models import NotificationMetric
+
+    limite = aujourd_hui - timedelta(days=getattr(settings, 'NOTIFICATIONS_METRIQUES_JOURS', 30))
+    NotificationMetric.objects.filter(day__lt=limite).delete()
+
+
+def enregistrer(canal, envoyes=0, echecs=0, invalides=0):
+    """Enregistrer le bilan d'un envoi groupé (un UPDATE atomique)"""
+    from accounts.models import NotificationMetric
+
+    valeurs = {'envoyes': envoyes, 'echecs': echecs, 'invalides': invalides}
+    increments = {COLONNES[evenement]: F(COLONNES[evenement]) + valeur for evenement, valeur in valeurs.items() if valeur}
+    if not increments:
+        return
+    aujourd_hui = timezone.localdate()
+    lignes = NotificationMetric.objects.filter(day=aujourd_hui, channel=canal)
+    if not lignes.update(**increments):
+        # Premier envoi du jour sur ce canal
+        _, cree = NotificationMetric.objects.get_or_create(day=aujourd_hui, channel=canal)
+        lignes.update(**increments)
+        if cree:
+            _purger(aujourd_hui)
+
+
+def incrementer(canal, evenement, valeur=1):
+    """Ajouter `valeur` au compteur du jour"""
+    enregistrer(canal, **{evenement: valeur})
+
+
+def resume(jours=7):
+    """
+    Totaux des derniers jours par canal, avec le taux d'élagage (une requête)
+
+    Returns:
+        {canal: {'envoyes', 'echecs', 'invalides', 'taux_elagage'}}
+    """
+    from accounts.models import NotificationMetric
+
+    depuis = timezone.localdate() - timedelta(days=jours - 1)
+    lignes = (
+        NotificationMetric.objects.filter(day__gte=depuis)
+        .values('channel')
+        .annotate(**{evenement: Sum(colonne) for evenement, colonne in COLONNES.items()})
+        .order_by()
+    )
+
+    totaux = {canal: dict.fromkeys(EVENEMENTS, 0) for canal in CANAUX}
+    for ligne in lignes:
+        if ligne['channel'] in totaux:
+            totaux[ligne['channel']].update({evenement: ligne[evenement] or 0 for evenement in EVENEMENTS})
+
+    for total in totaux.values():
+        tentatives = total['envoyes'] + total['echecs']
+        total['taux_elagage'] = round(total['invalides'] * 100 / tentatives, 2) if tentatives else 0.0
+    return totaux
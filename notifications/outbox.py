@@ -0,0 +1,265 @@
+"""
+Outbox transactionnelle des notifications
+
+Les notifications ne sont plus envoyées dans les signaux ni dans les vues :
+`mettre_en_file` écrit un NotificationOutbox dans la transaction courante
+(il disparaît si elle est annulée) et les workers de
+`manage.py run_notification_workers` les envoient :
+
+- prise en charge par lots avec `SELECT ... FOR UPDATE SKIP LOCKED` : plusieurs
+  workers se partagent la file sans traiter deux fois le même message ;
+- un message pris en charge depuis plus de NOTIFICATIONS_VERROU_SECONDES
+  (défaut 300, worker arrêté en cours d'envoi) redevient disponible ;
+- chaque tentative est enregistrée (NotificationAttempt) avec le résultat de
+  chaque appareil ; les appareils servis sont mémorisés (`delivered_devices`)
+  et seuls ceux en échec temporaire sont visés par la tentative suivante, les
+  tokens / abonnements invalides étant considérés comme traités ; en cas
+  d'échec la tentative suivante est planifiée avec un backoff exponentiel
+  (NOTIFICATIONS_BACKOFF_SECONDES × 2^(n-1), plafonné à
+  NOTIFICATIONS_BACKOFF_MAX_SECONDES, avec gigue) ;
+- après `max_attempts` échecs (NOTIFICATIONS_MAX_TENTATIVES, défaut 6) le
+  message passe en lettre morte (`dead`) et la NotificationDesignation liée
+  est marquée échouée.
+
+Regroupement : un message mis en file avec une clé (`coalesce_key`, ex.
+`match:<id>` pour les changements d'une désignation) part après
+NOTIFICATIONS_FENETRE_REGROUPEMENT secondes (défaut 60). Un nouveau message
+de même clé pour le même arbitre et le même canal, arrivé avant l'envoi,
+remplace les messages en attente : ceux-ci passent en `superseded` (liés au
+message qui les remplace, pour l'audit) et le nouveau message, qui garde
+l'échéance du premier, indique le nombre de mises à jour regroupées.
+"""
+import logging
+import random
+import time as chrono
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def _reglage(nom, defaut):
+    return getattr(settings, nom, defaut)
+
+
+def message(channel, arbitre, title, body, data=None, tag='', designation=None, notification=None):
+    """Message d'outbox non sauvegardé (pour bulk_create)"""
+    from accounts.models import NotificationOutbox
+
+    return NotificationOutbox(
+        channel=channel,
+        arbitre=arbitre,
+        designation=designation,
+        notification=notification,
+        title=title,
+        body=body,
+        data=data or {},
+        tag=tag or '',
+        max_attempts=_reglage('NOTIFICATIONS_MAX_TENTATIVES', 6),
+    )
+
+
+def mettre_en_file(channel, arbitre, title, body, data=None, tag='', designation=None, notification=None,
+                   coalesce_key=''):
+    """Écrire une notification dans l'outbox (dans la transaction courante)"""
+    instance = message(channel, arbitre, title, body, data, tag, designation, notification)
+    if not coalesce_key:
+        instance.save()
+        return instance
+    return _regrouper(instance, coalesce_key)
+
+
+def _regrouper(instance, coalesce_key):
+    """Remplacer les messages en attente de même clé par `instance` (résumé)"""
+    from accounts.models import NotificationOutbox
+
+    instance.coalesce_key = coalesce_key
+    with transaction.atomic():
+        precedents = list(
+            NotificationOutbox.objects.select_for_update()
+            .filter(
+                channel=instance.channel,
+                arbitre=instance.arbitre,
+                coalesce_key=coalesce_key,
+                status='pending',
+            )
+            .order_by('created_at')
+        )
+        if precedents:
+            # Garder l'échéance du premier message : la fenêtre ne glisse pas
+            instance.next_attempt_at = min(precedent.next_attempt_at for precedent in precedents)
+            instance.coalesced_count = 1 + sum(precedent.coalesced_count for precedent in precedents)
+            instance.body = f'{instance.body} ({instance.coalesced_count} mises à jour regroupées)'
+            instance.data = dict(instance.data, coalesced=instance.coalesced_count)
+        else:
+            instance.next_attempt_at = timezone.now() + timedelta(
+                seconds=_reglage('NOTIFICATIONS_FENETRE_REGROUPEMENT', 60)
+            )
+        instance.save()
+
+        if precedents:
+            NotificationOutbox.objects.filter(id__in=[precedent.id for precedent in precedents]).update(
+                status='superseded', superseded_by=instance
+            )
+    return instance
+
+
+def delai_backoff(tentative):
+    """Délai avant la tentative suivante (secondes), avec ±20 % de gigue"""
+    base = _reglage('NOTIFICATIONS_BACKOFF_SECONDES', 30)
+    plafond = _reglage('NOTIFICATIONS_BACKOFF_MAX_SECONDES', 3600)
+    delai = min(plafond, base * 2 ** max(0, tentative - 1))
+    return delai * random.uniform(0.8, 1.2)
+
+
+def prendre_lot(taille):
+    """
+    Prendre en charge les prochains messages à envoyer
+
+    Returns:
+        liste de NotificationOutbox passés en `processing`
+    """
+    from accounts.models import NotificationOutbox
+
+    maintenant = timezone.now()
+    expiration = maintenant - timedelta(seconds=_reglage('NOTIFICATIONS_VERROU_SECONDES', 300))
+    with transaction.atomic():
+        messages = list(
+            NotificationOutbox.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status='pending', next_attempt_at__lte=maintenant)
+                | Q(status='processing', locked_at__lt=expiration)
+            )
+            .order_by('next_attempt_at')[:taille]
+        )
+        if messages:
+            NotificationOutbox.objects.filter(id__in=[instance.id for instance in messages]).update(
+                status='processing', locked_at=maintenant
+            )
+    return messages
+
+
+def _envoyer(instance):
+    """
+    Envoyer un message aux appareils de l'arbitre qui ne l'ont pas encore reçu
+
+    Un appareil invalide (token ou abonnement désactivé pendant l'envoi) est
+    considéré comme traité : il ne justifie pas une nouvelle tentative.
+
+    Returns:
+        (ids des appareils servis, ids des appareils à réessayer, réponse)
+    """
+    from accounts.models import Device
+
+    if instance.channel == 'fcm':
+        from firebase_config import send_multicast
+
+        fcm_tokens = Device.objects.pour(instance.arbitre).actifs().filter(channel='fcm').exclude(
+            id__in=instance.delivered_devices
+        )
+        resultat = send_multicast(fcm_tokens, instance.title, instance.body, instance.data)
+        appareils = [(token['id'], token['success'], token['invalid']) for token in resultat['tokens']]
+    else:
+        from .services import push_service
+
+        resultat = push_service.send_notification_to_arbitres(
+            arbitres=[instance.arbitre],
+            title=instance.title,
+            body=instance.body,
+            data=instance.data,
+            tag=instance.tag or None,
+            exclure_appareils=instance.delivered_devices
+        )
+        appareils = [(appareil['id'], appareil['success'], appareil['expired']) for appareil in resultat['devices']]
+
+    servis = [appareil_id for appareil_id, succes, _ in appareils if succes]
+    a_reessayer = [appareil_id for appareil_id, succes, invalide in appareils if not succes and not invalide]
+    return servis, a_reessayer, resultat
+
+
+def traiter(instance):
+    """
+    Envoyer un message pris en charge et enregistrer la tentative
+
+    Returns:
+        statut final du message ('sent', 'pending' ou 'dead')
+    """
+    from accounts.models import NotificationAttempt, NotificationOutbox
+
+    debut = chrono.monotonic()
+    servis = []
+    try:
+        servis, a_reessayer, reponse = _envoyer(instance)
+        succes = not a_reessayer
+        erreur = '' if succes else f'Échec de l\'envoi vers {len(a_reessayer)} appareil(s): {reponse}'
+    except Exception as e:
+        succes, reponse, erreur = False, None, str(e)
+    duree_ms = int((chrono.monotonic() - debut) * 1000)
+
+    numero = instance.attempts + 1
+    maintenant = timezone.now()
+    with transaction.atomic():
+        NotificationAttempt.objects.create(
+            message=instance,
+            notification_id=instance.notification_id,
+            number=numero,
+            success=succes,
+            response=reponse,
+            error_message=erreur,
+            duration_ms=duree_ms
+        )
+        if succes:
+            statut = 'sent'
+            valeurs = {'sent_at': maintenant, 'last_error': ''}
+        elif numero >= instance.max_attempts:
+            statut = 'dead'
+            valeurs = {'last_error': erreur}
+        else:
+            statut = 'pending'
+            valeurs = {
+                'last_error': erreur,
+                'next_attempt_at': maintenant + timedelta(seconds=delai_backoff(numero)),
+            }
+        if servis:
+            valeurs['delivered_devices'] = instance.delivered_devices + servis
+        NotificationOutbox.objects.filter(id=instance.id).update(
+            status=statut, attempts=numero, locked_at=None, **valeurs
+        )
+        _suites(instance, statut, reponse, erreur, maintenant)
+
+    if statut == 'dead':
+        logger.error(f'Notification {instance.id} abandonnée après {numero} tentative(s): {erreur}')
+    return statut
+
+
+def _suites(instance, statut, reponse, erreur, maintenant):
+    """Répercuter le résultat sur la désignation et l'historique de notification"""
+    from accounts.models import NotificationDesignation
+    from matches.models import Designation
+
+    if statut == 'sent' and instance.designation_id:
+        Designation.objects.filter(id=instance.designation_id).update(
+            notification_envoyee=True, date_notification=maintenant
+        )
+    if instance.notification_id and statut in ('sent', 'dead'):
+        notification = NotificationDesignation.objects.filter(id=instance.notification_id).first()
+        if notification is None:
+            return
+        NotificationDesignation.objects.filter(id=notification.id).update(
+            fcm_response=reponse, sent_at=maintenant
+        )
+        if statut == 'sent':
+            notification.mark_as_delivered()
+        else:
+            notification.mark_as_failed(erreur)
+
+
+def relancer(queryset):
+    """Remettre en file des messages abandonnés (tentatives remises à zéro)"""
+    return queryset.filter(status='dead').update(
+        status='pending', attempts=0, next_attempt_at=timezone.now(), last_error=''
+    )
@@ -4,17 +4,39 @@ Service de notifications push Web pour les arbitres
 """
 
 import json
+import os
+import threading
+import time as chrono
 import requests
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Dict, Any
+from urllib.parse import urlparse
 from django.conf import settings
 from django.utils import timezone
-from pywebpush import webpush, WebPushException
-from accounts.models import Arbitre, PushSubscription
+from py_vapid import Vapid
+from pywebpush import WebPusher, WebPushException
+from requests.adapters import HTTPAdapter
+from accounts.models import Arbitre, Device
+from . import metrics
+from .utilisation import RegistreUtilisation
 
 class PushNotificationService:
-    """Service pour envoyer des notifications push aux arbitres"""
+    """
+    Service pour envoyer des notifications push aux arbitres
+    
+    Les envois partent en parallèle sur un pool de WEBPUSH_WORKERS threads
+    (défaut 8). Chaque service push (origine de l'endpoint) a sa session HTTP
+    keep-alive, gardée d'un envoi à l'autre, et ses en-têtes VAPID signés une
+    fois puis réutilisés jusqu'à WEBPUSH_VAPID_MARGE secondes (défaut 300)
+    avant leur expiration (WEBPUSH_VAPID_DUREE, défaut 12 h).
+    """
     
     def __init__(self):
+        self._verrou = threading.Lock()
+        self._sessions = {}
+        self._entetes_vapid = {}
+        self._vapid = None
+        
         # Essayer d'abord les variables d'environnement
         self.vapid_private_key = getattr(settings, 'VAPID_PRIVATE_KEY', None)
         self.vapid_public_key = getattr(settings, 'VAPID_PUBLIC_KEY', None)
@@ -51,7 +73,8 @@ class PushNotificationService:
         data: Dict[str, Any] = None,
         icon: str = None,
         badge: str = None,
-        tag: str = None
+        tag: str = None,
+        exclure_appareils: List[int] = None
     ) -> Dict[str, Any]:
         """
         Envoyer une notification push à une liste d'arbitres
@@ -64,171 +87,188 @@ class PushNotificationService:
             icon: URL de l'icône
             badge: URL du badge
             tag: Tag pour grouper les notifications
+            exclure_appareils: Ids des abonnements déjà servis (optionnel)
         
         Returns:
-            Dict avec le statut des envois
+            Dict avec le statut des envois et le résultat de chaque
+            abonnement ('devices')
         """
         results = {
             'success': 0,
             'failed': 0,
-            'errors': []
+            'deactivated': 0,
+            'errors': [],
+            'devices': []
         }
         
-        for arbitre in arbitres:
-            try:
-                # Récupérer tous les abonnements actifs de l'arbitre
-                subscriptions = PushSubscription.objects.filter(
-                    arbitre=arbitre,
-                    is_active=True
-                )
-                
-                for subscription in subscriptions:
-                    success = self._send_single_notification(
-                        subscription, title, body, data, icon, badge, tag
-                    )
-                    
-                    if success:
-                        results['success'] += 1
-                        # Mettre à jour la date de dernière utilisation
-                        subscription.last_used = timezone.now()
-                        subscription.save()
-                    else:
-                        results['failed'] += 1
-                        
-            except Exception as e:
+        # Récupérer en une requête tous les abonnements actifs des arbitres
+        arbitres = {arbitre.pk: arbitre for arbitre in arbitres}
+        subscriptions = list(
+            Device.objects.actifs().filter(
+                channel='webpush',
+                user_type='arbitre',
+                user_id__in=list(arbitres)
+            ).exclude(id__in=exclure_appareils or [])
+        )
+        if not subscriptions:
+            return results
+        
+        # Préparer le payload de la notification (commun à tous les envois)
+        payload = json.dumps({
+            'title': title,
+            'body': body,
+            'icon': icon or '/static/images/notification-icon.png',
+            'badge': badge or '/static/images/badge-icon.png',
+            'tag': tag,
+            'data': data or {},
+            'timestamp': timezone.now().isoformat()
+        })
+        
+        workers = min(self._workers(), len(subscriptions))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='webpush') as pool:
+            envois = list(pool.map(lambda subscription: self._send_single_notification(subscription, payload), subscriptions))
+        
+        # Les écritures restent dans le thread appelant (connexion de la requête)
+        expires = []
+        servis = RegistreUtilisation(Device)
+        for subscription, envoi in zip(subscriptions, envois):
+            results['devices'].append(dict(envoi, id=subscription.id))
+            if envoi['success']:
+                results['success'] += 1
+                servis.marquer([subscription.id])
+            else:
                 results['failed'] += 1
-                results['errors'].append(f"Erreur pour {arbitre.get_full_name()}: {str(e)}")
+                if envoi['expired']:
+                    expires.append(subscription.id)
+                if envoi['error']:
+                    results['errors'].append(f"Erreur pour {arbitres[subscription.user_id].get_full_name()}: {envoi['error']}")
+        
+        # Mettre à jour la date de dernière utilisation
+        servis.ecrire()
+        
+        # Abonnements expirés ou invalides (404 / 410) : désactivés en une requête
+        if expires:
+            results['deactivated'] = Device.objects.filter(
+                id__in=expires, is_active=True
+            ).update(is_active=False)
+        metrics.enregistrer(
+            'webpush',
+            envoyes=results['success'],
+            echecs=results['failed'],
+            invalides=results['deactivated']
+        )
         
         return results
     
-    def _send_single_notification(
-        self, 
-        subscription: PushSubscription, 
-        title: str, 
-        body: str, 
-        data: Dict[str, Any] = None,
-        icon: str = None,
-        badge: str = None,
-        tag: str = None
-    ) -> bool:
-        """Envoyer une notification à un abonnement spécifique"""
+    def _workers(self) -> int:
+        return max(1, getattr(settings, 'WEBPUSH_WORKERS', 8))
+    
+    @staticmethod
+    def _origine(endpoint: str) -> str:
+        """Schéma + hôte + port : origine du service push et audience VAPID"""
+        parsed_url = urlparse(endpoint)
+        return f"{parsed_url.scheme}://{parsed_url.netloc}"
+    
+    def _session(self, origine: str) -> requests.Session:
+        """Session HTTP keep-alive partagée pour un service push"""
+        with self._verrou:
+            session = self._sessions.get(origine)
+            if session is None:
+                session = requests.Session()
+                session.mount(origine, HTTPAdapter(pool_connections=1, pool_maxsize=self._workers()))
+                self._sessions[origine] = session
+            return session
+    
+    def _entetes_vapid_pour(self, audience: str) -> Dict[str, str]:
+        """En-têtes d'autorisation VAPID d'une audience, re-signés peu avant expiration"""
+        maintenant = int(chrono.time())
+        marge = getattr(settings, 'WEBPUSH_VAPID_MARGE', 300)
+        with self._verrou:
+            entree = self._entetes_vapid.get(audience)
+            if entree is not None and entree[1] - marge > maintenant:
+                return entree[0]
+            
+            if self._vapid is None:
+                if os.path.isfile(self.vapid_private_key):
+                    self._vapid = Vapid.from_file(private_key_file=self.vapid_private_key)
+                else:
+                    self._vapid = Vapid.from_string(private_key=self.vapid_private_key)
+            expiration = maintenant + getattr(settings, 'WEBPUSH_VAPID_DUREE', 12 * 60 * 60)
+            entetes = self._vapid.sign({
+                'sub': f'mailto:{self.vapid_email}',
+                'aud': audience,
+                'exp': expiration
+            })
+            self._entetes_vapid[audience] = (entetes, expiration)
+            return entetes
+    
+    def _post(self, subscription: Device, payload: str) -> requests.Response:
+        """Chiffrer et poster le message sur la session du service push"""
+        origine = self._origine(subscription.endpoint)
+        return WebPusher(
+            subscription.subscription_info,
+            requests_session=self._session(origine)
+        ).send(
+            payload,
+            dict(self._entetes_vapid_pour(origine)),
+            content_encoding='aes128gcm',
+            timeout=getattr(settings, 'WEBPUSH_TIMEOUT', 10)
+        )
+    
+    def _send_single_notification(self, subscription: Device, payload: str) -> Dict[str, Any]:
+        """
+        Envoyer une notification à un abonnement spécifique (sans accès à la base)
         
+        Returns:
+            Dict success / expired (abonnement à désactiver) / error
+        """
         try:
-            # Préparer le payload de la notification
-            payload = {
-                'title': title,
-                'body': body,
-                'icon': icon or '/static/images/notification-icon.png',
-                'badge': badge or '/static/images/badge-icon.png',
-                'tag': tag,
-                'data': data or {},
-                'timestamp': timezone.now().isoformat()
-            }
-            
             # Détecter le type d'endpoint
-            from urllib.parse import urlparse
-            parsed_url = urlparse(subscription.endpoint)
-            is_fcm = 'fcm.googleapis.com' in subscription.endpoint
-            
-            print(f"🔔 Tentative d'envoi de notification:")
-            print(f"   Endpoint: {subscription.endpoint}")
-            print(f"   Type: {'FCM (Firebase)' if is_fcm else 'VAPID Standard'}")
-            
-            if is_fcm:
-                # Pour FCM, utiliser une approche différente
+            if 'fcm.googleapis.com' in subscription.endpoint:
                 return self._send_fcm_notification(subscription, payload)
             else:
-                # Pour les endpoints VAPID standard
                 return self._send_vapid_notification(subscription, payload)
                 
         except Exception as e:
-            print(f"❌ Erreur lors de l'envoi de notification: {e}")
-            print(f"   Type d'erreur: {type(e).__name__}")
-            print(f"   Détails: {str(e)}")
-            import traceback
-            print(f"   Stack trace: {traceback.format_exc()}")
-            return False
+            print(f"❌ Erreur lors de l'envoi de notification: {type(e).__name__}: {e}")
+            return {'success': False, 'expired': False, 'error': str(e)}
     
-    def _send_fcm_notification(self, subscription: PushSubscription, payload: Dict[str, Any]) -> bool:
+    def _send_fcm_notification(self, subscription: Device, payload: str) -> Dict[str, Any]:
         """Envoyer une notification via FCM (Firebase)"""
         try:
-            print(f"🔥 Envoi via FCM...")
-            
-            # Pour FCM, l'audience doit être le schéma + hôte + port
-            # Pas l'endpoint complet
-            from urllib.parse import urlparse
-            parsed_url = urlparse(subscription.endpoint)
-            
-            # Audience correcte pour FCM : schéma + hôte + port
-            audience = f"{parsed_url.scheme}://{parsed_url.netloc}"
-            
-            print(f"   Audience FCM: {audience}")
-            print(f"   Clés VAPID: {self.vapid_private_key[:20]}... / {self.vapid_public_key[:20]}...")
-            
-            # Essayer avec VAPID pour FCM
-            response = webpush(
-                subscription_info=subscription.subscription_info,
-                data=json.dumps(payload),
-                vapid_private_key=self.vapid_private_key,
-                vapid_claims={
-                    'sub': f'mailto:{self.vapid_email}',
-                    'aud': audience
-                }
-            )
-            
-            print(f"✅ Réponse FCM: {response.status_code}")
+            response = self._post(subscription, payload)
             # FCM retourne 201 (Created) pour succès, pas 200
-            return response.status_code in [200, 201]
+            if response.status_code in [200, 201]:
+                return {'success': True, 'expired': False, 'error': None}
+            return {'success': False, 'expired': False, 'error': f'HTTP {response.status_code}'}
             
         except Exception as e:
             print(f"❌ Erreur FCM: {e}")
-            return False
+            return {'success': False, 'expired': False, 'error': str(e)}
     
-    def _send_vapid_notification(self, subscription: PushSubscription, payload: Dict[str, Any]) -> bool:
+    def _send_vapid_notification(self, subscription: Device, payload: str) -> Dict[str, Any]:
         """Envoyer une notification via VAPID standard"""
         try:
-            print(f"🔑 Envoi via VAPID...")
-            
-            # Extraire le domaine de l'endpoint pour l'audience VAPID
-            from urllib.parse import urlparse
-            parsed_url = urlparse(subscription.endpoint)
-            audience = f"{parsed_url.scheme}://{parsed_url.netloc}"
-            
-            print(f"   Audience: {audience}")
-            print(f"   Clés VAPID: {self.vapid_private_key[:20]}... / {self.vapid_public_key[:20]}...")
-            
-            response = webpush(
-                subscription_info=subscription.subscription_info,
-                data=json.dumps(payload),
-                vapid_private_key=self.vapid_private_key,
-                vapid_claims={
-                    'sub': f'mailto:{self.vapid_email}',
-                    'aud': audience
-                }
-            )
+            response = self._post(subscription, payload)
             
             # Vérifier la réponse
-            if response.status_code == 200:
-                return True
-            else:
-                # Si l'abonnement n'est plus valide, le désactiver
-                if response.status_code in [404, 410]:
-                    subscription.is_active = False
-                    subscription.save()
-                return False
+            if response.status_code in [200, 201, 202]:
+                return {'success': True, 'expired': False, 'error': None}
+            # Si l'abonnement n'est plus valide, le désactiver
+            return {
+                'success': False,
+                'expired': response.status_code in [404, 410],
+                'error': f'HTTP {response.status_code}'
+            }
                 
         except WebPushException as e:
             # Gérer les erreurs Web Push
             print(f"❌ Erreur WebPush: {e}")
-            if '410' in str(e) or '404' in str(e):
-                # Abonnement expiré ou invalide
-                subscription.is_active = False
-                subscription.save()
-            return False
+            return {'success': False, 'expired': '410' in str(e) or '404' in str(e), 'error': str(e)}
             
         except Exception as e:
             print(f"❌ Erreur VAPID: {e}")
-            return False
+            return {'success': False, 'expired': False, 'error': str(e)}
     
     def send_designation_notification(
         self, 
@@ -0,0 +1,241 @@
+"""
+Segmentation des envois FCM par topics
+
+Chaque appareil FCM (Device actif d'un utilisateur actif) est abonné aux topics
+décrivant son utilisateur :
+- type_<arbitre|commissaire|admin> ;
+- ligue_<id> (arbitres et commissaires) ;
+- grade_<arbitre|commissaire>_<grade> ;
+- role_<arbitre|assistant> (arbitres).
+
+Un envoi à un segment (« arbitres de la ligue 3 », « arbitres fédéraux ») est
+alors un seul message FCM adressé à un topic ou à une condition combinant
+jusqu'à 5 topics, quelle que soit la taille de l'audience.
+
+Les abonnements ne sont pas modifiés dans les requêtes : les signaux marquent
+les appareils à resynchroniser (`topics_synced=False`) lorsqu'un token est
+enregistré / réactivé / désactivé ou que le type, la ligue, le grade, le rôle
+ou le statut de son utilisateur change ; chaque marquage incrémente
+`topics_version`. `synchroniser` (appelé par les workers de
+`run_notification_workers`) calcule ensuite les écarts et les applique par
+appels groupés `subscribe_to_topic` / `unsubscribe_from_topic` (1000 tokens
+par appel, limite FCM). Le résultat n'est validé (`topics_synced=True`) que
+pour les appareils dont `topics_version` n'a pas changé pendant les appels :
+un appareil remarqué entre-temps est repris au passage suivant.
+
+Les appareils d'un utilisateur supprimé sont désactivés par les signaux puis
+supprimés par `synchroniser` une fois désabonnés de leurs topics.
+"""
+import logging
+import operator
+from functools import reduce
+
+from django.conf import settings
+from django.db.models import F, Q
+
+logger = logging.getLogger(__name__)
+
+TAILLE_APPEL = 1000  # tokens par appel de gestion des topics (limite FCM)
+TOPICS_PAR_CONDITION = 5  # topics au plus dans une condition FCM
+
+# Erreurs d'abonnement définitives (raison renvoyée par l'API Instance ID) :
+# token inconnu ou mal formé
+ERREURS_TOKEN_INVALIDE = ('NOT_FOUND', 'INVALID_ARGUMENT')
+
+
+# Champs déterminant les topics, par modèle (nom en minuscules)
+CHAMPS_SUIVIS = {
+    'arbitre': ('is_active', 'ligue_id', 'grade', 'role'),
+    'commissaire': ('is_active', 'ligue_id', 'grade'),
+    'admin': ('is_active',),
+    'device': ('token', 'is_active', 'user_type', 'user_id'),
+}
+
+
+def etat(instance):
+    """
+    Valeurs des champs qui déterminent les topics (signaux post_init / save)
+
+    None si un champ est différé (`only()` / `defer()`) : état inconnu.
+    """
+    champs = CHAMPS_SUIVIS[instance.__class__.__name__.lower()]
+    if any(champ not in instance.__dict__ for champ in champs):
+        return None
+    return tuple(instance.__dict__[champ] for champ in champs)
+
+
+def type_utilisateur(user):
+    """'arbitre', 'commissaire' ou 'admin'"""
+    from accounts.models import Device
+
+    return Device.type_utilisateur(user)
+
+
+def topics_utilisateur(user):
+    """Topics auxquels les appareils d'un utilisateur doivent être abonnés"""
+    if user is None or not user.is_active:
+        return frozenset()
+    user_type = type_utilisateur(user)
+    topics = {f'type_{user_type}'}
+    if user_type in ('arbitre', 'commissaire'):
+        if user.ligue_id:
+            topics.add(f'ligue_{user.ligue_id}')
+        if user.grade:
+            topics.add(f'grade_{user_type}_{user.grade}')
+    if user_type == 'arbitre' and user.role:
+        topics.add(f'role_{user.role}')
+    return frozenset(topics)
+
+
+def topics_token(fcm_token, user):
+    """Topics voulus pour un appareil FCM (aucun s'il est inactif ou orphelin)"""
+    if not fcm_token.is_active:
+        return frozenset()
+    return topics_utilisateur(user)
+
+
+def _utilisateurs(devices):
+    """Propriétaires des appareils : une requête par type d'utilisateur"""
+    from accounts.models import Device
+
+    ids_par_type = {}
+    for device in devices:
+        ids_par_type.setdefault(device.user_type, set()).add(device.user_id)
+    utilisateurs = {}
+    for user_type, ids in ids_par_type.items():
+        for user in Device.modele_utilisateur(user_type).objects.filter(pk__in=ids):
+            utilisateurs[(user_type, user.pk)] = user
+    return utilisateurs
+
+
+def topics_segment(ligue_id=None, grade=None, role=None, user_type=None):
+    """
+    Topics d'un segment (intersection des critères)
+
+    Le grade dépend du type d'utilisateur (arbitre par défaut) ; le rôle ne
+    concerne que les arbitres.
+
+    Raises:
+        ValueError: critères vides ou incompatibles
+    """
+    topics = []
+    if user_type:
+        topics.append(f'type_{user_type}')
+    if ligue_id:
+        topics.append(f'ligue_{ligue_id}')
+    if grade:
+        if user_type == 'admin':
+            raise ValueError('Les administrateurs n\'ont pas de grade')
+        topics.append(f'grade_{user_type or "arbitre"}_{grade}')
+    if role:
+        if user_type not in (None, 'arbitre'):
+            raise ValueError('Le rôle ne concerne que les arbitres')
+        topics.append(f'role_{role}')
+    if not topics:
+        raise ValueError('Au moins un critère de segment est requis')
+    return topics
+
+
+def condition(topics):
+    """Condition FCM (`'a' in topics && 'b' in topics`) ; None pour un seul topic"""
+    if len(topics) == 1:
+        return None
+    if len(topics) > TOPICS_PAR_CONDITION:
+        raise ValueError(f'Une condition FCM combine au plus {TOPICS_PAR_CONDITION} topics')
+    return ' && '.join(f"'{topic}' in topics" for topic in topics)
+
+
+def marquer_utilisateur(user):
+    """Faire resynchroniser les topics des appareils FCM d'un utilisateur"""
+    from accounts.models import Device
+
+    return Device.objects.pour(user).filter(channel='fcm').update(
+        topics_synced=False, topics_version=F('topics_version') + 1
+    )
+
+
+def _inchanges(fcm_tokens):
+    """Appareils encore à la topics_version chargée (non remarqués depuis)"""
+    return reduce(operator.or_, (
+        Q(id=fcm_token.id, topics_version=fcm_token.topics_version) for fcm_token in fcm_tokens
+    ))
+
+
+def synchroniser(limite=None):
+    """
+    Appliquer les abonnements des tokens marqués à resynchroniser
+
+    Returns:
+        dict avec le nombre de tokens synchronisés, en échec, désactivés et
+        supprimés (utilisateur supprimé)
+    """
+    from accounts.models import Device
+    from firebase_config import FIREBASE_AVAILABLE, initialize_firebase, desactiver_tokens
+
+    resultats = {'synced': 0, 'failed': 0, 'deactivated': 0, 'deleted': 0}
+    if not FIREBASE_AVAILABLE or not initialize_firebase():
+        return resultats
+    from firebase_admin import messaging
+
+    limite = limite or getattr(settings, 'FCM_TOPICS_TAILLE_LOT', 5000)
+    tokens = list(Device.objects.filter(channel='fcm', topics_synced=False).order_by('id')[:limite])
+    if not tokens:
+        return resultats
+    utilisateurs = _utilisateurs(tokens)
+
+    # Écarts par (topic, opération) -> tokens
+    voulus = {}
+    operations = {}
+    for fcm_token in tokens:
+        voulus[fcm_token.id] = topics_token(fcm_token, utilisateurs.get((fcm_token.user_type, fcm_token.user_id)))
+        actuels = frozenset(fcm_token.topics or ())
+        for topic in voulus[fcm_token.id] - actuels:
+            operations.setdefault((topic, 'subscribe'), []).append(fcm_token)
+        for topic in actuels - voulus[fcm_token.id]:
+            operations.setdefault((topic, 'unsubscribe'), []).append(fcm_token)
+
+    echecs = set()
+    invalides = set()
+    for (topic, operation), concernes in operations.items():
+        appel = messaging.subscribe_to_topic if operation == 'subscribe' else messaging.unsubscribe_from_topic
+        for debut in range(0, len(concernes), TAILLE_APPEL):
+            lot = concernes[debut:debut + TAILLE_APPEL]
+            try:
+                reponse = appel([fcm_token.token for fcm_token in lot], topic)
+            except Exception as e:
+                logger.error(f'Erreur lors de la gestion du topic {topic} ({operation}): {e}')
+                echecs.update(fcm_token.id for fcm_token in lot)
+                continue
+            for erreur in reponse.errors:
+                fcm_token = lot[erreur.index]
+                if erreur.reason in ERREURS_TOKEN_INVALIDE:
+                    invalides.add(fcm_token.id)
+                else:
+                    echecs.add(fcm_token.id)
+
+    # Les tokens en échec restent marqués et seront repris au prochain passage ;
+    # les tokens invalides sont désactivés (sans topics). Les topics appliqués
+    # sont toujours enregistrés (état réel côté FCM), mais un appareil remarqué
+    # pendant les appels (topics_version changée) reste à resynchroniser.
+    par_topics = {}
+    for fcm_token in tokens:
+        if fcm_token.id in invalides or fcm_token.id in echecs:
+            continue
+        par_topics.setdefault(tuple(sorted(voulus[fcm_token.id])), []).append(fcm_token)
+    for topics_appliques, groupe in par_topics.items():
+        for debut in range(0, len(groupe), TAILLE_APPEL):
+            lot = groupe[debut:debut + TAILLE_APPEL]
+            Device.objects.filter(id__in=[fcm_token.id for fcm_token in lot]).update(topics=list(topics_appliques))
+            resultats['synced'] += Device.objects.filter(_inchanges(lot)).update(topics_synced=True)
+
+    # Appareils d'un utilisateur supprimé : une fois désabonnés (ou invalides), supprimés
+    orphelins = [
+        fcm_token for fcm_token in tokens
+        if (fcm_token.user_type, fcm_token.user_id) not in utilisateurs and fcm_token.id not in echecs
+    ]
+    if orphelins:
+        resultats['deleted'] = Device.objects.filter(_inchanges(orphelins)).delete()[1].get(Device._meta.label, 0)
+
+    resultats['failed'] = len(echecs - invalides)
+    resultats['deactivated'] = desactiver_tokens(list(invalides - {fcm_token.id for fcm_token in orphelins}))
+    return resultats
@@ -0,0 +1,44 @@
+"""
+Suivi de la dernière utilisation des appareils
+
+Après un envoi groupé, les appareils servis sont accumulés en mémoire puis
+leur `last_used` est écrit en une requête `UPDATE ... WHERE id IN (...)`
+(par tranches de NOTIFICATIONS_TAILLE_MISE_A_JOUR identifiants, défaut
+5000), au lieu d'un `save()` complet par appareil. `last_used` étant en
+`auto_now`, la date est fixée explicitement.
+"""
+from django.conf import settings
+from django.utils import timezone
+
+
+class RegistreUtilisation:
+    """Appareils servis d'un modèle (Device), à écrire en bloc"""
+
+    def __init__(self, model):
+        self.model = model
+        self.ids = set()
+
+    def __len__(self):
+        return len(self.ids)
+
+    def marquer(self, ids):
+        """Ajouter des appareils servis (identifiants)"""
+        self.ids.update(ids)
+
+    def ecrire(self, quand=None):
+        """
+        Écrire la dernière utilisation des appareils marqués puis vider le registre
+
+        Returns:
+            nombre d'appareils mis à jour
+        """
+        if not self.ids:
+            return 0
+        quand = quand or timezone.now()
+        taille = getattr(settings, 'NOTIFICATIONS_TAILLE_MISE_A_JOUR', 5000)
+        ids = sorted(self.ids)
+        self.ids = set()
+        return sum(
+            self.model.objects.filter(id__in=ids[debut:debut + taille]).update(last_used=quand)
+            for debut in range(0, len(ids), taille)
+        )
@@ -11,7 +11,7 @@ from datetime import datetime
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arbitrage_project.settings')
 django.setup()
 
-from accounts.models import FCMToken, Arbitre
+from accounts.models import Device, Arbitre
 from firebase_config import send_notification_to_user, get_notification_stats, initialize_firebase
 
 def test_fcm_system():
@@ -31,7 +31,7 @@ def test_fcm_system():
     
     # 2. Vérifier les tokens FCM
     print("\n2️⃣ Vérification des tokens FCM...")
-    tokens = FCMToken.objects.filter(is_active=True)
+    tokens = Device.objects.filter(channel='fcm', is_active=True)
     print(f"   📱 Tokens FCM actifs: {tokens.count()}")
     
     if not tokens.exists():
@@ -99,10 +99,12 @@ def create_test_token():
         print(f"   ✅ Arbitre de test existant: {arbitre.get_full_name()}")
     
     # Créer un token FCM de test
-    fcm_token, created = FCMToken.objects.get_or_create(
+    fcm_token, created = Device.objects.get_or_create(
+        channel='fcm',
         token='test_fcm_token_final_123456789',
         defaults={
-            'arbitre': arbitre,
+            'user_type': 'arbitre',
+            'user_id': arbitre.pk,
             'device_type': 'android',
             'device_id': 'test_device_final_123',
             'app_version': '1.0.0',
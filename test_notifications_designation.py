@@ -11,7 +11,7 @@ from datetime import datetime, timedelta
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'arbitrage_project.settings')
 django.setup()
 
-from accounts.models import Arbitre, NotificationDesignation, FCMToken
+from accounts.models import Arbitre, NotificationDesignation, Device
 from accounts.views import notify_arbitre_designation, notify_multiple_arbitres
 from django.test import RequestFactory
 from django.contrib.auth import get_user_model
@@ -42,10 +42,12 @@ def test_notification_designation():
     
     # 2. Créer un token FCM de test
     print("\n2️⃣ Création d'un token FCM de test...")
-    fcm_token, created = FCMToken.objects.get_or_create(
+    fcm_token, created = Device.objects.get_or_create(
+        channel='fcm',
         token='test_designation_token_123456789',
         defaults={
-            'arbitre': arbitre,
+            'user_type': 'arbitre',
+            'user_id': arbitre.pk,
             'device_type': 'android',
             'device_id': 'test_device_designation_123',
             'app_version': '1.0.0',